@@ -0,0 +1,52 @@
+"""Add generated tsvector columns + GIN indexes for the PostgreSQL search backend.
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "004"
+down_revision: Union[str, None] = "003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Ausdruecke identisch zu app/models/oparl.py (*_SEARCH_VECTOR)
+PAPER_SEARCH_VECTOR = (
+    "setweight(to_tsvector('german', coalesce(reference, '')), 'A') || "
+    "setweight(to_tsvector('german', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('german', coalesce(paper_type, '')), 'C') || "
+    "setweight(to_tsvector('german', coalesce(ai_summary, '')), 'D')"
+)
+MEETING_SEARCH_VECTOR = "setweight(to_tsvector('german', coalesce(name, '')), 'A')"
+PERSON_SEARCH_VECTOR = (
+    "setweight(to_tsvector('german', coalesce(family_name, '')), 'A') || "
+    "setweight(to_tsvector('german', coalesce(given_name, '')), 'A') || "
+    "setweight(to_tsvector('german', coalesce(name, '')), 'B')"
+)
+
+TABLES = [
+    ("papers", "ix_paper_search_vector", PAPER_SEARCH_VECTOR),
+    ("meetings", "ix_meeting_search_vector", MEETING_SEARCH_VECTOR),
+    ("persons", "ix_person_search_vector", PERSON_SEARCH_VECTOR),
+]
+
+
+def upgrade() -> None:
+    for table, index, expression in TABLES:
+        op.execute(
+            f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector "
+            f"GENERATED ALWAYS AS ({expression}) STORED"
+        )
+        op.execute(
+            f"CREATE INDEX IF NOT EXISTS {index} ON {table} USING gin (search_vector)"
+        )
+
+
+def downgrade() -> None:
+    for table, index, _ in TABLES:
+        op.execute(f"DROP INDEX IF EXISTS {index}")
+        op.execute(f"ALTER TABLE {table} DROP COLUMN IF EXISTS search_vector")
@@ -0,0 +1,35 @@
+"""Track input hash, model and source version of paper embeddings.
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "005"
+down_revision: Union[str, None] = "004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # SHA-256 des Eingabetexts, Modellname und papers.modified der eingebetteten Fassung
+    op.execute("ALTER TABLE papers ADD COLUMN IF NOT EXISTS embedding_hash varchar(64)")
+    op.execute("ALTER TABLE papers ADD COLUMN IF NOT EXISTS embedding_model varchar(64)")
+    op.execute("ALTER TABLE papers ADD COLUMN IF NOT EXISTS embedding_synced_at timestamp")
+
+    # Bestehende Vektoren stammen von voyage-3; ohne Hash werden sie erst bei
+    # der naechsten Aenderung der Vorlage neu berechnet
+    op.execute(
+        "UPDATE papers SET embedding_model = 'voyage-3', embedding_synced_at = modified "
+        "WHERE embedding IS NOT NULL AND embedding_model IS NULL"
+    )
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE papers DROP COLUMN IF EXISTS embedding_synced_at")
+    op.execute("ALTER TABLE papers DROP COLUMN IF EXISTS embedding_model")
+    op.execute("ALTER TABLE papers DROP COLUMN IF EXISTS embedding_hash")
@@ -0,0 +1,39 @@
+"""Replace the IVFFlat embedding index with HNSW.
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "006"
+down_revision: Union[str, None] = "005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # HNSW braucht kein Training (lists) und haelt den Recall bei wachsendem
+    # Bestand; CONCURRENTLY laeuft nicht innerhalb einer Transaktion.
+    # Parameter entsprechen den Defaults von VECTOR_HNSW_M / _EF_CONSTRUCTION,
+    # abweichende Werte: python -m app.scripts.vector_index rebuild
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_papers_embedding_cosine")
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_papers_embedding_cosine "
+            "ON papers USING hnsw (embedding vector_cosine_ops) "
+            "WITH (m = 16, ef_construction = 64)"
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_papers_embedding_cosine")
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_papers_embedding_cosine "
+            "ON papers USING ivfflat (embedding vector_cosine_ops) "
+            "WITH (lists = 100)"
+        )
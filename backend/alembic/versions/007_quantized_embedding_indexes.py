@@ -0,0 +1,39 @@
+"""Update pgvector for halfvec/binary quantization (indexes via vector_index sync).
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "007"
+down_revision: Union[str, None] = "006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # halfvec und binary_quantize ab pgvector 0.7
+    op.execute("ALTER EXTENSION vector UPDATE")
+
+    # Keine Indizes hier: welche Quantisierungen einen Index brauchen, haengt
+    # von VECTOR_QUANTIZATION(_TENANTS) der jeweiligen Umgebung ab. Nach dem
+    # Upgrade und nach jeder Aenderung der Einstellung:
+    #   python -m app.scripts.vector_index sync
+    # Bis dahin sucht jeder Tenant ueber den float32-Index aus Migration 006.
+
+
+def downgrade() -> None:
+    # Von vector_index sync angelegte Indizes entfernen, float32-Index aus 006
+    # wiederherstellen, falls sync ihn entfernt hat
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_papers_embedding_cosine "
+            "ON papers USING hnsw (embedding vector_cosine_ops) "
+            "WITH (m = 16, ef_construction = 64)"
+        )
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_papers_embedding_binary")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_papers_embedding_halfvec")
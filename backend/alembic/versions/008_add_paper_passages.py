@@ -0,0 +1,56 @@
+"""Add paper_passages: chunked paper and file texts with embeddings.
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "008"
+down_revision: Union[str, None] = "007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Zeitpunkt der letzten Passagen-Indexierung (python -m app.scripts.index_passages)
+    op.execute("ALTER TABLE papers ADD COLUMN IF NOT EXISTS passages_synced_at timestamp")
+
+    # file_id NULL: Abschnitt aus Titel/Stichwoertern/KI-Zusammenfassung der Vorlage;
+    # tenant_id redundant zu papers fuer den Filter direkt im Vektorindex-Scan
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS paper_passages (
+            id bigserial PRIMARY KEY,
+            paper_id varchar(36) NOT NULL REFERENCES papers(id) ON DELETE CASCADE,
+            file_id varchar(36) REFERENCES files(id) ON DELETE CASCADE,
+            tenant_id varchar(36) NOT NULL,
+            chunk_index integer NOT NULL,
+            content text NOT NULL,
+            content_hash varchar(64) NOT NULL,
+            embedding vector(1024),
+            embedding_model varchar(64)
+        )
+    """)
+    op.execute("CREATE INDEX IF NOT EXISTS ix_paper_passages_paper_id ON paper_passages (paper_id)")
+    # float32-Index wie Migration 006; halfvec/binary-Indizes fuer quantisiert
+    # suchende Tenants legt python -m app.scripts.vector_index sync an
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_paper_passages_embedding_cosine "
+        "ON paper_passages USING hnsw (embedding vector_cosine_ops) "
+        "WITH (m = 16, ef_construction = 64)"
+    )
+    # Noch nie indexierte Vorlagen (Ergaenzung ueber papers.embedding in der
+    # Suche); nach dem ersten vollstaendigen Lauf praktisch leer
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_papers_passages_pending ON papers (tenant_id) "
+        "WHERE passages_synced_at IS NULL AND deleted = false"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_papers_passages_pending")
+    op.execute("DROP TABLE IF EXISTS paper_passages")
+    op.execute("ALTER TABLE papers DROP COLUMN IF EXISTS passages_synced_at")
@@ -0,0 +1,44 @@
+"""Add rag_answer_cache: reusable RAG chat answers keyed by query embedding.
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "009"
+down_revision: Union[str, None] = "008"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # scope: Hash aus Tenant, Filtern, Trefferzahl und Modellen;
+    # source_stamps: {paper_id: modified} der Quellen beim Speichern
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS rag_answer_cache (
+            id bigserial PRIMARY KEY,
+            scope varchar(64) NOT NULL,
+            question text NOT NULL,
+            query_embedding vector(1024) NOT NULL,
+            answer text NOT NULL,
+            sources jsonb NOT NULL,
+            source_stamps jsonb NOT NULL,
+            hits integer NOT NULL DEFAULT 0,
+            created timestamp NOT NULL DEFAULT now(),
+            expires_at timestamp NOT NULL
+        )
+    """)
+    op.execute("CREATE INDEX IF NOT EXISTS ix_rag_answer_cache_expires_at ON rag_answer_cache (expires_at)")
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_rag_answer_cache_query_embedding "
+        "ON rag_answer_cache USING hnsw (query_embedding vector_cosine_ops) "
+        "WITH (m = 16, ef_construction = 64)"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS rag_answer_cache")
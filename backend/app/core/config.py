@@ -43,6 +43,132 @@ class Settings(BaseSettings):
     elasticsearch_url: str = "http://localhost:9200"
     es_password: str = ""
     es_index_prefix: str = "ris"
+    es_number_of_shards: int = 1  # bei vielen Tenants erhoehen, siehe es_tenant_routing
+    es_number_of_replicas: int = 0
+    # Dokumente mit _routing=tenant_id schreiben/suchen (Aenderung erfordert Reindex)
+    es_tenant_routing: bool = True
+
+    # --- Suche ---
+    search_cache_enabled: bool = True
+    search_cache_ttl: int = 300  # seconds
+    search_cache_lock_ttl: int = 10  # seconds, Single-Flight-Sperre ueber Worker hinweg
+    search_pit_keep_alive: str = "2m"  # Point-in-Time fuer Cursor-Paginierung
+
+    # --- Suche: Backend ---
+    # "elasticsearch" oder "postgres" (PostgreSQL-Volltextsuche ohne ES)
+    search_backend: Literal["elasticsearch", "postgres"] = "elasticsearch"
+    # Abweichendes Backend je Tenant, z.B. "gemeinde-a=postgres,stadt-b=elasticsearch"
+    search_backend_tenants: str = ""
+
+    # --- Suche: Autocomplete (In-Memory-Praefix-Index) ---
+    autocomplete_index_enabled: bool = True
+    autocomplete_refresh_interval: int = 60  # seconds, Delta-Abgleich ueber modified
+
+    # --- Suche: Hybrid (BM25 + Vektor, Reciprocal Rank Fusion) ---
+    hybrid_candidates: int = 100  # Kandidaten je Quelle vor der Fusion
+    hybrid_rrf_k: int = 60
+    hybrid_keyword_timeout: float = 2.0  # seconds
+    hybrid_semantic_timeout: float = 2.0  # seconds, inkl. Query-Embedding
+    hybrid_min_similarity: float = 0.3
+
+    # --- Suche: Dateitexte im Index (content) ---
+    search_content_max_chars_per_file: int = 20_000
+    search_content_max_chars: int = 100_000  # pro Vorlage, Hauptdatei + Anlagen
+    search_content_batch_size: int = 200  # Vorlagen pro DB-Block beim Reindex
+
+    # --- Abonnements: Stichwort-Abgleich ---
+    keyword_compound_min_len: int = 5  # ab dieser Laenge auch innerhalb von Komposita
+    keyword_matcher_max_age: int = 300  # seconds, danach Automat neu aufbauen
+    keyword_notify_interval: int = 300  # seconds, geaenderte Vorlagen abgleichen (0 = aus)
+    keyword_notify_batch_size: int = 500  # Vorlagen je Seite
+
+    # --- Embeddings ---
+    # "voyage" (Voyage AI) oder "local" (Offline-Vektoren aus gehashten n-Grammen)
+    embedding_provider: Literal["voyage", "local"] = "voyage"
+    # Modellwechsel: Einstellung aendern, dann Backfill mit upgrade_model=true;
+    # Vektoren anderer Modelle werden bei der Suche bis dahin ausgeblendet
+    embedding_model: str = "voyage-3"  # Voyage-Modell
+    embedding_refresh_interval: int = 900  # seconds, geaenderte Vorlagen neu einbetten (0 = aus)
+    query_embedding_cache_size: int = 2048  # Eintraege im prozesslokalen LRU
+    query_embedding_cache_ttl: int = 604_800  # seconds (7 Tage) in Redis
+
+    # --- Embeddings: Vektorindex (pgvector) ---
+    # Aenderungen an m/ef_construction/lists wirken erst nach
+    # python -m app.scripts.vector_index rebuild
+    vector_index_type: Literal["hnsw", "ivfflat"] = "hnsw"
+    vector_hnsw_m: int = 16
+    vector_hnsw_ef_construction: int = 64
+    vector_hnsw_ef_search: int = 100  # je Abfrage, mindestens LIMIT
+    vector_ivfflat_lists: int = 0  # 0 = automatisch (Zeilen / 1000, min. 10)
+    vector_ivfflat_probes: int = 10
+    # ANN-Stufe auf quantisierten Vektoren, danach exakter Rerank mit float32:
+    # "none", "halfvec" (float16, halber Index) oder "binary" (1 Bit je Dimension);
+    # nach Aenderungen python -m app.scripts.vector_index sync (Indizes anpassen)
+    vector_quantization: Literal["none", "halfvec", "binary"] = "none"
+    # Abweichende Quantisierung je Tenant, z.B. "gemeinde-a=binary,stadt-b=halfvec"
+    vector_quantization_tenants: str = ""
+    vector_rerank_factor: int = 4  # ANN-Kandidaten = LIMIT * Faktor (binary: eher 8-10)
+    # Iterativer Index-Scan (pgvector >= 0.8): bei Filtern weiterlesen, bis LIMIT
+    # Treffer gefunden sind; "off" fuer aeltere pgvector-Versionen
+    vector_iterative_scan: Literal["off", "relaxed_order", "strict_order"] = "relaxed_order"
+    vector_max_scan_tuples: int = 20_000  # Obergrenze gelesener Index-Tupel je Abfrage
+
+    # --- Embeddings: Passagen (Vorlagen- und Dateitexte) ---
+    passage_chars: int = 1200  # Zielgroesse eines Abschnitts in Zeichen
+    passage_overlap: int = 200  # Zeichen Ueberlappung zum vorherigen Abschnitt
+    passage_max_chars_per_file: int = 200_000
+    passage_candidate_factor: int = 5  # Passagen-Treffer = LIMIT * Faktor vor der Gruppierung
+    passage_per_paper: int = 3  # beste Passagen je Vorlage im Ergebnis
+    passage_batch_size: int = 50  # Vorlagen pro Block beim Indexieren
+
+    # --- Embeddings: Backfill-Job ---
+    embedding_backfill_concurrency: int = 4  # gleichzeitige Voyage-Requests
+    embedding_backfill_batch_size: int = 128  # Texte pro Request (zusaetzlich Token-Limit)
+    embedding_backfill_page_size: int = 1000  # Vorlagen pro DB-Seite / Checkpoint
+    embedding_backfill_rate: float = 4.0  # Requests pro Sekunde (Token-Bucket)
+    embedding_backfill_burst: int = 8
+    embedding_backfill_max_retries: int = 5
+    embedding_backfill_backoff_base: float = 1.0  # seconds, exponentiell mit Jitter
+    embedding_backfill_backoff_max: float = 60.0  # seconds
+    embedding_backfill_lock_ttl: int = 300  # seconds, wird je Checkpoint verlaengert
+
+    # --- RAG-Chat ---
+    rag_model: str = "claude-haiku-4-5"
+    rag_max_tokens: int = 1024
+    rag_max_concurrent_streams: int = 100  # je Worker, danach 503 (0 = unbegrenzt)
+
+    # --- RAG-Chat: Kontext ---
+    rag_context_max_tokens: int = 3000  # geschaetzte Tokens fuer Quellen im Prompt
+    rag_context_min_similarity: float = 0.3  # sonst die besten 3 Vorlagen
+    rag_context_mmr_lambda: float = 0.7  # 1.0 = nur Relevanz, kleiner = mehr Vielfalt
+    rag_context_duplicate_threshold: float = 0.8  # Jaccard (Wort-Trigramme), darueber verworfen
+
+    # --- RAG-Chat: Antwort-Cache ---
+    # Antwort wiederverwenden, wenn eine fruehere Frage im selben Tenant/Filter
+    # mindestens so aehnlich ist und alle Quellen unveraendert sind
+    rag_answer_cache_enabled: bool = True
+    rag_answer_cache_threshold: float = 0.95  # Cosinus-Aehnlichkeit der Query-Embeddings
+    rag_answer_cache_ttl: int = 86_400  # seconds, begrenzt das Fehlen neuer Vorlagen
+
+    # --- KI-Texte: Kurzfassung und einfache Sprache ---
+    ai_summary_model: str = "claude-haiku-4-5-20251001"
+    ai_source_max_chars: int = 12_000  # Titel + Dateitexte als Eingabe
+    ai_jobs_worker_enabled: bool = True  # Worker im API-Prozess starten
+    ai_jobs_concurrency: int = 2  # gleichzeitige Generierungen je Prozess
+    ai_jobs_max_retries: int = 3  # bei Rate-Limit/Ueberlastung, Backoff mit Jitter
+    ai_jobs_backoff_base: float = 2.0  # seconds
+    ai_jobs_backoff_max: float = 60.0  # seconds
+    ai_jobs_pending_ttl: int = 900  # seconds, Sperre gegen doppelte Jobs je Vorlage
+    ai_jobs_status_ttl: int = 86_400  # seconds, Jobstatus abrufbar
+    ai_jobs_result_ttl: int = 2_592_000  # seconds (30 Tage), Ergebnis je Quelltext-Hash
+
+    # --- KI-Texte: Kurzfassungen im Massenbetrieb (Batch) ---
+    # "anthropic" (Message Batches API) oder "local" (Offline-Ersatz fuer Tests)
+    ai_batch_provider: Literal["anthropic", "local"] = "anthropic"
+    ai_batch_size: int = 500  # Vorlagen je Batch
+    ai_batch_max_open: int = 4  # gleichzeitig offene Batches
+    ai_batch_poll_interval: float = 60.0  # seconds
+    ai_batch_lock_ttl: int = 600  # seconds, wird je Abfrage verlaengert
 
     # --- MinIO ---
     minio_endpoint: str = "localhost:9000"
@@ -73,10 +199,39 @@ class Settings(BaseSettings):
     def parse_cors_origins(cls, v: str) -> str:
         return v
 
+    @field_validator("search_backend_tenants")
+    @classmethod
+    def check_search_backend_tenants(cls, v: str) -> str:
+        # Tippfehler sollen beim Start auffallen, nicht erst als Fehler in der Suche
+        unknown = {
+            f"{tenant}={name}" for tenant, name in cls._tenant_overrides(v).items()
+            if name not in ("elasticsearch", "postgres")
+        }
+        if unknown:
+            raise ValueError(f"Unbekanntes Suchbackend in SEARCH_BACKEND_TENANTS: {', '.join(sorted(unknown))}")
+        return v
+
     @property
     def cors_origins_list(self) -> list[str]:
         return [origin.strip() for origin in self.cors_origins.split(",")]
 
+    @staticmethod
+    def _tenant_overrides(value: str) -> dict[str, str]:
+        overrides: dict[str, str] = {}
+        for entry in value.split(","):
+            tenant, _, option = entry.partition("=")
+            if tenant.strip() and option.strip():
+                overrides[tenant.strip()] = option.strip()
+        return overrides
+
+    @property
+    def search_backend_overrides(self) -> dict[str, str]:
+        return self._tenant_overrides(self.search_backend_tenants)
+
+    @property
+    def vector_quantization_overrides(self) -> dict[str, str]:
+        return self._tenant_overrides(self.vector_quantization_tenants)
+
     @property
     def is_production(self) -> bool:
         return self.environment == "production"
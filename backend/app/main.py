@@ -16,14 +16,37 @@ from app.routers.search import router as search_router
 from app.routers.subscriptions import router as subscriptions_router
 from app.routers.calendar import router as calendar_router
 from app.routers.push import router as push_router
-from app.routers.rag import router as rag_router
+from app.routers.rag import close_anthropic_client, router as rag_router
+from app.routers.semantic_search import router as semantic_search_router
+from app.core.config import get_settings
+from app.services import ai_summary
+from app.services.ai_jobs import ai_jobs
+from app.services.autocomplete_index import autocomplete_index
+from app.services.embedding_backfill import embedding_backfill
+from app.services.embeddings import close_async_client
+from app.services.keyword_matcher import keyword_notifier
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application startup and shutdown."""
     init_db()
+    if get_settings().autocomplete_index_enabled:
+        autocomplete_index.start()
+    if get_settings().embedding_refresh_interval > 0:
+        embedding_backfill.start_refresh()
+    if get_settings().ai_jobs_worker_enabled:
+        ai_jobs.start()
+    if get_settings().keyword_notify_interval > 0:
+        keyword_notifier.start()
     yield
+    await keyword_notifier.stop()
+    await ai_jobs.stop()
+    await autocomplete_index.stop()
+    await embedding_backfill.stop()
+    await close_async_client()
+    await close_anthropic_client()
+    await ai_summary.close_client()
 
 
 app = FastAPI(
@@ -63,6 +86,7 @@ app.include_router(subscriptions_router)
 app.include_router(calendar_router)
 app.include_router(push_router)
 app.include_router(rag_router)
+app.include_router(semantic_search_router)
 
 
 # Health check
@@ -24,9 +24,9 @@ from typing import Optional, List
 
 from sqlalchemy import (
     Column, String, Text, Integer, Float, Boolean, DateTime, Date,
-    ForeignKey, Table, JSON, Enum as SAEnum, UniqueConstraint, Index
+    ForeignKey, Table, JSON, Enum as SAEnum, UniqueConstraint, Index, Computed
 )
-from sqlalchemy.dialects.postgresql import UUID, ARRAY, JSONB
+from sqlalchemy.dialects.postgresql import UUID, ARRAY, JSONB, TSVECTOR
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 from sqlalchemy.ext.hybrid import hybrid_property
 
@@ -37,6 +37,21 @@ def generate_uuid():
     return str(uuid.uuid4())
 
 
+# Volltext-Vektoren (PostgreSQL-Suchbackend, siehe services/search_postgres.py)
+PAPER_SEARCH_VECTOR = (
+    "setweight(to_tsvector('german', coalesce(reference, '')), 'A') || "
+    "setweight(to_tsvector('german', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('german', coalesce(paper_type, '')), 'C') || "
+    "setweight(to_tsvector('german', coalesce(ai_summary, '')), 'D')"
+)
+MEETING_SEARCH_VECTOR = "setweight(to_tsvector('german', coalesce(name, '')), 'A')"
+PERSON_SEARCH_VECTOR = (
+    "setweight(to_tsvector('german', coalesce(family_name, '')), 'A') || "
+    "setweight(to_tsvector('german', coalesce(given_name, '')), 'A') || "
+    "setweight(to_tsvector('german', coalesce(name, '')), 'B')"
+)
+
+
 class TimestampMixin:
     """Common timestamp fields for all OParl objects."""
     created = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
@@ -181,11 +196,16 @@ class Person(Base, OParlMixin):
     life = mapped_column(Text, nullable=True)
     life_source = mapped_column(String(1024), nullable=True)
     location_id = mapped_column(String(36), ForeignKey('locations.id'), nullable=True)
+    search_vector = mapped_column(TSVECTOR, Computed(PERSON_SEARCH_VECTOR, persisted=True), nullable=True, deferred=True)
 
     body = relationship('Body', back_populates='persons')
     memberships = relationship('Membership', back_populates='person', lazy='dynamic')
     location = relationship('Location', foreign_keys=[location_id])
 
+    __table_args__ = (
+        Index('ix_person_search_vector', 'search_vector', postgresql_using='gin'),
+    )
+
     @hybrid_property
     def display_name(self):
         parts = []
@@ -263,10 +283,12 @@ class Meeting(Base, OParlMixin):
     participants = relationship('Person', secondary=meeting_participant, lazy='dynamic')
     organization_id = mapped_column(String(36), ForeignKey('organizations.id'), nullable=True)
     organization = relationship('Organization', foreign_keys=[organization_id])
+    search_vector = mapped_column(TSVECTOR, Computed(MEETING_SEARCH_VECTOR, persisted=True), nullable=True, deferred=True)
 
     __table_args__ = (
         Index('ix_meeting_body_state', 'body_id', 'meeting_state'),
         Index('ix_meeting_start', 'start'),
+        Index('ix_meeting_search_vector', 'search_vector', postgresql_using='gin'),
     )
 
 
@@ -305,6 +327,8 @@ class Paper(Base, OParlMixin):
     ai_summary = mapped_column(Text, nullable=True, comment="KI-generierte Kurzfassung")
     ai_summary_generated_at = mapped_column(DateTime, nullable=True, comment="Zeitstempel der KI-Generierung")
 
+    search_vector = mapped_column(TSVECTOR, Computed(PAPER_SEARCH_VECTOR, persisted=True), nullable=True, deferred=True)
+
     body = relationship('Body', back_populates='papers')
     main_file = relationship('File', foreign_keys=[main_file_id])
     auxiliary_files = relationship('File', secondary=paper_file, lazy='dynamic')
@@ -315,6 +339,7 @@ class Paper(Base, OParlMixin):
     __table_args__ = (
         Index('ix_paper_body_ref', 'body_id', 'reference'),
         Index('ix_paper_date', 'date'),
+        Index('ix_paper_search_vector', 'search_vector', postgresql_using='gin'),
     )
 
 
@@ -22,6 +22,7 @@ from app.models.oparl import (
     OParlSystem, Body, Organization, Person, Membership,
     Meeting, AgendaItem, Paper, Consultation, File,
 )
+from app.services.search_content import iter_paper_documents
 from app.services.search_service import SearchService
 from app.core.config import get_settings
 
@@ -83,22 +84,6 @@ async def trigger_reindex(db: Session = Depends(get_db)):
     try:
         objects = []
 
-        # Papers indexieren
-        papers = db.query(Paper).filter(Paper.deleted == False).all()
-        for p in papers:
-            objects.append({
-                "oparl_id": p.id,
-                "oparl_type": "paper",
-                "body_id": p.body_id,
-                "tenant": p.tenant_id,
-                "name": p.name,
-                "reference": p.reference,
-                "paper_type": p.paper_type,
-                "date": p.date.isoformat() if p.date else None,
-                "created": p.created.isoformat() if p.created else None,
-                "modified": p.modified.isoformat() if p.modified else None,
-            })
-
         # Meetings indexieren
         meetings = db.query(Meeting).filter(Meeting.deleted == False).all()
         for m in meetings:
@@ -143,7 +128,8 @@ async def trigger_reindex(db: Session = Depends(get_db)):
                 "modified": o.modified.isoformat() if o.modified else None,
             })
 
-        indexed = await search.reindex_all(objects)
+        # Papers inkl. Dateitexten (content) blockweise streamen
+        indexed = await search.reindex_all(objects, papers=iter_paper_documents(db))
 
         duration = int((datetime.utcnow() - start).total_seconds() * 1000)
         return ReindexResponse(
@@ -166,29 +166,82 @@ def export_protokoll(
     )
 
 
-# M4: Einfache Sprache (BFSG)
+# M4: Einfache Sprache (BFSG) und KI-Kurzfassung
+# Generierung ueber die Job-Queue (services/ai_jobs); die Endpunkte
+# antworten sofort mit dem Jobstatus.
 from datetime import datetime
-from app.services.ai_summary import generate_simple_language as _gen_simple
+from typing import Optional
 
+from pydantic import BaseModel
 
-@router.post("/paper/{paper_id}/simple-language")
+from app.services.ai_jobs import ai_jobs
+from app.services.ai_summary import SIMPLE_LANGUAGE, SUMMARY
+
+
+class AIJobStatus(BaseModel):
+    kind: str
+    paper_id: str
+    status: str  # idle, queued, running, done, failed
+    cached: bool = False  # Ergebnis aus dem Cache (gleicher Quelltext)
+    queued_at: Optional[str] = None
+    updated_at: Optional[str] = None
+    error: Optional[str] = None
+    text: Optional[str] = None
+    generated_at: Optional[datetime] = None
+
+
+def _get_paper(db: Session, paper_id: str) -> Paper:
+    paper = db.query(Paper).filter(Paper.id == paper_id, Paper.deleted == False).first()
+    if not paper:
+        raise HTTPException(status_code=404, detail="Vorlage nicht gefunden")
+    return paper
+
+
+async def _job_status(kind: str, paper: Paper) -> AIJobStatus:
+    if kind == SUMMARY:
+        text_value, generated_at = paper.ai_summary, paper.ai_summary_generated_at
+    else:
+        text_value, generated_at = paper.simple_language_text, paper.simple_language_generated_at
+    return AIJobStatus(
+        **await ai_jobs.status(kind, paper.id), text=text_value, generated_at=generated_at
+    )
+
+
+@router.post("/paper/{paper_id}/simple-language", response_model=AIJobStatus, status_code=202)
 async def generate_simple_language_version(
     paper_id: str,
     db: Session = Depends(get_db),
 ):
-    """Generate a simple-language (A2) version of a paper via Claude Haiku."""
-    paper = db.query(Paper).filter(Paper.id == paper_id, Paper.deleted == False).first()
-    if not paper:
-        raise HTTPException(status_code=404, detail="Vorlage nicht gefunden")
+    """Simple-language (A2) version of a paper via Claude Haiku (queued job)."""
+    paper = _get_paper(db, paper_id)
+    await ai_jobs.enqueue(SIMPLE_LANGUAGE, paper.id)
+    return await _job_status(SIMPLE_LANGUAGE, paper)
 
-    full_text = getattr(paper, "simple_language_text", "") or ""
-    if not full_text:
-        full_text = paper.name or ""
 
-    simple_text = await _gen_simple(full_text)
+@router.get("/paper/{paper_id}/simple-language", response_model=AIJobStatus)
+async def get_simple_language_version(
+    paper_id: str,
+    db: Session = Depends(get_db),
+):
+    """Job status and the current simple-language text of a paper."""
+    return await _job_status(SIMPLE_LANGUAGE, _get_paper(db, paper_id))
 
-    paper.simple_language_text = simple_text
-    paper.simple_language_generated_at = datetime.utcnow()
-    db.commit()
 
-    return {"simple_language_text": simple_text}
+@router.post("/paper/{paper_id}/summary", response_model=AIJobStatus, status_code=202)
+async def generate_summary(
+    paper_id: str,
+    db: Session = Depends(get_db),
+):
+    """AI summary (papers.ai_summary) via Claude Haiku (queued job)."""
+    paper = _get_paper(db, paper_id)
+    await ai_jobs.enqueue(SUMMARY, paper.id)
+    return await _job_status(SUMMARY, paper)
+
+
+@router.get("/paper/{paper_id}/summary", response_model=AIJobStatus)
+async def get_summary(
+    paper_id: str,
+    db: Session = Depends(get_db),
+):
+    """Job status and the current AI summary of a paper."""
+    return await _job_status(SUMMARY, _get_paper(db, paper_id))
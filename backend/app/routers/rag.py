@@ -3,149 +3,281 @@ aitema|RIS - RAG Chat Router (E1)
 
 Endpoint: POST /api/rag/chat
 Retrieval-Augmented Generation ueber Ratsbeschluesse mit Claude Haiku + Streaming.
+
+Die Route blockiert die Event-Loop nicht: Query-Embedding ueber den
+Async-Cache, Vektorsuche in einem Worker-Thread mit eigener Session,
+Generierung ueber einen gemeinsamen anthropic.AsyncAnthropic-Client.
+Das SSE-Streaming ist pull-basiert (der naechste Chunk wird erst gelesen,
+wenn der vorige gesendet ist); trennt der Client die Verbindung, wird der
+Anthropic-Stream geschlossen und die Generierung abgebrochen.
+
+Wiederholte Fragen beantwortet der Antwort-Cache (services/rag_answer_cache)
+ohne Vektorsuche und Generierung, solange die Quellen unveraendert sind.
 """
-from fastapi import APIRouter, Depends
-from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
-from pydantic import BaseModel
-from typing import Optional
-import anthropic
+import asyncio
 import json
 import os
+from contextlib import nullcontext
+from datetime import date
+from typing import AsyncIterator, Callable, Optional
+
+import anthropic
+import structlog
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from app.core.config import get_settings
+from app.services.embeddings import VectorFilter, is_zero_vector
+from app.services.passages import PaperMatch, semantic_paper_search
+from app.services.query_embedding_cache import query_embedding_cache
+from app.services.rag_answer_cache import (
+    CachedAnswer,
+    answer_scope,
+    lookup_answer,
+    source_stamps,
+    store_answer,
+)
+from app.services.rag_context import build_context, estimate_tokens
 
-from app.database import get_db
-from app.services.embeddings import generate_query_embedding, is_zero_vector
-from sqlalchemy import text
+settings = get_settings()
+logger = structlog.get_logger()
 
 router = APIRouter(prefix="/api/rag", tags=["rag"])
 
+SYSTEM_PROMPT = (
+    "Du bist ein Assistent fuer das Ratsinformationssystem einer deutschen Kommune. "
+    "Beantworte die Frage des Buergers ausschliesslich auf Basis der bereitgestellten "
+    "Beschluesse und Vorlagen. Wenn die Information nicht in den Quellen enthalten ist, "
+    "sage das klar. Antworte auf Deutsch, sachlich und neutral. "
+    "Zitiere konkrete Drucksachen-Nummern oder Beschluesse wenn moeglich."
+)
+
+GENERATION_ERROR = (
+    "\n\n[Die Antwort konnte nicht vollstaendig erzeugt werden. Bitte versuchen Sie es spaeter erneut.]"
+)
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+_client: Optional[anthropic.AsyncAnthropic] = None
+# Gleichzeitige Chat-Streams dieses Workers (settings.rag_max_concurrent_streams, 0 = unbegrenzt)
+_stream_slots: Optional[asyncio.Semaphore] = (
+    asyncio.Semaphore(settings.rag_max_concurrent_streams)
+    if settings.rag_max_concurrent_streams > 0 else None
+)
+
 
 class RAGQuery(BaseModel):
     query: str
     tenant_id: str = "default"
     limit: int = 8
+    # Optional: Suche auf Koerperschaft, Vorlagenart, Zeitraum oder Gremium eingrenzen
+    body_id: Optional[str] = None
+    paper_type: Optional[str] = None
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+    organization: Optional[str] = None
 
+    def filters(self) -> VectorFilter:
+        return VectorFilter(
+            body_id=self.body_id,
+            paper_type=self.paper_type,
+            date_from=self.date_from,
+            date_to=self.date_to,
+            organization=self.organization,
+        )
 
-@router.post("/chat")
-async def rag_chat(body: RAGQuery, db: Session = Depends(get_db)):
-    """RAG-Chat ueber Ratsbeschluesse: Vektor-Suche + Claude Haiku Streaming."""
+    def cache_scope(self) -> str:
+        return answer_scope(self.tenant_id, self.limit, self.filters())
 
-    # 1. Query-Embedding generieren (Voyage AI via ANTHROPIC_API_KEY)
-    query_embedding = generate_query_embedding(body.query)
 
-    if is_zero_vector(query_embedding):
-        async def no_key():
-            yield "data: " + json.dumps({"text": "Semantische Suche nicht verfuegbar (API-Key fehlt)."}) + "\n\n"
-            yield "data: [DONE]\n\n"
-        return StreamingResponse(no_key(), media_type="text/event-stream")
-
-    embedding_str = f"[{','.join(map(str, query_embedding))}]"
-
-    # 2. pgvector Suche direkt auf papers-Tabelle (embedding-Spalte)
-    rows = db.execute(text("""
-        SELECT
-            id,
-            name,
-            paper_type,
-            date,
-            reference,
-            COALESCE(ai_summary, '') AS content,
-            1 - (embedding <=> CAST(:embedding AS vector)) AS similarity
-        FROM papers
-        WHERE
-            embedding IS NOT NULL
-            AND tenant_id = :tenant_id
-            AND deleted = false
-        ORDER BY embedding <=> CAST(:embedding AS vector)
-        LIMIT :limit
-    """), {
-        "embedding": embedding_str,
-        "tenant_id": body.tenant_id,
-        "limit": body.limit,
-    }).fetchall()
+def _get_client() -> Optional[anthropic.AsyncAnthropic]:
+    """Gemeinsamer Async-Client (Verbindungspool) fuer alle Chats des Workers."""
+    global _client
+    api_key = os.environ.get("ANTHROPIC_API_KEY")
+    if _client is None and api_key:
+        _client = anthropic.AsyncAnthropic(api_key=api_key)
+    return _client
 
-    if not rows:
-        async def no_results():
-            yield "data: " + json.dumps({"text": "Keine relevanten Beschluesse gefunden. Bitte pruefen Sie, ob Embeddings fuer die Drucksachen generiert wurden."}) + "\n\n"
-            yield "data: [DONE]\n\n"
-        return StreamingResponse(no_results(), media_type="text/event-stream")
-
-    # 3. Kontext aufbauen (nur Treffer mit >= 30% Aehnlichkeit)
-    context_parts = []
-    sources = []
-    for r in rows:
-        if r.similarity < 0.3:
-            continue
-        # Bevorzuge KI-Zusammenfassung, sonst Drucksachentyp als Fallback
-        text_snippet = r.content.strip() if r.content.strip() else (r.paper_type or "")
-        context_parts.append(
-            f"**{r.name or 'Ohne Titel'}** (Drucksache {r.reference or '?'}, {r.date})\n{text_snippet[:600]}"
+
+async def close_anthropic_client() -> None:
+    """Beim Shutdown aufrufen (main.lifespan)."""
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
+
+
+def _sse(payload) -> str:
+    return "data: " + json.dumps(payload) + "\n\n"
+
+
+def _message_response(text_value: str) -> StreamingResponse:
+    """Einzelne Hinweismeldung als SSE-Stream."""
+    async def message():
+        yield _sse({"text": text_value})
+        yield "data: [DONE]\n\n"
+    return StreamingResponse(message(), media_type="text/event-stream")
+
+
+def _in_session(func, *args):
+    """func(db, *args) mit eigener Session; fuer asyncio.to_thread."""
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        return func(db, *args)
+    finally:
+        db.close()
+
+
+def _retrieve(body: RAGQuery, query_embedding: list[float]) -> list[PaperMatch]:
+    """Vektorsuche ueber Passagen bzw. Vorlagen (blockierend)."""
+    return _in_session(
+        lambda db: semantic_paper_search(
+            db, query_embedding, tenant_id=body.tenant_id, limit=body.limit, filters=body.filters()
         )
-        sources.append({
-            "id": r.id,
-            "title": r.name or "Ohne Titel",
-            "reference": r.reference or "",
-            "date": str(r.date) if r.date else "",
-            "similarity": round(float(r.similarity) * 100, 1),
-        })
-
-    if not context_parts:
-        # Treffer vorhanden, aber alle unter Schwellwert – trotzdem die besten 3 nehmen
-        for r in rows[:3]:
-            text_snippet = r.content.strip() if r.content.strip() else (r.paper_type or "")
-            context_parts.append(
-                f"**{r.name or 'Ohne Titel'}** (Drucksache {r.reference or '?'}, {r.date})\n{text_snippet[:600]}"
-            )
-            sources.append({
-                "id": r.id,
-                "title": r.name or "Ohne Titel",
-                "reference": r.reference or "",
-                "date": str(r.date) if r.date else "",
-                "similarity": round(float(r.similarity) * 100, 1),
-            })
-
-    context = "\n\n---\n\n".join(context_parts)
-
-    system_prompt = (
-        "Du bist ein Assistent fuer das Ratsinformationssystem einer deutschen Kommune. "
-        "Beantworte die Frage des Buergers ausschliesslich auf Basis der bereitgestellten "
-        "Beschluesse und Vorlagen. Wenn die Information nicht in den Quellen enthalten ist, "
-        "sage das klar. Antworte auf Deutsch, sachlich und neutral. "
-        "Zitiere konkrete Drucksachen-Nummern oder Beschluesse wenn moeglich."
     )
 
-    user_message = f"Kontext aus dem Ratsinformationssystem:\n\n{context}\n\nFrage: {body.query}"
 
-    # 4. Anthropic Client + Streaming
-    api_key = os.environ.get("ANTHROPIC_API_KEY")
-    if not api_key:
-        async def no_anthropic_key():
-            yield "data: " + json.dumps({"text": "ANTHROPIC_API_KEY nicht gesetzt."}) + "\n\n"
-            yield "data: [DONE]\n\n"
-        return StreamingResponse(no_anthropic_key(), media_type="text/event-stream")
+def _cached_answer(body: RAGQuery, query_embedding: list[float]) -> Optional[CachedAnswer]:
+    """Antwort-Cache abfragen (blockierend); Fehler gelten als Fehlgriff."""
+    try:
+        return _in_session(lookup_answer, body.cache_scope(), query_embedding)
+    except Exception as e:
+        logger.warning("RAG-Antwort-Cache: Abfrage fehlgeschlagen", error=str(e))
+        return None
+
+
+def _answer_store(
+    body: RAGQuery,
+    query_embedding: list[float],
+    sources: list[dict],
+    rows: list[PaperMatch],
+) -> Callable[[str], None]:
+    """Speicherfunktion fuer die fertige Antwort; Quellenstaende von der Retrieval-Zeit."""
+    used = {s["id"] for s in sources}
+    stamps = source_stamps(r for r in rows if r.id in used)
 
-    client = anthropic.Anthropic(api_key=api_key)
+    def store(answer: str) -> None:
+        _in_session(
+            store_answer, body.cache_scope(), body.query, query_embedding, answer, sources, stamps
+        )
+
+    return store
 
-    async def stream_response():
-        # Zuerst Quellen senden
-        yield "data: " + json.dumps({"sources": sources}) + "\n\n"
 
+async def stream_answer(
+    request: Request,
+    client: anthropic.AsyncAnthropic,
+    user_message: str,
+    sources: list[dict],
+    store: Optional[Callable[[str], None]] = None,
+) -> AsyncIterator[str]:
+    """SSE-Ereignisse: zuerst Quellen, dann Text-Chunks, zuletzt [DONE].
+
+    Haelt waehrend der Generierung einen Platz in _stream_slots. Nur eine
+    vollstaendig generierte Antwort wird an `store` (Antwort-Cache) uebergeben.
+    """
+    async with _stream_slots or nullcontext():
+        yield _sse({"sources": sources})
+        parts: list[str] = []
+        completed = False
         try:
-            with client.messages.stream(
-                model="claude-haiku-4-5",
-                max_tokens=1024,
-                system=system_prompt,
+            async with client.messages.stream(
+                model=settings.rag_model,
+                max_tokens=settings.rag_max_tokens,
+                system=SYSTEM_PROMPT,
                 messages=[{"role": "user", "content": user_message}],
             ) as stream:
-                for chunk in stream.text_stream:
-                    yield "data: " + json.dumps({"text": chunk}) + "\n\n"
+                async for chunk in stream.text_stream:
+                    if await request.is_disconnected():
+                        # Verlassen des Kontexts schliesst den Anthropic-Stream
+                        logger.info("RAG-Chat vom Client abgebrochen")
+                        return
+                    parts.append(chunk)
+                    yield _sse({"text": chunk})
+            completed = True
         except Exception as e:
-            yield "data: " + json.dumps({"text": f"\n\n[Fehler: {str(e)}]"}) + "\n\n"
+            # Details nur ins Log; Upstream-Fehlertexte nicht an Clients weitergeben
+            logger.warning("RAG-Chat: Generierung fehlgeschlagen", error=str(e))
+            yield _sse({"text": GENERATION_ERROR})
 
         yield "data: [DONE]\n\n"
 
+    if completed and store is not None and "".join(parts).strip():
+        try:
+            await asyncio.to_thread(store, "".join(parts))
+        except Exception as e:
+            logger.warning("RAG-Antwort-Cache: Speichern fehlgeschlagen", error=str(e))
+
+
+async def replay_answer(cached: CachedAnswer) -> AsyncIterator[str]:
+    """Gespeicherte Antwort im selben SSE-Format wie stream_answer."""
+    yield _sse({"sources": cached.sources, "cached": True})
+    yield _sse({"text": cached.answer})
+    yield "data: [DONE]\n\n"
+
+
+@router.post("/chat")
+async def rag_chat(body: RAGQuery, request: Request):
+    """RAG-Chat ueber Ratsbeschluesse: Vektor-Suche + Claude Haiku Streaming."""
+
+    # 1. Query-Embedding (gecacht, sonst Voyage AI via ANTHROPIC_API_KEY)
+    query_embedding = await query_embedding_cache.get(body.query)
+
+    if is_zero_vector(query_embedding):
+        return _message_response("Semantische Suche nicht verfuegbar (API-Key fehlt).")
+
+    # 2. Aehnliche Frage mit unveraenderten Quellen bereits beantwortet?
+    if settings.rag_answer_cache_enabled:
+        cached = await asyncio.to_thread(_cached_answer, body, query_embedding)
+        if cached is not None:
+            logger.info("RAG-Chat aus dem Antwort-Cache", similarity=round(cached.similarity, 3))
+            return StreamingResponse(
+                replay_answer(cached), media_type="text/event-stream", headers=SSE_HEADERS
+            )
+
+    # Alle Plaetze belegt: sofort ablehnen statt Anfragen unbegrenzt zu stauen
+    if _stream_slots is not None and _stream_slots.locked():
+        raise HTTPException(
+            status_code=503,
+            detail="Zu viele gleichzeitige Chat-Anfragen, bitte spaeter erneut versuchen.",
+            headers={"Retry-After": "5"},
+        )
+
+    # 3. pgvector Suche ueber Passagen aus Vorlagen- und Dateitexten, gruppiert
+    #    zu Vorlagen (ohne Passagen-Index: papers.embedding + KI-Zusammenfassung)
+    rows = await asyncio.to_thread(_retrieve, body, query_embedding)
+
+    if not rows:
+        return _message_response(
+            "Keine relevanten Beschluesse gefunden. Bitte pruefen Sie, ob Embeddings "
+            "fuer die Drucksachen generiert wurden."
+        )
+
+    # 4. Kontext im Token-Budget, Quellen per MMR diversifiziert
+    context = build_context(rows)
+    sources = context.sources
+    user_message = f"Kontext aus dem Ratsinformationssystem:\n\n{context.text}\n\nFrage: {body.query}"
+    prompt_tokens = estimate_tokens(SYSTEM_PROMPT) + estimate_tokens(user_message)
+    logger.info(
+        "RAG-Chat: Prompt",
+        prompt_tokens=prompt_tokens,
+        context_tokens=context.tokens,
+        sources=len(sources),
+        passages=context.passages,
+        dropped=context.dropped,
+    )
+
+    # 5. Anthropic Async-Client + Streaming
+    client = _get_client()
+    if client is None:
+        return _message_response("ANTHROPIC_API_KEY nicht gesetzt.")
+
+    store = _answer_store(body, query_embedding, sources, rows) if settings.rag_answer_cache_enabled else None
     return StreamingResponse(
-        stream_response(),
+        stream_answer(request, client, user_message, sources, store),
         media_type="text/event-stream",
-        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        headers={**SSE_HEADERS, "X-RAG-Prompt-Tokens": str(prompt_tokens)},
     )
@@ -2,7 +2,7 @@
 aitema|RIS - Search Router
 
 FastAPI Router fuer Volltextsuche:
-- GET  /api/v1/search                 - Volltextsuche mit Filtern
+- GET  /api/v1/search                 - Volltextsuche mit Filtern (Seiten oder Cursor)
 - GET  /api/v1/search/autocomplete    - Typeahead-Vorschlaege
 - GET  /api/v1/search/facets          - Suche mit aggregierten Facetten
 - POST /api/v1/admin/search/reindex   - Vollstaendiger Reindex
@@ -18,7 +18,12 @@ from sqlalchemy.orm import Session
 
 from app.database import get_db
 from app.models.oparl import Paper, Meeting, Person, Organization
-from app.services.search_service import SearchService
+from app.core.config import get_settings
+from app.services.autocomplete_index import autocomplete_index
+from app.services.hybrid_search import hybrid_search
+from app.services.search_backend import SearchBackend, get_search_backend
+from app.services.search_content import iter_paper_documents
+from app.services.search_service import SEARCH_AGGREGATIONS, SearchService
 
 router = APIRouter(prefix="/api/v1", tags=["Suche"])
 
@@ -34,6 +39,9 @@ class SearchResponse(BaseModel):
     total_pages: int
     facets: dict
     query: str
+    next_cursor: Optional[str] = None
+    mode: str = "keyword"
+    degraded: list[str] = []
 
 class AutocompleteItem(BaseModel):
     id: Optional[str] = None
@@ -54,6 +62,18 @@ class ReindexResponse(BaseModel):
     duration_ms: int
     breakdown: dict
 
+# ============================================================
+# Hilfsfunktionen
+# ============================================================
+
+def _search_backend(tenant_id: Optional[str], db: Session) -> SearchBackend:
+    """Backend des Tenants; Fehlkonfiguration als 503 statt 500."""
+    try:
+        return get_search_backend(tenant_id, db)
+    except ValueError as e:
+        raise HTTPException(status_code=503, detail=f"Suche nicht verfuegbar: {e}")
+
+
 # ============================================================
 # GET /api/v1/search
 # ============================================================
@@ -69,6 +89,23 @@ async def search(
     tenant_id: Optional[str] = Query(default=None, description="Tenant-ID"),
     page: int = Query(default=1, ge=1, description="Seite"),
     size: int = Query(default=20, ge=1, le=100, description="Ergebnisse pro Seite"),
+    cursor: Optional[str] = Query(
+        default=None,
+        description="Cursor-Paginierung: '*' fuer die erste Seite, danach next_cursor",
+    ),
+    facets: Optional[str] = Query(
+        default=None,
+        description=(
+            "Kommagetrennte Facetten: by_type, by_paper_type, by_organization, "
+            "by_meeting_state, by_year (ohne Angabe: keine Facetten)"
+        ),
+    ),
+    mode: str = Query(
+        default="keyword",
+        pattern="^(keyword|hybrid)$",
+        description="keyword (Standard) oder hybrid (Stichwort + semantisch, RRF)",
+    ),
+    db: Session = Depends(get_db),
 ):
     """
     Volltextsuche ueber Papers, Meetings und Personen.
@@ -77,8 +114,15 @@ async def search(
     - Fuzzy-Matching und Stemming (Deutsch)
     - Highlighting mit &lt;mark&gt; Tags
     - Filter: Typ, Gremium, Jahr, Status
-    - Pagination
-    - Facetten (Aggregationen)
+    - Pagination (Seitennummer oder Cursor via search_after fuer tiefe Seiten)
+    - Facetten (Aggregationen), nur auf Anfrage via `facets=`
+    - mode=hybrid: Stichwort- und pgvector-Suche parallel, per Reciprocal
+      Rank Fusion verschmolzen; langsame Quellen werden per Timeout
+      uebersprungen und in `degraded` gemeldet (keine Cursor-Paginierung);
+      die semantische Quelle nur mit tenant_id
+
+    Das Backend (Elasticsearch oder PostgreSQL) wird je Tenant ueber
+    settings.search_backend / search_backend_tenants gewaehlt.
     """
     if not q or len(q.strip()) < 2:
         return SearchResponse(
@@ -89,22 +133,47 @@ async def search(
             total_pages=0,
             facets={},
             query=q,
+            mode=mode,
         )
 
     types = [type] if type else None
-    svc = SearchService()
+    facet_names = [f.strip() for f in facets.split(",") if f.strip()] if facets else None
+    if mode == "hybrid" and cursor is not None:
+        raise HTTPException(status_code=400, detail="Cursor-Paginierung im Hybrid-Modus nicht unterstuetzt")
+
+    degraded: list[str] = []
+    svc = _search_backend(tenant_id, db)
     try:
-        result = await svc.search(
-            query=q.strip(),
-            types=types,
-            tenant_id=tenant_id,
-            body_id=body_id,
-            gremium=gremium,
-            year=year,
-            status=status,
-            page=page,
-            size=size,
-        )
+        if mode == "hybrid":
+            result, degraded = await hybrid_search(
+                svc,
+                query=q.strip(),
+                types=types,
+                tenant_id=tenant_id,
+                body_id=body_id,
+                gremium=gremium,
+                year=year,
+                status=status,
+                page=page,
+                size=size,
+                facets=facet_names,
+            )
+        else:
+            result = await svc.search(
+                query=q.strip(),
+                types=types,
+                tenant_id=tenant_id,
+                body_id=body_id,
+                gremium=gremium,
+                year=year,
+                status=status,
+                page=page,
+                size=size,
+                cursor=cursor,
+                facets=facet_names,
+            )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     finally:
         await svc.close()
 
@@ -116,6 +185,9 @@ async def search(
         total_pages=result.total_pages,
         facets=result.facets,
         query=q,
+        next_cursor=result.next_cursor,
+        mode=mode,
+        degraded=degraded,
     )
 
 # ============================================================
@@ -128,17 +200,31 @@ async def autocomplete(
     type: Optional[str] = Query(default=None, description="Typ: paper, meeting, person"),
     tenant_id: Optional[str] = Query(default=None),
     limit: int = Query(default=8, ge=1, le=20),
+    db: Session = Depends(get_db),
 ):
     """
     Typeahead-Autocomplete-Vorschlaege.
 
-    Nutzt Edge-NGram Analyse (min 3 / max 15 Gramm).
+    Beantwortet aus dem In-Memory-Praefix-Index, sobald dieser geladen ist;
+    bis dahin Edge-NGram-Suche im konfigurierten Such-Backend.
     Gibt max. 8 Vorschlaege zurueck.
     """
     if len(q.strip()) < 3:
         return AutocompleteResponse(suggestions=[], query=q)
 
-    svc = SearchService()
+    if get_settings().autocomplete_index_enabled and autocomplete_index.ready:
+        suggestions = autocomplete_index.search(
+            prefix=q.strip(),
+            type=type,
+            limit=limit,
+            tenant_id=tenant_id,
+        )
+        return AutocompleteResponse(
+            suggestions=[AutocompleteItem(**s) for s in suggestions],
+            query=q,
+        )
+
+    svc = _search_backend(tenant_id, db)
     try:
         suggestions = await svc.autocomplete(
             prefix=q.strip(),
@@ -163,26 +249,30 @@ async def search_facets(
     q: str = Query(default="", description="Suchbegriff"),
     tenant_id: Optional[str] = Query(default=None),
     body_id: Optional[str] = Query(default=None),
+    db: Session = Depends(get_db),
 ):
     """
     Volltext-Suche mit aggregierten Facetten.
 
     Gibt Ergebnisse + Facetten (by_type, by_paper_type, by_organization, by_year).
+    Backend je Tenant wie bei GET /search.
     """
     if not q or len(q.strip()) < 2:
         return {"results": {"data": [], "total": 0}, "facets": {}, "query": q}
 
-    svc = SearchService()
+    svc = _search_backend(tenant_id, db)
     try:
-        result = await svc.search_with_facets(
+        result = await svc.search(
             query=q.strip(),
             tenant_id=tenant_id,
             body_id=body_id,
+            size=25,
+            facets=list(SEARCH_AGGREGATIONS),
         )
     finally:
         await svc.close()
 
-    return {**result, "query": q}
+    return {"results": result.to_dict(), "facets": result.facets, "query": q}
 
 # ============================================================
 # POST /api/v1/admin/search/reindex
@@ -194,7 +284,7 @@ async def reindex(db: Session = Depends(get_db)):
     Vollstaendiger Elasticsearch-Reindex aller OParl-Objekte.
 
     Indexiert Papers, Meetings und Persons separat in drei Indizes:
-    - {prefix}_ris_papers
+    - {prefix}_ris_papers (inkl. extrahierter Texte von Hauptdatei und Anlagen)
     - {prefix}_ris_meetings
     - {prefix}_ris_persons
     """
@@ -202,22 +292,8 @@ async def reindex(db: Session = Depends(get_db)):
     svc = SearchService()
 
     try:
-        # Papers aufsammeln
-        papers_data = []
-        papers = db.query(Paper).filter(Paper.deleted == False).all()
-        for p in papers:
-            papers_data.append({
-                "oparl_id": p.id,
-                "oparl_type": "paper",
-                "body_id": p.body_id,
-                "tenant_id": getattr(p, "tenant_id", "public"),
-                "name": p.name,
-                "reference": p.reference,
-                "paper_type": p.paper_type,
-                "date": p.date.isoformat() if p.date else None,
-                "created": p.created.isoformat() if p.created else None,
-                "modified": p.modified.isoformat() if p.modified else None,
-            })
+        # Papers werden inkl. Dateitexten (content) blockweise gestreamt
+        papers_data = iter_paper_documents(db)
 
         # Meetings aufsammeln
         meetings_data = []
@@ -3,28 +3,41 @@ aitema|RIS - Semantic Search Router
 
 FastAPI Router fuer semantische Suche via pgvector + Voyage AI Embeddings:
 - POST /api/v1/search/semantic              - Semantische Volltextsuche
-- POST /api/v1/search/semantic/embed/{id}  - Einzelnes Paper einbetten
+- POST /api/v1/search/semantic/embed/{id}  - Einzelnes Paper einbetten (admin:settings)
 - GET  /api/v1/search/semantic/status      - Status der Embedding-Abdeckung
+- POST /api/v1/search/semantic/backfill    - Embedding-Backfill starten/fortsetzen (admin:settings)
 """
 from __future__ import annotations
 
+import structlog
+from datetime import date
 from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 
+from app.core.security import Permission, TokenPayload, require_permission
 from app.database import get_db
 from app.models.oparl import Paper
+from app.services.embedding_backfill import embedding_backfill
+from app.services.passages import semantic_paper_search
+from app.services.query_embedding_cache import query_embedding_cache
 from app.services.embeddings import (
-    generate_embedding,
-    generate_query_embedding,
-    cosine_similarity_search,
+    generate_embedding_async,
+    content_hash,
+    embedding_row,
+    get_embedding_provider,
     is_zero_vector,
+    paper_embedding_text,
     EMBEDDING_DIM,
+    STORE_EMBEDDING_SQL,
+    EMBEDDING_MODEL,
+    VectorFilter,
 )
 
 router = APIRouter(prefix="/api/v1/search", tags=["Semantische Suche"])
+logger = structlog.get_logger()
 
 
 # ============================================================
@@ -36,6 +49,28 @@ class SemanticSearchRequest(BaseModel):
     limit: int = 10
     min_similarity: float = 0.5
     tenant_id: str = "default"
+    ef_search: Optional[int] = None  # HNSW-Suchbreite, Standard: VECTOR_HNSW_EF_SEARCH
+    # Filter, im Vektorindex-Scan ausgewertet
+    body_id: Optional[str] = None
+    paper_type: Optional[str] = None
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+    organization: Optional[str] = None  # ID oder Name des Gremiums
+
+    def filters(self) -> VectorFilter:
+        return VectorFilter(
+            body_id=self.body_id,
+            paper_type=self.paper_type,
+            date_from=self.date_from,
+            date_to=self.date_to,
+            organization=self.organization,
+        )
+
+
+class PassageResult(BaseModel):
+    file_id: Optional[str] = None  # None: Abschnitt aus der Vorlage selbst
+    content: str
+    similarity_score: float
 
 
 class SemanticResult(BaseModel):
@@ -45,6 +80,7 @@ class SemanticResult(BaseModel):
     date: Optional[str] = None
     reference: Optional[str] = None
     similarity_score: float
+    passages: list[PassageResult] = []
 
 
 class SemanticSearchResponse(BaseModel):
@@ -61,11 +97,47 @@ class EmbedResponse(BaseModel):
     message: Optional[str] = None
 
 
+class BackfillStatus(BaseModel):
+    status: str
+    mode: Optional[str] = None
+    total: int
+    processed: int
+    embedded: int
+    unchanged: int
+    skipped: int
+    failed: int
+    failed_ids: list[str] = []
+    cursor: Optional[str] = None
+    started_at: Optional[str] = None
+    updated_at: Optional[str] = None
+    error: Optional[str] = None
+
+
+class QueryCacheStats(BaseModel):
+    size: int
+    memory_hits: int
+    redis_hits: int
+    misses: int
+    hit_rate: float
+
+
 class EmbeddingStatusResponse(BaseModel):
     total_papers: int
     embedded_papers: int
     coverage_percent: float
     semantic_search_enabled: bool
+    provider: str
+    model: str
+    stale_papers: int = 0
+    other_model_papers: int = 0
+    passage_papers: int = 0  # Vorlagen mit aktuellem Passagen-Index
+    backfill: Optional[BackfillStatus] = None
+    query_cache: Optional[QueryCacheStats] = None  # Zaehler dieses Worker-Prozesses
+
+
+class BackfillStartResponse(BaseModel):
+    started: bool
+    message: str
 
 
 # ============================================================
@@ -79,8 +151,8 @@ async def semantic_search(
 ):
     """Semantische Suche ueber alle Drucksachen via Cosine-Similarity.
 
-    Nutzt Voyage AI (voyage-3, 1024 Dimensionen) fuer Embeddings.
-    Erfordert ANTHROPIC_API_KEY als Umgebungsvariable.
+    Nutzt den konfigurierten Embedding-Provider (Standard: Voyage AI,
+    voyage-3, 1024 Dimensionen; erfordert ANTHROPIC_API_KEY).
     """
     query = (request.query or "").strip()
     if len(query) < 2:
@@ -92,8 +164,8 @@ async def semantic_search(
             message="Suchbegriff zu kurz (min. 2 Zeichen)",
         )
 
-    # Generate query embedding
-    query_embedding = generate_query_embedding(query)
+    # Query-Embedding (LRU/Redis-Cache, sonst Voyage)
+    query_embedding = await query_embedding_cache.get(query)
 
     if is_zero_vector(query_embedding):
         return SemanticSearchResponse(
@@ -107,13 +179,15 @@ async def semantic_search(
             ),
         )
 
-    # Search via pgvector
-    rows = cosine_similarity_search(
-        query_embedding=query_embedding,
-        db=db,
+    # Search via pgvector (Passagen, gruppiert zu Vorlagen)
+    rows = semantic_paper_search(
+        db,
+        query_embedding,
         tenant_id=request.tenant_id,
         limit=request.limit,
         min_similarity=request.min_similarity,
+        ef_search=request.ef_search,
+        filters=request.filters(),
     )
 
     results = [
@@ -124,6 +198,14 @@ async def semantic_search(
             date=str(row.date) if row.date else None,
             reference=row.reference,
             similarity_score=round(float(row.similarity) * 100, 1),
+            passages=[
+                PassageResult(
+                    file_id=p.file_id,
+                    content=p.content,
+                    similarity_score=round(p.similarity * 100, 1),
+                )
+                for p in row.passages
+            ],
         )
         for row in rows
     ]
@@ -143,22 +225,48 @@ async def semantic_search(
 @router.post("/semantic/embed/{paper_id}", response_model=EmbedResponse)
 async def embed_paper(
     paper_id: str,
+    force: bool = Query(False, description="Auch bei unveraendertem Text neu berechnen"),
     db: Session = Depends(get_db),
+    user: TokenPayload = Depends(require_permission(Permission.ADMIN_SETTINGS)),
 ):
-    """Embedding fuer ein einzelnes Paper generieren und speichern."""
+    """Embedding fuer ein einzelnes Paper generieren und speichern.
+
+    Ist der Eingabetext seit dem letzten Einbetten (gleiches Modell)
+    unveraendert, wird kein API-Aufruf gemacht.
+    """
     paper = db.query(Paper).filter(Paper.id == paper_id).first()
     if not paper:
         raise HTTPException(status_code=404, detail=f"Paper {paper_id} nicht gefunden")
 
-    # Combine text fields for rich embedding
-    text_content = " ".join(filter(None, [
-        paper.name or "",
-        getattr(paper, "description", "") or "",
-        " ".join(paper.keyword or []) if paper.keyword else "",
-        paper.paper_type or "",
-    ]))[:8000]
+    text_content = paper_embedding_text(paper)
+    text_hash = content_hash(text_content)
+
+    current = db.execute(
+        text(
+            "SELECT embedding IS NOT NULL AS has_embedding, embedding_hash, embedding_model "
+            "FROM papers WHERE id = :id"
+        ),
+        {"id": paper_id},
+    ).first()
+    if (
+        not force
+        and current is not None
+        and current.has_embedding
+        and current.embedding_hash == text_hash
+        and current.embedding_model == EMBEDDING_MODEL
+    ):
+        db.execute(
+            text("UPDATE papers SET embedding_synced_at = :synced_at WHERE id = :id"),
+            {"synced_at": paper.modified, "id": paper_id},
+        )
+        db.commit()
+        return EmbedResponse(
+            status="unchanged",
+            paper_id=paper_id,
+            message="Text unveraendert, vorhandenes Embedding bleibt bestehen",
+        )
 
-    embedding = generate_embedding(text_content)
+    embedding = await generate_embedding_async(text_content)
 
     if is_zero_vector(embedding):
         return EmbedResponse(
@@ -167,10 +275,9 @@ async def embed_paper(
             message="Embedding-Service nicht verfuegbar (ANTHROPIC_API_KEY fehlt)",
         )
 
-    embedding_str = f"[{','.join(map(str, embedding))}]"
     db.execute(
-        text("UPDATE papers SET embedding = CAST(:emb AS vector) WHERE id = :id"),
-        {"emb": embedding_str, "id": paper_id},
+        text(STORE_EMBEDDING_SQL),
+        embedding_row(paper_id, embedding, text_hash, paper.modified),
     )
     db.commit()
 
@@ -196,14 +303,73 @@ async def embedding_status(db: Session = Depends(get_db)):
         text("SELECT COUNT(*) FROM papers WHERE deleted = false AND embedding IS NOT NULL")
     ).scalar() or 0
 
-    import os
-    has_key = bool(os.getenv("ANTHROPIC_API_KEY"))
+    # Seit dem Einbetten geaendert bzw. mit anderem Modell berechnet
+    drift = db.execute(
+        text("""
+            SELECT
+                COUNT(*) FILTER (
+                    WHERE embedding_model = :model AND modified > embedding_synced_at
+                ) AS stale,
+                COUNT(*) FILTER (WHERE embedding_model <> :model) AS other_model
+            FROM papers
+            WHERE deleted = false AND embedding IS NOT NULL
+        """),
+        {"model": EMBEDDING_MODEL},
+    ).first()
+
+    passage_papers = db.execute(
+        text("""
+            SELECT COUNT(*) FROM papers
+            WHERE deleted = false AND passages_synced_at IS NOT NULL
+              AND modified <= passages_synced_at
+        """)
+    ).scalar() or 0
+
+    provider = get_embedding_provider()
 
     coverage = round((embedded / total * 100), 1) if total > 0 else 0.0
 
+    # Fortschritt des Backfill-Jobs; ohne Redis nur die Abdeckung
+    try:
+        backfill = BackfillStatus(**await embedding_backfill.status())
+    except Exception as e:
+        logger.warning("Backfill-Status nicht abrufbar", error=str(e))
+        backfill = None
+
     return EmbeddingStatusResponse(
         total_papers=total,
         embedded_papers=embedded,
         coverage_percent=coverage,
-        semantic_search_enabled=has_key,
+        semantic_search_enabled=provider.available,
+        provider=provider.name,
+        model=EMBEDDING_MODEL,
+        stale_papers=drift.stale or 0,
+        other_model_papers=drift.other_model or 0,
+        passage_papers=passage_papers,
+        backfill=backfill,
+        query_cache=QueryCacheStats(**query_embedding_cache.stats()),
     )
+
+
+# ============================================================
+# POST /api/v1/search/semantic/backfill
+# ============================================================
+
+@router.post("/semantic/backfill", response_model=BackfillStartResponse, status_code=202)
+async def start_backfill(
+    restart: bool = Query(False, description="Checkpoint verwerfen und von vorn beginnen"),
+    retry_failed: bool = Query(False, description="Nur fehlgeschlagene Vorlagen erneut versuchen"),
+    upgrade_model: bool = Query(False, description="Vektoren anderer Modelle neu berechnen"),
+    user: TokenPayload = Depends(require_permission(Permission.ADMIN_SETTINGS)),
+):
+    """Embedding-Backfill im Hintergrund starten bzw. am Checkpoint fortsetzen.
+
+    Mit upgrade_model=true werden nach einem Wechsel von EMBEDDING_MODEL alle
+    Vektoren des alten Modells neu berechnet. Fortschritt ueber
+    GET /api/v1/search/semantic/status.
+    """
+    if not embedding_backfill.start(
+        restart=restart, retry_failed=retry_failed, upgrade_model=upgrade_model
+    ):
+        raise HTTPException(status_code=409, detail="Embedding-Backfill laeuft bereits")
+    return BackfillStartResponse(started=True, message="Embedding-Backfill gestartet")
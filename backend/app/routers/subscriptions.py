@@ -23,6 +23,7 @@ from sqlalchemy.orm import Session
 from app.database import get_db
 from app.models.subscription import Subscription
 from app.services.email_service import send_confirmation_email
+from app.services.keyword_matcher import keyword_matcher
 
 router = APIRouter(prefix="/api/v1/subscriptions", tags=["Abonnements"])
 
@@ -174,6 +175,8 @@ def confirm_subscription(token: str, db: Session = Depends(get_db)) -> HTMLRespo
         )
     sub.confirmed = True
     db.commit()
+    if sub.subscription_type == "keyword":
+        keyword_matcher.invalidate()
     return HTMLResponse(_CONFIRM_SUCCESS_HTML.format(base_url=BASE_URL), status_code=200)
 
 
@@ -214,6 +217,8 @@ def unsubscribe(token: str, db: Session = Depends(get_db)) -> HTMLResponse:
         )
     db.delete(sub)
     db.commit()
+    if sub.subscription_type == "keyword":
+        keyword_matcher.invalidate()
     return HTMLResponse(_UNSUB_SUCCESS_HTML.format(base_url=BASE_URL), status_code=200)
 
 
@@ -249,7 +254,12 @@ def get_subscribers_for_keyword(
     keyword: str,
     min_digest_hours: int = 24,
 ) -> list[Subscription]:
-    """Gibt bestaetigte Keyword-Abonnenten zurueck (Digest-Schutz)."""
+    """
+    Gibt bestaetigte Keyword-Abonnenten zurueck (Digest-Schutz).
+
+    Fuer den Abgleich neuer Vorlagen gegen alle Stichwoerter in einem
+    Durchlauf siehe app.services.keyword_matcher.
+    """
     cutoff = datetime.now(timezone.utc) - timedelta(hours=min_digest_hours)
     return (
         db.query(Subscription)
@@ -0,0 +1,77 @@
+"""
+index_passages.py - Passagen-Index (paper_passages) aufbauen und aktualisieren.
+
+Aufruf: python -m app.scripts.index_passages [--limit 1000] [--rebuild]
+
+Zerlegt Vorlagen und ihre Dateitexte (Hauptdatei und Anlagen) in
+ueberlappende Abschnitte und bettet sie ein (app.services.passages).
+Ohne --rebuild werden nur Vorlagen verarbeitet, die seit der letzten
+Indexierung geaendert wurden oder noch keine Passagen haben; unveraenderte
+Abschnitte behalten ihr Embedding. Passagen geloeschter Vorlagen werden
+entfernt. Regelmaessig ausfuehren (z.B. per Cron).
+"""
+import sys
+
+# Add /app to path when running standalone
+if "/app" not in sys.path:
+    sys.path.insert(0, "/app")
+
+from app.core.config import get_settings
+from app.database import SessionLocal
+from app.services.passages import (
+    load_papers,
+    pending_paper_ids,
+    purge_deleted_passages,
+    sync_passages,
+)
+
+settings = get_settings()
+
+
+def index_passages(limit: int = 0, rebuild: bool = False, batch_size: int = 0) -> dict:
+    """Passagen fuer alle Vorlagen ohne aktuellen Stand erzeugen.
+
+    Args:
+        limit: Hoechstens so viele Vorlagen in diesem Lauf (0 = alle)
+        rebuild: Auch bereits indexierte Vorlagen neu zerlegen
+        batch_size: Vorlagen pro Block (Standard: PASSAGE_BATCH_SIZE)
+    """
+    batch_size = batch_size or settings.passage_batch_size
+    totals = {"papers": 0, "passages": 0, "embedded": 0, "reused": 0, "failed": 0, "purged": 0}
+    db = SessionLocal()
+    try:
+        totals["purged"] = purge_deleted_passages(db)
+        after = ""
+        while not limit or totals["papers"] < limit:
+            size = min(batch_size, limit - totals["papers"]) if limit else batch_size
+            paper_ids = pending_paper_ids(db, after, size, rebuild)
+            if not paper_ids:
+                break
+            counters = sync_passages(db, load_papers(db, paper_ids))
+            for key, value in counters.items():
+                totals[key] += value
+            after = paper_ids[-1]
+            db.expunge_all()
+            print(f"[index_passages] {totals['papers']} Vorlagen, {totals['passages']} Passagen")
+    finally:
+        db.close()
+
+    print(f"\n[index_passages] Vorlagen: {totals['papers']}")
+    print(f"  Passagen: {totals['passages']}")
+    print(f"  Eingebettet: {totals['embedded']}")
+    print(f"  Uebernommen (Hash gleich): {totals['reused']}")
+    print(f"  Fehlgeschlagen: {totals['failed']}")
+    print(f"  Entfernt (Vorlage geloescht): {totals['purged']}")
+    return totals
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Passagen-Index fuer Vorlagen und Dateitexte")
+    parser.add_argument("--limit", type=int, default=0, help="Hoechstens so viele Vorlagen (0 = alle)")
+    parser.add_argument("--rebuild", action="store_true", help="Alle Vorlagen neu zerlegen")
+    parser.add_argument("--batch-size", type=int, default=0, help="Vorlagen pro Block")
+    args = parser.parse_args()
+
+    index_passages(limit=args.limit, rebuild=args.rebuild, batch_size=args.batch_size)
@@ -0,0 +1,522 @@
+"""
+search_benchmark.py - Reproduzierbarer Benchmark fuer die Volltextsuche.
+
+Aufruf: python -m app.scripts.search_benchmark --backend elasticsearch --scale 10000
+        python -m app.scripts.search_benchmark --backend postgres --scale 5000 --json
+
+Ablauf:
+1. Synthetischen Ratskorpus erzeugen (Vorlagen nach dem Muster von
+   app/seeds/musterstadt.py: Haushalt, Bauleitplanung, Infrastruktur, ...)
+   mit Ortsteil, Jahr und Fliesstext; deterministisch ueber --seed
+2. Korpus indexieren (eigener ES-Index-Praefix bzw. eigener Tenant in PostgreSQL)
+3. Bewertete Anfragen (Aktenzeichen, Thema + Ortsteil, Thema + Jahr, Tippfehler)
+   als Query-Log mit Zipf-Verteilung abspielen, optional parallel
+4. Bericht: Latenz p50/p95/p99, Durchsatz, recall@k und MRR; fehlgeschlagene
+   Anfragen werden gezaehlt (Exit-Code 1)
+
+Vor Aenderungen an PAPERS_INDEX_SETTINGS (Analyzer) oder den multi_match-
+Gewichtungen (SEARCH_FIELDS) einmal vorher und einmal nachher ausfuehren.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import math
+import random
+import re
+import sys
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Any, Optional
+
+# Add /app to path when running standalone
+if "/app" not in sys.path:
+    sys.path.insert(0, "/app")
+
+from app.seeds.musterstadt import PAPER_DEFINITIONS
+
+BENCH_TENANT = "benchmark"
+BENCH_INDEX_PREFIX = "bench"
+
+ORTSTEILE = [
+    "Innenstadt", "Nordstadt", "Weststadt", "Suedwest", "Felddorf", "Kleindorf",
+    "Am Park", "Bahnhofsviertel", "Muehlenbach", "Oberhausen", "Lindenhof", "Seeblick",
+]
+
+# Schluesselbegriff und Fliesstext-Bausteine je Themenkuerzel (aus PAPER_DEFINITIONS)
+TOPICS: dict[str, dict[str, Any]] = {
+    "HH": {
+        "term": "Haushaltsplan",
+        "phrases": [
+            "Der Ergebnishaushalt weist einen Fehlbetrag aus, der durch Rueckstellungen gedeckt wird.",
+            "Die Investitionsplanung sieht Mittel fuer Schulen und Strassen vor.",
+            "Die Kaemmerei empfiehlt eine Anpassung der Hebesaetze der Grundsteuer.",
+        ],
+    },
+    "BP": {
+        "term": "Bebauungsplan",
+        "phrases": [
+            "Der Geltungsbereich umfasst die Flurstuecke entlang der Erschliessungsstrasse.",
+            "Im Rahmen der fruehzeitigen Oeffentlichkeitsbeteiligung gingen Stellungnahmen ein.",
+            "Die Festsetzungen regeln Grundflaechenzahl, Geschossigkeit und Dachform.",
+        ],
+    },
+    "INF": {
+        "term": "Strassensanierung",
+        "phrases": [
+            "Die Fahrbahndecke weist erhebliche Schaeden und Spurrinnen auf.",
+            "Die Vergabe erfolgt nach oeffentlicher Ausschreibung an den wirtschaftlichsten Bieter.",
+            "Waehrend der Bauzeit wird eine Umleitung ueber die Nebenstrassen eingerichtet.",
+        ],
+    },
+    "UMW": {
+        "term": "Klimaschutz",
+        "phrases": [
+            "Die Massnahme reduziert den CO2-Ausstoss der kommunalen Liegenschaften.",
+            "Foerdermittel des Bundes decken bis zu 70 Prozent der Kosten.",
+            "Photovoltaikanlagen auf Daechern oeffentlicher Gebaeude werden geprueft.",
+        ],
+    },
+    "SOZ": {
+        "term": "Kitabedarfsplan",
+        "phrases": [
+            "Der Bedarf an Betreuungsplaetzen fuer unter Dreijaehrige steigt weiter.",
+            "Die Traegerschaft der Einrichtung uebernimmt ein freier Traeger.",
+            "Die Elternbeitraege bleiben im kommenden Kitajahr unveraendert.",
+        ],
+    },
+    "SCH": {
+        "term": "Schulentwicklungsplan",
+        "phrases": [
+            "Die Schuelerzahlen der Grundschulen steigen in den naechsten Jahren.",
+            "Der Digitalpakt finanziert die Ausstattung mit Endgeraeten.",
+            "Die Offene Ganztagsschule wird um zwei Gruppen erweitert.",
+        ],
+    },
+    "ANT": {
+        "term": "Antrag",
+        "phrases": [
+            "Die Fraktion beantragt, die Verwaltung mit einer Pruefung zu beauftragen.",
+            "Die Kosten sollen im naechsten Haushalt beruecksichtigt werden.",
+            "Begruendung: Die Buergerinnen und Buerger haben wiederholt darauf hingewiesen.",
+        ],
+    },
+    "ANF": {
+        "term": "Anfrage",
+        "phrases": [
+            "Die Verwaltung wird um schriftliche Beantwortung der folgenden Fragen gebeten.",
+            "Wie ist der aktuelle Sachstand und welche Kosten sind entstanden?",
+            "Welche Massnahmen sind fuer das laufende Jahr geplant?",
+        ],
+    },
+    "MIT": {
+        "term": "Sachstandsbericht",
+        "phrases": [
+            "Die Verwaltung berichtet ueber den Stand der Umsetzung.",
+            "Der Bericht wird zur Kenntnis genommen, ein Beschluss ist nicht erforderlich.",
+            "Die Kennzahlen des Berichtszeitraums sind in der Anlage dargestellt.",
+        ],
+    },
+}
+
+_YEAR_RE = re.compile(r"\b20\d\d\b")
+
+
+def _templates_by_topic() -> dict[str, list[tuple[str, str]]]:
+    """Titelvorlagen (Name, Vorlagenart) aus PAPER_DEFINITIONS je Themenkuerzel."""
+    templates: dict[str, list[tuple[str, str]]] = {}
+    for ref, name, paper_type, _ in PAPER_DEFINITIONS:
+        code = ref.split("/")[1].split("-")[0]
+        if code in TOPICS:
+            templates.setdefault(code, []).append((name, paper_type))
+    return templates
+
+
+# ============================================================
+# Korpus und bewertete Anfragen
+# ============================================================
+
+@dataclass
+class SyntheticPaper:
+    id: str
+    reference: str
+    name: str
+    paper_type: str
+    topic: str
+    ortsteil: str
+    year: int
+    paragraphs: list[str]
+
+    def to_document(self, tenant_id: str = BENCH_TENANT) -> dict[str, Any]:
+        """ES-Dokument im Format von search_content.paper_to_document()."""
+        return {
+            "oparl_id": self.id,
+            "oparl_type": "paper",
+            "body_id": None,
+            "tenant_id": tenant_id,
+            "name": self.name,
+            "reference": self.reference,
+            "paper_type": self.paper_type,
+            "keywords": [TOPICS[self.topic]["term"], self.ortsteil],
+            "content": self.paragraphs,
+            "date": date(self.year, 6, 1).isoformat(),
+            "created": None,
+            "modified": None,
+        }
+
+
+@dataclass
+class JudgedQuery:
+    query: str
+    kind: str
+    relevant: set[str] = field(default_factory=set)
+
+
+def generate_corpus(scale: int, seed: int = 42) -> list[SyntheticPaper]:
+    """`scale` Vorlagen erzeugen; gleiche Parameter ergeben denselben Korpus."""
+    rng = random.Random(seed)
+    templates = _templates_by_topic()
+    topics = sorted(templates)
+    counters: dict[tuple[int, str], int] = {}
+    papers = []
+    for _ in range(scale):
+        topic = rng.choice(topics)
+        title, paper_type = rng.choice(templates[topic])
+        year = rng.randint(2018, 2026)
+        ortsteil = rng.choice(ORTSTEILE)
+        counters[(year, topic)] = counters.get((year, topic), 0) + 1
+        reference = f"{year}/{topic}-{counters[(year, topic)]:04d}"
+        name = _YEAR_RE.sub(str(year), title)
+        name = f"{name} – {ortsteil}"
+        phrases = TOPICS[topic]["phrases"]
+        paragraphs = [
+            f"{TOPICS[topic]['term']} {ortsteil} {year}: " + " ".join(rng.sample(phrases, 2)),
+            " ".join(rng.choice(phrases) for _ in range(rng.randint(2, 6))),
+        ]
+        papers.append(SyntheticPaper(
+            id=str(uuid.UUID(int=rng.getrandbits(128))),
+            reference=reference,
+            name=name,
+            paper_type=paper_type,
+            topic=topic,
+            ortsteil=ortsteil,
+            year=year,
+            paragraphs=paragraphs,
+        ))
+    return papers
+
+
+def _typo(word: str, rng: random.Random) -> str:
+    """Einen Buchstaben im Wortinneren auslassen (Test fuer Fuzziness)."""
+    if len(word) < 6:
+        return word
+    pos = rng.randint(1, len(word) - 2)
+    return word[:pos] + word[pos + 1:]
+
+
+def build_judged_queries(
+    corpus: list[SyntheticPaper],
+    seed: int = 42,
+    references: int = 20,
+) -> list[JudgedQuery]:
+    """
+    Anfragen mit bekannter Relevanzmenge:
+    - reference:     Aktenzeichen -> genau eine Vorlage
+    - topic_place:   Schluesselbegriff + Ortsteil -> alle Vorlagen dazu
+    - topic_year:    Schluesselbegriff + Jahr
+    - typo:          topic_place mit Tippfehler im Schluesselbegriff
+    """
+    rng = random.Random(seed)
+    by_place: dict[tuple[str, str], set[str]] = {}
+    by_year: dict[tuple[str, int], set[str]] = {}
+    for p in corpus:
+        by_place.setdefault((p.topic, p.ortsteil), set()).add(p.id)
+        by_year.setdefault((p.topic, p.year), set()).add(p.id)
+
+    queries = [
+        JudgedQuery(p.reference, "reference", {p.id})
+        for p in rng.sample(corpus, min(references, len(corpus)))
+    ]
+    for (topic, ortsteil), ids in sorted(by_place.items()):
+        term = TOPICS[topic]["term"]
+        queries.append(JudgedQuery(f"{term} {ortsteil}", "topic_place", ids))
+        queries.append(JudgedQuery(f"{_typo(term, rng)} {ortsteil}", "typo", ids))
+    for (topic, year), ids in sorted(by_year.items()):
+        queries.append(JudgedQuery(f"{TOPICS[topic]['term']} {year}", "topic_year", ids))
+    return queries
+
+
+def build_query_log(
+    queries: list[JudgedQuery],
+    length: int,
+    seed: int = 42,
+    zipf_s: float = 1.1,
+) -> list[JudgedQuery]:
+    """Query-Log mit Zipf-verteilter Haeufigkeit (wenige Anfragen sehr haeufig)."""
+    rng = random.Random(seed)
+    ranked = queries[:]
+    rng.shuffle(ranked)
+    weights = [1.0 / (rank ** zipf_s) for rank in range(1, len(ranked) + 1)]
+    return rng.choices(ranked, weights=weights, k=length)
+
+
+# ============================================================
+# Kennzahlen
+# ============================================================
+
+def percentile(values: list[float], pct: float) -> float:
+    """Perzentil nach Nearest-Rank-Methode."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(math.ceil(pct / 100.0 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def recall_at_k(result_ids: list[str], relevant: set[str], k: int) -> float:
+    if not relevant:
+        return 0.0
+    return len(set(result_ids[:k]) & relevant) / min(len(relevant), k)
+
+
+def reciprocal_rank(result_ids: list[str], relevant: set[str]) -> float:
+    for rank, doc_id in enumerate(result_ids, start=1):
+        if doc_id in relevant:
+            return 1.0 / rank
+    return 0.0
+
+
+def summarize(
+    latencies_ms: list[float],
+    wall_seconds: float,
+    judged: list[tuple[JudgedQuery, list[str]]],
+    k: int,
+    errors: Optional[list[str]] = None,
+) -> dict[str, Any]:
+    """Bericht aus Einzelmessungen; recall@k je Anfragetyp und gesamt, Fehler je Art."""
+    recall_by_kind: dict[str, list[float]] = {}
+    mrr: list[float] = []
+    for query, ids in judged:
+        recall_by_kind.setdefault(query.kind, []).append(recall_at_k(ids, query.relevant, k))
+        mrr.append(reciprocal_rank(ids, query.relevant))
+    all_recalls = [r for values in recall_by_kind.values() for r in values]
+    errors = errors or []
+    return {
+        "queries": len(latencies_ms),
+        "errors": len(errors),
+        "errors_by_type": {name: errors.count(name) for name in sorted(set(errors))},
+        "latency_ms": {
+            "p50": round(percentile(latencies_ms, 50), 2),
+            "p95": round(percentile(latencies_ms, 95), 2),
+            "p99": round(percentile(latencies_ms, 99), 2),
+            "max": round(max(latencies_ms, default=0.0), 2),
+        },
+        "throughput_qps": round(len(latencies_ms) / wall_seconds, 1) if wall_seconds else 0.0,
+        f"recall@{k}": round(sum(all_recalls) / len(all_recalls), 4) if all_recalls else 0.0,
+        f"recall@{k}_by_kind": {
+            kind: round(sum(v) / len(v), 4) for kind, v in sorted(recall_by_kind.items())
+        },
+        "mrr": round(sum(mrr) / len(mrr), 4) if mrr else 0.0,
+    }
+
+
+# ============================================================
+# Backends
+# ============================================================
+
+async def _index_elasticsearch(svc, corpus: list[SyntheticPaper]) -> None:
+    indexed = await svc.index_all_papers(p.to_document() for p in corpus)
+    await svc.client.indices.refresh(index=svc.idx_papers)
+    print(f"[benchmark] {indexed} Vorlagen in {svc.idx_papers} indexiert")
+
+
+def _index_postgres(db, corpus: list[SyntheticPaper]) -> None:
+    """Korpus als eigener Tenant einspielen (Absatz 1 als Kurzfassung im tsvector)."""
+    from sqlalchemy import insert
+
+    from app.models.oparl import Body, OParlSystem, Paper
+
+    _cleanup_postgres(db)
+    system = OParlSystem(id=str(uuid.uuid4()), name="Benchmark")
+    body = Body(id=str(uuid.uuid4()), tenant_id=BENCH_TENANT, system_id=system.id,
+                name="Benchmarkstadt")
+    db.add_all([system, body])
+    db.flush()
+    now = datetime.utcnow()
+    rows = [
+        {
+            "id": p.id, "tenant_id": BENCH_TENANT, "body_id": body.id,
+            "name": p.name, "reference": p.reference, "paper_type": p.paper_type,
+            "keyword": [TOPICS[p.topic]["term"], p.ortsteil],
+            "ai_summary": " ".join(p.paragraphs), "date": date(p.year, 6, 1),
+            "deleted": False, "created": now, "modified": now,
+        }
+        for p in corpus
+    ]
+    for start in range(0, len(rows), 1000):
+        db.execute(insert(Paper), rows[start:start + 1000])
+    db.commit()
+    print(f"[benchmark] {len(rows)} Vorlagen in PostgreSQL (tenant={BENCH_TENANT}) eingespielt")
+
+
+def _cleanup_postgres(db) -> None:
+    from sqlalchemy import text
+
+    body_ids = [r[0] for r in db.execute(
+        text("SELECT id FROM bodies WHERE tenant_id = :t"), {"t": BENCH_TENANT}
+    )]
+    db.execute(text("DELETE FROM papers WHERE tenant_id = :t"), {"t": BENCH_TENANT})
+    if body_ids:
+        system_ids = [r[0] for r in db.execute(
+            text("SELECT system_id FROM bodies WHERE tenant_id = :t"), {"t": BENCH_TENANT}
+        )]
+        db.execute(text("DELETE FROM bodies WHERE tenant_id = :t"), {"t": BENCH_TENANT})
+        db.execute(text("DELETE FROM oparl_systems WHERE id = ANY(:ids)"), {"ids": system_ids})
+    db.commit()
+
+
+async def replay(
+    backends: list,
+    log: list[JudgedQuery],
+    k: int,
+) -> dict[str, Any]:
+    """
+    Query-Log abspielen und Bericht erzeugen.
+
+    Je Eintrag in `backends` laeuft ein Worker (Parallelitaet = Anzahl);
+    das PostgreSQL-Backend braucht je Worker eine eigene Session. Fehlgeschlagene
+    Anfragen (Exception oder vom Backend abgefangen) zaehlen als Fehler und
+    gehen nicht in Latenz und recall ein.
+    """
+    pending = iter(log)
+    latencies: list[float] = []
+    judged: list[tuple[JudgedQuery, list[str]]] = []
+    errors: list[str] = []
+
+    async def worker(backend) -> None:
+        for query in pending:
+            started = time.perf_counter()
+            try:
+                result = await backend.search(
+                    query=query.query, types=["paper"], tenant_id=BENCH_TENANT, size=k,
+                )
+                error = result.error
+            except Exception as e:
+                error = type(e).__name__
+            if error:
+                errors.append(error)
+                continue
+            latencies.append((time.perf_counter() - started) * 1000)
+            judged.append((query, [d["id"] for d in result.data]))
+
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(worker(b) for b in backends))
+    return summarize(latencies, time.perf_counter() - wall_start, judged, k, errors)
+
+
+async def run_benchmark(
+    backend_name: str,
+    scale: int,
+    queries: int,
+    k: int,
+    concurrency: int,
+    seed: int,
+    warmup: int,
+    keep: bool,
+) -> dict[str, Any]:
+    from app.core.config import get_settings
+
+    settings = get_settings()
+    # Ergebnis-Cache wuerde wiederholte Anfragen verfaelschen
+    settings.search_cache_enabled = False
+
+    corpus = generate_corpus(scale, seed)
+    judged = build_judged_queries(corpus, seed)
+    log = build_query_log(judged, queries, seed)
+    print(f"[benchmark] Korpus: {len(corpus)} Vorlagen, {len(judged)} bewertete Anfragen, "
+          f"Log: {len(log)} Anfragen")
+
+    sessions = []
+    if backend_name == "postgres":
+        from app.database import SessionLocal
+        from app.services.search_postgres import PostgresSearchService
+
+        db = SessionLocal()
+        sessions.append(db)
+        _index_postgres(db, corpus)
+        # Sessions sind nicht threadsicher: je Worker eine eigene
+        sessions += [SessionLocal() for _ in range(max(concurrency, 1) - 1)]
+        backends = [PostgresSearchService(session) for session in sessions]
+    else:
+        from app.services.search_service import SearchService
+
+        settings.es_index_prefix = BENCH_INDEX_PREFIX
+        backend = SearchService()
+        await _index_elasticsearch(backend, corpus)
+        backends = [backend] * max(concurrency, 1)
+
+    try:
+        if warmup:
+            await replay(backends, log[:warmup], k)
+        report = await replay(backends, log, k)
+        report.update({
+            "backend": backend_name, "scale": scale, "k": k,
+            "concurrency": concurrency, "seed": seed,
+        })
+        return report
+    finally:
+        if backend_name == "postgres":
+            if not keep:
+                _cleanup_postgres(sessions[0])
+            for session in sessions:
+                session.close()
+        else:
+            if not keep:
+                await backend.client.indices.delete(index=backend.idx_papers, ignore_unavailable=True)
+            await backend.close()
+
+
+def _print_report(report: dict[str, Any]) -> None:
+    k = report["k"]
+    lat = report["latency_ms"]
+    print(f"\n[benchmark] Backend: {report['backend']}  Korpus: {report['scale']}  "
+          f"Parallelitaet: {report['concurrency']}")
+    print(f"  Anfragen:   {report['queries']}")
+    if report["errors"]:
+        by_type = ", ".join(f"{name} {count}" for name, count in report["errors_by_type"].items())
+        print(f"  FEHLER:     {report['errors']} ({by_type})")
+    print(f"  Latenz:     p50 {lat['p50']} ms | p95 {lat['p95']} ms | p99 {lat['p99']} ms")
+    print(f"  Durchsatz:  {report['throughput_qps']} Anfragen/s")
+    print(f"  recall@{k}:  {report[f'recall@{k}']}  (MRR {report['mrr']})")
+    for kind, value in report[f"recall@{k}_by_kind"].items():
+        print(f"    {kind:<12} {value}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark fuer die Volltextsuche")
+    parser.add_argument("--backend", choices=["elasticsearch", "postgres"], default="elasticsearch")
+    parser.add_argument("--scale", type=int, default=10_000, help="Anzahl synthetischer Vorlagen")
+    parser.add_argument("--queries", type=int, default=2_000, help="Laenge des Query-Logs")
+    parser.add_argument("--k", type=int, default=10, help="Cutoff fuer recall@k")
+    parser.add_argument("--concurrency", type=int, default=1, help="Parallele Anfragen")
+    parser.add_argument("--warmup", type=int, default=100, help="Anfragen vor der Messung")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--keep", action="store_true", help="Korpus nach dem Lauf behalten")
+    parser.add_argument("--json", action="store_true", help="Bericht als JSON ausgeben")
+    args = parser.parse_args()
+
+    result = asyncio.run(run_benchmark(
+        args.backend, args.scale, args.queries, args.k,
+        args.concurrency, args.seed, args.warmup, args.keep,
+    ))
+    if args.json:
+        print(json.dumps(result, indent=2, ensure_ascii=False))
+    else:
+        _print_report(result)
+    # Fehlgeschlagene Anfragen verfaelschen Latenz und recall: Lauf gilt als gescheitert
+    if result["errors"]:
+        sys.exit(1)
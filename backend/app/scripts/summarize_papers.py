@@ -0,0 +1,68 @@
+"""
+summarize_papers.py - KI-Kurzfassungen fuer den Vorlagenbestand im Batch erzeugen.
+
+Aufruf: python -m app.scripts.summarize_papers [--tenant gemeinde-a] [--limit 1000]
+        [--restart] [--provider local]
+
+Reicht alle Vorlagen ohne aktuelle Kurzfassung in Batches ein
+(app.services.ai_summary_batch), wartet auf die Ergebnisse und schreibt sie
+gesammelt zurueck. Ein abgebrochener Lauf (Strg+C, Deployment) wird beim
+naechsten Aufruf fortgesetzt; bereits eingereichte Batches werden nur noch
+eingesammelt. Einzelne Vorlagen: POST /export/paper/{id}/summary.
+"""
+import asyncio
+import sys
+
+# Add /app to path when running standalone
+if "/app" not in sys.path:
+    sys.path.insert(0, "/app")
+
+from app.core.config import get_settings
+from app.services.ai_summary_batch import BACKENDS, SummaryBatchJob
+
+settings = get_settings()
+
+
+def summarize_papers(
+    tenant_id: str = "",
+    limit: int = 0,
+    restart: bool = False,
+    provider: str = "",
+) -> dict:
+    """Batchlauf ausfuehren bzw. fortsetzen und Ergebnis ausgeben.
+
+    Args:
+        tenant_id: Nur Vorlagen dieses Tenants ("" = alle)
+        limit: Hoechstens so viele Vorlagen einreichen (0 = alle)
+        restart: Cursor verwerfen und von vorn beginnen
+        provider: Batch-Backend (Standard: AI_BATCH_PROVIDER)
+    """
+    backend = BACKENDS[provider or settings.ai_batch_provider]()
+    status = asyncio.run(
+        SummaryBatchJob(backend=backend).run(tenant_id=tenant_id or None, restart=restart, limit=limit)
+    )
+
+    print(f"\n[summarize_papers] Status: {status['status']} ({backend.name})")
+    print(f"  Eingereicht: {status['submitted']}")
+    print(f"  Aus dem Cache: {status['cached']}")
+    print(f"  Geschrieben: {status['written']}")
+    print(f"  Fehlgeschlagen: {status['failed']}")
+    print(f"  Ohne Quelltext: {status['skipped']}")
+    if status["open_batches"]:
+        print(f"  Offene Batches: {', '.join(status['open_batches'])}")
+    if status["error"]:
+        print(f"  Fehler: {status['error']}")
+    return status
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="KI-Kurzfassungen fuer Vorlagen im Batch erzeugen")
+    parser.add_argument("--tenant", default="", help="Nur Vorlagen dieses Tenants")
+    parser.add_argument("--limit", type=int, default=0, help="Hoechstens so viele Vorlagen (0 = alle)")
+    parser.add_argument("--restart", action="store_true", help="Von vorn beginnen statt fortzusetzen")
+    parser.add_argument("--provider", choices=sorted(BACKENDS), default="", help="Batch-Backend")
+    args = parser.parse_args()
+
+    summarize_papers(tenant_id=args.tenant, limit=args.limit, restart=args.restart, provider=args.provider)
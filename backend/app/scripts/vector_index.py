@@ -0,0 +1,403 @@
+"""
+vector_index.py - Verwaltung der pgvector-Indizes auf papers.embedding und
+paper_passages.embedding.
+
+Aufruf: python -m app.scripts.vector_index rebuild [--type hnsw|ivfflat] [--quantization halfvec]
+                                                   [--table paper_passages]
+        python -m app.scripts.vector_index sync
+        python -m app.scripts.vector_index drop --quantization none [--table paper_passages]
+        python -m app.scripts.vector_index recall --sample 200 --k 10 [--ef-search 40]
+        python -m app.scripts.vector_index benchmark --sample 200 --k 10
+
+rebuild:
+    Baut einen Index mit den aktuellen Einstellungen (VECTOR_INDEX_TYPE,
+    VECTOR_HNSW_M, VECTOR_HNSW_EF_CONSTRUCTION, VECTOR_IVFFLAT_LISTS) neu,
+    ohne Schreibsperre auf papers: neuer Index unter temporaerem Namen mit
+    CREATE INDEX CONCURRENTLY, danach alten Index entfernen und umbenennen.
+    Die Suche laeuft waehrenddessen weiter. --quantization waehlt den Index
+    (none = float32, halfvec, binary; siehe VECTOR_QUANTIZATION), --table
+    die Tabelle (papers oder paper_passages).
+
+sync:
+    Legt auf papers und paper_passages fehlende Indizes fuer alle
+    konfigurierten Quantisierungen an (VECTOR_QUANTIZATION und
+    VECTOR_QUANTIZATION_TENANTS) und entfernt danach
+    die nicht mehr benoetigten, z.B. den float32-Index, wenn alle Tenants
+    quantisiert suchen (die Spalte bleibt fuer den Rerank erhalten). Nach
+    Migration 007 und jeder Aenderung der Quantisierung ausfuehren.
+
+drop:
+    Entfernt einen einzelnen Index.
+
+recall:
+    Zieht eine Stichprobe eingebetteter Vorlagen, sucht zu jedem Vektor die
+    k naechsten Nachbarn ueber den Index (ANN) und exakt (Index-Scan aus)
+    und berichtet recall@k sowie Latenz p50/p95/p99 beider Varianten.
+    Vor und nach Aenderungen an ef_search / m ausfuehren.
+
+benchmark:
+    recall und Latenz fuer none/halfvec/binary auf derselben Stichprobe,
+    dazu Groesse der Indizes und Speicher je Vektor.
+"""
+from __future__ import annotations
+
+import json
+import sys
+import time
+from typing import Any, Optional
+
+# Add /app to path when running standalone
+if "/app" not in sys.path:
+    sys.path.insert(0, "/app")
+
+from app.core.config import get_settings
+from app.scripts.search_benchmark import percentile, recall_at_k
+from app.services.embeddings import EMBEDDING_DIM, QUANTIZATIONS
+
+settings = get_settings()
+
+INDEX_NAME = "ix_papers_embedding_cosine"
+TMP_INDEX_NAME = f"{INDEX_NAME}_new"
+INDEX_NAMES = {
+    "none": INDEX_NAME,
+    "halfvec": "ix_papers_embedding_halfvec",
+    "binary": "ix_papers_embedding_binary",
+}
+# Passagen (Migration 008 legt den float32-Index an)
+PASSAGE_INDEX_NAMES = {
+    "none": "ix_paper_passages_embedding_cosine",
+    "halfvec": "ix_paper_passages_embedding_halfvec",
+    "binary": "ix_paper_passages_embedding_binary",
+}
+TABLE_INDEX_NAMES = {"papers": INDEX_NAMES, "paper_passages": PASSAGE_INDEX_NAMES}
+
+# Bytes je Vektor in der jeweiligen Darstellung (ohne Tupel-/Indexoverhead)
+VECTOR_BYTES = {
+    "none": 4 * EMBEDDING_DIM + 8,
+    "halfvec": 2 * EMBEDDING_DIM + 8,
+    "binary": EMBEDDING_DIM // 8 + 8,
+}
+
+
+def ivfflat_lists(rows: int, configured: int = 0) -> int:
+    """Anzahl IVFFlat-Listen: konfiguriert oder Zeilen / 1000 (min. 10)."""
+    if configured > 0:
+        return configured
+    return max(rows // 1000, 10)
+
+
+def index_ddl(
+    name: str, index_type: str, rows: int = 0, quantization: str = "none", table: str = "papers"
+) -> str:
+    """CREATE INDEX CONCURRENTLY fuer den gewuenschten Indextyp und die Quantisierung."""
+    if index_type == "hnsw":
+        options = f"m = {settings.vector_hnsw_m}, ef_construction = {settings.vector_hnsw_ef_construction}"
+    elif index_type == "ivfflat":
+        options = f"lists = {ivfflat_lists(rows, settings.vector_ivfflat_lists)}"
+    else:
+        raise ValueError(f"Unbekannter Indextyp: {index_type}")
+    q = QUANTIZATIONS[quantization]
+    column = q.column if quantization == "none" else f"({q.column})"
+    return (
+        f"CREATE INDEX CONCURRENTLY {name} "
+        f"ON {table} USING {index_type} ({column} {q.opclass}) WITH ({options})"
+    )
+
+
+def rebuild_index(
+    conn, index_type: Optional[str] = None, quantization: str = "none", table: str = "papers"
+) -> dict[str, Any]:
+    """Index ohne Schreibsperre neu aufbauen.
+
+    `conn` muss im AUTOCOMMIT-Modus sein (CONCURRENTLY ist in einer
+    Transaktion nicht erlaubt).
+    """
+    from sqlalchemy import text
+
+    index_type = index_type or settings.vector_index_type
+    name = TABLE_INDEX_NAMES[table][quantization]
+    tmp_name = f"{name}_new"
+    rows = conn.execute(text(f"SELECT count(*) FROM {table} WHERE embedding IS NOT NULL")).scalar() or 0
+
+    # Reste eines abgebrochenen Laufs (ungueltiger Index) entfernen
+    conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {tmp_name}"))
+
+    ddl = index_ddl(tmp_name, index_type, rows, quantization, table)
+    print(f"[vector_index] {ddl}")
+    started = time.perf_counter()
+    conn.execute(text(ddl))
+    build_seconds = time.perf_counter() - started
+
+    valid = conn.execute(
+        text("SELECT indisvalid FROM pg_index WHERE indexrelid = CAST(:name AS regclass)"),
+        {"name": tmp_name},
+    ).scalar()
+    if not valid:
+        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {tmp_name}"))
+        raise RuntimeError("Neuer Vektorindex ist ungueltig, alter Index bleibt bestehen")
+
+    conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+    conn.execute(text(f"ALTER INDEX {tmp_name} RENAME TO {name}"))
+
+    return {
+        "index": name,
+        "table": table,
+        "type": index_type,
+        "quantization": quantization,
+        "rows": rows,
+        "ddl": ddl.replace(tmp_name, name),
+        "build_seconds": round(build_seconds, 2),
+    }
+
+
+def drop_index(conn, quantization: str, table: str = "papers") -> str:
+    """Index einer Quantisierung entfernen (AUTOCOMMIT-Verbindung)."""
+    from sqlalchemy import text
+
+    name = TABLE_INDEX_NAMES[table][quantization]
+    conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+    return name
+
+
+def configured_quantizations() -> set[str]:
+    """Quantisierungen, mit denen mindestens ein Tenant sucht."""
+    overrides = settings.vector_quantization_overrides.values()
+    return {settings.vector_quantization, *(q for q in overrides if q in QUANTIZATIONS)}
+
+
+def sync_indexes(conn, index_type: Optional[str] = None) -> dict[str, list[str]]:
+    """Indizes von papers und paper_passages an die konfigurierten Quantisierungen
+    anpassen (AUTOCOMMIT-Verbindung).
+
+    Fehlende werden zuerst gebaut, erst danach ueberzaehlige entfernt, damit
+    die Suche nie ohne Index laeuft.
+    """
+    from sqlalchemy import text
+
+    wanted = configured_quantizations()
+    existing = {
+        (table, quantization)
+        for table, names in TABLE_INDEX_NAMES.items()
+        for quantization, name in names.items()
+        if conn.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": name}).scalar()
+    }
+    created = [
+        rebuild_index(conn, index_type, quantization, table)["index"]
+        for table in TABLE_INDEX_NAMES
+        for quantization in QUANTIZATIONS
+        if quantization in wanted and (table, quantization) not in existing
+    ]
+    dropped = [
+        drop_index(conn, quantization, table)
+        for table in TABLE_INDEX_NAMES
+        for quantization in QUANTIZATIONS
+        if (table, quantization) in existing and quantization not in wanted
+    ]
+    return {"created": created, "dropped": dropped}
+
+
+def index_sizes(db) -> dict[str, int]:
+    """Groesse der vorhandenen Vektorindizes in Bytes (fehlende: 0)."""
+    from sqlalchemy import text
+
+    sizes = {}
+    for quantization, name in INDEX_NAMES.items():
+        sizes[quantization] = db.execute(
+            text("SELECT COALESCE(pg_relation_size(to_regclass(:name)), 0)"), {"name": name}
+        ).scalar() or 0
+    return sizes
+
+
+_SAMPLE_SQL = """
+    SELECT id, tenant_id, CAST(embedding AS text) AS embedding
+    FROM papers
+    WHERE embedding IS NOT NULL AND embedding_model = :model AND deleted = false
+    ORDER BY random()
+    LIMIT :sample
+"""
+
+
+def _neighbours(
+    db, row, k: int, exact: bool, ef_search: Optional[int], quantization: str = "none"
+) -> tuple[list[str], float]:
+    """k naechste Nachbarn eines Stichprobenvektors und Dauer in ms."""
+    from sqlalchemy import text
+
+    from app.services.embeddings import EMBEDDING_MODEL, set_vector_search_params, vector_search_sql
+
+    candidates = k if exact or quantization == "none" else k * max(settings.vector_rerank_factor, 1)
+    try:
+        if exact:
+            db.execute(text("SET LOCAL enable_indexscan = off"))
+        else:
+            set_vector_search_params(db, candidates, ef_search)
+        started = time.perf_counter()
+        ids = [r.id for r in db.execute(
+            text(vector_search_sql("id", "none" if exact else quantization)),
+            {
+                "model": EMBEDDING_MODEL, "tenant_id": row.tenant_id, "embedding": row.embedding,
+                "limit": k, "candidates": candidates,
+            },
+        )]
+        return ids, (time.perf_counter() - started) * 1000
+    finally:
+        # SET LOCAL / set_config(..., true) enden mit der Transaktion
+        db.rollback()
+
+
+def summarize_recall(
+    results: list[tuple[list[str], list[str]]],
+    ann_ms: list[float],
+    exact_ms: list[float],
+    k: int,
+) -> dict[str, Any]:
+    """Bericht aus (ANN-Treffer, exakte Treffer) je Stichprobe und Latenzen."""
+    recalls = [recall_at_k(ann, set(exact), k) for ann, exact in results if exact]
+
+    def latency(values: list[float]) -> dict[str, float]:
+        return {f"p{p}": round(percentile(values, p), 2) for p in (50, 95, 99)}
+
+    return {
+        "sample": len(results),
+        "k": k,
+        f"recall@{k}": round(sum(recalls) / len(recalls), 4) if recalls else 0.0,
+        f"min_recall@{k}": round(min(recalls), 4) if recalls else 0.0,
+        "ann_latency_ms": latency(ann_ms),
+        "exact_latency_ms": latency(exact_ms),
+    }
+
+
+def _sample(db, sample: int) -> list:
+    from sqlalchemy import text
+
+    from app.services.embeddings import EMBEDDING_MODEL
+
+    rows = db.execute(text(_SAMPLE_SQL), {"model": EMBEDDING_MODEL, "sample": sample}).fetchall()
+    db.rollback()
+    return rows
+
+
+def _recall_on(
+    db, rows: list, k: int, ef_search: Optional[int], quantization: str
+) -> dict[str, Any]:
+    from app.services.embeddings import effective_ef_search
+
+    results: list[tuple[list[str], list[str]]] = []
+    ann_ms: list[float] = []
+    exact_ms: list[float] = []
+    for row in rows:
+        ann, ann_t = _neighbours(db, row, k, exact=False, ef_search=ef_search, quantization=quantization)
+        exact, exact_t = _neighbours(db, row, k, exact=True, ef_search=None)
+        results.append((ann, exact))
+        ann_ms.append(ann_t)
+        exact_ms.append(exact_t)
+
+    report = summarize_recall(results, ann_ms, exact_ms, k)
+    report["quantization"] = quantization
+    report["ef_search"] = effective_ef_search(k, ef_search)
+    return report
+
+
+def measure_recall(
+    db,
+    sample: int = 200,
+    k: int = 10,
+    ef_search: Optional[int] = None,
+    quantization: Optional[str] = None,
+) -> dict[str, Any]:
+    """recall@k des Vektorindex gegen exakte Suche auf einer Stichprobe."""
+    return _recall_on(db, _sample(db, sample), k, ef_search, quantization or settings.vector_quantization)
+
+
+def benchmark_quantizations(
+    db, sample: int = 200, k: int = 10, ef_search: Optional[int] = None
+) -> list[dict[str, Any]]:
+    """Speicher, Latenz und recall@k aller Quantisierungen auf derselben Stichprobe."""
+    rows = _sample(db, sample)
+    sizes = index_sizes(db)
+    db.rollback()
+
+    reports = []
+    for quantization in QUANTIZATIONS:
+        report = _recall_on(db, rows, k, ef_search, quantization)
+        report["index_bytes"] = sizes[quantization]
+        report["vector_bytes"] = VECTOR_BYTES[quantization]
+        reports.append(report)
+    return reports
+
+
+def _print_recall(report: dict[str, Any]) -> None:
+    k = report["k"]
+    ann, exact = report["ann_latency_ms"], report["exact_latency_ms"]
+    print(f"\n[vector_index] Quantisierung: {report['quantization']}  Stichprobe: {report['sample']}  "
+          f"ef_search: {report['ef_search']}")
+    print(f"  recall@{k}:  {report[f'recall@{k}']}  (min {report[f'min_recall@{k}']})")
+    print(f"  ANN:        p50 {ann['p50']} ms | p95 {ann['p95']} ms | p99 {ann['p99']} ms")
+    print(f"  Exakt:      p50 {exact['p50']} ms | p95 {exact['p95']} ms | p99 {exact['p99']} ms")
+    if "index_bytes" in report:
+        print(f"  Speicher:   Index {report['index_bytes'] / 1024 / 1024:.1f} MB, "
+              f"{report['vector_bytes']} Bytes je Vektor")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="pgvector-Indizes auf papers und paper_passages verwalten")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    rebuild = commands.add_parser("rebuild", help="Index ohne Schreibsperre neu aufbauen")
+    rebuild.add_argument("--type", choices=["hnsw", "ivfflat"], default=None,
+                         help="Indextyp (Standard: VECTOR_INDEX_TYPE)")
+    rebuild.add_argument("--quantization", choices=list(QUANTIZATIONS), default="none",
+                         help="Index fuer float32 (none), halfvec oder binary")
+    rebuild.add_argument("--table", choices=list(TABLE_INDEX_NAMES), default="papers")
+
+    sync = commands.add_parser("sync", help="Indizes an die konfigurierten Quantisierungen anpassen")
+    sync.add_argument("--type", choices=["hnsw", "ivfflat"], default=None,
+                      help="Indextyp neuer Indizes (Standard: VECTOR_INDEX_TYPE)")
+
+    drop = commands.add_parser("drop", help="Nicht benoetigten Index entfernen")
+    drop.add_argument("--quantization", choices=list(QUANTIZATIONS), required=True)
+    drop.add_argument("--table", choices=list(TABLE_INDEX_NAMES), default="papers")
+
+    for name, help_text in (
+        ("recall", "recall@k gegen exakte Suche messen"),
+        ("benchmark", "none/halfvec/binary vergleichen (Speicher, Latenz, recall@k)"),
+    ):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument("--sample", type=int, default=200, help="Anzahl Stichprobenvektoren")
+        command.add_argument("--k", type=int, default=10, help="Cutoff fuer recall@k")
+        command.add_argument("--ef-search", type=int, default=None,
+                             help="HNSW-Suchbreite (Standard: VECTOR_HNSW_EF_SEARCH)")
+        command.add_argument("--json", action="store_true", help="Bericht als JSON ausgeben")
+        if name == "recall":
+            command.add_argument("--quantization", choices=list(QUANTIZATIONS), default=None,
+                                 help="Standard: VECTOR_QUANTIZATION")
+    args = parser.parse_args()
+
+    if args.command in ("rebuild", "sync", "drop"):
+        from app.database import engine
+
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            if args.command == "rebuild":
+                print(json.dumps(rebuild_index(conn, args.type, args.quantization, args.table), indent=2))
+            elif args.command == "sync":
+                print(json.dumps(sync_indexes(conn, args.type), indent=2))
+            else:
+                print(f"[vector_index] {drop_index(conn, args.quantization, args.table)} entfernt")
+    else:
+        from app.database import SessionLocal
+
+        db = SessionLocal()
+        try:
+            if args.command == "recall":
+                result = measure_recall(db, args.sample, args.k, args.ef_search, args.quantization)
+            else:
+                result = benchmark_quantizations(db, args.sample, args.k, args.ef_search)
+        finally:
+            db.close()
+        if args.json:
+            print(json.dumps(result, indent=2))
+        else:
+            for report in result if isinstance(result, list) else [result]:
+                _print_recall(report)
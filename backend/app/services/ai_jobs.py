@@ -0,0 +1,257 @@
+"""
+aitema|RIS - Job-Queue fuer KI-Texte (Kurzfassung, einfache Sprache)
+
+Die HTTP-Endpunkte stellen nur einen Job ein und antworten sofort mit dem
+Jobstatus; die Generierung laeuft in Worker-Tasks:
+- Queue ist eine Redis-Liste (LPUSH/BRPOP), Eintraege "<art>:<paper_id>"
+- je Vorlage und Art hoechstens ein offener Job (Sperre mit
+  settings.ai_jobs_pending_ttl, loest sich auch nach einem Worker-Absturz)
+- settings.ai_jobs_concurrency Worker-Tasks je Prozess begrenzen die
+  gleichzeitigen Claude-Aufrufe
+- Ergebnisse werden unter dem Hash von Modell und Quelltext gecacht
+  (settings.ai_jobs_result_ttl); ein erneuter Job fuer unveraenderte
+  Vorlagen (oder gleichlautende Vorlagen) ruft Claude nicht erneut auf
+- Rate-Limit, Ueberlastung und Netzwerkfehler werden mit exponentiellem
+  Backoff wiederholt (settings.ai_jobs_max_retries)
+- Der Jobstatus ist oeffentlich: er enthaelt nur feste Fehlertexte, die
+  Fehlerdetails (Claude, Datenbank) stehen nur im Log
+
+Status: GET /export/paper/{id}/summary bzw. /simple-language
+"""
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Optional
+
+import anthropic
+import structlog
+from redis.asyncio import Redis
+from sqlalchemy import text
+
+from app.core.config import get_settings
+from app.database import SessionLocal
+from app.services import ai_summary
+from app.services.ai_summary import COLUMNS
+from app.services.embeddings import content_hash
+from app.services.redis_utils import backoff_delay
+
+settings = get_settings()
+logger = structlog.get_logger()
+
+QUEUE_KEY = "ai:jobs:queue"
+KINDS = tuple(COLUMNS)
+
+_SOURCE_SQL = text("SELECT id, name FROM papers WHERE id = :id AND deleted = false")
+
+# Fester Fehlertext fuer unerwartete Fehler im oeffentlichen Jobstatus
+GENERATION_FAILED = "Generierung fehlgeschlagen"
+
+
+class JobError(Exception):
+    """Erwarteter Fehler eines Jobs; der Text darf im Jobstatus erscheinen."""
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def job_key(kind: str, paper_id: str) -> str:
+    return f"ai:jobs:{kind}:{paper_id}"
+
+
+def result_key(kind: str, source_hash: str) -> str:
+    return f"ai:result:{kind}:{settings.ai_summary_model}:{source_hash}"
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Rate-Limit, Ueberlastung (529), Serverfehler und Netzwerkprobleme."""
+    if isinstance(exc, anthropic.APIStatusError):
+        return exc.status_code == 429 or exc.status_code >= 500
+    return isinstance(exc, anthropic.APIConnectionError)
+
+
+def _load_source(paper_id: str) -> Optional[str]:
+    """Quelltext der Vorlage; None, wenn es sie nicht (mehr) gibt."""
+    db = SessionLocal()
+    try:
+        paper = db.execute(_SOURCE_SQL, {"id": paper_id}).first()
+        if paper is None:
+            return None
+        return ai_summary.load_source_texts(db, [paper])[paper.id]
+    finally:
+        db.close()
+
+
+def _store_result(kind: str, paper_id: str, result: str) -> None:
+    column, stamp = COLUMNS[kind]
+    db = SessionLocal()
+    try:
+        db.execute(
+            text(f"UPDATE papers SET {column} = :result, {stamp} = :generated_at WHERE id = :id"),
+            {"id": paper_id, "result": result, "generated_at": datetime.utcnow()},
+        )
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+class AIJobQueue:
+    """Queue und Worker; eine Instanz pro Prozess (siehe `ai_jobs`)."""
+
+    def __init__(
+        self,
+        redis: Optional[Redis] = None,
+        generate: Optional[Callable[[str, str], Awaitable[str]]] = None,
+    ) -> None:
+        self._redis = redis
+        self._generate = generate or ai_summary.generate
+        self._workers: list[asyncio.Task] = []
+
+    def _client(self) -> Redis:
+        if self._redis is None:
+            self._redis = Redis.from_url(settings.redis_url, decode_responses=True)
+        return self._redis
+
+    async def status(self, kind: str, paper_id: str) -> dict[str, Any]:
+        job = await self._client().hgetall(job_key(kind, paper_id))
+        return {
+            "kind": kind,
+            "paper_id": paper_id,
+            "status": job.get("status", "idle"),
+            "cached": job.get("cached") == "1",
+            "queued_at": job.get("queued_at") or None,
+            "updated_at": job.get("updated_at") or None,
+            "error": job.get("error") or None,
+        }
+
+    async def enqueue(self, kind: str, paper_id: str) -> dict[str, Any]:
+        """Job einstellen; laeuft fuer die Vorlage bereits einer, dessen Status."""
+        redis = self._client()
+        key = job_key(kind, paper_id)
+        if not await redis.set(f"{key}:pending", "1", nx=True, ex=settings.ai_jobs_pending_ttl):
+            return await self.status(kind, paper_id)
+        await redis.hset(key, mapping={
+            "status": "queued",
+            "cached": "0",
+            "queued_at": _now(),
+            "updated_at": _now(),
+            "error": "",
+        })
+        await redis.expire(key, settings.ai_jobs_status_ttl)
+        await redis.lpush(QUEUE_KEY, f"{kind}:{paper_id}")
+        return await self.status(kind, paper_id)
+
+    # ------------------------------------------------------------
+    # Worker
+    # ------------------------------------------------------------
+
+    def start(self, concurrency: Optional[int] = None) -> None:
+        """Worker-Tasks starten (settings.ai_jobs_concurrency)."""
+        if self._workers:
+            return
+        for _ in range(concurrency or settings.ai_jobs_concurrency):
+            self._workers.append(asyncio.create_task(self._work()))
+
+    async def stop(self) -> None:
+        """Worker abbrechen; laufende Jobs werden wieder eingereiht."""
+        for task in self._workers:
+            task.cancel()
+        for task in self._workers:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._workers = []
+
+    async def _work(self) -> None:
+        redis = self._client()
+        while True:
+            try:
+                item = await redis.brpop(QUEUE_KEY, timeout=5)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("KI-Job-Queue nicht erreichbar", error=str(e))
+                await asyncio.sleep(5)
+                continue
+            if not item:
+                continue
+            # Ein Fehler in einem Job (z.B. Redis kurz weg) darf den Worker nicht beenden
+            try:
+                await self.process(item[1])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("KI-Job abgebrochen", entry=item[1], error=str(e))
+
+    async def process(self, entry: str) -> None:
+        """Einen Job ausfuehren: Quelltext, Cache bzw. Claude, Ergebnis schreiben."""
+        redis = self._client()
+        kind, _, paper_id = entry.partition(":")
+        key = job_key(kind, paper_id)
+        if kind not in KINDS:
+            logger.warning("Unbekannte KI-Job-Art", entry=entry)
+            return
+        requeued = False
+        try:
+            await redis.hset(key, mapping={"status": "running", "updated_at": _now()})
+            source = await asyncio.to_thread(_load_source, paper_id)
+            if source is None:
+                raise JobError("Vorlage nicht gefunden")
+            if not source:
+                raise JobError("Kein Quelltext vorhanden")
+
+            cache_key = result_key(kind, content_hash(source))
+            result = await redis.get(cache_key)
+            cached = result is not None
+            if not cached:
+                result = await self._generate_with_retries(kind, source)
+                await redis.set(cache_key, result, ex=settings.ai_jobs_result_ttl)
+
+            await asyncio.to_thread(_store_result, kind, paper_id, result)
+            await redis.hset(key, mapping={
+                "status": "done", "cached": "1" if cached else "0", "updated_at": _now(),
+            })
+            logger.info("KI-Job erledigt", kind=kind, paper_id=paper_id, cached=cached)
+        except asyncio.CancelledError:
+            # Shutdown: Job bleibt offen und wird beim naechsten Start abgearbeitet
+            await redis.hset(key, mapping={"status": "queued", "updated_at": _now()})
+            await redis.rpush(QUEUE_KEY, entry)
+            requeued = True
+            raise
+        except Exception as e:
+            logger.warning(
+                "KI-Job fehlgeschlagen", kind=kind, paper_id=paper_id,
+                error_type=type(e).__name__, error=str(e),
+            )
+            await redis.hset(key, mapping={
+                "status": "failed",
+                "error": str(e) if isinstance(e, JobError) else GENERATION_FAILED,
+                "updated_at": _now(),
+            })
+        finally:
+            if not requeued:
+                await redis.delete(f"{key}:pending")
+
+    async def _generate_with_retries(self, kind: str, source: str) -> str:
+        attempt = 0
+        while True:
+            try:
+                return await self._generate(kind, source)
+            except Exception as e:
+                if attempt >= settings.ai_jobs_max_retries or not is_retryable(e):
+                    raise
+                delay = backoff_delay(attempt, settings.ai_jobs_backoff_base, settings.ai_jobs_backoff_max)
+                logger.warning(
+                    "Claude-Request wird wiederholt", attempt=attempt + 1, delay=round(delay, 2), error=str(e)
+                )
+                await asyncio.sleep(delay)
+                attempt += 1
+
+
+# Prozessweite Instanz
+ai_jobs = AIJobQueue()
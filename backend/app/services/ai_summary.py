@@ -1,39 +1,99 @@
+"""
+aitema|RIS - KI-Texte zu Vorlagen (Claude)
+
+- Kurzfassung (papers.ai_summary)
+- Einfache Sprache auf A2-Niveau (papers.simple_language_text, BFSG)
+
+Quelltext ist der Titel der Vorlage mit den extrahierten Dateitexten
+(Hauptdatei zuerst, dann Anlagen), begrenzt auf settings.ai_source_max_chars.
+Aufrufe laufen ueber den Job-Queue-Worker (services/ai_jobs), nicht im
+Request; hier liegen nur Prompts, Quelltext und der Async-Client.
+"""
+from __future__ import annotations
+
 import os
+from typing import Optional
+
 import anthropic
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.services.search_content import load_file_texts
+
+settings = get_settings()
+
+SUMMARY = "summary"
+SIMPLE_LANGUAGE = "simple_language"
+
+PROMPTS = {
+    SUMMARY: (
+        "Fasse folgende Verwaltungsvorlage einer deutschen Kommune sachlich und "
+        "neutral zusammen:\n"
+        "- Hoechstens 5 Saetze\n"
+        "- Worum geht es, was wird beschlossen, welche Kosten oder Fristen\n"
+        "- Keine Wertungen\n\n"
+        "Vorlage:\n"
+    ),
+    SIMPLE_LANGUAGE: (
+        "Erklaere folgende Verwaltungsvorlage in einfacher Sprache (A2-Niveau):\n"
+        "- Kurze Saetze (max. 15 Woerter)\n"
+        "- Keine Fachbegriffe oder erklaeren falls noetig\n"
+        "- Aktive Sprache\n"
+        "- Max. 3 Absaetze\n\n"
+        "Vorlage:\n"
+    ),
+}
+
+MAX_TOKENS = {SUMMARY: 400, SIMPLE_LANGUAGE: 500}
+
+# Ergebnis-Spalten je Art
+COLUMNS = {
+    SUMMARY: ("ai_summary", "ai_summary_generated_at"),
+    SIMPLE_LANGUAGE: ("simple_language_text", "simple_language_generated_at"),
+}
 
-_client = None
+_client: Optional[anthropic.AsyncAnthropic] = None
 
 
-def _get_client():
+def _get_client() -> Optional[anthropic.AsyncAnthropic]:
     global _client
     if _client is None and os.getenv("ANTHROPIC_API_KEY"):
-        _client = anthropic.Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
+        _client = anthropic.AsyncAnthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
     return _client
 
 
-async def generate_simple_language(full_text: str) -> str:
-    """Generates a simple language (A2 level) version of a council paper."""
+async def close_client() -> None:
+    """Beim Shutdown aufrufen (main.lifespan)."""
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
+
+
+def message_params(kind: str, source_text: str) -> dict:
+    """Argumente fuer messages.create (einzeln oder als Batch-Request)."""
+    return {
+        "model": settings.ai_summary_model,
+        "max_tokens": MAX_TOKENS[kind],
+        "messages": [{"role": "user", "content": PROMPTS[kind] + source_text}],
+    }
+
+
+def build_source_text(name: Optional[str], file_texts: list[tuple[str, str]]) -> str:
+    parts = [name or ""] + [text_value for _, text_value in file_texts]
+    return "\n\n".join(p.strip() for p in parts if p and p.strip())[: settings.ai_source_max_chars]
+
+
+def load_source_texts(db: Session, papers: list) -> dict[str, str]:
+    """Quelltext je Vorlage (Objekte mit id und name)."""
+    file_texts = load_file_texts(db, [p.id for p in papers], settings.ai_source_max_chars)
+    return {p.id: build_source_text(p.name, file_texts.get(p.id, [])) for p in papers}
+
+
+async def generate(kind: str, source_text: str) -> str:
+    """Text der Art `kind` erzeugen; Fehler (auch fehlender API-Key) werden weitergereicht."""
     client = _get_client()
-    if not client:
-        return full_text[:500] + "..." if len(full_text) > 500 else full_text
-
-    try:
-        message = client.messages.create(
-            model="claude-haiku-4-5-20251001",
-            max_tokens=500,
-            messages=[{
-                "role": "user",
-                "content": (
-                    "Erklaere folgende Verwaltungsvorlage in einfacher Sprache (A2-Niveau):\n"
-                    "- Kurze Saetze (max. 15 Woerter)\n"
-                    "- Keine Fachbegriffe oder erklaeren falls noetig\n"
-                    "- Aktive Sprache\n"
-                    "- Max. 3 Absaetze\n\n"
-                    "Vorlage:\n" + full_text[:3000]
-                ),
-            }],
-        )
-        return message.content[0].text
-    except Exception as e:
-        print(f"Simple language generation failed: {e}")
-        return full_text[:500]
+    if client is None:
+        raise RuntimeError("ANTHROPIC_API_KEY nicht gesetzt")
+    message = await client.messages.create(**message_params(kind, source_text))
+    return message.content[0].text
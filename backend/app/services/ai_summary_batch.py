@@ -0,0 +1,409 @@
+"""
+aitema|RIS - KI-Kurzfassungen im Massenbetrieb (Batch-Verarbeitung)
+
+Fuer den Bestand eines Tenants werden Kurzfassungen nicht einzeln, sondern
+ueber eine Batch-Schnittstelle erzeugt (Anthropic Message Batches: guenstiger,
+ohne Rate-Limit-Druck, Ergebnis nach Minuten bis Stunden):
+- ausgewaehlt werden Vorlagen ohne Kurzfassung oder mit einer Kurzfassung,
+  die aelter ist als die letzte Aenderung (Keyset ueber id)
+- je settings.ai_batch_size Vorlagen ein Batch, hoechstens
+  settings.ai_batch_max_open gleichzeitig offen
+- Ergebnisse im Cache der Job-Queue (gleicher Quelltext-Hash) werden ohne
+  Batch direkt geschrieben; neue Ergebnisse landen ebenfalls dort
+- offene Batches werden alle settings.ai_batch_poll_interval Sekunden
+  abgefragt; Ergebnisse eines fertigen Batches werden in einem
+  Bulk-UPDATE geschrieben
+- Cursor, Zaehler und offene Batches (id -> {paper_id: Quelltext-Hash})
+  liegen in Redis; ein unterbrochener Lauf sammelt beim naechsten Start
+  zuerst die offenen Batches ein und setzt dann am Cursor fort, ohne
+  bereits eingereichte Vorlagen erneut einzureichen
+
+Backends: "anthropic" oder "local" (settings.ai_batch_provider); der lokale
+Ersatz erzeugt Kurzfassungen aus den ersten Saetzen des Quelltexts.
+
+Aufruf: python -m app.scripts.summarize_papers
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import re
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from typing import Any, NamedTuple, Optional
+
+import structlog
+from redis.asyncio import Redis
+from sqlalchemy import text
+
+from app.core.config import get_settings
+from app.database import SessionLocal
+from app.services import ai_summary
+from app.services.ai_jobs import result_key
+from app.services.ai_summary import SUMMARY, message_params
+from app.services.embeddings import content_hash
+from app.services.redis_utils import release_lock
+
+settings = get_settings()
+logger = structlog.get_logger()
+
+STATE_KEY = "ai:summary_batch"
+BATCHES_KEY = "ai:summary_batch:open"
+FAILED_KEY = "ai:summary_batch:failed"
+LOCK_KEY = "ai:summary_batch:lock"
+
+COUNTERS = ("submitted", "cached", "written", "failed", "skipped")
+
+_PENDING_SQL = """
+    SELECT id, name
+    FROM papers
+    WHERE deleted = false
+      AND (ai_summary IS NULL OR ai_summary_generated_at IS NULL
+           OR modified > ai_summary_generated_at)
+      AND id > :after AND NOT (id = ANY(:exclude)) {tenant_filter}
+    ORDER BY id
+    LIMIT :limit
+"""
+
+_WRITE_SQL = text(
+    "UPDATE papers SET ai_summary = :summary, ai_summary_generated_at = :generated_at WHERE id = :id"
+)
+
+
+class BatchResult(NamedTuple):
+    custom_id: str
+    text: Optional[str]  # None: fehlgeschlagen, siehe error
+    error: Optional[str] = None
+
+
+class SummaryBatchBackend(ABC):
+    """Batch-Schnittstelle: Requests einreichen, Status abfragen, Ergebnisse lesen."""
+
+    name: str = ""
+
+    @abstractmethod
+    async def submit(self, requests: list[dict]) -> str:
+        """Requests ({"custom_id", "params"}) einreichen; gibt die Batch-ID zurueck."""
+
+    @abstractmethod
+    async def is_done(self, batch_id: str) -> bool:
+        """Ob der Batch abgeschlossen ist (auch abgebrochen oder abgelaufen)."""
+
+    @abstractmethod
+    async def results(self, batch_id: str) -> list[BatchResult]:
+        """Ergebnisse eines abgeschlossenen Batches; fehlende custom_ids gelten als fehlgeschlagen."""
+
+
+class AnthropicBatchBackend(SummaryBatchBackend):
+    """Anthropic Message Batches API (ANTHROPIC_API_KEY)."""
+
+    name = "anthropic"
+
+    def _client(self):
+        client = ai_summary._get_client()
+        if client is None:
+            raise RuntimeError("ANTHROPIC_API_KEY nicht gesetzt")
+        return client
+
+    async def submit(self, requests: list[dict]) -> str:
+        batch = await self._client().messages.batches.create(requests=requests)
+        return batch.id
+
+    async def is_done(self, batch_id: str) -> bool:
+        batch = await self._client().messages.batches.retrieve(batch_id)
+        return batch.processing_status == "ended"
+
+    async def results(self, batch_id: str) -> list[BatchResult]:
+        results = []
+        async for entry in await self._client().messages.batches.results(batch_id):
+            result = entry.result
+            if result.type == "succeeded":
+                results.append(BatchResult(entry.custom_id, result.message.content[0].text))
+            elif result.type == "errored":
+                results.append(BatchResult(entry.custom_id, None, f"errored: {result.error.error.message}"))
+            else:
+                results.append(BatchResult(entry.custom_id, None, result.type))
+        return results
+
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+class LocalBatchBackend(SummaryBatchBackend):
+    """
+    Offline-Ersatz fuer Tests und Installationen ohne API-Zugang.
+
+    Die "Kurzfassung" sind die ersten Saetze des Quelltexts; ein Batch gilt
+    nach `polls` Statusabfragen als fertig. Batches leben nur im Prozess,
+    unbekannte Batch-IDs gelten als abgelaufen (keine Ergebnisse).
+    """
+
+    name = "local"
+
+    def __init__(self, polls: int = 1, sentences: int = 3):
+        self.polls = polls
+        self.sentences = sentences
+        self._batches: dict[str, dict[str, Any]] = {}
+
+    def summarize(self, source_text: str) -> str:
+        parts = _SENTENCE_END.split(" ".join(source_text.split()))
+        return " ".join(parts[: self.sentences])
+
+    async def submit(self, requests: list[dict]) -> str:
+        batch_id = f"local_{uuid.uuid4().hex}"
+        self._batches[batch_id] = {"requests": list(requests), "polls": self.polls}
+        return batch_id
+
+    async def is_done(self, batch_id: str) -> bool:
+        batch = self._batches.get(batch_id)
+        if batch is None:
+            return True
+        batch["polls"] -= 1
+        return batch["polls"] <= 0
+
+    async def results(self, batch_id: str) -> list[BatchResult]:
+        batch = self._batches.pop(batch_id, None)
+        if batch is None:
+            return []
+        prefix = ai_summary.PROMPTS[SUMMARY]
+        return [
+            BatchResult(r["custom_id"], self.summarize(r["params"]["messages"][0]["content"].removeprefix(prefix)))
+            for r in batch["requests"]
+        ]
+
+
+BACKENDS = {
+    AnthropicBatchBackend.name: AnthropicBatchBackend,
+    LocalBatchBackend.name: LocalBatchBackend,
+}
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _load_page(
+    after: str, limit: int, tenant_id: Optional[str], exclude: list[str]
+) -> list[tuple[str, str]]:
+    """(paper_id, Quelltext) der naechsten Vorlagen ohne aktuelle Kurzfassung.
+
+    Vorlagen in `exclude` (noch offene Batches) werden uebersprungen.
+    """
+    params: dict[str, Any] = {"after": after, "limit": limit, "exclude": exclude}
+    tenant_filter = ""
+    if tenant_id:
+        tenant_filter = "AND tenant_id = :tenant_id"
+        params["tenant_id"] = tenant_id
+    db = SessionLocal()
+    try:
+        rows = db.execute(text(_PENDING_SQL.format(tenant_filter=tenant_filter)), params).fetchall()
+        sources = ai_summary.load_source_texts(db, rows)
+        return [(row.id, sources[row.id]) for row in rows]
+    finally:
+        db.close()
+
+
+def _write_summaries(rows: list[dict]) -> None:
+    """Kurzfassungen in einem Bulk-UPDATE schreiben (executemany)."""
+    db = SessionLocal()
+    try:
+        db.execute(_WRITE_SQL, rows)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+class SummaryBatchJob:
+    """Massenlauf fuer Kurzfassungen; fortsetzbar ueber den Redis-Zustand."""
+
+    def __init__(self, redis: Optional[Redis] = None, backend: Optional[SummaryBatchBackend] = None) -> None:
+        self._redis = redis
+        self.backend = backend or BACKENDS[settings.ai_batch_provider]()
+
+    def _client(self) -> Redis:
+        if self._redis is None:
+            self._redis = Redis.from_url(settings.redis_url, decode_responses=True)
+        return self._redis
+
+    async def status(self) -> dict[str, Any]:
+        redis = self._client()
+        state = await redis.hgetall(STATE_KEY)
+        return {
+            "status": state.get("status", "idle"),
+            "tenant_id": state.get("tenant_id") or None,
+            **{key: int(state.get(key) or 0) for key in COUNTERS},
+            "open_batches": sorted(await redis.hkeys(BATCHES_KEY)),
+            "cursor": state.get("cursor") or None,
+            "started_at": state.get("started_at") or None,
+            "updated_at": state.get("updated_at") or None,
+            "error": state.get("error") or None,
+        }
+
+    async def run(self, tenant_id: Optional[str] = None, restart: bool = False, limit: int = 0) -> dict[str, Any]:
+        """
+        Kurzfassungen fuer alle ausstehenden Vorlagen erzeugen (bzw. fortsetzen).
+
+        Args:
+            tenant_id: nur Vorlagen dieses Tenants (None = alle)
+            restart: Cursor, Zaehler und Fehlerliste verwerfen; bereits offene
+                Batches werden trotzdem eingesammelt, ihre Vorlagen nicht
+                erneut eingereicht
+            limit: hoechstens so viele Vorlagen einreichen (0 = alle)
+        """
+        redis = self._client()
+        token = uuid.uuid4().hex
+        if not await redis.set(LOCK_KEY, token, nx=True, ex=settings.ai_batch_lock_ttl):
+            logger.warning("Kurzfassungs-Batchlauf laeuft bereits")
+            return await self.status()
+
+        try:
+            if restart:
+                await redis.delete(STATE_KEY, FAILED_KEY)
+            state = await redis.hgetall(STATE_KEY)
+            resumed = (
+                state.get("status") not in (None, "done")
+                and (state.get("tenant_id") or None) == tenant_id
+            )
+            cursor = state.get("cursor", "") if resumed else ""
+            counters = {key: int(state.get(key) or 0) if resumed else 0 for key in COUNTERS}
+            await redis.hset(STATE_KEY, mapping={
+                "status": "running",
+                "tenant_id": tenant_id or "",
+                "cursor": cursor,
+                "started_at": state.get("started_at", "") if resumed else _now(),
+                "updated_at": _now(),
+                "error": "",
+                **counters,
+            })
+            logger.info(
+                "Kurzfassungs-Batchlauf gestartet",
+                tenant_id=tenant_id, cursor=cursor or None, backend=self.backend.name,
+            )
+
+            await self._process(redis, token, cursor, counters, tenant_id, limit)
+
+            await redis.hset(STATE_KEY, mapping={"status": "done", "updated_at": _now()})
+            logger.info("Kurzfassungs-Batchlauf abgeschlossen", **counters)
+        except asyncio.CancelledError:
+            await redis.hset(STATE_KEY, mapping={"status": "stopped", "updated_at": _now()})
+            raise
+        except Exception as e:
+            logger.error("Kurzfassungs-Batchlauf abgebrochen", error=str(e))
+            await redis.hset(STATE_KEY, mapping={"status": "error", "error": str(e), "updated_at": _now()})
+        finally:
+            await release_lock(redis, LOCK_KEY, token)
+        return await self.status()
+
+    async def _process(
+        self,
+        redis: Redis,
+        token: str,
+        cursor: str,
+        counters: dict[str, int],
+        tenant_id: Optional[str],
+        limit: int,
+    ) -> None:
+        exhausted = False
+        seen = 0
+        while True:
+            # Offene Batches zuerst einsammeln (auch die eines unterbrochenen Laufs)
+            collected = await self._collect(redis, counters)
+            pending = await redis.hgetall(BATCHES_KEY)
+            open_batches = len(pending)
+            # nach einem Neustart (Cursor vorn) nicht erneut einreichen und doppelt bezahlen
+            exclude = sorted({paper_id for encoded in pending.values() for paper_id in json.loads(encoded)})
+
+            while not exhausted and open_batches < max(settings.ai_batch_max_open, 1):
+                size = settings.ai_batch_size
+                if limit:
+                    size = min(size, limit - seen)
+                rows = (
+                    await asyncio.to_thread(_load_page, cursor, size, tenant_id, exclude) if size > 0 else []
+                )
+                if not rows:
+                    exhausted = True
+                    break
+                seen += len(rows)
+                if await self._submit(redis, rows, counters):
+                    open_batches += 1
+                cursor = rows[-1][0]
+                await redis.hset(STATE_KEY, mapping={"cursor": cursor, "updated_at": _now(), **counters})
+
+            if exhausted and not open_batches:
+                return
+            await redis.expire(LOCK_KEY, settings.ai_batch_lock_ttl)
+            if not collected:
+                await asyncio.sleep(settings.ai_batch_poll_interval)
+
+    async def _submit(self, redis: Redis, rows: list[tuple[str, str]], counters: dict[str, int]) -> bool:
+        """Eine Seite einreichen; gecachte Ergebnisse direkt schreiben. True, wenn ein Batch offen ist."""
+        requests: list[dict] = []
+        hashes: dict[str, str] = {}
+        cached: list[dict] = []
+        for paper_id, source in rows:
+            if not source:
+                counters["skipped"] += 1
+                continue
+            digest = content_hash(source)
+            summary = await redis.get(result_key(SUMMARY, digest))
+            if summary is not None:
+                cached.append({"id": paper_id, "summary": summary, "generated_at": datetime.utcnow()})
+                continue
+            hashes[paper_id] = digest
+            requests.append({"custom_id": paper_id, "params": message_params(SUMMARY, source)})
+
+        if cached:
+            await asyncio.to_thread(_write_summaries, cached)
+            counters["cached"] += len(cached)
+            counters["written"] += len(cached)
+        if not requests:
+            return False
+
+        # Bricht der Lauf zwischen submit und hset ab, wird die Seite beim
+        # Fortsetzen erneut eingereicht (Cursor steht noch davor)
+        batch_id = await self.backend.submit(requests)
+        await redis.hset(BATCHES_KEY, mapping={batch_id: json.dumps(hashes)})
+        counters["submitted"] += len(requests)
+        logger.info("Kurzfassungs-Batch eingereicht", batch_id=batch_id, papers=len(requests))
+        return True
+
+    async def _collect(self, redis: Redis, counters: dict[str, int]) -> bool:
+        """Fertige Batches auswerten und schreiben; True, wenn mindestens einer fertig war."""
+        collected = False
+        for batch_id, encoded in (await redis.hgetall(BATCHES_KEY)).items():
+            if not await self.backend.is_done(batch_id):
+                continue
+            hashes: dict[str, str] = json.loads(encoded)
+            rows: list[dict] = []
+            failures: dict[str, str] = {}
+            for result in await self.backend.results(batch_id):
+                if result.custom_id not in hashes:
+                    continue
+                if result.text:
+                    rows.append({"id": result.custom_id, "summary": result.text, "generated_at": datetime.utcnow()})
+                    await redis.set(
+                        result_key(SUMMARY, hashes[result.custom_id]), result.text, ex=settings.ai_jobs_result_ttl
+                    )
+                else:
+                    failures[result.custom_id] = (result.error or "leeres Ergebnis")[:300]
+            done = {row["id"] for row in rows} | set(failures)
+            failures.update({paper_id: "kein Ergebnis" for paper_id in hashes if paper_id not in done})
+
+            if rows:
+                await asyncio.to_thread(_write_summaries, rows)
+                await redis.hdel(FAILED_KEY, *(row["id"] for row in rows))
+            if failures:
+                await redis.hset(FAILED_KEY, mapping=failures)
+                logger.warning("Kurzfassungen fehlgeschlagen", batch_id=batch_id, papers=len(failures))
+            # erst nach dem Schreiben austragen: ein Abbruch davor schreibt beim Fortsetzen erneut
+            await redis.hdel(BATCHES_KEY, batch_id)
+            counters["written"] += len(rows)
+            counters["failed"] += len(failures)
+            await redis.hset(STATE_KEY, mapping={"updated_at": _now(), **counters})
+            logger.info("Kurzfassungs-Batch geschrieben", batch_id=batch_id, written=len(rows))
+            collected = True
+        return collected
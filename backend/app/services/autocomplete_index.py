@@ -0,0 +1,318 @@
+"""
+aitema|RIS - In-Memory-Autocomplete
+
+Praefix-Index je Tenant im Prozess, damit Typeahead ohne Elasticsearch-
+Roundtrip auskommt:
+- Quellen: Vorlagen (Name, Aktenzeichen), Sitzungen (Name), Personen (Name)
+- kompaktes sortiertes Array (Term -> Eintrag) mit bisect-Bereichssuche
+- Eintraege nach Popularitaet sortiert; Rang = Position im Array
+- Popularitaet: Anzahl Beratungen / Tagesordnungspunkte / Mitgliedschaften
+  (logarithmisch) plus Aktualitaet
+- Laden beim Start, danach periodischer Delta-Abgleich ueber `modified`;
+  unveraenderte Zeilen (gleiches id/modified) loesen keinen Neuaufbau aus
+- Verknuepfungszahlen werden nur aktualisiert, wenn sich das Objekt selbst
+  aendert (`modified`); neue Beratungen usw. allein verschieben die
+  Popularitaet erst beim naechsten eigenen Update bzw. Neustart
+
+Liefert dieselben Felder wie SearchService.autocomplete().
+"""
+from __future__ import annotations
+
+import asyncio
+import heapq
+import math
+import re
+import unicodedata
+from bisect import bisect_left
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Iterable, Optional
+
+import structlog
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+
+logger = structlog.get_logger()
+settings = get_settings()
+
+# Obergrenze fuer Unicode-Praefixbereiche in bisect
+_PREFIX_END = "\U0010ffff"
+
+_TOKEN_RE = re.compile(r"\w+")
+
+# Alle Zeilen mit modified >= :since (inkl. geloeschter, fuer den Delta-Abgleich).
+# links wird nur mitgeliefert, wenn die Zeile selbst geaendert wurde; das
+# modified der Verknuepfungstabellen wird bewusst nicht ausgewertet.
+_SOURCE_SQL = text("""
+    SELECT 'paper' AS type, p.id, p.tenant_id, p.name, p.reference,
+           p.paper_type, NULL AS meeting_state, p.deleted, p.modified,
+           (SELECT count(*) FROM consultations c
+            WHERE c.paper_id = p.id AND c.deleted = false) AS links
+    FROM papers p
+    WHERE p.modified >= :since
+    UNION ALL
+    SELECT 'meeting', m.id, m.tenant_id, m.name, NULL,
+           NULL, m.meeting_state, m.deleted, m.modified,
+           (SELECT count(*) FROM agenda_items a
+            WHERE a.meeting_id = m.id AND a.deleted = false)
+    FROM meetings m
+    WHERE m.modified >= :since
+    UNION ALL
+    SELECT 'person', pe.id, pe.tenant_id,
+           COALESCE(NULLIF(concat_ws(' ', pe.given_name, pe.family_name), ''), pe.name),
+           NULL, NULL, NULL, pe.deleted, pe.modified,
+           (SELECT count(*) FROM memberships ms
+            WHERE ms.person_id = pe.id AND ms.deleted = false)
+    FROM persons pe
+    WHERE pe.modified >= :since
+""")
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def normalize_term(value: str) -> str:
+    """Kleinschreibung und Diakritika entfernen ('Müll' -> 'mull')."""
+    decomposed = unicodedata.normalize("NFKD", value)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+def tokenize(value: Optional[str]) -> list[str]:
+    """Normalisierte Woerter eines Textes."""
+    if not value:
+        return []
+    return _TOKEN_RE.findall(normalize_term(value))
+
+
+def popularity(links: int, modified: Optional[datetime], now: Optional[datetime] = None) -> float:
+    """Gewicht aus Verknuepfungen (log) und Aktualitaet (Halbwert ca. 1 Jahr)."""
+    weight = math.log1p(max(links or 0, 0))
+    if modified:
+        age_days = max(((now or datetime.utcnow()) - modified).days, 0)
+        weight += 1.0 / (1.0 + age_days / 365.0)
+    return round(weight, 4)
+
+
+@dataclass
+class Suggestion:
+    """Ein Eintrag im Praefix-Index."""
+    id: str
+    type: str
+    name: Optional[str]
+    reference: Optional[str] = None
+    paper_type: Optional[str] = None
+    meeting_state: Optional[str] = None
+    weight: float = 0.0
+
+    def terms(self) -> set[str]:
+        terms = set(tokenize(self.name)) | set(tokenize(self.reference))
+        if self.reference:
+            # Aktenzeichen auch am Stueck ("v/2026/001")
+            terms.add(normalize_term(self.reference))
+        return terms
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "id": self.id,
+            "type": self.type,
+            "name": self.name,
+            "reference": self.reference,
+            "paper_type": self.paper_type,
+            "meeting_state": self.meeting_state,
+            "score": self.weight,
+        }
+
+
+class TenantPrefixIndex:
+    """
+    Unveraenderlicher Praefix-Index eines Tenants.
+
+    `keys` ist sortiert, `postings[i]` ist der Rang des Eintrags zu `keys[i]`.
+    Ein Praefix entspricht dem Bereich [bisect(p), bisect(p + U+10FFFF)).
+    """
+
+    __slots__ = ("entries", "keys", "postings")
+
+    def __init__(self, suggestions: Iterable[Suggestion]):
+        self.entries: list[Suggestion] = sorted(
+            suggestions, key=lambda s: (-s.weight, s.name or "", s.id)
+        )
+        pairs = sorted(
+            (term, rank)
+            for rank, entry in enumerate(self.entries)
+            for term in entry.terms()
+        )
+        self.keys: list[str] = [t for t, _ in pairs]
+        self.postings: list[int] = [r for _, r in pairs]
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _ranks(self, token: str) -> set[int]:
+        lo = bisect_left(self.keys, token)
+        hi = bisect_left(self.keys, token + _PREFIX_END, lo)
+        return set(self.postings[lo:hi])
+
+    def search(self, prefix: str, type: Optional[str] = None, limit: int = 8) -> list[Suggestion]:
+        """Eintraege, bei denen jedes Eingabewort Praefix eines Terms ist."""
+        tokens = tokenize(prefix)
+        if not tokens:
+            return []
+        candidates: Optional[set[int]] = None
+        # laengste (selektivste) Woerter zuerst schneiden
+        for token in sorted(set(tokens), key=len, reverse=True):
+            ranks = self._ranks(token)
+            candidates = ranks if candidates is None else candidates & ranks
+            if not candidates:
+                return []
+        if type:
+            candidates = {r for r in candidates if self.entries[r].type == type}
+        return [self.entries[r] for r in heapq.nsmallest(limit, candidates)]
+
+
+class AutocompleteIndex:
+    """Praefix-Indizes aller Tenants mit Voll- und Delta-Ladevorgang."""
+
+    def __init__(self) -> None:
+        self._tenants: dict[str, TenantPrefixIndex] = {}
+        self._suggestions: dict[str, dict[str, Suggestion]] = {}
+        # id -> modified der uebernommenen Eintraege, um Wiederholungen zu erkennen
+        self._stamps: dict[str, Optional[datetime]] = {}
+        self._watermark: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._watermark is not None
+
+    # ----------------------------------------
+    # Abfrage
+    # ----------------------------------------
+
+    def search(
+        self,
+        prefix: str,
+        type: Optional[str] = None,
+        limit: int = 8,
+        tenant_id: Optional[str] = None,
+    ) -> list[dict]:
+        """Typeahead-Vorschlaege; ohne tenant_id ueber alle Tenants."""
+        if len(prefix) < 3:
+            return []
+        if tenant_id:
+            index = self._tenants.get(tenant_id)
+            hits = index.search(prefix, type, limit) if index else []
+        else:
+            hits = heapq.nsmallest(
+                limit,
+                (s for index in list(self._tenants.values()) for s in index.search(prefix, type, limit)),
+                key=lambda s: (-s.weight, s.name or "", s.id),
+            )
+        return [s.to_dict() for s in hits]
+
+    # ----------------------------------------
+    # Laden / Aktualisieren
+    # ----------------------------------------
+
+    def apply(self, rows: Iterable[Any], now: Optional[datetime] = None) -> int:
+        """
+        Zeilen aus _SOURCE_SQL uebernehmen und betroffene Tenants neu aufbauen.
+
+        Geloeschte Objekte werden entfernt; bereits bekannte Zeilen (gleiches
+        id/modified) werden uebersprungen. Gibt die Anzahl der Aenderungen zurueck.
+        """
+        now = now or datetime.utcnow()
+        dirty: set[str] = set()
+        count = 0
+        watermark = self._watermark
+        for row in rows:
+            if row.modified and (watermark is None or row.modified > watermark):
+                watermark = row.modified
+            tenant = self._suggestions.setdefault(row.tenant_id, {})
+            if row.deleted or not row.name:
+                if tenant.pop(row.id, None) is None:
+                    continue
+                self._stamps.pop(row.id, None)
+            elif row.id in self._stamps and self._stamps[row.id] == row.modified:
+                continue
+            else:
+                self._stamps[row.id] = row.modified
+                tenant[row.id] = Suggestion(
+                    id=row.id,
+                    type=row.type,
+                    name=row.name,
+                    reference=row.reference,
+                    paper_type=row.paper_type,
+                    meeting_state=row.meeting_state,
+                    weight=popularity(row.links, row.modified, now),
+                )
+            count += 1
+            dirty.add(row.tenant_id)
+
+        for tenant_id in dirty:
+            # neuer Index wird erst nach dem Aufbau eingehaengt (atomarer Tausch)
+            self._tenants[tenant_id] = TenantPrefixIndex(self._suggestions[tenant_id].values())
+        self._watermark = watermark or self._watermark or _EPOCH
+        return count
+
+    def refresh(self, db: Session) -> int:
+        """Delta seit dem letzten Stand laden (beim ersten Aufruf: alles)."""
+        result = db.execute(
+            _SOURCE_SQL.execution_options(stream_results=True, yield_per=1000),
+            {"since": self._watermark or _EPOCH},
+        )
+        try:
+            # Zeilen mit modified == Wasserzeichen kommen erneut und werden in apply
+            # uebersprungen; >= statt > verliert keine Aenderungen mit gleichem Zeitstempel
+            return self.apply(result)
+        finally:
+            result.close()
+
+    def _refresh_with_session(self) -> int:
+        from app.database import SessionLocal
+
+        db = SessionLocal()
+        try:
+            return self.refresh(db)
+        finally:
+            db.close()
+
+    async def _run(self, interval: int) -> None:
+        while True:
+            try:
+                initial = not self.ready
+                changed = await asyncio.to_thread(self._refresh_with_session)
+                if initial:
+                    logger.info(
+                        "Autocomplete-Index geladen",
+                        entries=changed,
+                        tenants=len(self._tenants),
+                    )
+                elif changed:
+                    logger.debug("Autocomplete-Index aktualisiert", changed=changed)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Autocomplete-Index nicht aktualisiert", error=str(e))
+            await asyncio.sleep(interval)
+
+    def start(self) -> None:
+        """Initiales Laden und periodischen Delta-Abgleich im Hintergrund starten."""
+        if self._task is None:
+            self._task = asyncio.create_task(
+                self._run(settings.autocomplete_refresh_interval)
+            )
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Prozessweite Instanz (FastAPI-Lifespan startet den Hintergrund-Abgleich)
+autocomplete_index = AutocompleteIndex()
@@ -0,0 +1,421 @@
+"""
+aitema|RIS - Embedding-Backfill als fortsetzbarer Hintergrundjob
+
+Bettet alle Vorlagen ohne Embedding oder mit veraltetem Embedding ein:
+- veraltet sind Vorlagen, die seit dem Einbetten geaendert wurden
+  (modified > embedding_synced_at); ist der Hash des Eingabetexts gleich
+  geblieben, wird nur embedding_synced_at nachgezogen, ohne API-Aufruf
+- Vektoren eines anderen Modells werden nur bei upgrade_model=True neu
+  berechnet (kontrollierter Modellwechsel)
+- der Job laeuft zusaetzlich periodisch (embedding_refresh_interval), damit
+  geaenderte Vorlagen automatisch neu eingebettet werden
+- Vorlagen werden seitenweise (Keyset ueber id) gelesen; jede Seite wird in
+  Voyage-Batches zerlegt, die mit begrenzter Parallelitaet laufen
+- Token-Bucket begrenzt die Requests pro Sekunde ueber alle Worker-Tasks
+- 429/5xx/Netzwerkfehler werden mit exponentiellem Backoff + Jitter
+  wiederholt; danach werden die Vorlagen des Batches als fehlgeschlagen
+  vermerkt, der Lauf geht weiter
+- Checkpoint (letzte abgeschlossene id) und Zaehler liegen in Redis; ein
+  abgebrochener Lauf setzt beim naechsten Start dort fort
+- Eine Redis-Sperre verhindert parallele Laeufe ueber Worker hinweg
+
+Fortschritt: GET /api/v1/search/semantic/status
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Callable, Optional
+
+import httpx
+import structlog
+from redis.asyncio import Redis
+from sqlalchemy import text
+
+from app.core.config import get_settings
+from app.database import SessionLocal
+from app.services.embeddings import (
+    STORE_EMBEDDING_SQL,
+    EMBEDDING_MODEL,
+    content_hash,
+    embedding_row,
+    get_embedding_provider,
+    iter_batches,
+    paper_embedding_text,
+    request_embeddings_async,
+)
+from app.services.redis_utils import backoff_delay, release_lock
+
+settings = get_settings()
+logger = structlog.get_logger()
+
+STATE_KEY = "embeddings:backfill"
+FAILED_KEY = "embeddings:backfill:failed"
+LOCK_KEY = "embeddings:backfill:lock"
+
+# Ohne Embedding, nach Aenderung der Vorlage veraltet, oder (beim
+# Modellwechsel) mit einem anderen Modell berechnet
+_PENDING_WHERE = """
+    deleted = false AND (
+        embedding IS NULL
+        OR embedding_model IS NULL
+        OR (embedding_model = :model
+            AND (embedding_synced_at IS NULL OR modified > embedding_synced_at))
+        OR (:upgrade AND embedding_model <> :model)
+    )
+"""
+
+_COUNT_SQL = text(f"SELECT COUNT(*) FROM papers WHERE {_PENDING_WHERE}")
+
+_PENDING_SQL = text(f"""
+    SELECT id, name, paper_type, keyword, reference, modified,
+           embedding IS NOT NULL AS has_embedding, embedding_hash, embedding_model
+    FROM papers
+    WHERE {_PENDING_WHERE} AND id > :after
+    ORDER BY id
+    LIMIT :limit
+""")
+
+_RETRY_SQL = text(f"""
+    SELECT id, name, paper_type, keyword, reference, modified,
+           embedding IS NOT NULL AS has_embedding, embedding_hash, embedding_model
+    FROM papers
+    WHERE {_PENDING_WHERE} AND id > :after AND id = ANY(:ids)
+    ORDER BY id
+    LIMIT :limit
+""")
+
+_UPDATE_SQL = text(STORE_EMBEDDING_SQL)
+
+_TOUCH_SQL = text("UPDATE papers SET embedding_synced_at = :synced_at WHERE id = :id")
+
+COUNTERS = ("processed", "embedded", "unchanged", "skipped")
+
+
+class TokenBucket:
+    """Einfacher Token-Bucket (rate Tokens pro Sekunde, hoechstens capacity)."""
+
+    def __init__(self, rate: float, capacity: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._tokens = capacity
+        self._updated = clock()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Rate-Limit, Serverfehler und Netzwerkprobleme sind voruebergehend."""
+    if isinstance(exc, httpx.HTTPStatusError):
+        status = exc.response.status_code
+        return status == 429 or status >= 500
+    return isinstance(exc, httpx.TransportError)
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _count_pending(upgrade: bool = False) -> int:
+    db = SessionLocal()
+    try:
+        return db.execute(_COUNT_SQL, {"model": EMBEDDING_MODEL, "upgrade": upgrade}).scalar() or 0
+    finally:
+        db.close()
+
+
+def _load_page(after: str, limit: int, ids: Optional[list[str]], upgrade: bool = False) -> list:
+    if ids is not None and not ids:
+        return []
+    params = {"after": after, "limit": limit, "model": EMBEDDING_MODEL, "upgrade": upgrade}
+    db = SessionLocal()
+    try:
+        if ids is None:
+            return db.execute(_PENDING_SQL, params).fetchall()
+        return db.execute(_RETRY_SQL, {**params, "ids": ids}).fetchall()
+    finally:
+        db.close()
+
+
+def _store(params: list[dict], touched: list[dict]) -> None:
+    """Neue Vektoren schreiben und unveraenderte Vorlagen als aktuell markieren."""
+    db = SessionLocal()
+    try:
+        if params:
+            db.execute(_UPDATE_SQL, params)
+        if touched:
+            db.execute(_TOUCH_SQL, touched)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+class EmbeddingBackfill:
+    """Backfill-Job; eine Instanz pro Prozess (siehe `embedding_backfill`)."""
+
+    def __init__(self, redis: Optional[Redis] = None) -> None:
+        self._redis = redis
+        self._task: Optional[asyncio.Task] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    def _client(self) -> Redis:
+        if self._redis is None:
+            self._redis = Redis.from_url(settings.redis_url, decode_responses=True)
+        return self._redis
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def status(self) -> dict[str, Any]:
+        """Fortschritt des letzten/aktuellen Laufs inkl. fehlgeschlagener Vorlagen."""
+        redis = self._client()
+        state = await redis.hgetall(STATE_KEY)
+        _, failed = await redis.hscan(FAILED_KEY, count=20)
+        counters = {key: int(state.get(key) or 0) for key in ("total", *COUNTERS)}
+        return {
+            "status": state.get("status", "idle"),
+            "mode": state.get("mode") or None,
+            **counters,
+            "failed": await redis.hlen(FAILED_KEY),
+            "failed_ids": sorted(failed)[:20],
+            "cursor": state.get("cursor") or None,
+            "started_at": state.get("started_at") or None,
+            "updated_at": state.get("updated_at") or None,
+            "error": state.get("error") or None,
+        }
+
+    def start(self, restart: bool = False, retry_failed: bool = False, upgrade_model: bool = False) -> bool:
+        """Lauf als Hintergrund-Task starten; False, wenn im Prozess bereits einer laeuft."""
+        if self.running:
+            return False
+        self._task = asyncio.create_task(
+            self.run(restart=restart, retry_failed=retry_failed, upgrade_model=upgrade_model)
+        )
+        return True
+
+    async def _refresh_loop(self, interval: int) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            if self.running or not get_embedding_provider().available:
+                continue
+            try:
+                self._task = asyncio.create_task(self.run())
+                await self._task
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Embedding-Abgleich fehlgeschlagen", error=str(e))
+
+    def start_refresh(self) -> None:
+        """Geaenderte Vorlagen periodisch neu einbetten (embedding_refresh_interval)."""
+        if self._refresh_task is None:
+            self._refresh_task = asyncio.create_task(
+                self._refresh_loop(settings.embedding_refresh_interval)
+            )
+
+    async def stop(self) -> None:
+        """Abgleich und laufenden Task abbrechen; der Checkpoint bleibt erhalten."""
+        for task in (self._refresh_task, self._task):
+            if task is not None and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._refresh_task = None
+        self._task = None
+
+    async def run(
+        self,
+        restart: bool = False,
+        retry_failed: bool = False,
+        limit: int = 0,
+        upgrade_model: bool = False,
+    ) -> dict[str, Any]:
+        """
+        Backfill ausfuehren (bzw. am Checkpoint fortsetzen).
+
+        Args:
+            restart: Checkpoint und Fehlerliste verwerfen, von vorn beginnen
+            retry_failed: nur die bisher fehlgeschlagenen Vorlagen erneut versuchen
+            limit: hoechstens so viele Vorlagen verarbeiten (0 = alle)
+            upgrade_model: auch Vektoren anderer Modelle neu berechnen
+        """
+        redis = self._client()
+        token = uuid.uuid4().hex
+        if not await redis.set(LOCK_KEY, token, nx=True, ex=settings.embedding_backfill_lock_ttl):
+            logger.warning("Embedding-Backfill laeuft bereits")
+            return await self.status()
+
+        try:
+            if restart:
+                await redis.delete(STATE_KEY, FAILED_KEY)
+            state = await redis.hgetall(STATE_KEY)
+
+            ids: Optional[list[str]] = None
+            finished = state.get("status") == "done"
+            # ein unterbrochener Modellwechsel wird auch als solcher fortgesetzt
+            upgrade = upgrade_model or (not finished and state.get("mode") == "upgrade")
+            if retry_failed:
+                ids = list(await redis.hkeys(FAILED_KEY))
+                await redis.delete(FAILED_KEY)
+                cursor, total = "", len(ids)
+            elif finished:
+                cursor, total = "", await asyncio.to_thread(_count_pending, upgrade)
+            else:
+                cursor = state.get("cursor", "")
+                total = await asyncio.to_thread(_count_pending, upgrade)
+
+            resumed = not restart and not retry_failed and bool(cursor)
+            counters = {key: int(state.get(key) or 0) if resumed else 0 for key in COUNTERS}
+            if resumed:
+                # bereits verarbeitete Vorlagen zaehlen weiter zum Gesamtumfang
+                total += counters["embedded"] + counters["unchanged"]
+            await redis.hset(STATE_KEY, mapping={
+                "status": "running",
+                "mode": "upgrade" if upgrade else "default",
+                "total": min(total, limit) if limit else total,
+                "cursor": cursor,
+                "started_at": state.get("started_at", "") if resumed else _now(),
+                "updated_at": _now(),
+                "error": "",
+                **counters,
+            })
+            logger.info(
+                "Embedding-Backfill gestartet",
+                total=total, cursor=cursor or None, model=EMBEDDING_MODEL, upgrade=upgrade,
+            )
+
+            await self._process(redis, token, cursor, counters, ids, limit, upgrade)
+
+            await redis.hset(STATE_KEY, mapping={"status": "done", "updated_at": _now()})
+            logger.info("Embedding-Backfill abgeschlossen", **counters)
+        except asyncio.CancelledError:
+            await redis.hset(STATE_KEY, mapping={"status": "stopped", "updated_at": _now()})
+            raise
+        except Exception as e:
+            logger.error("Embedding-Backfill abgebrochen", error=str(e))
+            await redis.hset(STATE_KEY, mapping={"status": "error", "error": str(e), "updated_at": _now()})
+        finally:
+            await release_lock(redis, LOCK_KEY, token)
+        return await self.status()
+
+    async def _process(
+        self,
+        redis: Redis,
+        token: str,
+        cursor: str,
+        counters: dict[str, int],
+        ids: Optional[list[str]],
+        limit: int,
+        upgrade: bool,
+    ) -> None:
+        bucket = TokenBucket(settings.embedding_backfill_rate, settings.embedding_backfill_burst)
+        semaphore = asyncio.Semaphore(settings.embedding_backfill_concurrency)
+        seen = 0
+
+        while not limit or seen < limit:
+            page_size = settings.embedding_backfill_page_size
+            if limit:
+                page_size = min(page_size, limit - seen)
+            rows = await asyncio.to_thread(_load_page, cursor, page_size, ids, upgrade)
+            if not rows:
+                break
+            seen += len(rows)
+
+            texts = [paper_embedding_text(row) for row in rows]
+            hashes = [content_hash(t) for t in texts]
+
+            # Eingabetext unveraendert: Vektor behalten, nur Stand nachziehen
+            touched: list[dict] = []
+            for i, row in enumerate(rows):
+                if (
+                    texts[i]
+                    and row.has_embedding
+                    and row.embedding_hash == hashes[i]
+                    and row.embedding_model == EMBEDDING_MODEL
+                ):
+                    touched.append({"id": row.id, "synced_at": row.modified})
+                    texts[i] = ""
+            chunks = list(iter_batches(texts, max_inputs=settings.embedding_backfill_batch_size))
+            results = await asyncio.gather(
+                *(self._embed_chunk([texts[i] for i in chunk], bucket, semaphore) for chunk in chunks),
+                return_exceptions=True,
+            )
+
+            params: list[dict] = []
+            failures: dict[str, str] = {}
+            for chunk, result in zip(chunks, results):
+                if isinstance(result, BaseException):
+                    for i in chunk:
+                        failures[rows[i].id] = f"{type(result).__name__}: {result}"[:300]
+                    continue
+                for i, embedding in zip(chunk, result):
+                    params.append(embedding_row(rows[i].id, embedding, hashes[i], rows[i].modified))
+
+            if params or touched:
+                await asyncio.to_thread(_store, params, touched)
+                await redis.hdel(FAILED_KEY, *(p["id"] for p in params + touched))
+            if failures:
+                await redis.hset(FAILED_KEY, mapping=failures)
+                logger.warning("Embeddings fehlgeschlagen", papers=len(failures))
+
+            cursor = rows[-1].id
+            counters["processed"] += len(rows)
+            counters["embedded"] += len(params)
+            counters["unchanged"] += len(touched)
+            counters["skipped"] += len(rows) - len(params) - len(touched) - len(failures)
+            await redis.hset(STATE_KEY, mapping={"cursor": cursor, "updated_at": _now(), **counters})
+            await redis.expire(LOCK_KEY, settings.embedding_backfill_lock_ttl)
+
+    async def _embed_chunk(
+        self,
+        inputs: list[str],
+        bucket: TokenBucket,
+        semaphore: asyncio.Semaphore,
+    ) -> list[list[float]]:
+        """Ein Voyage-Request mit Rate-Limit und Retries."""
+        async with semaphore:
+            attempt = 0
+            while True:
+                await bucket.acquire()
+                try:
+                    return await request_embeddings_async(inputs, "document")
+                except Exception as e:
+                    if attempt >= settings.embedding_backfill_max_retries or not is_retryable(e):
+                        raise
+                    delay = backoff_delay(
+                        attempt,
+                        settings.embedding_backfill_backoff_base,
+                        settings.embedding_backfill_backoff_max,
+                    )
+                    logger.warning(
+                        "Voyage-Request wird wiederholt",
+                        attempt=attempt + 1, delay=round(delay, 2), error=str(e),
+                    )
+                    await asyncio.sleep(delay)
+                    attempt += 1
+
+
+# Prozessweite Instanz
+embedding_backfill = EmbeddingBackfill()
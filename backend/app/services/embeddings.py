@@ -3,95 +3,416 @@
 Voyage AI is Anthropic's embedding model provider.
 The ANTHROPIC_API_KEY is also valid for Voyage AI.
 Voyage-3 produces 1024-dimensional vectors.
+
+Fuer async-Handler gibt es *_async-Varianten auf einem gemeinsamen
+httpx.AsyncClient (Keep-Alive, HTTP/2); die synchronen Funktionen sind fuer
+Skripte und Worker-Threads gedacht und blockieren die Event-Loop.
+
+Provider (settings.embedding_provider):
+- "voyage": Voyage AI (Standard)
+- "local":  deterministische Offline-Vektoren aus gehashten n-Grammen,
+            fuer Tests, CI und Installationen ohne Internetzugang
 """
+import asyncio
+import hashlib
+import math
 import os
+import re
+import threading
 import httpx
-from typing import List
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, fields
+from datetime import date
+from functools import lru_cache
+from typing import Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from app.core.config import get_settings
 
 EMBEDDING_DIM = 1024  # voyage-3 default dimension
 VOYAGE_API_URL = "https://api.voyageai.com/v1/embeddings"
-VOYAGE_MODEL = "voyage-3"
+VOYAGE_MODEL = get_settings().embedding_model
+LOCAL_MODEL = "local-ngram-v1"
+
+# Voyage-Limits pro Request (voyage-3: 1000 Eingaben, 120k Tokens);
+# Token-Schaetzung konservativ mit ~3 Zeichen pro Token fuer deutsche Texte
+VOYAGE_MAX_BATCH_INPUTS = 1000
+VOYAGE_MAX_BATCH_TOKENS = 120_000
+CHARS_PER_TOKEN = 3
+MAX_DOCUMENT_CHARS = 8000
+MAX_QUERY_CHARS = 2000
+
+_client: Optional[httpx.Client] = None
+_client_lock = threading.Lock()
+_async_client: Optional[httpx.AsyncClient] = None
+
+
+def _get_client() -> httpx.Client:
+    """Gemeinsamer httpx.Client mit Keep-Alive-Pool (statt Client pro Aufruf)."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = httpx.Client(
+                    timeout=60,
+                    limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+                )
+    return _client
+
+
+def _get_async_client() -> httpx.AsyncClient:
+    """Gemeinsamer httpx.AsyncClient mit Keep-Alive und HTTP/2 (ein Prozess, eine Loop)."""
+    global _async_client
+    if _async_client is None or _async_client.is_closed:
+        _async_client = httpx.AsyncClient(
+            http2=True,
+            timeout=60,
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+        )
+    return _async_client
+
+
+async def close_async_client() -> None:
+    """AsyncClient beim Herunterfahren schliessen."""
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+
+
+def _estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _fit_dim(embedding: List[float]) -> List[float]:
+    """Auf EMBEDDING_DIM kuerzen bzw. auffuellen."""
+    if len(embedding) > EMBEDDING_DIM:
+        return embedding[:EMBEDDING_DIM]
+    if len(embedding) < EMBEDDING_DIM:
+        return embedding + [0.0] * (EMBEDDING_DIM - len(embedding))
+    return embedding
+
+
+def iter_batches(
+    texts: Sequence[str],
+    max_inputs: int = VOYAGE_MAX_BATCH_INPUTS,
+    max_tokens: int = VOYAGE_MAX_BATCH_TOKENS,
+) -> Iterator[List[int]]:
+    """Indizes nicht-leerer Texte zu Batches innerhalb der Provider-Limits packen."""
+    batch: List[int] = []
+    tokens = 0
+    for i, text in enumerate(texts):
+        if not text:
+            continue
+        cost = _estimate_tokens(text)
+        if batch and (len(batch) >= max_inputs or tokens + cost > max_tokens):
+            yield batch
+            batch, tokens = [], 0
+        batch.append(i)
+        tokens += cost
+    if batch:
+        yield batch
+
+
+def _voyage_request(api_key: str, inputs: List[str], input_type: str) -> dict:
+    """Argumente fuer client.post() an die Voyage-API."""
+    return {
+        "url": VOYAGE_API_URL,
+        "headers": {
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json",
+        },
+        "json": {
+            "model": VOYAGE_MODEL,
+            "input": inputs,
+            "input_type": input_type,
+        },
+    }
+
+
+def _parse_response(resp: httpx.Response, count: int) -> List[List[float]]:
+    """Vektoren in Eingabereihenfolge (ueber `index`)."""
+    resp.raise_for_status()
+    data = sorted(resp.json()["data"], key=lambda d: d["index"])
+    if len(data) != count:
+        raise ValueError(f"Voyage lieferte {len(data)} statt {count} Vektoren")
+    return [_fit_dim(d["embedding"]) for d in data]
+
+
+def _embed_batch(api_key: str, inputs: List[str], input_type: str) -> List[List[float]]:
+    """Ein Voyage-Request; Ergebnis in Eingabereihenfolge."""
+    resp = _get_client().post(**_voyage_request(api_key, inputs, input_type))
+    return _parse_response(resp, len(inputs))
+
+
+async def _embed_batch_async(api_key: str, inputs: List[str], input_type: str) -> List[List[float]]:
+    resp = await _get_async_client().post(**_voyage_request(api_key, inputs, input_type))
+    return _parse_response(resp, len(inputs))
+
+
+# ============================================================
+# Provider
+# ============================================================
+
+class EmbeddingProvider(ABC):
+    """Schnittstelle eines Embedding-Providers (ein Request = ein Batch)."""
+
+    name: str = ""
+    model: str = ""
+
+    @property
+    def available(self) -> bool:
+        """Ob Embeddings berechnet werden koennen (z.B. API-Key vorhanden)."""
+        return True
+
+    @abstractmethod
+    def embed(self, inputs: List[str], input_type: str) -> List[List[float]]:
+        """Vektoren fuer `inputs` (innerhalb der Limits); Fehler werden ausgeloest."""
+
+    @abstractmethod
+    async def embed_async(self, inputs: List[str], input_type: str) -> List[List[float]]:
+        """Async-Variante von embed()."""
+
+
+class VoyageProvider(EmbeddingProvider):
+    """Voyage AI ueber die HTTP-API (ANTHROPIC_API_KEY)."""
+
+    name = "voyage"
+    model = VOYAGE_MODEL
+
+    @property
+    def available(self) -> bool:
+        return bool(os.getenv("ANTHROPIC_API_KEY"))
+
+    def _api_key(self) -> str:
+        api_key = os.getenv("ANTHROPIC_API_KEY")
+        if not api_key:
+            raise RuntimeError("ANTHROPIC_API_KEY fehlt")
+        return api_key
+
+    def embed(self, inputs: List[str], input_type: str) -> List[List[float]]:
+        return _embed_batch(self._api_key(), inputs, input_type)
+
+    async def embed_async(self, inputs: List[str], input_type: str) -> List[List[float]]:
+        return await _embed_batch_async(self._api_key(), inputs, input_type)
+
+
+_WORD = re.compile(r"\w+")
+
+
+@lru_cache(maxsize=1 << 18)
+def _feature_bucket(feature: str, dim: int) -> Tuple[int, float]:
+    """Stabile Dimension und Vorzeichen eines Merkmals (unabhaengig von PYTHONHASHSEED)."""
+    h = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+    return h % dim, 1.0 if h >> 63 else -1.0
+
+
+class LocalHashingProvider(EmbeddingProvider):
+    """
+    Deterministische Offline-Embeddings ohne Netzwerk.
+
+    Woerter, Wort-Bigramme und Zeichen-Trigramme (auch innerhalb von
+    Komposita) werden per Feature-Hashing mit Vorzeichen auf EMBEDDING_DIM
+    Dimensionen abgebildet (eine duenn besetzte Zufallsprojektion) und
+    L2-normiert. Texte mit gemeinsamen Woertern/Wortteilen haben damit eine
+    positive Kosinus-Aehnlichkeit; semantische Naehe ohne gemeinsame
+    Zeichenfolgen erkennt der Provider nicht.
+    """
+
+    name = "local"
+    model = LOCAL_MODEL
+
+    def __init__(self, dim: int = EMBEDDING_DIM, ngram: int = 3):
+        self.dim = dim
+        self.ngram = ngram
+
+    def _features(self, text: str) -> Iterator[Tuple[str, float]]:
+        words = _WORD.findall(text.casefold())
+        for word in words:
+            yield f"w:{word}", 1.0
+            padded = f"<{word}>"
+            for i in range(len(padded) - self.ngram + 1):
+                yield f"c:{padded[i:i + self.ngram]}", 0.5
+        for first, second in zip(words, words[1:]):
+            yield f"b:{first} {second}", 0.5
+
+    def embed_one(self, text: str) -> List[float]:
+        vector = [0.0] * self.dim
+        for feature, weight in self._features(text):
+            index, sign = _feature_bucket(feature, self.dim)
+            vector[index] += sign * weight
+        norm = math.sqrt(sum(v * v for v in vector))
+        return [v / norm for v in vector] if norm else vector
+
+    def embed(self, inputs: List[str], input_type: str) -> List[List[float]]:
+        return [self.embed_one(text) for text in inputs]
+
+    async def embed_async(self, inputs: List[str], input_type: str) -> List[List[float]]:
+        # CPU-Arbeit; grosse Batches (Backfill) nicht auf der Event-Loop rechnen
+        if len(inputs) <= 8:
+            return self.embed(inputs, input_type)
+        return await asyncio.to_thread(self.embed, inputs, input_type)
+
+
+PROVIDERS = {
+    VoyageProvider.name: VoyageProvider,
+    LocalHashingProvider.name: LocalHashingProvider,
+}
+
+_provider: Optional[EmbeddingProvider] = None
+
+
+def get_embedding_provider() -> EmbeddingProvider:
+    """Konfigurierter Provider (settings.embedding_provider), prozessweit."""
+    global _provider
+    if _provider is None:
+        _provider = PROVIDERS[get_settings().embedding_provider]()
+    return _provider
+
+
+# Modellname der gespeicherten und abgefragten Vektoren (papers.embedding_model)
+EMBEDDING_MODEL = PROVIDERS[get_settings().embedding_provider].model
+
+
+def _prepare(texts: Sequence[str], input_type: str) -> List[str]:
+    max_chars = MAX_QUERY_CHARS if input_type == "query" else MAX_DOCUMENT_CHARS
+    return [(t or "").strip()[:max_chars] for t in texts]
+
+
+def generate_embeddings(
+    texts: Sequence[str],
+    input_type: str = "document",
+) -> List[List[float]]:
+    """Embeddings fuer viele Texte mit moeglichst wenigen Provider-Requests.
+
+    Texte werden bis zu den Provider-Limits (Anzahl Eingaben, Tokens) in
+    einen Request gepackt. Das Ergebnis ist an `texts` ausgerichtet; leere
+    Texte und Texte aus fehlgeschlagenen Batches erhalten den Null-Vektor.
+    """
+    cleaned = _prepare(texts, input_type)
+    results: List[List[float]] = [[0.0] * EMBEDDING_DIM for _ in cleaned]
+
+    provider = get_embedding_provider()
+    if not provider.available:
+        return results
+
+    for batch in iter_batches(cleaned):
+        try:
+            vectors = provider.embed([cleaned[i] for i in batch], input_type)
+        except Exception as e:
+            print(f"[embeddings] Batch of {len(batch)} failed: {e}")
+            continue
+        for i, vector in zip(batch, vectors):
+            results[i] = vector
+    return results
+
+
+async def generate_embeddings_async(
+    texts: Sequence[str],
+    input_type: str = "document",
+) -> List[List[float]]:
+    """Wie generate_embeddings(), Batches laufen parallel auf dem AsyncClient."""
+    cleaned = _prepare(texts, input_type)
+    results: List[List[float]] = [[0.0] * EMBEDDING_DIM for _ in cleaned]
+
+    provider = get_embedding_provider()
+    if not provider.available:
+        return results
+
+    batches = list(iter_batches(cleaned))
+    outcomes = await asyncio.gather(
+        *(provider.embed_async([cleaned[i] for i in b], input_type) for b in batches),
+        return_exceptions=True,
+    )
+    for batch, vectors in zip(batches, outcomes):
+        if isinstance(vectors, BaseException):
+            print(f"[embeddings] Batch of {len(batch)} failed: {vectors}")
+            continue
+        for i, vector in zip(batch, vectors):
+            results[i] = vector
+    return results
+
+
+def request_embeddings(texts: Sequence[str], input_type: str = "document") -> List[List[float]]:
+    """Ein einzelner Provider-Request ohne Null-Vektor-Fallback.
+
+    Fuer Aufrufer mit eigener Retry-Logik (Backfill-Job); Fehler werden
+    weitergereicht. `texts` muessen bereits innerhalb der Limits liegen
+    (siehe iter_batches).
+    """
+    return get_embedding_provider().embed(list(texts), input_type)
+
+
+async def request_embeddings_async(texts: Sequence[str], input_type: str = "document") -> List[List[float]]:
+    """Async-Variante von request_embeddings()."""
+    return await get_embedding_provider().embed_async(list(texts), input_type)
+
+
+def paper_embedding_text(paper) -> str:
+    """Eingabetext fuer das Embedding einer Vorlage (Titel, Art, Stichwoerter, Nummer)."""
+    text_parts = []
+    if paper.name:
+        text_parts.append(paper.name)
+    if getattr(paper, "description", None):
+        text_parts.append(paper.description)
+    if paper.paper_type:
+        text_parts.append(f"Typ: {paper.paper_type}")
+    if paper.keyword:
+        text_parts.append(f"Stichwoerter: {', '.join(paper.keyword)}")
+    if paper.reference:
+        text_parts.append(f"Drucksache: {paper.reference}")
+    return " ".join(text_parts)[:MAX_DOCUMENT_CHARS]
+
+
+def content_hash(text: str) -> str:
+    """SHA-256 des Embedding-Eingabetexts (papers.embedding_hash)."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+# Vektor mit Herkunft speichern: Hash des Eingabetexts, Modell und der
+# Stand (papers.modified) der Vorlage, aus dem der Text gebildet wurde
+STORE_EMBEDDING_SQL = """
+    UPDATE papers
+    SET embedding = CAST(:emb AS vector),
+        embedding_hash = :hash,
+        embedding_model = :model,
+        embedding_synced_at = :synced_at
+    WHERE id = :id
+"""
+
+
+def embedding_row(paper_id: str, embedding: List[float], text_hash: str, synced_at) -> dict:
+    """Parameter fuer STORE_EMBEDDING_SQL."""
+    return {
+        "id": paper_id,
+        "emb": f"[{','.join(map(str, embedding))}]",
+        "hash": text_hash,
+        "model": EMBEDDING_MODEL,
+        "synced_at": synced_at,
+    }
 
 
 def generate_embedding(text: str) -> List[float]:
-    """Generate 1024-dim embedding via Voyage AI (voyage-3 model).
+    """Generate 1024-dim embedding via the configured provider (default: Voyage AI voyage-3).
 
     Uses ANTHROPIC_API_KEY which is valid for Voyage AI as well.
     Returns zero vector on failure (semantic search gracefully disabled).
     """
-    api_key = os.getenv("ANTHROPIC_API_KEY")
-    if not api_key:
-        return [0.0] * EMBEDDING_DIM
-
-    text = (text or "").strip()
-    if not text:
-        return [0.0] * EMBEDDING_DIM
-
-    try:
-        with httpx.Client(timeout=30) as client:
-            resp = client.post(
-                VOYAGE_API_URL,
-                headers={
-                    "Authorization": f"Bearer {api_key}",
-                    "Content-Type": "application/json",
-                },
-                json={
-                    "model": VOYAGE_MODEL,
-                    "input": [text[:8000]],
-                    "input_type": "document",
-                },
-            )
-            resp.raise_for_status()
-            data = resp.json()
-            embedding = data["data"][0]["embedding"]
-            if len(embedding) != EMBEDDING_DIM:
-                print(f"[embeddings] Unexpected dim: {len(embedding)}, expected {EMBEDDING_DIM}")
-                # Resize if needed
-                if len(embedding) > EMBEDDING_DIM:
-                    embedding = embedding[:EMBEDDING_DIM]
-                else:
-                    embedding += [0.0] * (EMBEDDING_DIM - len(embedding))
-            return embedding
-    except Exception as e:
-        print(f"[embeddings] Failed to generate embedding: {e}")
-        return [0.0] * EMBEDDING_DIM
+    return generate_embeddings([text], input_type="document")[0]
 
 
 def generate_query_embedding(query: str) -> List[float]:
     """Generate embedding for search queries (input_type=query)."""
-    api_key = os.getenv("ANTHROPIC_API_KEY")
-    if not api_key:
-        return [0.0] * EMBEDDING_DIM
-
-    query = (query or "").strip()
-    if not query:
-        return [0.0] * EMBEDDING_DIM
-
-    try:
-        with httpx.Client(timeout=30) as client:
-            resp = client.post(
-                VOYAGE_API_URL,
-                headers={
-                    "Authorization": f"Bearer {api_key}",
-                    "Content-Type": "application/json",
-                },
-                json={
-                    "model": VOYAGE_MODEL,
-                    "input": [query[:2000]],
-                    "input_type": "query",
-                },
-            )
-            resp.raise_for_status()
-            data = resp.json()
-            embedding = data["data"][0]["embedding"]
-            if len(embedding) > EMBEDDING_DIM:
-                embedding = embedding[:EMBEDDING_DIM]
-            elif len(embedding) < EMBEDDING_DIM:
-                embedding += [0.0] * (EMBEDDING_DIM - len(embedding))
-            return embedding
-    except Exception as e:
-        print(f"[embeddings] Query embedding failed: {e}")
-        return [0.0] * EMBEDDING_DIM
+    return generate_embeddings([query], input_type="query")[0]
+
+
+async def generate_embedding_async(text: str) -> List[float]:
+    """Async-Variante von generate_embedding() (blockiert die Event-Loop nicht)."""
+    return (await generate_embeddings_async([text], input_type="document"))[0]
+
+
+async def generate_query_embedding_async(query: str) -> List[float]:
+    """Async-Variante von generate_query_embedding()."""
+    return (await generate_embeddings_async([query], input_type="query"))[0]
 
 
 def is_zero_vector(embedding: List[float]) -> bool:
@@ -99,37 +420,204 @@ def is_zero_vector(embedding: List[float]) -> bool:
     return all(v == 0.0 for v in embedding)
 
 
+# pgvector begrenzt hnsw.ef_search auf 1000
+MAX_EF_SEARCH = 1000
+
+
+def effective_ef_search(limit: int, ef_search: Optional[int] = None) -> int:
+    """HNSW-Suchbreite: Vorgabe oder Einstellung, mindestens `limit`."""
+    ef = ef_search or get_settings().vector_hnsw_ef_search
+    return min(max(ef, limit), MAX_EF_SEARCH)
+
+
+def set_vector_search_params(db, limit: int, ef_search: Optional[int] = None) -> None:
+    """Suchparameter des Vektorindex fuer die laufende Transaktion setzen.
+
+    HNSW liefert hoechstens ef_search Kandidaten, ef_search ist daher
+    mindestens `limit`. ivfflat.probes greift, falls ein IVFFlat-Index aktiv ist.
+    Mit iterativem Scan (settings.vector_iterative_scan, pgvector >= 0.8)
+    liest der Index weiter, bis `limit` Zeilen die Filter erfuellen oder
+    settings.vector_max_scan_tuples erreicht ist.
+    """
+    from sqlalchemy import text
+
+    settings = get_settings()
+    params = {
+        "ef": str(effective_ef_search(limit, ef_search)),
+        "probes": str(settings.vector_ivfflat_probes),
+    }
+    sql = "SELECT set_config('hnsw.ef_search', :ef, true), set_config('ivfflat.probes', :probes, true)"
+    if settings.vector_iterative_scan != "off":
+        # IVFFlat kennt nur relaxed_order
+        sql += (
+            ", set_config('hnsw.iterative_scan', :iterative, true)"
+            ", set_config('hnsw.max_scan_tuples', :max_tuples, true)"
+            ", set_config('ivfflat.iterative_scan', 'relaxed_order', true)"
+        )
+        params["iterative"] = settings.vector_iterative_scan
+        params["max_tuples"] = str(settings.vector_max_scan_tuples)
+    db.execute(text(sql), params)
+
+
+@dataclass
+class VectorFilter:
+    """Filter der Vektorsuche; werden im ANN-Scan ausgewertet, nicht nach dem LIMIT."""
+
+    body_id: Optional[str] = None
+    paper_type: Optional[str] = None
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+    organization: Optional[str] = None  # ID oder Name des beratenden/einreichenden Gremiums
+    without_passages: Optional[bool] = None  # nur Vorlagen ohne Passagen-Index (True)
+
+    def __bool__(self) -> bool:
+        return any(getattr(self, f.name) is not None for f in fields(self))
+
+    def sql(self, ref: str = "papers") -> str:
+        """Bedingungen auf der papers-Zeile `ref`, mit AND verknuepft ("" ohne Filter)."""
+        clauses = []
+        if self.body_id is not None:
+            clauses.append(f"{ref}.body_id = :filter_body_id")
+        if self.paper_type is not None:
+            clauses.append(f"{ref}.paper_type = :filter_paper_type")
+        if self.date_from is not None:
+            clauses.append(f"{ref}.date >= :filter_date_from")
+        if self.date_to is not None:
+            clauses.append(f"{ref}.date <= :filter_date_to")
+        if self.organization is not None:
+            clauses.append(f"""(
+                EXISTS (
+                    SELECT 1 FROM consultations c JOIN organizations o ON o.id = c.organization_id
+                    WHERE c.paper_id = {ref}.id AND c.deleted = false
+                      AND (o.id = :filter_organization OR o.name = :filter_organization)
+                )
+                OR EXISTS (
+                    SELECT 1 FROM paper_originator_org po JOIN organizations o ON o.id = po.organization_id
+                    WHERE po.paper_id = {ref}.id
+                      AND (o.id = :filter_organization OR o.name = :filter_organization)
+                )
+            )""")
+        if self.without_passages:
+            clauses.append(f"{ref}.passages_synced_at IS NULL")
+        return " AND ".join(clauses)
+
+    def params(self) -> dict:
+        return {f"filter_{f.name}": getattr(self, f.name) for f in fields(self)}
+
+
+class Quantization(NamedTuple):
+    """ANN-Stufe: indizierter Ausdruck, Distanzoperator, Query-Ausdruck, Operator-Klasse."""
+
+    column: str
+    operator: str
+    query: str
+    opclass: str
+
+
+# Die Spaltenausdruecke muessen exakt den Index-Ausdruecken entsprechen
+# (app.scripts.vector_index), sonst greift der Index nicht
+QUANTIZATIONS = {
+    "none": Quantization("embedding", "<=>", "CAST(:embedding AS vector)", "vector_cosine_ops"),
+    "halfvec": Quantization(
+        f"CAST(embedding AS halfvec({EMBEDDING_DIM}))", "<=>",
+        f"CAST(:embedding AS halfvec({EMBEDDING_DIM}))", "halfvec_cosine_ops",
+    ),
+    "binary": Quantization(
+        f"CAST(binary_quantize(embedding) AS bit({EMBEDDING_DIM}))", "<~>",
+        "binary_quantize(CAST(:embedding AS vector))", "bit_hamming_ops",
+    ),
+}
+
+
+def quantization_for_tenant(tenant_id: Optional[str]) -> str:
+    """Konfigurierte Quantisierung fuer einen Tenant (Fallback: settings.vector_quantization)."""
+    settings = get_settings()
+    if tenant_id:
+        override = settings.vector_quantization_overrides.get(tenant_id)
+        if override in QUANTIZATIONS:
+            return override
+    return settings.vector_quantization
+
+
+def vector_search_sql(
+    columns: str,
+    quantization: str = "none",
+    filters: Optional[VectorFilter] = None,
+) -> str:
+    """Nachbarsuche auf papers fuer einen Tenant, sortiert nach Cosinus-Distanz.
+
+    Der ANN-Index liefert :candidates Kandidaten (ohne Quantisierung
+    :candidates = :limit); Filter stehen im selben Scan. Danach wird mit den
+    float32-Vektoren exakt sortiert, was bei Quantisierung den Rerank und beim
+    iterativen Scan (relaxed_order) die Reihenfolge herstellt. Parameter:
+    :embedding, :model, :tenant_id, :limit, :candidates und filters.params().
+    """
+    q = QUANTIZATIONS[quantization]
+    where = """
+                embedding IS NOT NULL
+                AND embedding_model = :model
+                AND tenant_id = :tenant_id
+                AND deleted = false"""
+    if filters:
+        where += f"\n                AND {filters.sql()}"
+    return f"""
+        WITH candidates AS MATERIALIZED (
+            SELECT id
+            FROM papers
+            WHERE {where}
+            ORDER BY {q.column} {q.operator} {q.query}
+            LIMIT :candidates
+        )
+        SELECT {columns}, 1 - (embedding <=> CAST(:embedding AS vector)) AS similarity
+        FROM papers JOIN candidates USING (id)
+        ORDER BY embedding <=> CAST(:embedding AS vector)
+        LIMIT :limit
+        """
+
+
+def nearest_papers(
+    db,
+    query_embedding: List[float],
+    tenant_id: str,
+    limit: int,
+    columns: str = "id, name, paper_type, date, reference",
+    ef_search: Optional[int] = None,
+    filters: Optional[VectorFilter] = None,
+) -> list:
+    """Naechste Vorlagen zum Query-Embedding, Quantisierung je Tenant."""
+    from sqlalchemy import text
+
+    quantization = quantization_for_tenant(tenant_id)
+    candidates = limit if quantization == "none" else limit * max(get_settings().vector_rerank_factor, 1)
+    set_vector_search_params(db, candidates, ef_search)
+    params = {
+        "embedding": f"[{','.join(map(str, query_embedding))}]",
+        "model": EMBEDDING_MODEL,
+        "tenant_id": tenant_id,
+        "limit": limit,
+        "candidates": candidates,
+    }
+    if filters:
+        params.update(filters.params())
+    return db.execute(text(vector_search_sql(columns, quantization, filters)), params).fetchall()
+
+
 def cosine_similarity_search(
     query_embedding: List[float],
     db,
     tenant_id: str = "default",
     limit: int = 10,
     min_similarity: float = 0.5,
+    ef_search: Optional[int] = None,
+    filters: Optional[VectorFilter] = None,
 ) -> list:
-    """Search papers by cosine similarity using pgvector operator <=>."""
-    from sqlalchemy import text
+    """Search papers by cosine similarity using pgvector operator <=>.
 
-    embedding_str = f"[{','.join(map(str, query_embedding))}]"
-
-    result = db.execute(
-        text("""
-            SELECT
-                id, name, paper_type, date, reference,
-                1 - (embedding <=> CAST(:embedding AS vector)) AS similarity
-            FROM papers
-            WHERE
-                embedding IS NOT NULL
-                AND tenant_id = :tenant_id
-                AND deleted = false
-            ORDER BY embedding <=> CAST(:embedding AS vector)
-            LIMIT :limit
-        """),
-        {
-            "embedding": embedding_str,
-            "tenant_id": tenant_id,
-            "limit": limit,
-        },
-    )
-
-    rows = result.fetchall()
+    Nur Vektoren des aktuellen Modells (EMBEDDING_MODEL) sind mit dem
+    Query-Embedding vergleichbar. `ef_search` ueberschreibt
+    settings.vector_hnsw_ef_search fuer diese Abfrage (Recall vs. Latenz).
+    Mit Quantisierung (settings.vector_quantization) wird exakt nachsortiert.
+    `filters` (Koerperschaft, Art, Zeitraum, Gremium) wirken im Index-Scan.
+    """
+    rows = nearest_papers(db, query_embedding, tenant_id, limit, ef_search=ef_search, filters=filters)
     return [r for r in rows if r.similarity >= min_similarity]
@@ -0,0 +1,220 @@
+"""
+aitema|RIS - Hybride Suche (BM25 + Vektor)
+
+Kombiniert die Stichwortsuche des Such-Backends (Elasticsearch/PostgreSQL)
+mit der semantischen pgvector-Suche:
+- beide Quellen laufen parallel (asyncio.gather)
+- jede Quelle hat ein eigenes Timeout; eine langsame oder ausgefallene
+  Quelle wird uebersprungen statt die Antwort aufzuhalten
+- Zusammenfuehrung per Reciprocal Rank Fusion (RRF, Cormack et al. 2009):
+  score(d) = sum(1 / (k + rank_q(d)))
+"""
+from __future__ import annotations
+
+import asyncio
+from datetime import date
+from typing import Any, Awaitable, Optional
+
+import structlog
+
+from app.core.config import get_settings
+from app.services.embeddings import VectorFilter, is_zero_vector
+from app.services.passages import semantic_paper_search
+from app.services.query_embedding_cache import query_embedding_cache
+from app.services.search_backend import SearchBackend
+from app.services.search_service import SearchResult
+
+logger = structlog.get_logger()
+settings = get_settings()
+
+SOURCE_KEYWORD = "keyword"
+SOURCE_SEMANTIC = "semantic"
+
+# Obergrenze fuer Kandidaten je Quelle (ES-Fenster, pgvector LIMIT)
+MAX_CANDIDATES = 1000
+
+
+def reciprocal_rank_fusion(
+    rankings: dict[str, list[dict]],
+    k: int = 60,
+) -> list[dict]:
+    """
+    Mehrere Trefferlisten per RRF zu einer Rangfolge verschmelzen.
+
+    Args:
+        rankings: Quelle -> Treffer (absteigend sortiert, Schluessel "id")
+        k:        Daempfungskonstante (60 laut Literatur)
+
+    Returns:
+        Treffer nach RRF-Score; Felder der zuerst genannten Quelle haben
+        Vorrang, `score` ist der RRF-Score, `sources` nennt die Quellen.
+    """
+    fused: dict[str, dict[str, Any]] = {}
+    for source, hits in rankings.items():
+        for rank, hit in enumerate(hits, start=1):
+            entry = fused.get(hit["id"])
+            if entry is None:
+                entry = fused[hit["id"]] = {**hit, "score": 0.0, "sources": []}
+            else:
+                for key, value in hit.items():
+                    if entry.get(key) is None and key != "score":
+                        entry[key] = value
+            entry["score"] += 1.0 / (k + rank)
+            entry["sources"].append(source)
+    return sorted(fused.values(), key=lambda e: (-e["score"], e["id"]))
+
+
+def _semantic_candidates(
+    embedding: list[float],
+    tenant_id: str,
+    limit: int,
+    filters: Optional[VectorFilter] = None,
+) -> list[dict]:
+    """pgvector-Kandidaten; eigene Session, da parallel zur Stichwortsuche."""
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        rows = semantic_paper_search(
+            db,
+            embedding,
+            tenant_id=tenant_id,
+            limit=limit,
+            min_similarity=settings.hybrid_min_similarity,
+            filters=filters,
+        )
+    finally:
+        db.close()
+    return [
+        {
+            "id": str(r.id),
+            "type": "paper",
+            "name": r.name,
+            "reference": r.reference,
+            "paper_type": r.paper_type,
+            "date": r.date.isoformat() if r.date else None,
+            "similarity": round(float(r.similarity), 4),
+        }
+        for r in rows
+    ]
+
+
+async def _semantic_search(
+    query: str,
+    tenant_id: str,
+    limit: int,
+    filters: Optional[VectorFilter] = None,
+) -> list[dict]:
+    """Query-Embedding (gecacht) und pgvector-Suche im Thread."""
+    embedding = await query_embedding_cache.get(query)
+    if is_zero_vector(embedding):
+        return []
+    return await asyncio.to_thread(_semantic_candidates, embedding, tenant_id, limit, filters)
+
+
+async def _with_timeout(source: str, awaitable: Awaitable, timeout: float) -> Any:
+    """Ergebnis der Quelle oder None bei Timeout/Fehler (auch vom Backend abgefangene)."""
+    try:
+        result = await asyncio.wait_for(awaitable, timeout=timeout)
+        if isinstance(result, SearchResult) and result.error:
+            logger.warning("Hybride Suche: Quelle fehlgeschlagen", source=source, error=result.error)
+            return None
+        return result
+    except asyncio.TimeoutError:
+        logger.warning("Hybride Suche: Quelle ueberschreitet Timeout", source=source, timeout=timeout)
+    except ValueError:
+        raise
+    except Exception as e:
+        logger.warning("Hybride Suche: Quelle fehlgeschlagen", source=source, error=str(e))
+    return None
+
+
+async def hybrid_search(
+    backend: SearchBackend,
+    query: str,
+    types: Optional[list[str]] = None,
+    tenant_id: Optional[str] = None,
+    body_id: Optional[str] = None,
+    gremium: Optional[str] = None,
+    year: Optional[int] = None,
+    status: Optional[str] = None,
+    page: int = 1,
+    size: int = 20,
+    facets: Optional[list[str]] = None,
+) -> tuple[SearchResult, list[str]]:
+    """
+    Stichwort- und Vektorsuche parallel ausfuehren und per RRF verschmelzen.
+
+    Die Vektorsuche kennt nur Vorlagen; Koerperschaft, Gremium und Jahr
+    filtert sie im Index-Scan mit. Einen Statusfilter (Sitzungsstatus) kennt
+    sie nicht; ist er gesetzt, entfaellt sie. Sie sucht nur innerhalb eines
+    Tenants; ohne tenant_id (Stichwortsuche ueber alle Tenants) entfaellt sie
+    ebenfalls, damit beide Quellen denselben Bereich abdecken.
+
+    Returns:
+        (SearchResult, Liste der ausgefallenen Quellen)
+
+    Raises:
+        ValueError: bei ungueltigen Parametern der Stichwortsuche
+    """
+    window = min(max(settings.hybrid_candidates, page * size), MAX_CANDIDATES)
+    use_semantic = bool(tenant_id) and (not types or "paper" in types) and not status
+
+    keyword_task = _with_timeout(
+        SOURCE_KEYWORD,
+        backend.search(
+            query=query,
+            types=types,
+            tenant_id=tenant_id,
+            body_id=body_id,
+            gremium=gremium,
+            year=year,
+            status=status,
+            page=1,
+            size=window,
+            facets=facets,
+        ),
+        settings.hybrid_keyword_timeout,
+    )
+    if use_semantic:
+        semantic_task = _with_timeout(
+            SOURCE_SEMANTIC,
+            _semantic_search(
+                query,
+                tenant_id,
+                window,
+                VectorFilter(
+                    body_id=body_id,
+                    organization=gremium,
+                    date_from=date(year, 1, 1) if year else None,
+                    date_to=date(year, 12, 31) if year else None,
+                ),
+            ),
+            settings.hybrid_semantic_timeout,
+        )
+        keyword_result, semantic_hits = await asyncio.gather(keyword_task, semantic_task)
+    else:
+        keyword_result, semantic_hits = await keyword_task, []
+
+    degraded = []
+    if keyword_result is None:
+        degraded.append(SOURCE_KEYWORD)
+    if semantic_hits is None:
+        degraded.append(SOURCE_SEMANTIC)
+
+    rankings: dict[str, list[dict]] = {}
+    if keyword_result is not None:
+        rankings[SOURCE_KEYWORD] = keyword_result.data
+    if semantic_hits:
+        rankings[SOURCE_SEMANTIC] = semantic_hits
+
+    fused = reciprocal_rank_fusion(rankings, k=settings.hybrid_rrf_k)
+    start = (page - 1) * size
+    result = SearchResult(
+        data=fused[start:start + size],
+        total=len(fused),
+        page=page,
+        per_page=size,
+        facets=keyword_result.facets if keyword_result is not None else {},
+    )
+    return result, degraded
@@ -0,0 +1,375 @@
+"""
+aitema|RIS - Stichwort-Abonnements abgleichen
+
+Alle bestaetigten Keyword-Abonnements werden einmal in einen
+Aho-Corasick-Automaten uebernommen. Eine neue oder geaenderte Vorlage wird
+dann in einem einzigen Durchlauf gegen saemtliche Stichwoerter geprueft,
+statt pro Stichwort eine Abfrage zu stellen (get_subscribers_for_keyword).
+
+Normalisierung fuer deutsche Texte:
+- Kleinschreibung, Umlaute/ß ausgeschrieben ("Müllabfuhr" -> "muellabfuhr")
+- sonstige Diakritika entfernt, Satzzeichen/Bindestriche -> Leerzeichen
+- Stichwoerter treffen am Wortanfang ("Radweg" -> "Radwegekonzept"); ab
+  keyword_compound_min_len Zeichen auch innerhalb von Komposita
+  ("Schule" -> "Grundschule")
+
+Ausloeser: KeywordNotifier gleicht alle keyword_notify_interval Sekunden die
+seitdem neuen oder geaenderten Vorlagen ab (Wasserstand (modified, id) in
+Redis, Sperre ueber Worker hinweg) und baut den Automaten dabei jedes Mal neu
+auf; Bestaetigungen und Abmeldungen aus anderen Prozessen wirken so spaetestens
+beim naechsten Durchlauf.
+"""
+from __future__ import annotations
+
+import asyncio
+import re
+import time
+import unicodedata
+import uuid
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Optional
+
+import structlog
+from redis.asyncio import Redis
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.database import SessionLocal
+from app.models.oparl import Paper
+from app.models.subscription import Subscription
+from app.services.redis_utils import release_lock
+
+logger = structlog.get_logger()
+settings = get_settings()
+
+WATERMARK_KEY = "keyword_matcher:watermark"
+LOCK_KEY = "keyword_matcher:lock"
+
+_UMLAUTS = str.maketrans({"ä": "ae", "ö": "oe", "ü": "ue", "ß": "ss"})
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def normalize_german(value: Optional[str]) -> str:
+    """Text fuer den Abgleich normalisieren; Ergebnis ist von Leerzeichen umschlossen."""
+    if not value:
+        return " "
+    value = value.casefold().translate(_UMLAUTS)
+    value = "".join(
+        c for c in unicodedata.normalize("NFKD", value) if not unicodedata.combining(c)
+    )
+    return f" {_NON_WORD.sub(' ', value).strip()} "
+
+
+class AhoCorasick:
+    """
+    Aho-Corasick-Automat ueber Zeichen (Goto-, Fail- und Ausgabe-Links).
+
+    `search()` liefert alle (Endposition, Muster-Index) in O(n + Treffer).
+    """
+
+    def __init__(self, patterns: list[str]):
+        self.patterns = patterns
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._out: list[list[int]] = [[]]
+
+        for index, pattern in enumerate(patterns):
+            state = 0
+            for char in pattern:
+                nxt = self._goto[state].get(char)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][char] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = nxt
+            self._out[state].append(index)
+
+        # Fail-Links per Breitensuche; Ausgaben der Fail-Zustaende erben
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(char, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    def search(self, text: str) -> Iterable[tuple[int, int]]:
+        state = 0
+        goto, fail, out = self._goto, self._fail, self._out
+        for pos, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for index in out[state]:
+                yield pos, index
+
+
+def paper_match_text(paper: Paper, content: Optional[Iterable[str]] = None) -> str:
+    """Abgleichstext einer Vorlage: Titel, Aktenzeichen, Art, Schlagworte, Kurzfassung."""
+    parts = [
+        paper.name,
+        paper.reference,
+        paper.paper_type,
+        " ".join(paper.keyword or []),
+        getattr(paper, "ai_summary", None),
+        *(content or []),
+    ]
+    return " ".join(p for p in parts if p)
+
+
+class KeywordSubscriptionMatcher:
+    """Automat ueber alle bestaetigten Keyword-Abonnements eines Prozesses."""
+
+    def __init__(self) -> None:
+        self._automaton: Optional[AhoCorasick] = None
+        # Muster-Index -> Abonnement-IDs
+        self._subscribers: list[set[str]] = []
+        self._loaded_at: float = 0.0
+
+    @property
+    def size(self) -> int:
+        return len(self._automaton) if self._automaton else 0
+
+    def build(self, subscriptions: Iterable[Subscription]) -> None:
+        """Automaten aus Abonnements (target_id als Slug, target_label) aufbauen."""
+        by_pattern: dict[str, set[str]] = {}
+        for sub in subscriptions:
+            terms = {
+                normalize_german(sub.target_id.replace("-", " ")),
+                normalize_german(sub.target_label),
+            }
+            for term in terms:
+                term = term.strip()
+                if term:
+                    by_pattern.setdefault(term, set()).add(sub.id)
+        patterns = sorted(by_pattern)
+        self._automaton = AhoCorasick(patterns)
+        self._subscribers = [by_pattern[p] for p in patterns]
+        self._loaded_at = time.monotonic()
+
+    def load(self, db: Session) -> None:
+        subscriptions = (
+            db.query(Subscription)
+            .filter(
+                Subscription.subscription_type == "keyword",
+                Subscription.confirmed == True,  # noqa: E712
+            )
+            .all()
+        )
+        self.build(subscriptions)
+        logger.info("Keyword-Automat aufgebaut", patterns=self.size, subscriptions=len(subscriptions))
+
+    def invalidate(self) -> None:
+        """
+        Beim naechsten Abgleich neu laden (nach Bestaetigung/Abmeldung).
+
+        Wirkt nur in diesem Prozess; andere Prozesse laden spaetestens nach
+        keyword_matcher_max_age neu, der KeywordNotifier bei jedem Durchlauf.
+        """
+        self._automaton = None
+
+    def ensure_loaded(self, db: Session) -> None:
+        age = time.monotonic() - self._loaded_at
+        if self._automaton is None or age > settings.keyword_matcher_max_age:
+            self.load(db)
+
+    def match_text(self, text: str) -> dict[str, set[str]]:
+        """Abonnement-ID -> getroffene Stichwoerter fuer einen Text."""
+        if not self._automaton:
+            return {}
+        normalized = normalize_german(text)
+        matches: dict[str, set[str]] = {}
+        for end, index in self._automaton.search(normalized):
+            pattern = self._automaton.patterns[index]
+            start = end - len(pattern) + 1
+            at_word_start = normalized[start - 1] == " "
+            if not at_word_start and len(pattern) < settings.keyword_compound_min_len:
+                continue
+            for sub_id in self._subscribers[index]:
+                matches.setdefault(sub_id, set()).add(pattern)
+        return matches
+
+    def match_papers(self, db: Session, papers: Iterable[Paper]) -> dict[str, set[str]]:
+        """Paper-ID -> Abonnement-IDs fuer mehrere Vorlagen."""
+        self.ensure_loaded(db)
+        return {
+            paper.id: set(found)
+            for paper in papers
+            if (found := self.match_text(paper_match_text(paper)))
+        }
+
+
+def notify_keyword_subscribers(
+    db: Session,
+    papers: list[Paper],
+    matches: Optional[dict[str, set[str]]] = None,
+    min_digest_hours: int = 24,
+) -> int:
+    """
+    Neue/geaenderte Vorlagen gegen alle Keyword-Abonnements abgleichen und
+    Treffer per E-Mail melden (Digest-Schutz wie get_subscribers_for_keyword).
+
+    Args:
+        matches: bereits berechnetes Ergebnis von match_papers() (optional)
+
+    Returns:
+        Anzahl versendeter Benachrichtigungen
+    """
+    from app.services.email_service import BASE_URL, send_new_item_notification
+
+    if matches is None:
+        matches = keyword_matcher.match_papers(db, papers)
+    if not matches:
+        return 0
+
+    sub_ids = set().union(*matches.values())
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=min_digest_hours)
+    eligible = {
+        s.id: s
+        for s in db.query(Subscription).filter(
+            Subscription.id.in_(sub_ids),
+            Subscription.confirmed == True,  # noqa: E712
+            (Subscription.last_notified_at == None)  # noqa: E711
+            | (Subscription.last_notified_at < cutoff),
+        )
+    }
+
+    sent = 0
+    now = datetime.now(timezone.utc)
+    by_id = {p.id: p for p in papers}
+    for paper_id, paper_subs in matches.items():
+        recipients = [eligible[s] for s in paper_subs if s in eligible]
+        if not recipients:
+            continue
+        paper = by_id[paper_id]
+        title = " - ".join(p for p in (paper.reference, paper.name) if p)
+        send_new_item_notification(
+            recipients, title, f"{BASE_URL}/vorlagen/{paper.id}", item_type="Vorlage"
+        )
+        for sub in recipients:
+            sub.last_notified_at = now
+            # pro Digest-Zeitraum nur eine Benachrichtigung
+            eligible.pop(sub.id)
+        sent += len(recipients)
+    db.commit()
+    logger.info("Keyword-Abonnenten benachrichtigt", papers=len(papers), sent=sent)
+    return sent
+
+
+def _notify_page(since: datetime, last_id: str, limit: int, reload: bool) -> tuple[int, int, Optional[tuple]]:
+    """
+    Naechste Seite geaenderter Vorlagen nach dem Wasserstand abgleichen.
+
+    Returns:
+        (Vorlagen, Benachrichtigungen, neuer Wasserstand oder None)
+    """
+    db = SessionLocal()
+    try:
+        papers = (
+            db.query(Paper)
+            .filter(
+                Paper.deleted == False,  # noqa: E712
+                tuple_(Paper.modified, Paper.id) > tuple_(since, last_id),
+            )
+            .order_by(Paper.modified, Paper.id)
+            .limit(limit)
+            .all()
+        )
+        if not papers:
+            return 0, 0, None
+        if reload:
+            keyword_matcher.load(db)
+        matched = keyword_matcher.match_papers(db, papers)
+        sent = notify_keyword_subscribers(db, papers, matched) if matched else 0
+        return len(papers), sent, (papers[-1].modified, papers[-1].id)
+    finally:
+        db.close()
+
+
+class KeywordNotifier:
+    """Periodischer Abgleich neuer/geaenderter Vorlagen gegen die Stichwort-Abos."""
+
+    def __init__(self, redis: Optional[Redis] = None) -> None:
+        self._redis = redis
+        self._task: Optional[asyncio.Task] = None
+
+    def _client(self) -> Redis:
+        if self._redis is None:
+            self._redis = Redis.from_url(settings.redis_url, decode_responses=True)
+        return self._redis
+
+    def start(self) -> None:
+        """Abgleich alle keyword_notify_interval Sekunden starten."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop(settings.keyword_notify_interval))
+
+    async def stop(self) -> None:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    async def _loop(self, interval: int) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Stichwort-Abgleich fehlgeschlagen", error=str(e))
+
+    async def run_once(self) -> int:
+        """
+        Alle Vorlagen nach dem Wasserstand abgleichen; gibt die Anzahl der
+        Benachrichtigungen zurueck. Beim ersten Lauf wird nur der Wasserstand
+        gesetzt (der Bestand wird nicht gemeldet).
+        """
+        redis = self._client()
+        token = uuid.uuid4().hex
+        if not await redis.set(LOCK_KEY, token, nx=True, ex=max(settings.keyword_notify_interval, 60)):
+            return 0
+        try:
+            mark = await redis.hgetall(WATERMARK_KEY)
+            if not mark:
+                await redis.hset(WATERMARK_KEY, mapping={"modified": datetime.utcnow().isoformat(), "id": ""})
+                return 0
+            since, last_id = datetime.fromisoformat(mark["modified"]), mark["id"]
+            papers = sent = 0
+            while True:
+                count, notified, watermark = await asyncio.to_thread(
+                    _notify_page, since, last_id, settings.keyword_notify_batch_size, papers == 0
+                )
+                if watermark is None:
+                    break
+                papers += count
+                sent += notified
+                since, last_id = watermark
+                # Wasserstand je Seite sichern: bereits gemeldete Vorlagen nicht erneut melden
+                await redis.hset(WATERMARK_KEY, mapping={"modified": since.isoformat(), "id": last_id})
+                if count < settings.keyword_notify_batch_size:
+                    break
+            if papers:
+                logger.info("Stichwort-Abgleich abgeschlossen", papers=papers, sent=sent)
+            return sent
+        finally:
+            await release_lock(redis, LOCK_KEY, token)
+
+
+# Prozessweite Instanzen
+keyword_matcher = KeywordSubscriptionMatcher()
+keyword_notifier = KeywordNotifier()
@@ -0,0 +1,425 @@
+"""
+aitema|RIS - Passagen-Index fuer semantische Suche und RAG
+
+Vorlagen werden nicht nur als Ganzes (papers.embedding, Titel und
+Stichwoerter) eingebettet, sondern zusaetzlich in ueberlappende Abschnitte
+zerlegt, jeder mit eigenem Embedding in paper_passages:
+- Quelle "Vorlage": Titel, Art, Stichwoerter und KI-Zusammenfassung
+- Quelle Datei: extrahierter Volltext (File.text) von Hauptdatei und Anlagen
+- Abschnitte enden moeglichst an Satz- oder Absatzgrenzen
+  (settings.passage_chars, Ueberlappung settings.passage_overlap)
+- Embedding-Eingabe ist "<Titel>: <Abschnitt>"; unveraenderte Abschnitte
+  (gleicher Hash) uebernehmen ihr bisheriges Embedding
+
+Die Suche laeuft ueber den HNSW-Index auf paper_passages, mit derselben
+Quantisierung je Tenant und exaktem float32-Rerank wie die Vorlagensuche
+(Indizes: python -m app.scripts.vector_index sync); die Treffer werden wieder
+zu Vorlagen gruppiert (beste Passage bestimmt die Aehnlichkeit).
+Vorlagen, die noch nie indexiert wurden (passages_synced_at IS NULL), werden
+ueber papers.embedding ergaenzt, solange es sie gibt. Passagen geloeschter
+Vorlagen werden im Scan ausgeblendet und beim Indexieren entfernt.
+
+Indexierung: python -m app.scripts.index_passages
+"""
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field, replace
+from datetime import date, datetime
+from typing import Any, Iterable, Optional, Sequence
+
+import structlog
+from sqlalchemy import bindparam, text
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.models.oparl import Paper
+from app.services.embeddings import (
+    EMBEDDING_MODEL,
+    QUANTIZATIONS,
+    VectorFilter,
+    content_hash,
+    generate_embeddings,
+    is_zero_vector,
+    nearest_papers,
+    paper_embedding_text,
+    quantization_for_tenant,
+    set_vector_search_params,
+)
+from app.services.search_content import load_file_texts
+
+settings = get_settings()
+logger = structlog.get_logger()
+
+# Satzende (auch ; und :) oder Leerzeile
+_BOUNDARY = re.compile(r"(?<=[.!?;:])\s+|\n\s*\n")
+
+_EXISTING_SQL = text("""
+    SELECT paper_id, content_hash, CAST(embedding AS text) AS embedding
+    FROM paper_passages
+    WHERE paper_id IN :paper_ids AND embedding IS NOT NULL AND embedding_model = :model
+""").bindparams(bindparam("paper_ids", expanding=True))
+
+_DELETE_SQL = text(
+    "DELETE FROM paper_passages WHERE paper_id IN :paper_ids"
+).bindparams(bindparam("paper_ids", expanding=True))
+
+_INSERT_SQL = text("""
+    INSERT INTO paper_passages
+        (paper_id, file_id, tenant_id, chunk_index, content, content_hash, embedding, embedding_model)
+    VALUES
+        (:paper_id, :file_id, :tenant_id, :chunk_index, :content, :content_hash,
+         CAST(:embedding AS vector), :embedding_model)
+""")
+
+_PURGE_DELETED_SQL = text("""
+    DELETE FROM paper_passages pp
+    USING papers p
+    WHERE p.id = pp.paper_id AND p.deleted = true
+""")
+
+# Teilindex ix_papers_passages_pending (Migration 008): nach dem Backfill leer
+_HAS_UNSYNCED_SQL = text("""
+    SELECT EXISTS (
+        SELECT 1 FROM papers
+        WHERE tenant_id = :tenant_id AND deleted = false AND passages_synced_at IS NULL
+    )
+""")
+
+_MARK_SYNCED_SQL = text(
+    "UPDATE papers SET passages_synced_at = :synced_at WHERE id IN :paper_ids"
+).bindparams(bindparam("paper_ids", expanding=True))
+
+
+def _search_sql(filters: Optional[VectorFilter] = None, quantization: str = "none") -> str:
+    """Passagen-Treffer mit Vorlagen-Filtern im ANN-Scan, absteigend nach Aehnlichkeit.
+
+    Wie `vector_search_sql`: der ANN-Index der Quantisierung liefert
+    :candidates Passagen, danach wird exakt ueber die float32-Vektoren auf
+    :limit sortiert. Geloeschte Vorlagen werden im Scan ausgeschlossen, nicht
+    erst nach dem LIMIT, damit sie keine Kandidatenplaetze belegen.
+    """
+    q = QUANTIZATIONS[quantization]
+    conditions = "fp.deleted = false"
+    if filters:
+        conditions += f" AND {filters.sql('fp')}"
+    paper_filter = f"AND EXISTS (SELECT 1 FROM papers fp WHERE fp.id = pp.paper_id AND {conditions})"
+    return f"""
+        WITH candidates AS MATERIALIZED (
+            SELECT pp.id
+            FROM paper_passages pp
+            WHERE pp.embedding IS NOT NULL AND pp.embedding_model = :model
+              AND pp.tenant_id = :tenant_id {paper_filter}
+            ORDER BY {q.column} {q.operator} {q.query}
+            LIMIT :candidates
+        )
+        SELECT pp.paper_id, pp.file_id, pp.chunk_index, pp.content,
+               1 - (pp.embedding <=> CAST(:embedding AS vector)) AS similarity,
+               p.name, p.paper_type, p.date, p.reference, p.modified
+        FROM paper_passages pp
+        JOIN candidates c ON c.id = pp.id
+        JOIN papers p ON p.id = pp.paper_id
+        ORDER BY pp.embedding <=> CAST(:embedding AS vector)
+        LIMIT :limit
+    """
+
+
+# ============================================================
+# Zerlegung
+# ============================================================
+
+def _units(text_value: str, size: int) -> list[str]:
+    """Saetze/Absaetze mit normalisierten Leerzeichen; ueberlange hart an Wortgrenzen teilen."""
+    units = []
+    for piece in _BOUNDARY.split(text_value or ""):
+        piece = " ".join(piece.split())
+        while len(piece) > size:
+            cut = piece.rfind(" ", 0, size)
+            if cut <= 0:
+                cut = size
+            units.append(piece[:cut])
+            piece = piece[cut:].strip()
+        if piece:
+            units.append(piece)
+    return units
+
+
+def _joined_length(parts: list[str]) -> int:
+    return sum(map(len, parts)) + max(len(parts) - 1, 0)
+
+
+def split_passages(
+    text_value: Optional[str],
+    size: Optional[int] = None,
+    overlap: Optional[int] = None,
+) -> list[str]:
+    """Text in Abschnitte von hoechstens `size` Zeichen zerlegen.
+
+    Jeder Abschnitt beginnt mit den letzten Saetzen des vorherigen (bis zu
+    `overlap` Zeichen), damit Aussagen an Abschnittsgrenzen nicht verloren gehen.
+    """
+    size = size or settings.passage_chars
+    overlap = settings.passage_overlap if overlap is None else overlap
+
+    passages: list[str] = []
+    current: list[str] = []
+    for unit in _units(text_value or "", size):
+        if current and _joined_length([*current, unit]) > size:
+            passages.append(" ".join(current))
+            tail: list[str] = []
+            for previous in reversed(current):
+                if _joined_length([previous, *tail]) > overlap:
+                    break
+                tail.insert(0, previous)
+            if _joined_length([*tail, unit]) > size:
+                tail = []
+            current = tail
+        current.append(unit)
+    if current:
+        passages.append(" ".join(current))
+    return passages
+
+
+def paper_sources(paper: Any, file_texts: Sequence[tuple[str, str]] = ()) -> list[tuple[Optional[str], str]]:
+    """(file_id, Text) aller Quellen einer Vorlage; file_id None fuer die Vorlage selbst."""
+    own = paper_embedding_text(paper)
+    summary = (getattr(paper, "ai_summary", None) or "").strip()
+    if summary:
+        own = f"{own}\n\n{summary}" if own else summary
+    sources: list[tuple[Optional[str], str]] = []
+    if own.strip():
+        sources.append((None, own))
+    sources.extend(file_texts)
+    return sources
+
+
+def passage_embedding_text(title: Optional[str], content: str) -> str:
+    """Embedding-Eingabe: Titel als Kontext vor dem Abschnitt."""
+    return f"{title}: {content}" if title else content
+
+
+def build_passages(paper: Any, file_texts: Sequence[tuple[str, str]] = ()) -> list[dict]:
+    """Zeilen fuer paper_passages (ohne Embedding) aus allen Quellen einer Vorlage."""
+    rows = []
+    for file_id, source in paper_sources(paper, file_texts):
+        for index, content in enumerate(split_passages(source)):
+            embed_text = passage_embedding_text(paper.name, content)
+            rows.append({
+                "paper_id": paper.id,
+                "file_id": file_id,
+                "tenant_id": paper.tenant_id,
+                "chunk_index": index,
+                "content": content,
+                "content_hash": content_hash(embed_text),
+                "embed_text": embed_text,
+                "embedding": None,
+                "embedding_model": EMBEDDING_MODEL,
+            })
+    return rows
+
+
+# ============================================================
+# Indexierung
+# ============================================================
+
+def sync_passages(db: Session, papers: Sequence[Any]) -> dict[str, int]:
+    """Passagen eines Blocks Vorlagen neu aufbauen.
+
+    Abschnitte mit unveraendertem Hash uebernehmen ihr Embedding, nur neue
+    oder geaenderte werden eingebettet. Vorlagen, bei denen ein Embedding
+    fehlschlaegt, bleiben unsynchronisiert und werden beim naechsten Lauf
+    erneut versucht.
+    """
+    counters = {"papers": len(papers), "passages": 0, "embedded": 0, "reused": 0, "failed": 0}
+    if not papers:
+        return counters
+    paper_ids = [p.id for p in papers]
+
+    file_texts = load_file_texts(db, paper_ids, settings.passage_max_chars_per_file)
+    reuse = {
+        (row.paper_id, row.content_hash): row.embedding
+        for row in db.execute(_EXISTING_SQL, {"paper_ids": paper_ids, "model": EMBEDDING_MODEL})
+    }
+
+    rows: list[dict] = []
+    pending: list[dict] = []
+    for paper in papers:
+        for row in build_passages(paper, file_texts.get(paper.id, ())):
+            row["embedding"] = reuse.get((row["paper_id"], row["content_hash"]))
+            (pending if row["embedding"] is None else rows).append(row)
+    counters["reused"] = len(rows)
+
+    vectors = generate_embeddings([row["embed_text"] for row in pending], input_type="document")
+    failed_papers = set()
+    for row, vector in zip(pending, vectors):
+        if is_zero_vector(vector):
+            failed_papers.add(row["paper_id"])
+            counters["failed"] += 1
+        else:
+            row["embedding"] = f"[{','.join(map(str, vector))}]"
+            counters["embedded"] += 1
+        rows.append(row)
+    counters["passages"] = len(rows)
+
+    db.execute(_DELETE_SQL, {"paper_ids": paper_ids})
+    if rows:
+        db.execute(_INSERT_SQL, [{k: v for k, v in row.items() if k != "embed_text"} for row in rows])
+    synced = [paper_id for paper_id in paper_ids if paper_id not in failed_papers]
+    if synced:
+        db.execute(_MARK_SYNCED_SQL, {"paper_ids": synced, "synced_at": datetime.utcnow()})
+    db.commit()
+
+    if failed_papers:
+        logger.warning("Passagen ohne Embedding", papers=len(failed_papers), passages=counters["failed"])
+    return counters
+
+
+# ============================================================
+# Suche
+# ============================================================
+
+@dataclass
+class Passage:
+    file_id: Optional[str]
+    chunk_index: int
+    content: str
+    similarity: float
+
+
+@dataclass
+class PaperMatch:
+    """Vorlage mit ihren besten Passagen; `similarity` ist die der besten Passage."""
+
+    id: str
+    name: Optional[str]
+    paper_type: Optional[str]
+    date: Optional[date]
+    reference: Optional[str]
+    similarity: float
+    passages: list[Passage] = field(default_factory=list)
+    # Kontexttext: Passagen oder (Fallback) KI-Zusammenfassung
+    content: str = ""
+    modified: Optional[datetime] = None
+
+
+def group_passages(
+    rows: Iterable[Any],
+    limit: int,
+    per_paper: Optional[int] = None,
+    min_similarity: float = 0.0,
+) -> list[PaperMatch]:
+    """Passagen-Treffer (absteigend sortiert) zu Vorlagen zusammenfassen."""
+    per_paper = per_paper or settings.passage_per_paper
+    matches: dict[str, PaperMatch] = {}
+    for row in rows:
+        similarity = float(row.similarity)
+        if similarity < min_similarity:
+            continue
+        match = matches.get(row.paper_id)
+        if match is None:
+            if len(matches) >= limit:
+                continue
+            match = matches[row.paper_id] = PaperMatch(
+                id=row.paper_id, name=row.name, paper_type=row.paper_type,
+                date=row.date, reference=row.reference, similarity=similarity,
+                modified=getattr(row, "modified", None),
+            )
+        if len(match.passages) < per_paper:
+            match.passages.append(Passage(row.file_id, row.chunk_index, row.content, similarity))
+    for match in matches.values():
+        match.content = "\n[...]\n".join(p.content for p in match.passages)
+    return sorted(matches.values(), key=lambda m: m.similarity, reverse=True)
+
+
+def search_passages(
+    db: Session,
+    query_embedding: list[float],
+    tenant_id: str,
+    limit: int = 10,
+    min_similarity: float = 0.0,
+    per_paper: Optional[int] = None,
+    ef_search: Optional[int] = None,
+    filters: Optional[VectorFilter] = None,
+) -> list[PaperMatch]:
+    """Passagen-Suche, gruppiert zu hoechstens `limit` Vorlagen; Quantisierung je Tenant."""
+    quantization = quantization_for_tenant(tenant_id)
+    hits = limit * max(settings.passage_candidate_factor, 1)
+    candidates = hits if quantization == "none" else hits * max(settings.vector_rerank_factor, 1)
+    set_vector_search_params(db, candidates, ef_search)
+    params = {
+        "embedding": f"[{','.join(map(str, query_embedding))}]",
+        "model": EMBEDDING_MODEL,
+        "tenant_id": tenant_id,
+        "limit": hits,
+        "candidates": candidates,
+    }
+    if filters:
+        params.update(filters.params())
+    rows = db.execute(text(_search_sql(filters, quantization)), params).fetchall()
+    return group_passages(rows, limit, per_paper, min_similarity)
+
+
+def semantic_paper_search(
+    db: Session,
+    query_embedding: list[float],
+    tenant_id: str,
+    limit: int = 10,
+    min_similarity: float = 0.0,
+    ef_search: Optional[int] = None,
+    filters: Optional[VectorFilter] = None,
+) -> list[PaperMatch]:
+    """Vorlagen ueber ihre Passagen finden, noch nicht indexierte ueber papers.embedding.
+
+    Bei diesen ist `content` die KI-Zusammenfassung der Vorlage.
+    """
+    matches = search_passages(
+        db, query_embedding, tenant_id, limit, min_similarity, ef_search=ef_search, filters=filters
+    )
+    if not db.execute(_HAS_UNSYNCED_SQL, {"tenant_id": tenant_id}).scalar():
+        return matches
+    rows = nearest_papers(
+        db,
+        query_embedding,
+        tenant_id=tenant_id,
+        limit=limit,
+        columns="id, name, paper_type, date, reference, modified, COALESCE(ai_summary, '') AS content",
+        ef_search=ef_search,
+        filters=replace(filters or VectorFilter(), without_passages=True),
+    )
+    fallback = [
+        PaperMatch(
+            id=str(r.id), name=r.name, paper_type=r.paper_type, date=r.date,
+            reference=r.reference, similarity=float(r.similarity), content=r.content,
+            modified=r.modified,
+        )
+        for r in rows
+        if r.similarity >= min_similarity
+    ]
+    return sorted(matches + fallback, key=lambda m: m.similarity, reverse=True)[:limit]
+
+
+def pending_paper_ids(db: Session, after: str = "", limit: int = 50, rebuild: bool = False) -> list[str]:
+    """Vorlagen ohne aktuelle Passagen (Keyset-Paginierung ueber id)."""
+    condition = "" if rebuild else "AND (passages_synced_at IS NULL OR modified > passages_synced_at)"
+    return [
+        row.id for row in db.execute(
+            text(f"""
+                SELECT id FROM papers
+                WHERE deleted = false AND id > :after {condition}
+                ORDER BY id
+                LIMIT :limit
+            """),
+            {"after": after, "limit": limit},
+        )
+    ]
+
+
+def purge_deleted_passages(db: Session) -> int:
+    """Passagen geloeschter Vorlagen entfernen; gibt die Anzahl zurueck."""
+    purged = db.execute(_PURGE_DELETED_SQL).rowcount
+    db.commit()
+    return purged
+
+
+def load_papers(db: Session, paper_ids: list[str]) -> list[Paper]:
+    return db.query(Paper).filter(Paper.id.in_(paper_ids)).order_by(Paper.id).all()
@@ -0,0 +1,141 @@
+"""
+aitema|RIS - Cache fuer Query-Embeddings
+
+Wiederholte Suchanfragen (semantische Suche, hybride Suche, RAG-Chat)
+sollen nicht jedes Mal einen Voyage-Aufruf ausloesen:
+- Stufe 1: prozesslokaler LRU (settings.query_embedding_cache_size)
+- Stufe 2: Redis, geteilt ueber Worker (settings.query_embedding_cache_ttl)
+- Schluessel aus Modell und normalisiertem, kleingeschriebenem Suchbegriff;
+  eingebettet wird genau dieser Text, damit Schluessel und Wert zusammenpassen.
+  Ein Modellwechsel macht alte Eintraege automatisch unerreichbar
+- Vektoren als float32-Bytes, little-endian (4 KB statt ~20 KB JSON bei
+  1024 Dimensionen)
+- Zaehler fuer Treffer je Stufe und Fehlgriffe (GET /api/v1/search/semantic/status)
+
+Null-Vektoren (Embedding-Service nicht verfuegbar) werden nicht gecacht.
+Ist Redis nicht erreichbar, wird nur der LRU verwendet.
+"""
+from __future__ import annotations
+
+import hashlib
+import struct
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+
+import structlog
+from redis.asyncio import Redis
+
+from app.core.config import get_settings
+from app.services.embeddings import EMBEDDING_MODEL, generate_query_embedding_async, is_zero_vector
+from app.services.search_cache import normalize_query
+
+settings = get_settings()
+logger = structlog.get_logger()
+
+KEY_PREFIX = "embedding:query"
+
+
+def embedding_text(query: Optional[str]) -> str:
+    """Normalisierter, kleingeschriebener Suchbegriff (Cache-Key und Embedding-Eingabe)."""
+    return normalize_query(query).casefold()
+
+
+def make_cache_key(query: str, model: str = EMBEDDING_MODEL) -> str:
+    """Cache-Key aus Modell und normalisiertem, kleingeschriebenem Suchbegriff."""
+    digest = hashlib.sha256(embedding_text(query).encode("utf-8")).hexdigest()
+    return f"{KEY_PREFIX}:{model}:{digest}"
+
+
+def pack_vector(vector: list[float]) -> bytes:
+    """Vektor als float32-Bytes (little-endian, unabhaengig von der Plattform)."""
+    return struct.pack(f"<{len(vector)}f", *vector)
+
+
+def unpack_vector(data: bytes) -> list[float]:
+    return list(struct.unpack(f"<{len(data) // 4}f", data))
+
+
+class QueryEmbeddingCache:
+    """Zweistufiger Cache (LRU + Redis); eine Instanz pro Prozess."""
+
+    def __init__(self, redis: Optional[Redis] = None, maxsize: Optional[int] = None) -> None:
+        self._redis = redis
+        self._maxsize = maxsize or settings.query_embedding_cache_size
+        self._lru: OrderedDict[str, list[float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "redis_hits": 0, "misses": 0}
+
+    def _client(self) -> Redis:
+        if self._redis is None:
+            # Bytes statt Strings: Vektoren werden binaer abgelegt
+            self._redis = Redis.from_url(settings.redis_url)
+        return self._redis
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            self._stats[counter] += 1
+
+    def _lru_get(self, key: str) -> Optional[list[float]]:
+        with self._lock:
+            vector = self._lru.get(key)
+            if vector is not None:
+                self._lru.move_to_end(key)
+            return vector
+
+    def _lru_put(self, key: str, vector: list[float]) -> None:
+        with self._lock:
+            self._lru[key] = vector
+            self._lru.move_to_end(key)
+            while len(self._lru) > self._maxsize:
+                self._lru.popitem(last=False)
+
+    def stats(self) -> dict[str, Any]:
+        """Trefferzaehler dieses Prozesses."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._lru)
+        lookups = stats["memory_hits"] + stats["redis_hits"] + stats["misses"]
+        hits = stats["memory_hits"] + stats["redis_hits"]
+        stats["hit_rate"] = round(hits / lookups, 4) if lookups else 0.0
+        return stats
+
+    def clear(self) -> None:
+        with self._lock:
+            self._lru.clear()
+
+    async def get(self, query: str) -> list[float]:
+        """Query-Embedding aus dem Cache oder per Voyage-Aufruf."""
+        key = make_cache_key(query)
+
+        vector = self._lru_get(key)
+        if vector is not None:
+            self._count("memory_hits")
+            return vector
+
+        try:
+            data = await self._client().get(key)
+        except Exception as e:
+            logger.warning("Query-Embedding-Cache nicht verfuegbar", error=str(e))
+            data = None
+        if data:
+            vector = unpack_vector(data)
+            self._lru_put(key, vector)
+            self._count("redis_hits")
+            return vector
+
+        self._count("misses")
+        vector = await generate_query_embedding_async(embedding_text(query))
+        if is_zero_vector(vector):
+            return vector
+
+        self._lru_put(key, vector)
+        try:
+            await self._client().set(key, pack_vector(vector), ex=settings.query_embedding_cache_ttl)
+        except Exception as e:
+            logger.warning("Query-Embedding-Cache-Schreiben fehlgeschlagen", error=str(e))
+        return vector
+
+
+# Prozessweite Instanz
+query_embedding_cache = QueryEmbeddingCache()
@@ -0,0 +1,158 @@
+"""
+aitema|RIS - Antwort-Cache fuer den RAG-Chat
+
+Buerger stellen dieselbe Frage oft mehrfach ("Wann wird die Schule saniert?").
+Eine gespeicherte Antwort wird ohne Vektorsuche und Generierung erneut
+ausgeliefert, wenn
+- das Query-Embedding einer frueheren Frage im selben Geltungsbereich
+  (Tenant, Filter, Trefferzahl, Modelle) mindestens
+  settings.rag_answer_cache_threshold Cosinus-Aehnlichkeit hat und
+- alle damals verwendeten Quellen unveraendert sind (papers.modified wie beim
+  Speichern, nicht geloescht).
+
+Aendert sich eine Quelle, wird der Eintrag beim naechsten Zugriff verworfen.
+Neu hinzukommende Vorlagen kann der Cache nicht erkennen; dafuer laufen
+Eintraege nach settings.rag_answer_cache_ttl ab.
+
+Ablage in PostgreSQL (rag_answer_cache, Migration 009) mit HNSW-Index auf dem
+Query-Embedding, damit die Aehnlichkeitssuche nicht alle Eintraege liest.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Iterable, Optional
+
+import structlog
+from sqlalchemy import bindparam, text
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.services.embeddings import EMBEDDING_MODEL, VectorFilter, set_vector_search_params
+
+settings = get_settings()
+logger = structlog.get_logger()
+
+# Naechste Eintraege je Abfrage; veraltete werden uebersprungen und geloescht
+LOOKUP_CANDIDATES = 3
+
+_LOOKUP_SQL = text("""
+    SELECT id, answer, sources, source_stamps,
+           1 - (query_embedding <=> CAST(:embedding AS vector)) AS similarity
+    FROM rag_answer_cache
+    WHERE scope = :scope AND expires_at > now()
+    ORDER BY query_embedding <=> CAST(:embedding AS vector)
+    LIMIT :candidates
+""")
+
+_STAMPS_SQL = text(
+    "SELECT id, modified FROM papers WHERE id IN :ids AND deleted = false"
+).bindparams(bindparam("ids", expanding=True))
+
+_HIT_SQL = text("UPDATE rag_answer_cache SET hits = hits + 1 WHERE id = :id")
+
+_DELETE_SQL = text("DELETE FROM rag_answer_cache WHERE id IN :ids").bindparams(
+    bindparam("ids", expanding=True)
+)
+
+_PURGE_SQL = text("DELETE FROM rag_answer_cache WHERE expires_at <= now()")
+
+_INSERT_SQL = text("""
+    INSERT INTO rag_answer_cache
+        (scope, question, query_embedding, answer, sources, source_stamps, expires_at)
+    VALUES
+        (:scope, :question, CAST(:embedding AS vector), :answer,
+         CAST(:sources AS jsonb), CAST(:stamps AS jsonb),
+         now() + make_interval(secs => :ttl))
+""")
+
+
+@dataclass
+class CachedAnswer:
+    id: int
+    answer: str
+    sources: list[dict]
+    similarity: float
+
+
+def answer_scope(tenant_id: str, limit: int, filters: Optional[VectorFilter] = None) -> str:
+    """Geltungsbereich eines Eintrags: nur gleiche Tenants, Filter, Trefferzahl und Modelle."""
+    payload = {
+        "tenant_id": tenant_id,
+        "limit": limit,
+        "filters": filters.params() if filters else {},
+        "embedding_model": EMBEDDING_MODEL,
+        "rag_model": settings.rag_model,
+    }
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def _stamp(value: Optional[datetime]) -> str:
+    return value.isoformat() if value else ""
+
+
+def source_stamps(sources: Iterable[Any]) -> dict[str, str]:
+    """{paper_id: modified} der verwendeten Quellen (Objekte mit id und modified)."""
+    return {str(s.id): _stamp(s.modified) for s in sources}
+
+
+def _current_stamps(db: Session, ids: list[str]) -> dict[str, str]:
+    rows = db.execute(_STAMPS_SQL, {"ids": ids}).fetchall()
+    return {str(r.id): _stamp(r.modified) for r in rows}
+
+
+def lookup_answer(db: Session, scope: str, query_embedding: list[float]) -> Optional[CachedAnswer]:
+    """Gespeicherte Antwort zu einer aehnlichen Frage, sofern ihre Quellen unveraendert sind."""
+    set_vector_search_params(db, LOOKUP_CANDIDATES)
+    rows = db.execute(_LOOKUP_SQL, {
+        "embedding": f"[{','.join(map(str, query_embedding))}]",
+        "scope": scope,
+        "candidates": LOOKUP_CANDIDATES,
+    }).fetchall()
+
+    stale = []
+    hit = None
+    for row in rows:
+        if float(row.similarity) < settings.rag_answer_cache_threshold:
+            break
+        stamps = dict(row.source_stamps)
+        if _current_stamps(db, list(stamps)) != stamps:
+            stale.append(row.id)
+            continue
+        hit = CachedAnswer(row.id, row.answer, list(row.sources), float(row.similarity))
+        break
+
+    if stale:
+        db.execute(_DELETE_SQL, {"ids": stale})
+        logger.info("RAG-Antwort-Cache: veraltete Eintraege verworfen", count=len(stale))
+    if hit is not None:
+        db.execute(_HIT_SQL, {"id": hit.id})
+    if stale or hit is not None:
+        db.commit()
+    return hit
+
+
+def store_answer(
+    db: Session,
+    scope: str,
+    question: str,
+    query_embedding: list[float],
+    answer: str,
+    sources: list[dict],
+    stamps: dict[str, str],
+) -> None:
+    """Antwort mit Quellenliste und Quellenstaenden ablegen; abgelaufene Eintraege entfernen."""
+    db.execute(_PURGE_SQL)
+    db.execute(_INSERT_SQL, {
+        "scope": scope,
+        "question": question,
+        "embedding": f"[{','.join(map(str, query_embedding))}]",
+        "answer": answer,
+        "sources": json.dumps(sources),
+        "stamps": json.dumps(stamps),
+        "ttl": settings.rag_answer_cache_ttl,
+    })
+    db.commit()
@@ -0,0 +1,177 @@
+"""
+aitema|RIS - Kontextaufbau fuer den RAG-Chat
+
+Aus den gruppierten Treffern der Passagen-Suche wird der Prompt-Kontext
+innerhalb eines Token-Budgets (settings.rag_context_max_tokens) gepackt:
+- Einheiten sind die Passagen einer Vorlage (ohne Passagen-Index: ihre
+  KI-Zusammenfassung); nur Treffer ab settings.rag_context_min_similarity,
+  sonst die Einheiten der besten drei Vorlagen
+- Auswahl per Maximal Marginal Relevance: Relevanz (Aehnlichkeit zur Frage)
+  abzueglich der groessten Textaehnlichkeit zu bereits gewaehlten Passagen
+  (Jaccard ueber Wort-Trigramme), gewichtet mit settings.rag_context_mmr_lambda
+- Nahezu gleiche Passagen (z.B. dieselbe Anlage an mehreren Vorlagen) ab
+  settings.rag_context_duplicate_threshold werden verworfen
+- Tokens werden wie bei den Embeddings geschaetzt (~3 Zeichen pro Token);
+  die Kopfzeile einer Vorlage zaehlt einmal, sobald ihre erste Passage
+  gewaehlt ist
+
+Im Kontext stehen die Vorlagen in der Reihenfolge ihrer ersten Auswahl.
+"""
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+from app.core.config import get_settings
+from app.services.embeddings import CHARS_PER_TOKEN
+from app.services.passages import PaperMatch
+
+settings = get_settings()
+
+SEPARATOR = "\n\n---\n\n"
+PASSAGE_SEPARATOR = "\n[...]\n"
+# Ohne relevante Treffer: Einheiten der besten Vorlagen
+FALLBACK_PAPERS = 3
+SHINGLE_SIZE = 3
+
+_WORD = re.compile(r"\w+")
+
+
+def estimate_tokens(text_value: str) -> int:
+    return len(text_value) // CHARS_PER_TOKEN + 1
+
+
+def shingles(text_value: str, size: int = SHINGLE_SIZE) -> frozenset:
+    """Wort-n-Gramme (kleingeschrieben); kurze Texte als ein n-Gramm."""
+    words = [w.casefold() for w in _WORD.findall(text_value)]
+    if len(words) <= size:
+        return frozenset([tuple(words)]) if words else frozenset()
+    return frozenset(tuple(words[i:i + size]) for i in range(len(words) - size + 1))
+
+
+def jaccard(a: frozenset, b: frozenset) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+@dataclass
+class _Unit:
+    paper: PaperMatch
+    content: str
+    similarity: float
+    shingles: frozenset
+    tokens: int
+
+
+@dataclass
+class RagContext:
+    text: str
+    sources: list[dict]
+    tokens: int  # geschaetzte Tokens des Kontexts
+    passages: int  # gewaehlte Passagen
+    dropped: int = 0  # Kandidaten, die nicht gepackt wurden (Budget, Dubletten)
+
+
+def _header(paper: PaperMatch) -> str:
+    return f"**{paper.name or 'Ohne Titel'}** (Drucksache {paper.reference or '?'}, {paper.date})"
+
+
+def _units(rows: list[PaperMatch], min_similarity: float) -> list[_Unit]:
+    selected = [r for r in rows if r.similarity >= min_similarity] or rows[:FALLBACK_PAPERS]
+    units = []
+    for paper in selected:
+        # Passagen, sonst KI-Zusammenfassung bzw. Drucksachentyp als Fallback
+        pieces = [(p.content, p.similarity) for p in paper.passages] or [
+            (paper.content.strip() or paper.paper_type or "", paper.similarity)
+        ]
+        for content, similarity in pieces:
+            content = content.strip()
+            if content:
+                units.append(_Unit(paper, content, similarity, shingles(content), estimate_tokens(content)))
+    return units
+
+
+def _truncate(unit: _Unit, tokens: int) -> _Unit:
+    content = unit.content[: max(tokens - 1, 0) * CHARS_PER_TOKEN]
+    return _Unit(unit.paper, content, unit.similarity, unit.shingles, estimate_tokens(content))
+
+
+def select_mmr(
+    units: list[_Unit],
+    budget: int,
+    mmr_lambda: float,
+    duplicate_threshold: float,
+) -> tuple[list[_Unit], int]:
+    """Passagen per MMR waehlen, bis nichts mehr ins Budget passt.
+
+    Gibt die gewaehlten Einheiten (in Auswahlreihenfolge) und die genutzten
+    Tokens zurueck. Passt schon die erste Einheit nicht, wird sie gekuerzt.
+    """
+    remaining = list(units)
+    chosen: list[_Unit] = []
+    headers: set[str] = set()
+    used = 0
+    while remaining:
+        best, best_score, best_cost = None, None, 0
+        for unit in list(remaining):
+            redundancy = max((jaccard(unit.shingles, c.shingles) for c in chosen), default=0.0)
+            if redundancy >= duplicate_threshold:
+                remaining.remove(unit)
+                continue
+            cost = unit.tokens
+            if unit.paper.id not in headers:
+                cost += estimate_tokens(_header(unit.paper))
+            if used + cost > budget and chosen:
+                continue
+            score = mmr_lambda * unit.similarity - (1 - mmr_lambda) * redundancy
+            if best_score is None or score > best_score:
+                best, best_score, best_cost = unit, score, cost
+        if best is None:
+            break
+        remaining.remove(best)
+        if used + best_cost > budget:
+            best = _truncate(best, budget - (best_cost - best.tokens))
+            best_cost = budget
+        chosen.append(best)
+        headers.add(best.paper.id)
+        used += best_cost
+    return chosen, used
+
+
+def build_context(
+    rows: list[PaperMatch],
+    max_tokens: Optional[int] = None,
+    mmr_lambda: Optional[float] = None,
+) -> RagContext:
+    """Kontexttext und Quellenliste innerhalb des Token-Budgets."""
+    budget = max_tokens or settings.rag_context_max_tokens
+    lam = settings.rag_context_mmr_lambda if mmr_lambda is None else mmr_lambda
+    units = _units(rows, settings.rag_context_min_similarity)
+    chosen, _ = select_mmr(units, budget, lam, settings.rag_context_duplicate_threshold)
+
+    by_paper: dict[str, list[_Unit]] = {}
+    for unit in chosen:
+        by_paper.setdefault(unit.paper.id, []).append(unit)
+
+    parts = []
+    sources = []
+    for paper_units in by_paper.values():
+        paper = paper_units[0].paper
+        parts.append(_header(paper) + "\n" + PASSAGE_SEPARATOR.join(u.content for u in paper_units))
+        sources.append({
+            "id": paper.id,
+            "title": paper.name or "Ohne Titel",
+            "reference": paper.reference or "",
+            "date": str(paper.date) if paper.date else "",
+            "similarity": round(float(paper.similarity) * 100, 1),
+        })
+    text_value = SEPARATOR.join(parts)
+    return RagContext(
+        text=text_value,
+        sources=sources,
+        tokens=estimate_tokens(text_value) if text_value else 0,
+        passages=len(chosen),
+        dropped=len(units) - len(chosen),
+    )
@@ -0,0 +1,32 @@
+"""
+aitema|RIS - Gemeinsame Hilfen fuer Redis-Sperren und Wiederholungen
+
+Genutzt von den Hintergrundjobs (Embedding-Backfill, KI-Job-Queue,
+Batch-Kurzfassungen, Stichwort-Benachrichtigungen):
+- release_lock: Sperre nur freigeben, wenn sie noch dem eigenen Lauf gehoert
+- backoff_delay: exponentieller Backoff mit "full jitter"
+"""
+from __future__ import annotations
+
+import random
+
+from redis.asyncio import Redis
+
+# Sperre nur loeschen, wenn sie noch dem eigenen Lauf gehoert (atomar in Redis;
+# zwischen GET und DEL koennte sie sonst abgelaufen und neu vergeben sein)
+_RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Exponentieller Backoff mit "full jitter"."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+async def release_lock(redis: Redis, key: str, token: str) -> bool:
+    """Redis-Sperre freigeben, sofern sie noch `token` gehoert (Compare-and-Delete)."""
+    return bool(await redis.eval(_RELEASE_LOCK_SCRIPT, 1, key, token))
@@ -0,0 +1,91 @@
+"""
+aitema|RIS - Austauschbare Such-Backends
+
+Gemeinsame Schnittstelle fuer die Volltextsuche:
+- SearchService (search_service.py)            - Elasticsearch 8.x
+- PostgresSearchService (search_postgres.py)   - PostgreSQL tsvector/GIN
+
+Beide liefern dasselbe SearchResult, /api/v1/search funktioniert mit beiden.
+Die Auswahl erfolgt global ueber settings.search_backend und kann je Tenant
+ueber settings.search_backend_tenants ueberschrieben werden.
+"""
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+
+if TYPE_CHECKING:
+    from app.services.search_service import SearchResult
+
+settings = get_settings()
+
+BACKEND_ELASTICSEARCH = "elasticsearch"
+BACKEND_POSTGRES = "postgres"
+
+
+class SearchBackend(ABC):
+    """Schnittstelle eines Such-Backends."""
+
+    name: str = ""
+
+    @abstractmethod
+    async def search(
+        self,
+        query: str,
+        types: Optional[list[str]] = None,
+        tenant_id: Optional[str] = None,
+        body_id: Optional[str] = None,
+        gremium: Optional[str] = None,
+        year: Optional[int] = None,
+        status: Optional[str] = None,
+        page: int = 1,
+        size: int = 20,
+        cursor: Optional[str] = None,
+        facets: Optional[list[str]] = None,
+    ) -> "SearchResult":
+        """Volltextsuche; Parameter wie SearchService.search()."""
+
+    @abstractmethod
+    async def autocomplete(
+        self,
+        prefix: str,
+        type: Optional[str] = None,
+        limit: int = 8,
+        tenant_id: Optional[str] = None,
+    ) -> list[dict]:
+        """Typeahead-Vorschlaege als Liste von {id, type, name, reference, ...}."""
+
+    async def close(self) -> None:
+        """Ressourcen freigeben (Standard: nichts zu tun)."""
+
+
+def backend_name_for_tenant(tenant_id: Optional[str]) -> str:
+    """Konfiguriertes Backend fuer einen Tenant (Fallback: settings.search_backend)."""
+    if tenant_id:
+        override = settings.search_backend_overrides.get(tenant_id)
+        if override:
+            return override
+    return settings.search_backend
+
+
+def get_search_backend(tenant_id: Optional[str], db: Optional[Session] = None) -> SearchBackend:
+    """
+    Such-Backend fuer einen Tenant erzeugen.
+
+    Das PostgreSQL-Backend benoetigt eine DB-Session; der Aufrufer bleibt fuer
+    deren Lebenszyklus verantwortlich und ruft wie gewohnt `close()` auf.
+    """
+    name = backend_name_for_tenant(tenant_id)
+    if name == BACKEND_POSTGRES:
+        if db is None:
+            raise ValueError("PostgreSQL-Suchbackend benoetigt eine DB-Session")
+        from app.services.search_postgres import PostgresSearchService
+        return PostgresSearchService(db)
+    if name != BACKEND_ELASTICSEARCH:
+        raise ValueError(f"Unbekanntes Suchbackend: {name}")
+    from app.services.search_service import SearchService
+    return SearchService()
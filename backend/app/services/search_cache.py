@@ -0,0 +1,179 @@
+"""
+aitema|RIS - Ergebnis-Cache fuer die Volltextsuche
+
+Redis-basierter Cache vor SearchService.search():
+- Cache-Key aus normalisiertem Suchbegriff, Typen, Filtern und Seite
+- Index-Generation: jede Index-Aenderung erhoeht einen Zaehler in Redis,
+  Eintraege aus aelteren Generationen gelten sofort als ungueltig
+- TTL (settings.search_cache_ttl) als Obergrenze der Lebensdauer
+- Single-Flight: gleichzeitige identische Cache-Misses loesen nur eine
+  Elasticsearch-Anfrage aus (im Prozess per Task, ueber Worker per Redis-Lock)
+
+Ist Redis nicht erreichbar, wird ohne Cache weitergearbeitet.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import unicodedata
+from typing import Any, Awaitable, Callable, Optional
+
+import structlog
+from redis.asyncio import Redis
+
+from app.core.config import get_settings
+
+settings = get_settings()
+logger = structlog.get_logger()
+
+GENERATION_KEY = "search:generation"
+RESULT_KEY_PREFIX = "search:result"
+LOCK_KEY_PREFIX = "search:lock"
+
+# Wartezeit zwischen zwei Cache-Abfragen, waehrend ein anderer Worker rechnet
+_LOCK_POLL_INTERVAL = 0.05
+
+
+def normalize_query(query: Optional[str]) -> str:
+    """
+    Suchbegriff fuer den Cache-Key vereinheitlichen.
+
+    Unicode-Normalform und Leerzeichen werden angeglichen. Gross-/Kleinschreibung
+    bleibt erhalten, da `reference` als keyword-Feld case-sensitiv matcht.
+    """
+    q = unicodedata.normalize("NFC", query or "")
+    return " ".join(q.split())
+
+
+def make_cache_key(params: dict[str, Any]) -> str:
+    """Stabilen Cache-Key aus den Suchparametern bilden."""
+    canonical = json.dumps(params, sort_keys=True, separators=(",", ":"), default=str)
+    digest = hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+    return f"{RESULT_KEY_PREFIX}:{digest}"
+
+
+class SearchCache:
+    """
+    Suchergebnis-Cache mit Generationszaehler und Single-Flight.
+
+    Eine Instanz pro Prozess (siehe `search_cache`), da SearchService
+    pro Request neu erzeugt wird.
+    """
+
+    def __init__(self, redis: Optional[Redis] = None) -> None:
+        self._redis = redis
+        self._inflight: dict[str, asyncio.Task] = {}
+
+    def _client(self) -> Redis:
+        if self._redis is None:
+            self._redis = Redis.from_url(settings.redis_url, decode_responses=True)
+        return self._redis
+
+    # ----------------------------------------
+    # Index-Generation
+    # ----------------------------------------
+
+    async def bump_generation(self) -> None:
+        """Alle gecachten Ergebnisse invalidieren (nach Index-Aenderungen)."""
+        try:
+            generation = await self._client().incr(GENERATION_KEY)
+            logger.debug("Such-Cache invalidiert", generation=generation)
+        except Exception as e:
+            logger.warning("Such-Cache-Invalidierung fehlgeschlagen", error=str(e))
+
+    # ----------------------------------------
+    # Lesen / Schreiben
+    # ----------------------------------------
+
+    async def _lookup(self, key: str) -> tuple[int, Optional[dict]]:
+        """Aktuelle Generation und ggf. gueltigen Eintrag in einem Roundtrip lesen."""
+        generation_raw, entry_raw = await self._client().mget(GENERATION_KEY, key)
+        generation = int(generation_raw or 0)
+        if entry_raw is None:
+            return generation, None
+        entry = json.loads(entry_raw)
+        if entry.get("generation") != generation:
+            return generation, None
+        return generation, entry["result"]
+
+    async def _store(self, key: str, generation: int, result: dict) -> None:
+        payload = json.dumps({"generation": generation, "result": result}, default=str)
+        await self._client().set(key, payload, ex=settings.search_cache_ttl)
+
+    async def get_or_compute(
+        self,
+        params: dict[str, Any],
+        compute: Callable[[], Awaitable[dict]],
+    ) -> dict:
+        """
+        Ergebnis aus dem Cache liefern oder `compute()` genau einmal ausfuehren.
+
+        Exceptions aus `compute()` werden nicht gecacht, sondern an alle
+        wartenden Aufrufer weitergereicht.
+        """
+        if not settings.search_cache_enabled:
+            return await compute()
+
+        key = make_cache_key(params)
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._load(key, compute))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _t: self._inflight.pop(key, None))
+        # shield: bricht ein Client ab, laeuft die Anfrage fuer die anderen weiter
+        return await asyncio.shield(task)
+
+    async def _load(self, key: str, compute: Callable[[], Awaitable[dict]]) -> dict:
+        try:
+            generation, cached = await self._lookup(key)
+        except Exception as e:
+            logger.warning("Such-Cache nicht verfuegbar", error=str(e))
+            return await compute()
+
+        if cached is not None:
+            return cached
+
+        lock_key = f"{LOCK_KEY_PREFIX}:{key}"
+        try:
+            locked = await self._client().set(
+                lock_key, "1", nx=True, ex=settings.search_cache_lock_ttl
+            )
+        except Exception:
+            locked = True
+
+        if not locked:
+            # Ein anderer Worker berechnet dasselbe Ergebnis - kurz auf den Cache warten
+            cached = await self._wait_for_peer(key)
+            if cached is not None:
+                return cached
+
+        try:
+            result = await compute()
+            try:
+                await self._store(key, generation, result)
+            except Exception as e:
+                logger.warning("Such-Cache-Schreiben fehlgeschlagen", error=str(e))
+            return result
+        finally:
+            if locked:
+                try:
+                    await self._client().delete(lock_key)
+                except Exception:
+                    pass
+
+    async def _wait_for_peer(self, key: str) -> Optional[dict]:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.search_cache_lock_ttl
+        while loop.time() < deadline:
+            await asyncio.sleep(_LOCK_POLL_INTERVAL)
+            try:
+                _, cached = await self._lookup(key)
+            except Exception:
+                return None
+            if cached is not None:
+                return cached
+        return None
+
+
+search_cache = SearchCache()
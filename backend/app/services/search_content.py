@@ -0,0 +1,166 @@
+"""
+aitema|RIS - Dateitexte fuer den Such-Index
+
+Fuellt das `content`-Feld in ris_papers mit den extrahierten Volltexten
+(File.text, Tika-Ausgabe aus DMSService._extract_text) von Hauptdatei und
+Anlagen einer Vorlage.
+
+Speicherbedarf bleibt auch bei Vorlagen mit hunderten Anlagen begrenzt:
+- Vorlagen werden blockweise per Keyset-Paginierung gelesen
+- Dateitexte werden bereits in PostgreSQL per substr() gekuerzt
+- Dateitexte werden serverseitig gestreamt (stream_results / yield_per)
+- pro Vorlage werden hoechstens search_content_max_chars Zeichen gesammelt,
+  weitere Anlagen werden beim Streamen verworfen
+"""
+from __future__ import annotations
+
+from typing import Any, Iterable, Iterator, Optional
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.models.oparl import Paper
+
+settings = get_settings()
+
+# Zeilen pro Fetch beim Streamen der Dateitexte
+_FILE_TEXT_FETCH_SIZE = 50
+
+_FILE_TEXTS_SQL = text("""
+    SELECT p.id AS paper_id, 0 AS ord, f.id AS file_id,
+           substr(f.text, 1, :max_chars_per_file) AS text
+    FROM papers p
+    JOIN files f ON f.id = p.main_file_id
+    WHERE p.id IN :paper_ids AND f.text IS NOT NULL AND f.deleted = false
+    UNION ALL
+    SELECT pf.paper_id AS paper_id, 1 AS ord, f.id AS file_id,
+           substr(f.text, 1, :max_chars_per_file) AS text
+    FROM paper_file pf
+    JOIN files f ON f.id = pf.file_id
+    WHERE pf.paper_id IN :paper_ids AND f.text IS NOT NULL AND f.deleted = false
+    ORDER BY paper_id, ord, file_id
+""").bindparams(bindparam("paper_ids", expanding=True))
+
+
+def collect_contents(
+    rows: Iterable[tuple[str, Optional[str]]],
+    max_chars: int,
+) -> dict[str, list[str]]:
+    """
+    (paper_id, text)-Zeilen zu Textabschnitten je Vorlage zusammenfassen.
+
+    Pro Vorlage werden hoechstens `max_chars` Zeichen uebernommen; der letzte
+    Abschnitt wird ggf. gekuerzt, alle weiteren verworfen.
+    """
+    contents: dict[str, list[str]] = {}
+    used: dict[str, int] = {}
+    for paper_id, file_text in rows:
+        file_text = (file_text or "").strip()
+        if not file_text:
+            continue
+        remaining = max_chars - used.get(paper_id, 0)
+        if remaining <= 0:
+            continue
+        part = file_text[:remaining]
+        contents.setdefault(paper_id, []).append(part)
+        used[paper_id] = used.get(paper_id, 0) + len(part)
+    return contents
+
+
+def _iter_file_texts(
+    db: Session,
+    paper_ids: list[str],
+    max_chars_per_file: Optional[int] = None,
+) -> Iterator[Any]:
+    """Gekuerzte Dateitext-Zeilen (paper_id, file_id, text) serverseitig streamen."""
+    result = db.execute(
+        _FILE_TEXTS_SQL.execution_options(
+            stream_results=True, yield_per=_FILE_TEXT_FETCH_SIZE
+        ),
+        {
+            "paper_ids": paper_ids,
+            "max_chars_per_file": max_chars_per_file or settings.search_content_max_chars_per_file,
+        },
+    )
+    try:
+        yield from result
+    finally:
+        result.close()
+
+
+def load_paper_contents(
+    db: Session,
+    paper_ids: list[str],
+    max_chars_per_file: Optional[int] = None,
+    max_chars: Optional[int] = None,
+) -> dict[str, list[str]]:
+    """Gekuerzte Dateitexte (Hauptdatei zuerst, dann Anlagen) fuer einen Block Vorlagen."""
+    if not paper_ids:
+        return {}
+    return collect_contents(
+        ((row.paper_id, row.text) for row in _iter_file_texts(db, paper_ids, max_chars_per_file)),
+        max_chars or settings.search_content_max_chars,
+    )
+
+
+def load_file_texts(
+    db: Session,
+    paper_ids: list[str],
+    max_chars_per_file: Optional[int] = None,
+) -> dict[str, list[tuple[str, str]]]:
+    """(file_id, Text) je Vorlage, Hauptdatei zuerst, dann Anlagen (Passagen-Index)."""
+    if not paper_ids:
+        return {}
+    texts: dict[str, list[tuple[str, str]]] = {}
+    for row in _iter_file_texts(db, paper_ids, max_chars_per_file):
+        if row.text and row.text.strip():
+            texts.setdefault(row.paper_id, []).append((row.file_id, row.text))
+    return texts
+
+
+def paper_to_document(paper: Paper, content: Optional[list[str]] = None) -> dict:
+    """Paper-Modell in ein ES-Dokument fuer ris_papers ueberfuehren."""
+    return {
+        "oparl_id": paper.id,
+        "oparl_type": "paper",
+        "body_id": paper.body_id,
+        "tenant_id": getattr(paper, "tenant_id", "public"),
+        "name": paper.name,
+        "reference": paper.reference,
+        "paper_type": paper.paper_type,
+        "keywords": paper.keyword or [],
+        "content": content or [],
+        "date": paper.date.isoformat() if paper.date else None,
+        "created": paper.created.isoformat() if paper.created else None,
+        "modified": paper.modified.isoformat() if paper.modified else None,
+    }
+
+
+def iter_paper_documents(
+    db: Session,
+    batch_size: Optional[int] = None,
+) -> Iterator[dict]:
+    """
+    Alle nicht geloeschten Vorlagen inkl. Dateitexten als ES-Dokumente liefern.
+
+    Generator fuer SearchService.index_all_papers(): es liegt immer nur ein
+    Block von `batch_size` Vorlagen samt Texten im Speicher.
+    """
+    batch_size = batch_size or settings.search_content_batch_size
+    last_id: Optional[str] = None
+    while True:
+        query = db.query(Paper).filter(Paper.deleted == False)  # noqa: E712
+        if last_id is not None:
+            query = query.filter(Paper.id > last_id)
+        batch = query.order_by(Paper.id).limit(batch_size).all()
+        if not batch:
+            return
+
+        contents = load_paper_contents(db, [p.id for p in batch])
+        for paper in batch:
+            yield paper_to_document(paper, contents.get(paper.id))
+
+        last_id = batch[-1].id
+        # Identity-Map leeren, damit bereits indexierte Papers freigegeben werden
+        db.expunge_all()
@@ -0,0 +1,347 @@
+"""
+aitema|RIS - PostgreSQL-Volltextsuche
+
+Drop-in-Alternative zu SearchService fuer Installationen ohne Elasticsearch:
+- generierte tsvector-Spalten `search_vector` (Konfiguration 'german') mit
+  GIN-Indizes auf papers, meetings, persons (Migration 004)
+- Ranking via ts_rank, Highlighting via ts_headline (<mark>-Tags)
+- Facetten per SQL-Aggregation (gleiche Namen wie SEARCH_AGGREGATIONS)
+- Autocomplete via Praefix-tsquery (`wort:*`)
+
+Liefert dasselbe SearchResult wie das Elasticsearch-Backend.
+"""
+from __future__ import annotations
+
+import asyncio
+import re
+from typing import Any, Optional
+
+import structlog
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.services.search_backend import BACKEND_POSTGRES, SearchBackend
+from app.services.search_cache import normalize_query
+from app.services.search_service import SEARCH_AGGREGATIONS, SearchResult
+
+logger = structlog.get_logger()
+
+# Ein SELECT je OParl-Typ; alle liefern dieselben Spalten fuer UNION ALL.
+# {score} / {match} werden je nach Suchbegriff durch ts_rank bzw. @@ ersetzt.
+_TYPE_SELECTS: dict[str, str] = {
+    "paper": """
+        SELECT 'paper' AS type, p.id, p.name, p.reference, p.date AS date,
+               p.paper_type, NULL AS meeting_state, NULL AS organization_name,
+               p.body_id, p.tenant_id, p.modified, {score} AS score
+        FROM papers p CROSS JOIN q
+        WHERE p.deleted = false {match}
+    """,
+    "meeting": """
+        SELECT 'meeting', m.id, m.name, NULL, CAST(m.start AS date),
+               NULL, m.meeting_state, o.name,
+               m.body_id, m.tenant_id, m.modified, {score}
+        FROM meetings m
+        LEFT JOIN organizations o ON o.id = m.organization_id
+        CROSS JOIN q
+        WHERE m.deleted = false {match}
+    """,
+    "person": """
+        SELECT 'person', pe.id,
+               COALESCE(NULLIF(concat_ws(' ', pe.given_name, pe.family_name), ''), pe.name),
+               NULL, CAST(NULL AS date), NULL, NULL, NULL,
+               pe.body_id, pe.tenant_id, pe.modified, {score}
+        FROM persons pe CROSS JOIN q
+        WHERE pe.deleted = false {match}
+    """,
+}
+
+_TABLE_ALIAS = {"paper": "p", "meeting": "m", "person": "pe"}
+
+# Bucket-Groessen analog zu den ES-terms-Aggregationen
+_FACET_SQL: dict[str, tuple[str, Optional[int]]] = {
+    "by_type": ("SELECT type AS key, count(*) AS cnt FROM filtered GROUP BY type", 10),
+    "by_paper_type": (
+        "SELECT paper_type AS key, count(*) AS cnt FROM filtered "
+        "WHERE paper_type IS NOT NULL GROUP BY paper_type", 20,
+    ),
+    "by_organization": (
+        "SELECT organization_name AS key, count(*) AS cnt FROM filtered "
+        "WHERE organization_name IS NOT NULL GROUP BY organization_name", 20,
+    ),
+    "by_meeting_state": (
+        "SELECT meeting_state AS key, count(*) AS cnt FROM filtered "
+        "WHERE meeting_state IS NOT NULL GROUP BY meeting_state", 10,
+    ),
+    # wie der ES date_histogram auf "date": nur Vorlagen
+    "by_year": (
+        "SELECT to_char(date, 'YYYY') AS key, count(*) AS cnt FROM filtered "
+        "WHERE type = 'paper' AND date IS NOT NULL GROUP BY 1", None,
+    ),
+}
+
+_HEADLINE_OPTIONS = "StartSel=<mark>, StopSel=</mark>, HighlightAll=true"
+
+
+def _prefix_tsquery(prefix: str) -> Optional[str]:
+    """Eingabe in eine Praefix-tsquery ('haus & plan:*') ueberfuehren."""
+    tokens = re.findall(r"\w+", prefix.lower())
+    if not tokens:
+        return None
+    return " & ".join(tokens[:-1] + [tokens[-1] + ":*"])
+
+
+class PostgresSearchService(SearchBackend):
+    """PostgreSQL-Volltextsuche (tsvector/GIN) mit SearchService-kompatibler API."""
+
+    name = BACKEND_POSTGRES
+
+    def __init__(self, db: Session) -> None:
+        self.db = db
+
+    # ----------------------------------------
+    # SQL-Bausteine
+    # ----------------------------------------
+
+    def _matches_cte(self, types: Optional[list[str]], has_query: bool, q_expr: str) -> str:
+        """CTEs `q` (tsquery) und `matches` (UNION ALL ueber die Typen)."""
+        selected = [t for t in (types or []) if t in _TYPE_SELECTS] or list(_TYPE_SELECTS)
+        parts = []
+        for t in selected:
+            alias = _TABLE_ALIAS[t]
+            if has_query:
+                score = f"ts_rank({alias}.search_vector, q.query)"
+                match = f"AND {alias}.search_vector @@ q.query"
+            else:
+                score, match = "0.0", ""
+            parts.append(_TYPE_SELECTS[t].format(score=score, match=match))
+        return (
+            f"WITH q AS (SELECT {q_expr} AS query), "
+            f"matches AS ({' UNION ALL '.join(parts)})"
+        )
+
+    @staticmethod
+    def _filter_sql(
+        tenant_id: Optional[str],
+        body_id: Optional[str],
+        gremium: Optional[str],
+        year: Optional[int],
+        status: Optional[str],
+    ) -> tuple[str, dict[str, Any]]:
+        """WHERE-Klausel auf `matches` (Semantik wie _build_filter_clauses)."""
+        clauses = ["TRUE"]
+        params: dict[str, Any] = {}
+        if tenant_id:
+            clauses.append("tenant_id = :tenant_id")
+            params["tenant_id"] = tenant_id
+        if body_id:
+            clauses.append("body_id = :body_id")
+            params["body_id"] = body_id
+        if gremium:
+            clauses.append("organization_name = :gremium")
+            params["gremium"] = gremium
+        if status:
+            clauses.append("(meeting_state = :status OR paper_type = :status)")
+            params["status"] = status
+        if year:
+            clauses.append("date >= make_date(:year, 1, 1) AND date <= make_date(:year, 12, 31)")
+            params["year"] = year
+        return " AND ".join(clauses), params
+
+    # ----------------------------------------
+    # Suche
+    # ----------------------------------------
+
+    async def search(
+        self,
+        query: str,
+        types: Optional[list[str]] = None,
+        tenant_id: Optional[str] = None,
+        body_id: Optional[str] = None,
+        gremium: Optional[str] = None,
+        year: Optional[int] = None,
+        status: Optional[str] = None,
+        page: int = 1,
+        size: int = 20,
+        cursor: Optional[str] = None,
+        facets: Optional[list[str]] = None,
+    ) -> SearchResult:
+        """
+        Volltextsuche ueber Papers, Meetings und Personen in PostgreSQL.
+
+        Raises:
+            ValueError: bei Cursor-Paginierung (nur Elasticsearch) oder
+                        unbekannter Facette
+        """
+        if cursor is not None:
+            raise ValueError("Cursor-Paginierung wird nur vom Elasticsearch-Backend unterstuetzt")
+        facet_names = sorted(set(facets or []))
+        unknown = [f for f in facet_names if f not in SEARCH_AGGREGATIONS]
+        if unknown:
+            raise ValueError(f"Unbekannte Facette(n): {', '.join(unknown)}")
+
+        query = normalize_query(query)
+        try:
+            # Synchrone Session nicht im Event-Loop blockieren
+            return await asyncio.to_thread(
+                self._search_sync, query, types, tenant_id, body_id, gremium,
+                year, status, page, size, facet_names,
+            )
+        except Exception as e:
+            self.db.rollback()
+            logger.error("PostgreSQL-Suche fehlgeschlagen", error=str(e), query=query)
+            return SearchResult(data=[], total=0, page=page, per_page=size, facets={}, error=type(e).__name__)
+
+    def _search_sync(
+        self,
+        query: str,
+        types: Optional[list[str]],
+        tenant_id: Optional[str],
+        body_id: Optional[str],
+        gremium: Optional[str],
+        year: Optional[int],
+        status: Optional[str],
+        page: int,
+        size: int,
+        facet_names: list[str],
+    ) -> SearchResult:
+        has_query = bool(query) and query != "*"
+        cte = self._matches_cte(types, has_query, "websearch_to_tsquery('german', :q)")
+        where, params = self._filter_sql(tenant_id, body_id, gremium, year, status)
+        params["q"] = query if has_query else ""
+
+        rows = self.db.execute(
+            text(f"""
+                {cte}
+                SELECT page.*,
+                       ts_headline('german', COALESCE(page.name, ''), q.query, :hl_opts) AS hl_name
+                FROM (
+                    SELECT matches.*, count(*) OVER () AS total_count
+                    FROM matches
+                    WHERE {where}
+                    ORDER BY score DESC, modified DESC NULLS LAST, id
+                    LIMIT :limit OFFSET :offset
+                ) page
+                CROSS JOIN q
+                ORDER BY page.score DESC, page.modified DESC NULLS LAST, page.id
+            """),
+            {**params, "hl_opts": _HEADLINE_OPTIONS, "limit": size, "offset": (page - 1) * size},
+        ).fetchall()
+
+        if rows:
+            total = int(rows[0].total_count)
+        elif page > 1:
+            total = self.db.execute(
+                text(f"{cte} SELECT count(*) FROM matches WHERE {where}"), params
+            ).scalar() or 0
+        else:
+            total = 0
+
+        data = []
+        for r in rows:
+            item: dict[str, Any] = {
+                "id": r.id,
+                "type": r.type,
+                "name": r.name,
+                "reference": r.reference,
+                "date": r.date.isoformat() if r.date else None,
+                "paper_type": r.paper_type,
+                "meeting_state": r.meeting_state,
+                "organization_name": r.organization_name,
+                "score": float(r.score or 0),
+            }
+            if has_query and r.hl_name and "<mark>" in r.hl_name:
+                item["highlight"] = {"name": [r.hl_name]}
+            data.append(item)
+
+        facets = self._facets_sync(cte, where, params, facet_names) if facet_names else {}
+        return SearchResult(data=data, total=total, page=page, per_page=size, facets=facets)
+
+    def _facets_sync(
+        self,
+        cte: str,
+        where: str,
+        params: dict[str, Any],
+        facet_names: list[str],
+    ) -> dict[str, Any]:
+        """Alle angeforderten Facetten in einem Statement berechnen."""
+        selects = [
+            f"SELECT '{name}' AS facet, CAST(key AS text) AS key, cnt "
+            f"FROM ({_FACET_SQL[name][0]}) AS f_{name}"
+            for name in facet_names
+        ]
+        rows = self.db.execute(
+            text(f"""
+                {cte}, filtered AS (SELECT * FROM matches WHERE {where})
+                {' UNION ALL '.join(selects)}
+            """),
+            params,
+        ).fetchall()
+
+        facets: dict[str, list[dict]] = {name: [] for name in facet_names}
+        for r in rows:
+            facets[r.facet].append({"key": r.key, "count": int(r.cnt)})
+        for name, buckets in facets.items():
+            limit = _FACET_SQL[name][1]
+            if limit is None:
+                buckets.sort(key=lambda b: b["key"])
+            else:
+                buckets.sort(key=lambda b: (-b["count"], b["key"]))
+                del buckets[limit:]
+        return facets
+
+    # ----------------------------------------
+    # Autocomplete
+    # ----------------------------------------
+
+    async def autocomplete(
+        self,
+        prefix: str,
+        type: Optional[str] = None,
+        limit: int = 8,
+        tenant_id: Optional[str] = None,
+    ) -> list[dict]:
+        """Typeahead-Vorschlaege via Praefix-tsquery."""
+        tsquery = _prefix_tsquery(prefix)
+        if len(prefix) < 3 or not tsquery:
+            return []
+        try:
+            return await asyncio.to_thread(
+                self._autocomplete_sync, tsquery, type, limit, tenant_id
+            )
+        except Exception as e:
+            self.db.rollback()
+            logger.error("PostgreSQL-Autocomplete fehlgeschlagen", error=str(e))
+            return []
+
+    def _autocomplete_sync(
+        self,
+        tsquery: str,
+        type: Optional[str],
+        limit: int,
+        tenant_id: Optional[str],
+    ) -> list[dict]:
+        cte = self._matches_cte([type] if type else None, True, "to_tsquery('german', :tsq)")
+        where, params = self._filter_sql(tenant_id, None, None, None, None)
+        rows = self.db.execute(
+            text(f"""
+                {cte}
+                SELECT id, type, name, reference, paper_type, meeting_state, score
+                FROM matches
+                WHERE {where}
+                ORDER BY score DESC, modified DESC NULLS LAST
+                LIMIT :limit
+            """),
+            {**params, "tsq": tsquery, "limit": limit},
+        ).fetchall()
+        return [
+            {
+                "id": r.id,
+                "type": r.type,
+                "name": r.name,
+                "reference": r.reference,
+                "paper_type": r.paper_type,
+                "meeting_state": r.meeting_state,
+                "score": float(r.score or 0),
+            }
+            for r in rows
+        ]
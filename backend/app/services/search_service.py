@@ -3,22 +3,28 @@ aitema|RIS - Elasticsearch Volltextsuche (v2)
 
 Vollstaendige Elasticsearch 8.x Integration:
 - index_all_papers(), index_all_meetings(), index_all_persons() - Bulk-Indexer
-- search(query, types, filters, page, size) -> SearchResult mit Highlighting
+- search(query, types, filters, page, size, facets) -> SearchResult mit Highlighting
 - autocomplete(prefix, type, limit) -> Suggestions[]
 - search_with_facets(query) -> {results, facets}
-- Tenant-Isolation via tenant_id Filter
+- Tenant-Isolation via tenant_id Filter, Shard-Routing je Tenant (_routing)
+- Redis-Ergebnis-Cache mit Index-Generation (siehe search_cache.py)
 - German Analyzer mit Decompound-Filter
 - NGram-Analyzer fuer Autocomplete (min 3, max 15)
 """
 from __future__ import annotations
 
-from typing import Any, Optional
+import asyncio
+import base64
+import json
+from typing import Any, Iterable, Optional
 
 import structlog
 from elasticsearch import AsyncElasticsearch
 from elasticsearch.helpers import async_bulk
 
 from app.core.config import get_settings
+from app.services.search_backend import BACKEND_ELASTICSEARCH, SearchBackend
+from app.services.search_cache import normalize_query, search_cache
 
 settings = get_settings()
 logger = structlog.get_logger()
@@ -84,8 +90,8 @@ PAPERS_INDEX_SETTINGS: dict[str, Any] = {
                 },
             },
         },
-        "number_of_shards": 1,
-        "number_of_replicas": 0,
+        "number_of_shards": settings.es_number_of_shards,
+        "number_of_replicas": settings.es_number_of_replicas,
     },
     "mappings": {
         "properties": {
@@ -206,12 +212,85 @@ INDEX_CONFIGS = {
     "persons": PERSONS_INDEX_SETTINGS,
 }
 
+# ============================================================
+# Query-Bausteine
+# ============================================================
+SEARCH_FIELDS = [
+    "name^4",
+    "name.exact^3",
+    "reference^5",
+    "content^1",
+    "keywords^2",
+    "family_name^3",
+    "given_name^3",
+]
+
+SEARCH_AGGREGATIONS: dict[str, Any] = {
+    "by_type": {"terms": {"field": "oparl_type", "size": 10}},
+    "by_paper_type": {"terms": {"field": "paper_type", "size": 20}},
+    "by_organization": {"terms": {"field": "organization_name", "size": 20}},
+    "by_meeting_state": {"terms": {"field": "meeting_state", "size": 10}},
+    "by_year": {
+        "date_histogram": {
+            "field": "date",
+            "calendar_interval": "year",
+            "format": "yyyy",
+            "min_doc_count": 1,
+        }
+    },
+}
+
+HIGHLIGHT_CONFIG: dict[str, Any] = {
+    "fields": {
+        "name": {"number_of_fragments": 1},
+        "content": {
+            "number_of_fragments": 3,
+            "fragment_size": 200,
+        },
+        "reference": {"number_of_fragments": 1},
+    },
+    "pre_tags": ["<mark>"],
+    "post_tags": ["</mark>"],
+}
+
+# Obergrenze je Bulk-Request; begrenzt den Speicher bei Papers mit grossem content
+BULK_MAX_CHUNK_BYTES = 10 * 1024 * 1024
+
+SEARCH_SORT: list[Any] = ["_score", {"modified": {"order": "desc", "missing": "_last"}}]
+
+# Cursor-Modus: _shard_doc als eindeutiger Tiebreaker (nur mit Point-in-Time gueltig)
+CURSOR_SORT: list[Any] = SEARCH_SORT + [{"_shard_doc": "asc"}]
+
 # ============================================================
 # Hilfstypen
 # ============================================================
 
+def encode_cursor(state: dict[str, Any]) -> str:
+    """Cursor-Zustand (PIT-ID, search_after, Seite) als opaken Token kodieren."""
+    raw = json.dumps(state, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str) -> dict[str, Any]:
+    """Cursor-Token dekodieren; wirft ValueError bei ungueltigem Token."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        state = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if not isinstance(state, dict) or "pit" not in state or "after" not in state:
+            raise ValueError
+        state.setdefault("page", 1)
+        return state
+    except Exception:
+        raise ValueError("Ungueltiger Cursor")
+
+
 class SearchResult:
-    """Ergebnis einer Volltextsuche."""
+    """
+    Ergebnis einer Volltextsuche.
+
+    `error` ist gesetzt, wenn das Backend einen Fehler abgefangen und ein
+    leeres Ergebnis geliefert hat (nicht Teil der API-Antwort).
+    """
 
     def __init__(
         self,
@@ -220,6 +299,8 @@ class SearchResult:
         page: int,
         per_page: int,
         facets: dict,
+        next_cursor: Optional[str] = None,
+        error: Optional[str] = None,
     ) -> None:
         self.data = data
         self.total = total
@@ -227,6 +308,8 @@ class SearchResult:
         self.per_page = per_page
         self.total_pages = (total + per_page - 1) // per_page if per_page else 0
         self.facets = facets
+        self.next_cursor = next_cursor
+        self.error = error
 
     def to_dict(self) -> dict:
         return {
@@ -236,14 +319,26 @@ class SearchResult:
             "per_page": self.per_page,
             "total_pages": self.total_pages,
             "facets": self.facets,
+            "next_cursor": self.next_cursor,
         }
 
+    @classmethod
+    def from_dict(cls, d: dict) -> "SearchResult":
+        return cls(
+            data=d["data"],
+            total=d["total"],
+            page=d["page"],
+            per_page=d["per_page"],
+            facets=d["facets"],
+            next_cursor=d.get("next_cursor"),
+        )
+
 
 # ============================================================
 # SearchService
 # ============================================================
 
-class SearchService:
+class SearchService(SearchBackend):
     """
     Elasticsearch 8.x basierte Volltextsuche.
 
@@ -258,8 +353,15 @@ class SearchService:
     - Autocomplete via Edge-NGram
     - Tenant-Isolation
     - Bulk-Indexierung aller OParl-Objekte
+
+    Tenant-Routing (settings.es_tenant_routing): Dokumente werden mit
+    `_routing=tenant_id` geschrieben, Suchen mit tenant_id treffen daher nur
+    den Shard des Tenants statt aller Shards. Der tenant_id-Filter bleibt
+    bestehen, da sich mehrere Tenants einen Shard teilen koennen.
     """
 
+    name = BACKEND_ELASTICSEARCH
+
     def __init__(self) -> None:
         auth_kwargs: dict[str, Any] = {}
         if settings.es_password:
@@ -304,27 +406,38 @@ class SearchService:
             logger.info("Alter Index geloescht", index=index_name)
         await self.client.indices.create(index=index_name, body=cfg)
         logger.info("Neuer Index erstellt", index=index_name)
+        await search_cache.bump_generation()
 
     # ----------------------------------------
     # Bulk-Indexierung
     # ----------------------------------------
 
-    async def index_all_papers(self, papers: list[dict]) -> int:
-        """Alle Vorlagen (Papers) in ris_papers indexieren."""
+    async def index_all_papers(self, papers: Iterable[dict]) -> int:
+        """
+        Alle Vorlagen (Papers) in ris_papers indexieren.
+
+        `papers` darf ein Generator sein (siehe search_content.iter_paper_documents),
+        die Dokumente werden dann blockweise gestreamt statt vorab gesammelt.
+        """
         await self._recreate_index(self.idx_papers, PAPERS_INDEX_SETTINGS)
-        if not papers:
-            return 0
 
-        actions = [
+        actions = (
             {
                 "_index": self.idx_papers,
                 "_id": p.get("oparl_id", p.get("id")),
                 "_source": {**p, "oparl_type": "paper"},
+                **self._routing_for(p.get("tenant_id")),
             }
             for p in papers
-        ]
-        success, errors = await async_bulk(self.client, actions, raise_on_error=False)
+        )
+        success, errors = await async_bulk(
+            self.client,
+            actions,
+            raise_on_error=False,
+            max_chunk_bytes=BULK_MAX_CHUNK_BYTES,
+        )
         logger.info("Papers indexiert", success=success, errors=len(errors) if errors else 0)
+        await search_cache.bump_generation()
         return success
 
     async def index_all_meetings(self, meetings: list[dict]) -> int:
@@ -338,11 +451,13 @@ class SearchService:
                 "_index": self.idx_meetings,
                 "_id": m.get("oparl_id", m.get("id")),
                 "_source": {**m, "oparl_type": "meeting"},
+                **self._routing_for(m.get("tenant_id")),
             }
             for m in meetings
         ]
         success, errors = await async_bulk(self.client, actions, raise_on_error=False)
         logger.info("Meetings indexiert", success=success, errors=len(errors) if errors else 0)
+        await search_cache.bump_generation()
         return success
 
     async def index_all_persons(self, persons: list[dict]) -> int:
@@ -356,19 +471,29 @@ class SearchService:
                 "_index": self.idx_persons,
                 "_id": p.get("oparl_id", p.get("id")),
                 "_source": {**p, "oparl_type": "person"},
+                **self._routing_for(p.get("tenant_id")),
             }
             for p in persons
         ]
         success, errors = await async_bulk(self.client, actions, raise_on_error=False)
         logger.info("Persons indexiert", success=success, errors=len(errors) if errors else 0)
+        await search_cache.bump_generation()
         return success
 
-    async def reindex_all(self, objects: list[dict]) -> int:
+    async def reindex_all(
+        self,
+        objects: list[dict],
+        papers: Optional[Iterable[dict]] = None,
+    ) -> int:
         """
         Vollstaendiger Reindex aller OParl-Objekte (kompatibel mit Admin-Router).
         Verteilt Objekte nach oparl_type auf die drei Indizes.
+
+        Optional koennen Papers separat als Iterable uebergeben werden
+        (gestreamte Indexierung inkl. Dateitexten).
         """
-        papers = [o for o in objects if o.get("oparl_type") == "paper"]
+        if papers is None:
+            papers = [o for o in objects if o.get("oparl_type") == "paper"]
         meetings = [o for o in objects if o.get("oparl_type") == "meeting"]
         persons = [o for o in objects if o.get("oparl_type") == "person"]
 
@@ -389,16 +514,39 @@ class SearchService:
         await self.ensure_indices()
         index = self._index_map.get(oparl_type, self.idx_papers)
         doc = {"oparl_id": doc_id, "oparl_type": oparl_type, "tenant_id": tenant, **body}
-        await self.client.index(index=index, id=doc_id, document=doc)
+        await self.client.index(
+            index=index, id=doc_id, document=doc,
+            **self._routing_param(tenant),
+        )
         logger.debug("Dokument indexiert", doc_id=doc_id, type=oparl_type)
+        await search_cache.bump_generation()
+
+    async def delete_document(
+        self,
+        doc_id: str,
+        oparl_type: str = "paper",
+        tenant: Optional[str] = None,
+    ) -> None:
+        """
+        Dokument aus dem Index entfernen.
 
-    async def delete_document(self, doc_id: str, oparl_type: str = "paper") -> None:
-        """Dokument aus dem Index entfernen."""
+        Bei Tenant-Routing wird der Tenant fuer den Zugriff auf den richtigen
+        Shard benoetigt; ist er unbekannt, wird per ids-Query geloescht.
+        """
         index = self._index_map.get(oparl_type, self.idx_papers)
         try:
-            await self.client.delete(index=index, id=doc_id)
+            if settings.es_tenant_routing and not tenant:
+                await self.client.delete_by_query(
+                    index=index, query={"ids": {"values": [doc_id]}},
+                )
+            else:
+                await self.client.delete(
+                    index=index, id=doc_id, **self._routing_param(tenant),
+                )
         except Exception:
             logger.warning("Loeschen aus Index fehlgeschlagen", doc_id=doc_id)
+            return
+        await search_cache.bump_generation()
 
     # ----------------------------------------
     # Suche
@@ -439,6 +587,35 @@ class SearchService:
             ]}})
         return filters
 
+    @staticmethod
+    def _routing_for(tenant_id: Optional[str]) -> dict[str, str]:
+        """`_routing` fuer Bulk-Aktionen (Dokumente ohne Tenant: 'public')."""
+        if not settings.es_tenant_routing:
+            return {}
+        return {"_routing": tenant_id or "public"}
+
+    @staticmethod
+    def _routing_param(tenant_id: Optional[str]) -> dict[str, str]:
+        """`routing`-Parameter fuer index/delete/search, falls aktiviert."""
+        if not settings.es_tenant_routing or not tenant_id:
+            return {}
+        return {"routing": tenant_id}
+
+    def _determine_targets(
+        self,
+        types: Optional[list[str]],
+        tenant_id: Optional[str] = None,
+    ) -> dict[str, Any]:
+        """
+        Suchziele: Indizes nach Typ und - mit tenant_id - das Shard-Routing.
+
+        Ohne tenant_id (mandantenuebergreifend) werden alle Shards abgefragt.
+        """
+        return {
+            "index": self._determine_indices(types),
+            **self._routing_param(tenant_id),
+        }
+
     def _determine_indices(self, types: Optional[list[str]]) -> list[str]:
         """Welche Indizes durchsuchen?"""
         all_indices = [self.idx_papers, self.idx_meetings, self.idx_persons]
@@ -451,6 +628,54 @@ class SearchService:
                 result.append(idx)
         return result or all_indices
 
+    def _build_es_query(
+        self,
+        query: str,
+        tenant_id: Optional[str],
+        body_id: Optional[str],
+        gremium: Optional[str],
+        year: Optional[int],
+        status: Optional[str],
+        object_type: Optional[str],
+        date_from: Optional[str],
+        date_to: Optional[str],
+    ) -> dict:
+        """Bool-Query aus Suchbegriff und Filtern aufbauen."""
+        filter_clauses = self._build_filter_clauses(
+            tenant_id, body_id, gremium, year, status, object_type
+        )
+
+        # Datumsfilter (alt)
+        if date_from or date_to:
+            date_range: dict[str, str] = {}
+            if date_from:
+                date_range["gte"] = date_from
+            if date_to:
+                date_range["lte"] = date_to
+            filter_clauses.append({"range": {"date": date_range}})
+
+        if not query or query.strip() == "*":
+            must_clauses: list[dict] = [{"match_all": {}}]
+        else:
+            must_clauses = [
+                {
+                    "multi_match": {
+                        "query": query,
+                        "fields": SEARCH_FIELDS,
+                        "type": "best_fields",
+                        "fuzziness": "AUTO",
+                        "operator": "or",
+                    }
+                }
+            ]
+
+        return {
+            "bool": {
+                "must": must_clauses,
+                "filter": filter_clauses,
+            }
+        }
+
     async def search(
         self,
         query: str,
@@ -468,6 +693,9 @@ class SearchService:
         tenant: Optional[str] = None,
         date_from: Optional[str] = None,
         date_to: Optional[str] = None,
+        use_cache: bool = True,
+        cursor: Optional[str] = None,
+        facets: Optional[list[str]] = None,
     ) -> SearchResult:
         """
         Multi-Index Volltextsuche mit Highlighting und Facetten.
@@ -482,9 +710,19 @@ class SearchService:
             status:    Statusfilter (meeting_state oder paper_type)
             page:      Seite (1-basiert)
             size:      Ergebnisse pro Seite
+            use_cache: Ergebnis-Cache verwenden (Standard: ja)
+            cursor:    Cursor-Modus (search_after + Point-in-Time) statt
+                       Offset-Paginierung: "*" startet einen neuen Durchlauf,
+                       danach jeweils next_cursor der Vorseite uebergeben
+            facets:    Namen der zu berechnenden Aggregationen (siehe
+                       SEARCH_AGGREGATIONS); ohne Angabe keine Facetten.
+                       Facetten werden getrennt von der Trefferseite gecacht.
 
         Returns:
-            SearchResult mit data, total, facets
+            SearchResult mit data, total, facets (und next_cursor im Cursor-Modus)
+
+        Raises:
+            ValueError: bei ungueltigem Cursor-Token oder unbekannter Facette
         """
         # Rueckwaertskompatibilitaet
         if per_page is not None:
@@ -494,92 +732,172 @@ class SearchService:
         if object_type and not types:
             types = [object_type]
 
-        indices = self._determine_indices(types)
-        filter_clauses = self._build_filter_clauses(
-            tenant_id, body_id, gremium, year, status, object_type
+        cursor_state = None
+        if cursor is not None and cursor != "*":
+            cursor_state = decode_cursor(cursor)
+
+        facet_names = sorted(set(facets or []))
+        unknown = [f for f in facet_names if f not in SEARCH_AGGREGATIONS]
+        if unknown:
+            raise ValueError(f"Unbekannte Facette(n): {', '.join(unknown)}")
+        # Im Cursor-Modus nur fuer die erste Seite
+        if cursor_state is not None:
+            facet_names = []
+
+        query = normalize_query(query)
+        targets = self._determine_targets(types, tenant_id)
+        es_query = self._build_es_query(
+            query, tenant_id, body_id, gremium, year, status,
+            object_type, date_from, date_to,
         )
 
-        # Datumsfilter (alt)
-        if date_from or date_to:
-            date_range: dict[str, str] = {}
-            if date_from:
-                date_range["gte"] = date_from
-            if date_to:
-                date_range["lte"] = date_to
-            filter_clauses.append({"range": {"date": date_range}})
-
-        if not query or query.strip() == "*":
-            must_clauses: list[dict] = [{"match_all": {}}]
-        else:
-            must_clauses = [
-                {
-                    "multi_match": {
-                        "query": query,
-                        "fields": [
-                            "name^4",
-                            "name.exact^3",
-                            "reference^5",
-                            "content^1",
-                            "keywords^2",
-                            "family_name^3",
-                            "given_name^3",
-                        ],
-                        "type": "best_fields",
-                        "fuzziness": "AUTO",
-                        "operator": "or",
-                    }
-                }
-            ]
-
-        es_query = {
-            "bool": {
-                "must": must_clauses,
-                "filter": filter_clauses,
-            }
+        filter_params = {
+            "q": query,
+            "types": sorted(types) if types else None,
+            "tenant_id": tenant_id,
+            "body_id": body_id,
+            "gremium": gremium,
+            "year": year,
+            "status": status,
+            "date_from": date_from,
+            "date_to": date_to,
         }
 
-        aggs = {
-            "by_type": {"terms": {"field": "oparl_type", "size": 10}},
-            "by_paper_type": {"terms": {"field": "paper_type", "size": 20}},
-            "by_organization": {"terms": {"field": "organization_name", "size": 20}},
-            "by_meeting_state": {"terms": {"field": "meeting_state", "size": 10}},
-            "by_year": {
-                "date_histogram": {
-                    "field": "date",
-                    "calendar_interval": "year",
-                    "format": "yyyy",
-                    "min_doc_count": 1,
-                }
-            },
-        }
+        async def compute_hits() -> dict:
+            if cursor is not None:
+                # PIT-gebundene Seiten werden nicht gecacht
+                return await self._execute_cursor_search(
+                    es_query, targets, cursor_state, size
+                )
+            if not use_cache:
+                return await self._execute_search(es_query, targets, page, size)
+            return await search_cache.get_or_compute(
+                {**filter_params, "page": page, "size": size},
+                lambda: self._execute_search(es_query, targets, page, size),
+            )
 
-        highlight_cfg = {
-            "fields": {
-                "name": {"number_of_fragments": 1},
-                "content": {
-                    "number_of_fragments": 3,
-                    "fragment_size": 200,
-                },
-                "reference": {"number_of_fragments": 1},
-            },
-            "pre_tags": ["<mark>"],
-            "post_tags": ["</mark>"],
-        }
+        async def compute_facets() -> dict:
+            if not facet_names:
+                return {}
+            if not use_cache:
+                return await self._execute_facets(es_query, targets, facet_names)
+            return await search_cache.get_or_compute(
+                {**filter_params, "facets": facet_names},
+                lambda: self._execute_facets(es_query, targets, facet_names),
+            )
 
         try:
-            result = await self.client.search(
-                index=indices,
-                query=es_query,
-                from_=(page - 1) * size,
-                size=size,
-                highlight=highlight_cfg,
-                aggregations=aggs,
-                sort=["_score", {"modified": {"order": "desc", "missing": "_last"}}],
+            result, facet_result = await asyncio.gather(
+                compute_hits(), compute_facets(), return_exceptions=True
             )
+            if isinstance(result, BaseException):
+                raise result
         except Exception as e:
             logger.error("Suche fehlgeschlagen", error=str(e), query=query)
-            return SearchResult(data=[], total=0, page=page, per_page=size, facets={})
+            return SearchResult(data=[], total=0, page=page, per_page=size, facets={}, error=type(e).__name__)
 
+        if isinstance(facet_result, BaseException):
+            logger.warning("Facetten fehlgeschlagen", error=str(facet_result), query=query)
+            facet_result = {}
+        # Ergebnis kann per Single-Flight geteilt sein - nicht in-place aendern
+        result = {**result, "facets": facet_result}
+
+        return SearchResult.from_dict(result)
+
+    async def _execute_search(
+        self,
+        es_query: dict,
+        targets: dict[str, Any],
+        page: int,
+        size: int,
+    ) -> dict:
+        """Offset-paginierte ES-Anfrage; Fehler werden an search() durchgereicht (nicht gecacht)."""
+        result = await self.client.search(
+            **targets,
+            query=es_query,
+            from_=(page - 1) * size,
+            size=size,
+            highlight=HIGHLIGHT_CONFIG,
+            sort=SEARCH_SORT,
+        )
+        data, total = self._parse_hits(result)
+        return SearchResult(
+            data=data, total=total, page=page, per_page=size, facets={},
+        ).to_dict()
+
+    async def _execute_facets(
+        self,
+        es_query: dict,
+        targets: dict[str, Any],
+        facet_names: list[str],
+    ) -> dict:
+        """Nur die angeforderten Aggregationen berechnen (size=0, ohne Treffer)."""
+        result = await self.client.search(
+            **targets,
+            query=es_query,
+            size=0,
+            aggregations={name: SEARCH_AGGREGATIONS[name] for name in facet_names},
+        )
+        return self._parse_facets(result)
+
+    async def _execute_cursor_search(
+        self,
+        es_query: dict,
+        targets: dict[str, Any],
+        state: Optional[dict],
+        size: int,
+    ) -> dict:
+        """
+        Eine Seite per search_after innerhalb eines Point-in-Time lesen.
+
+        Ohne `state` wird ein neuer PIT geoeffnet. Ist die letzte Seite erreicht,
+        wird der PIT geschlossen und kein next_cursor mehr geliefert.
+        """
+        keep_alive = settings.search_pit_keep_alive
+        if state is None:
+            # Routing wird beim Oeffnen festgelegt und gilt fuer den ganzen PIT
+            pit = await self.client.open_point_in_time(**targets, keep_alive=keep_alive)
+            pit_id, search_after, page = pit["id"], None, 1
+        else:
+            pit_id, search_after, page = state["pit"], state["after"], state["page"]
+
+        kwargs: dict[str, Any] = {}
+        if search_after is not None:
+            kwargs["search_after"] = search_after
+
+        result = await self.client.search(
+            pit={"id": pit_id, "keep_alive": keep_alive},
+            query=es_query,
+            size=size,
+            highlight=HIGHLIGHT_CONFIG,
+            sort=CURSOR_SORT,
+            **kwargs,
+        )
+        pit_id = result.get("pit_id", pit_id)
+        data, total = self._parse_hits(result)
+
+        hits = result["hits"]["hits"]
+        next_cursor = None
+        if len(hits) == size:
+            next_cursor = encode_cursor({
+                "pit": pit_id,
+                "after": hits[-1]["sort"],
+                "page": page + 1,
+            })
+        else:
+            try:
+                await self.client.close_point_in_time(id=pit_id)
+            except Exception:
+                logger.debug("PIT bereits geschlossen", pit_id=pit_id)
+
+        return SearchResult(
+            data=data, total=total, page=page, per_page=size,
+            facets={}, next_cursor=next_cursor,
+        ).to_dict()
+
+    @staticmethod
+    def _parse_hits(result: Any) -> tuple[list[dict], int]:
+        """Treffer aus der ES-Antwort in das API-Format ueberfuehren."""
         hits = result["hits"]
         total_val = hits["total"]
         total = total_val["value"] if isinstance(total_val, dict) else int(total_val)
@@ -601,8 +919,11 @@ class SearchService:
             if "highlight" in hit:
                 item["highlight"] = hit["highlight"]
             data.append(item)
+        return data, total
 
-        # Facetten aufbereiten
+    @staticmethod
+    def _parse_facets(result: Any) -> dict[str, Any]:
+        """Aggregationen als Facetten-Buckets aufbereiten."""
         facets: dict[str, Any] = {}
         if "aggregations" in result:
             for agg_name, agg_result in result["aggregations"].items():
@@ -615,8 +936,7 @@ class SearchService:
                         for b in agg_result["buckets"]
                         if b["doc_count"] > 0
                     ]
-
-        return SearchResult(data=data, total=total, page=page, per_page=size, facets=facets)
+        return facets
 
     # ----------------------------------------
     # Autocomplete
@@ -644,7 +964,7 @@ class SearchService:
         if len(prefix) < 3:
             return []
 
-        indices = self._determine_indices([type] if type else None)
+        targets = self._determine_targets([type] if type else None, tenant_id)
         filter_clauses: list[dict] = []
         if tenant_id:
             filter_clauses.append({"term": {"tenant_id": tenant_id}})
@@ -667,7 +987,7 @@ class SearchService:
 
         try:
             result = await self.client.search(
-                index=indices,
+                **targets,
                 query=es_query,
                 size=limit,
                 _source=["oparl_id", "oparl_type", "name", "reference", "paper_type", "meeting_state"],
@@ -720,6 +1040,7 @@ class SearchService:
             tenant_id=tenant_id,
             body_id=body_id,
             size=25,
+            facets=list(SEARCH_AGGREGATIONS),
         )
         return {
             "results": sr.to_dict(),
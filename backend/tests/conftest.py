@@ -0,0 +1,112 @@
+"""
+Shared test fixtures.
+
+Covers:
+- FakeRedis: in-memory stand-in for redis.asyncio.Redis (strings, hashes,
+  lists, lock release script) used by the cache, queue and batch-job tests
+"""
+import pytest
+
+
+class FakeRedis:
+    """Minimal in-memory stand-in for redis.asyncio.Redis; fail=True simulates an outage."""
+
+    def __init__(self, fail=False):
+        self.store = {}
+        self.fail = fail
+
+    def _check(self):
+        if self.fail:
+            raise ConnectionError("redis down")
+
+    # ------------------------------------------------------------
+    # Strings
+    # ------------------------------------------------------------
+
+    async def get(self, key):
+        self._check()
+        return self.store.get(key)
+
+    async def mget(self, *keys):
+        self._check()
+        return [self.store.get(k) for k in keys]
+
+    async def set(self, key, value, ex=None, nx=False):
+        self._check()
+        if nx and key in self.store:
+            return None
+        self.store[key] = value
+        return True
+
+    async def incr(self, key):
+        self._check()
+        self.store[key] = str(int(self.store.get(key, 0)) + 1)
+        return int(self.store[key])
+
+    async def expire(self, key, seconds):
+        self._check()
+        return key in self.store
+
+    async def delete(self, *keys):
+        self._check()
+        for key in keys:
+            self.store.pop(key, None)
+
+    async def eval(self, script, numkeys, key, token):
+        # nur das Compare-and-Delete-Skript der Sperren
+        self._check()
+        if self.store.get(key) != token:
+            return 0
+        del self.store[key]
+        return 1
+
+    # ------------------------------------------------------------
+    # Hashes
+    # ------------------------------------------------------------
+
+    async def hset(self, key, mapping):
+        self._check()
+        self.store.setdefault(key, {}).update({k: str(v) for k, v in mapping.items()})
+
+    async def hgetall(self, key):
+        self._check()
+        return dict(self.store.get(key, {}))
+
+    async def hkeys(self, key):
+        self._check()
+        return list(self.store.get(key, {}))
+
+    async def hdel(self, key, *fields):
+        self._check()
+        for field in fields:
+            self.store.get(key, {}).pop(field, None)
+
+    async def hlen(self, key):
+        self._check()
+        return len(self.store.get(key, {}))
+
+    async def hscan(self, key, count=10):
+        self._check()
+        return 0, dict(list(self.store.get(key, {}).items())[:count])
+
+    # ------------------------------------------------------------
+    # Listen
+    # ------------------------------------------------------------
+
+    async def lpush(self, key, *values):
+        self._check()
+        self.store.setdefault(key, [])[:0] = reversed(values)
+
+    async def rpush(self, key, *values):
+        self._check()
+        self.store.setdefault(key, []).extend(values)
+
+    async def brpop(self, key, timeout=0):
+        self._check()
+        items = self.store.get(key)
+        return (key, items.pop()) if items else None
+
+
+@pytest.fixture
+def fake_redis():
+    return FakeRedis()
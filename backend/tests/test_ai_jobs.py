@@ -0,0 +1,210 @@
+"""
+Tests for the AI text job queue (summaries, simple language).
+
+Covers:
+- Enqueue returns immediately; one open job per paper and kind
+- Worker: generation, result written to the paper, job status
+- Results cached by source-text hash: no second Claude call
+- Transient errors are retried, permanent errors mark the job failed
+- The public job status carries fixed error texts, never upstream details
+- Redis errors during a job neither kill the worker nor leave the pending marker
+- Source text from title and file texts
+"""
+import asyncio
+
+import anthropic
+import httpx
+import pytest
+
+from app.services import ai_jobs as jobs_module
+from app.services.ai_jobs import GENERATION_FAILED, QUEUE_KEY, AIJobQueue, is_retryable, job_key
+from app.services.ai_summary import SIMPLE_LANGUAGE, SUMMARY, build_source_text
+
+
+def _status_error(status):
+    request = httpx.Request("POST", "https://api.anthropic.com/v1/messages")
+    return anthropic.APIStatusError("error", response=httpx.Response(status, request=request), body=None)
+
+
+@pytest.fixture
+def env(monkeypatch, fake_redis):
+    state = {"sources": {"p1": "Sanierung der Grundschule", "p2": "Sanierung der Grundschule"},
+             "stored": [], "calls": [], "errors": []}
+
+    async def generate(kind, source):
+        state["calls"].append((kind, source))
+        if state["errors"]:
+            raise state["errors"].pop(0)
+        return f"{kind}: {source}"
+
+    monkeypatch.setattr(jobs_module, "_load_source", lambda paper_id: state["sources"].get(paper_id))
+    monkeypatch.setattr(jobs_module, "_store_result", lambda *args: state["stored"].append(args))
+    monkeypatch.setattr(jobs_module.settings, "ai_jobs_backoff_base", 0.0)
+    monkeypatch.setattr(jobs_module.settings, "ai_jobs_max_retries", 2)
+    state["queue"] = AIJobQueue(redis=fake_redis, generate=generate)
+    return state
+
+
+async def _drain(queue):
+    redis = queue._redis
+    while (item := await redis.brpop(QUEUE_KEY)) is not None:
+        await queue.process(item[1])
+
+
+# ============================================================
+# Einstellen
+# ============================================================
+
+class TestEnqueue:
+
+    def test_enqueue_returns_queued_status(self, env):
+        status = asyncio.run(env["queue"].enqueue(SUMMARY, "p1"))
+
+        assert status["status"] == "queued"
+        assert env["queue"]._redis.store[QUEUE_KEY] == ["summary:p1"]
+        assert env["calls"] == []
+
+    def test_open_job_is_not_queued_twice(self, env):
+        async def scenario():
+            await env["queue"].enqueue(SUMMARY, "p1")
+            await env["queue"].enqueue(SUMMARY, "p1")
+            await env["queue"].enqueue(SIMPLE_LANGUAGE, "p1")
+
+        asyncio.run(scenario())
+
+        assert env["queue"]._redis.store[QUEUE_KEY] == ["simple_language:p1", "summary:p1"]
+
+    def test_paper_can_be_queued_again_after_completion(self, env):
+        async def scenario():
+            await env["queue"].enqueue(SUMMARY, "p1")
+            await _drain(env["queue"])
+            return await env["queue"].enqueue(SUMMARY, "p1")
+
+        assert asyncio.run(scenario())["status"] == "queued"
+
+
+# ============================================================
+# Worker
+# ============================================================
+
+class TestWorker:
+
+    def test_job_generates_and_stores_result(self, env):
+        async def scenario():
+            await env["queue"].enqueue(SIMPLE_LANGUAGE, "p1")
+            await _drain(env["queue"])
+            return await env["queue"].status(SIMPLE_LANGUAGE, "p1")
+
+        status = asyncio.run(scenario())
+
+        assert status["status"] == "done"
+        assert env["stored"] == [(SIMPLE_LANGUAGE, "p1", "simple_language: Sanierung der Grundschule")]
+
+    def test_same_source_text_uses_cached_result(self, env):
+        async def scenario():
+            await env["queue"].enqueue(SUMMARY, "p1")
+            await env["queue"].enqueue(SUMMARY, "p2")
+            await _drain(env["queue"])
+            return await env["queue"].status(SUMMARY, "p2")
+
+        status = asyncio.run(scenario())
+
+        assert len(env["calls"]) == 1
+        assert [s[1] for s in env["stored"]] == ["p1", "p2"]
+        assert status["cached"] is True
+
+    def test_transient_errors_are_retried(self, env):
+        env["errors"] = [_status_error(529), anthropic.APIConnectionError(request=httpx.Request("POST", "https://x"))]
+
+        async def scenario():
+            await env["queue"].enqueue(SUMMARY, "p1")
+            await _drain(env["queue"])
+            return await env["queue"].status(SUMMARY, "p1")
+
+        assert asyncio.run(scenario())["status"] == "done"
+        assert len(env["calls"]) == 3
+
+    def test_permanent_error_marks_job_failed(self, env):
+        env["errors"] = [_status_error(400)]
+
+        async def scenario():
+            await env["queue"].enqueue(SUMMARY, "p1")
+            await _drain(env["queue"])
+            return await env["queue"].status(SUMMARY, "p1")
+
+        status = asyncio.run(scenario())
+
+        assert status["status"] == "failed"
+        assert status["error"] == GENERATION_FAILED
+        assert f"{job_key(SUMMARY, 'p1')}:pending" not in env["queue"]._redis.store
+
+    def test_missing_paper_fails_without_generation(self, env):
+        async def scenario():
+            await env["queue"].enqueue(SUMMARY, "p9")
+            await _drain(env["queue"])
+            return await env["queue"].status(SUMMARY, "p9")
+
+        assert asyncio.run(scenario())["error"] == "Vorlage nicht gefunden"
+        assert env["calls"] == []
+
+    def test_retryable_errors(self):
+        assert is_retryable(_status_error(429))
+        assert is_retryable(_status_error(529))
+        assert not is_retryable(_status_error(400))
+        assert not is_retryable(ValueError("kaputt"))
+
+
+class TestWorkerResilience:
+
+    def test_redis_error_at_job_start_marks_job_failed_and_clears_marker(self, env):
+        queue = env["queue"]
+        original = queue._redis.hset
+
+        async def flaky_hset(key, mapping):
+            if mapping.get("status") == "running":
+                raise ConnectionError("redis weg")
+            await original(key, mapping)
+
+        async def scenario():
+            await queue.enqueue(SUMMARY, "p1")
+            queue._redis.hset = flaky_hset
+            await _drain(queue)
+            return await queue.status(SUMMARY, "p1")
+
+        status = asyncio.run(scenario())
+
+        assert status["status"] == "failed"
+        assert f"{job_key(SUMMARY, 'p1')}:pending" not in queue._redis.store
+
+    def test_worker_survives_failing_job(self, env, monkeypatch):
+        queue = env["queue"]
+        processed = []
+        items = iter([(QUEUE_KEY, "summary:p1"), (QUEUE_KEY, "summary:p2")])
+
+        async def brpop(key, timeout=0):
+            try:
+                return next(items)
+            except StopIteration:
+                raise asyncio.CancelledError
+
+        async def process(entry):
+            processed.append(entry)
+            raise ConnectionError("redis weg")
+
+        monkeypatch.setattr(queue._redis, "brpop", brpop)
+        monkeypatch.setattr(queue, "process", process)
+
+        with pytest.raises(asyncio.CancelledError):
+            asyncio.run(queue._work())
+
+        assert processed == ["summary:p1", "summary:p2"]
+
+
+class TestSourceText:
+
+    def test_title_and_file_texts_are_joined_and_capped(self, monkeypatch):
+        monkeypatch.setattr(jobs_module.settings, "ai_source_max_chars", 30)
+
+        source = build_source_text("Grundschule", [("f1", "  Hauptdatei  "), ("f2", "Anlage mit viel Text")])
+
+        assert source == "Grundschule\n\nHauptdatei\n\nAnlag"
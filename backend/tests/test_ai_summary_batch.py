@@ -0,0 +1,219 @@
+"""
+Tests for bulk AI summaries via batch processing.
+
+Covers:
+- Papers are submitted in batches and written back in bulk UPDATEs
+- Number of open batches is capped; polling until completion
+- Cached results (same source hash) are written without a batch
+- Failed and missing results are recorded
+- An interrupted run collects its open batches and resumes after the cursor
+- A restart does not resubmit papers of still open batches
+- The run lock is only released by its owner
+- Local batch backend (stand-in for tests)
+"""
+import asyncio
+import json
+
+import pytest
+
+from app.services import ai_summary_batch as batch_module
+from app.services.ai_jobs import result_key
+from app.services.ai_summary import SUMMARY
+from app.services.ai_summary_batch import (
+    BATCHES_KEY,
+    FAILED_KEY,
+    LOCK_KEY,
+    STATE_KEY,
+    BatchResult,
+    LocalBatchBackend,
+    SummaryBatchJob,
+)
+from app.services.embeddings import content_hash
+
+
+class FailingBackend(LocalBatchBackend):
+    """Local backend that reports an error for selected papers."""
+
+    def __init__(self, fail):
+        super().__init__()
+        self.fail = fail
+
+    async def results(self, batch_id):
+        return [
+            BatchResult(r.custom_id, None, "errored: overloaded") if r.custom_id in self.fail else r
+            for r in await super().results(batch_id)
+        ]
+
+
+@pytest.fixture
+def env(monkeypatch):
+    state = {
+        "papers": {f"p{i}": f"Vorlage {i}. Zweiter Satz. Dritter Satz. Vierter Satz." for i in range(5)},
+        "written": [],
+        "loads": [],
+    }
+
+    def load_page(after, limit, tenant_id, exclude):
+        state["loads"].append(after)
+        done = {row["id"] for rows in state["written"] for row in rows}
+        pending = [(pid, src) for pid, src in sorted(state["papers"].items())
+                   if pid > after and pid not in done and pid not in exclude]
+        return pending[:limit]
+
+    monkeypatch.setattr(batch_module, "_load_page", load_page)
+    monkeypatch.setattr(batch_module, "_write_summaries", lambda rows: state["written"].append(rows))
+    for name, value in {"ai_batch_size": 2, "ai_batch_max_open": 2, "ai_batch_poll_interval": 0.0}.items():
+        monkeypatch.setattr(batch_module.settings, name, value)
+    return state
+
+
+def _summaries(env):
+    return {row["id"]: row["summary"] for rows in env["written"] for row in rows}
+
+
+# ============================================================
+# Lauf
+# ============================================================
+
+class TestBatchRun:
+
+    def test_papers_are_submitted_in_batches_and_written_in_bulk(self, env, fake_redis):
+        backend = LocalBatchBackend(polls=2)
+        job = SummaryBatchJob(redis=fake_redis, backend=backend)
+
+        status = asyncio.run(job.run())
+
+        assert status["status"] == "done"
+        assert status["submitted"] == 5
+        assert status["written"] == 5
+        assert [len(rows) for rows in env["written"]] == [2, 2, 1]
+        assert _summaries(env)["p0"] == "Vorlage 0. Zweiter Satz. Dritter Satz."
+        assert status["open_batches"] == []
+        assert LOCK_KEY not in job._redis.store
+
+    def test_results_are_cached_by_source_hash(self, env, fake_redis):
+        job = SummaryBatchJob(redis=fake_redis, backend=LocalBatchBackend())
+
+        asyncio.run(job.run())
+
+        key = result_key(SUMMARY, content_hash(env["papers"]["p1"]))
+        assert job._redis.store[key] == _summaries(env)["p1"]
+
+    def test_cached_results_are_written_without_batch(self, env, fake_redis):
+        fake_redis.store[result_key(SUMMARY, content_hash(env["papers"]["p0"]))] = "Bekannte Kurzfassung"
+        job = SummaryBatchJob(redis=fake_redis, backend=LocalBatchBackend())
+
+        status = asyncio.run(job.run())
+
+        assert status["cached"] == 1
+        assert status["submitted"] == 4
+        assert _summaries(env)["p0"] == "Bekannte Kurzfassung"
+
+    def test_failed_results_are_recorded(self, env, fake_redis):
+        job = SummaryBatchJob(redis=fake_redis, backend=FailingBackend(fail={"p3"}))
+
+        status = asyncio.run(job.run())
+
+        assert status["failed"] == 1
+        assert job._redis.store[FAILED_KEY] == {"p3": "errored: overloaded"}
+        assert "p3" not in _summaries(env)
+
+    def test_empty_source_is_skipped(self, env, fake_redis):
+        env["papers"]["p2"] = ""
+        job = SummaryBatchJob(redis=fake_redis, backend=LocalBatchBackend())
+
+        status = asyncio.run(job.run())
+
+        assert status["skipped"] == 1
+        assert status["submitted"] == 4
+
+    def test_limit(self, env, fake_redis):
+        job = SummaryBatchJob(redis=fake_redis, backend=LocalBatchBackend())
+
+        status = asyncio.run(job.run(limit=3))
+
+        assert status["submitted"] == 3
+        assert sorted(_summaries(env)) == ["p0", "p1", "p2"]
+
+
+# ============================================================
+# Fortsetzen
+# ============================================================
+
+class TestResume:
+
+    def test_interrupted_run_collects_open_batch_and_resumes_after_cursor(self, env, fake_redis):
+        backend = LocalBatchBackend()
+
+        async def interrupted():
+            # p0/p1 wurden vor dem Abbruch eingereicht, aber nicht mehr eingesammelt
+            requests = [{"custom_id": pid, "params": batch_module.message_params(SUMMARY, env["papers"][pid])}
+                        for pid in ("p0", "p1")]
+            batch_id = await backend.submit(requests)
+            hashes = {pid: content_hash(env["papers"][pid]) for pid in ("p0", "p1")}
+            fake_redis.store[BATCHES_KEY] = {batch_id: json.dumps(hashes)}
+            fake_redis.store[STATE_KEY] = {"status": "stopped", "cursor": "p1", "submitted": "2", "tenant_id": ""}
+            return await SummaryBatchJob(redis=fake_redis, backend=backend).run()
+
+        status = asyncio.run(interrupted())
+
+        assert env["loads"][0] == "p1"
+        assert status["submitted"] == 5
+        assert status["written"] == 5
+        assert {row["id"] for row in env["written"][0]} == {"p0", "p1"}
+
+    def test_restart_does_not_resubmit_papers_of_open_batches(self, env, fake_redis):
+        backend = LocalBatchBackend(polls=3)
+
+        async def restarted():
+            requests = [{"custom_id": pid, "params": batch_module.message_params(SUMMARY, env["papers"][pid])}
+                        for pid in ("p0", "p1")]
+            batch_id = await backend.submit(requests)
+            hashes = {pid: content_hash(env["papers"][pid]) for pid in ("p0", "p1")}
+            fake_redis.store[BATCHES_KEY] = {batch_id: json.dumps(hashes)}
+            fake_redis.store[STATE_KEY] = {"status": "stopped", "cursor": "p1", "submitted": "2", "tenant_id": ""}
+            return await SummaryBatchJob(redis=fake_redis, backend=backend).run(restart=True)
+
+        status = asyncio.run(restarted())
+
+        assert env["loads"][0] == ""
+        assert status["submitted"] == 3
+        written = [row["id"] for rows in env["written"] for row in rows]
+        assert sorted(written) == ["p0", "p1", "p2", "p3", "p4"]
+
+    def test_expired_batch_marks_papers_failed(self, env, fake_redis):
+        fake_redis.store[BATCHES_KEY] = {"local_unbekannt": json.dumps({"p0": "x"})}
+        fake_redis.store[STATE_KEY] = {"status": "stopped", "cursor": "p4", "tenant_id": ""}
+
+        status = asyncio.run(SummaryBatchJob(redis=fake_redis, backend=LocalBatchBackend()).run())
+
+        assert fake_redis.store[FAILED_KEY] == {"p0": "kein Ergebnis"}
+        assert status["open_batches"] == []
+
+    def test_other_tenant_starts_from_the_beginning(self, env, fake_redis):
+        fake_redis.store[STATE_KEY] = {"status": "stopped", "cursor": "p3", "tenant_id": "gemeinde-a"}
+
+        asyncio.run(SummaryBatchJob(redis=fake_redis, backend=LocalBatchBackend()).run(tenant_id="stadt-b"))
+
+        assert env["loads"][0] == ""
+
+    def test_second_run_is_rejected_while_locked(self, env, fake_redis):
+        fake_redis.store[LOCK_KEY] = "other-worker"
+
+        asyncio.run(SummaryBatchJob(redis=fake_redis, backend=LocalBatchBackend()).run())
+
+        assert env["written"] == []
+        assert fake_redis.store[LOCK_KEY] == "other-worker"
+
+    def test_lock_taken_over_by_another_run_is_not_released(self, env, monkeypatch, fake_redis):
+
+        def taken_over(rows):
+            # Sperre ist abgelaufen und von einem anderen Lauf neu gesetzt worden
+            fake_redis.store[LOCK_KEY] = "other-worker"
+            env["written"].append(rows)
+
+        monkeypatch.setattr(batch_module, "_write_summaries", taken_over)
+
+        asyncio.run(SummaryBatchJob(redis=fake_redis, backend=LocalBatchBackend()).run(limit=1))
+
+        assert fake_redis.store[LOCK_KEY] == "other-worker"
@@ -0,0 +1,145 @@
+"""
+Tests for the in-memory autocomplete prefix index.
+
+Covers:
+- Prefix matching on names and references (multi-word, umlauts)
+- Popularity ordering
+- Tenant isolation
+- Delta updates and deletions; unchanged rows do not rebuild a tenant
+"""
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.autocomplete_index import AutocompleteIndex, popularity
+
+NOW = datetime(2026, 6, 1)
+
+
+def _row(id, name, type="paper", tenant="t1", reference=None, links=0,
+         modified=NOW, deleted=False):
+    return SimpleNamespace(
+        id=id, type=type, tenant_id=tenant, name=name, reference=reference,
+        paper_type="Beschlussvorlage" if type == "paper" else None,
+        meeting_state=None, deleted=deleted, modified=modified, links=links,
+    )
+
+
+@pytest.fixture
+def index():
+    idx = AutocompleteIndex()
+    idx.apply([
+        _row("p1", "Haushaltsplan 2026", reference="V/2026/001", links=1),
+        _row("p2", "Haushaltssatzung 2026", reference="V/2026/002", links=12),
+        _row("p3", "Bebauungsplan Nr. 12 Müllerstraße", reference="V/2026/003"),
+        _row("m1", "Sitzung Haupt- und Finanzausschuss", type="meeting"),
+        _row("pe1", "Anna Müller", type="person"),
+        _row("x1", "Haushaltsplan Nachbarstadt", tenant="t2", links=50),
+    ], now=NOW)
+    return idx
+
+
+def _ids(results):
+    return [r["id"] for r in results]
+
+
+# ============================================================
+# Praefixsuche
+# ============================================================
+
+class TestPrefixSearch:
+
+    def test_prefix_of_any_word_matches(self, index):
+        assert _ids(index.search("bebau", tenant_id="t1")) == ["p3"]
+        assert _ids(index.search("Finanz", tenant_id="t1")) == ["m1"]
+
+    def test_all_words_must_match(self, index):
+        assert _ids(index.search("2026 Haushaltsp", tenant_id="t1")) == ["p1"]
+
+    def test_umlauts_are_folded(self, index):
+        assert set(_ids(index.search("müll", tenant_id="t1"))) == {"p3", "pe1"}
+        assert set(_ids(index.search("Mull", tenant_id="t1"))) == {"p3", "pe1"}
+
+    def test_reference_matches_as_a_whole(self, index):
+        assert _ids(index.search("V/2026/00", tenant_id="t1")) == ["p2", "p1", "p3"]
+
+    def test_type_filter_and_limit(self, index):
+        assert _ids(index.search("müll", type="person", tenant_id="t1")) == ["pe1"]
+        assert len(index.search("2026", limit=2, tenant_id="t1")) == 2
+
+    def test_short_prefix_returns_nothing(self, index):
+        assert index.search("ha", tenant_id="t1") == []
+
+    def test_result_has_autocomplete_fields(self, index):
+        item = index.search("Haushaltsplan", tenant_id="t1")[0]
+        assert set(item) == {
+            "id", "type", "name", "reference", "paper_type", "meeting_state", "score",
+        }
+
+
+# ============================================================
+# Popularitaet / Tenants
+# ============================================================
+
+class TestRanking:
+
+    def test_more_popular_entries_first(self, index):
+        assert _ids(index.search("Haushalt", tenant_id="t1")) == ["p2", "p1"]
+
+    def test_recency_adds_weight(self):
+        assert popularity(0, NOW, NOW) > popularity(0, datetime(2020, 1, 1), NOW)
+
+    def test_tenants_are_isolated(self, index):
+        assert "x1" not in _ids(index.search("Haushalt", tenant_id="t1"))
+        assert _ids(index.search("Haushalt", tenant_id="t2")) == ["x1"]
+
+    def test_without_tenant_all_tenants_are_merged(self, index):
+        assert _ids(index.search("Haushalt"))[0] == "x1"
+
+
+# ============================================================
+# Delta-Abgleich
+# ============================================================
+
+class TestDelta:
+
+    def test_changed_and_deleted_rows_are_applied(self, index):
+        later = datetime(2026, 6, 2)
+        index.apply([
+            _row("p1", "Haushaltsplan 2027", reference="V/2026/001", modified=later),
+            _row("p3", "Bebauungsplan Nr. 12", deleted=True, modified=later),
+        ], now=NOW)
+
+        assert index.search("bebau", tenant_id="t1") == []
+        assert index.search("Haushaltsplan", tenant_id="t1")[0]["name"] == "Haushaltsplan 2027"
+        assert index._watermark == later
+
+    def test_unchanged_rows_do_not_rebuild_tenant(self, index):
+        before = index._tenants["t1"]
+
+        changed = index.apply([
+            _row("p1", "Haushaltsplan 2026", reference="V/2026/001", links=1),
+            _row("p9", "Alte Vorlage", deleted=True),
+        ], now=NOW)
+
+        assert changed == 0
+        assert index._tenants["t1"] is before
+
+    def test_modified_row_rebuilds_only_its_tenant(self, index):
+        t1, t2 = index._tenants["t1"], index._tenants["t2"]
+
+        changed = index.apply([
+            _row("p1", "Haushaltsplan 2026", reference="V/2026/001", links=7,
+                 modified=datetime(2026, 6, 2)),
+        ], now=NOW)
+
+        assert changed == 1
+        assert index._tenants["t1"] is not t1
+        assert index._tenants["t2"] is t2
+
+    def test_ready_after_first_load(self):
+        idx = AutocompleteIndex()
+        assert not idx.ready
+        idx.apply([])
+        assert idx.ready
@@ -0,0 +1,296 @@
+"""
+Tests for the resumable embedding backfill job.
+
+Covers:
+- Token bucket rate limiting
+- Retry classification and retries of transient Voyage errors
+- Failed batches are recorded and the run continues
+- Checkpoint in Redis; a restarted run resumes after the cursor
+- Retrying only the previously failed papers
+- Content-hash gate: unchanged texts are not re-embedded
+- Model upgrades only as an explicit run
+- Backfill and single-paper embedding endpoints require admin:settings
+"""
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.routers.semantic_search import router as semantic_search_router
+from app.services import embedding_backfill as backfill_module
+from app.services.embedding_backfill import (
+    FAILED_KEY,
+    LOCK_KEY,
+    STATE_KEY,
+    EMBEDDING_MODEL,
+    EmbeddingBackfill,
+    TokenBucket,
+    is_retryable,
+)
+from app.services.embeddings import content_hash, paper_embedding_text
+
+
+def _paper(id, name):
+    return SimpleNamespace(
+        id=id, name=name, paper_type=None, keyword=None, reference=None, modified=2,
+        has_embedding=False, embedding_hash=None, embedding_model=None, synced=None,
+    )
+
+
+def _embedded(id, name, model=EMBEDDING_MODEL, synced=1, text=None):
+    paper = _paper(id, name)
+    text = paper_embedding_text(paper) if text is None else text
+    paper.has_embedding, paper.embedding_hash = True, content_hash(text)
+    paper.embedding_model, paper.synced = model, synced
+    return paper
+
+
+def _pending(paper, upgrade):
+    return (
+        not paper.has_embedding
+        or paper.embedding_model is None
+        or (paper.embedding_model == EMBEDDING_MODEL
+            and (paper.synced is None or paper.modified > paper.synced))
+        or (upgrade and paper.embedding_model != EMBEDDING_MODEL)
+    )
+
+
+def _http_error(status):
+    request = httpx.Request("POST", "https://api.voyageai.com/v1/embeddings")
+    return httpx.HTTPStatusError("error", request=request, response=httpx.Response(status, request=request))
+
+
+@pytest.fixture
+def env(monkeypatch):
+    papers = [_paper(f"p{i:02d}", f"Vorlage {i}") for i in range(10)]
+    papers.append(_paper("p99", ""))
+    state = {"papers": papers, "stored": {}, "touched": [], "loads": [], "fail": set(), "calls": 0}
+
+    def load_page(after, limit, ids, upgrade=False):
+        state["loads"].append(after)
+        rows = [
+            p for p in state["papers"]
+            if p.id > after and _pending(p, upgrade) and (ids is None or p.id in ids)
+        ]
+        return rows[:limit]
+
+    def store(params, touched):
+        by_id = {p.id: p for p in state["papers"]}
+        for p in params:
+            state["stored"][p["id"]] = p
+            paper = by_id[p["id"]]
+            paper.has_embedding, paper.embedding_hash = True, p["hash"]
+            paper.embedding_model, paper.synced = p["model"], p["synced_at"]
+        for t in touched:
+            state["touched"].append(t["id"])
+            by_id[t["id"]].synced = t["synced_at"]
+
+    async def request(inputs, input_type):
+        state["calls"] += 1
+        if any(text in state["fail"] for text in inputs):
+            raise _http_error(400)
+        return [[1.0] for _ in inputs]
+
+    monkeypatch.setattr(backfill_module, "_load_page", load_page)
+    monkeypatch.setattr(backfill_module, "_store", store)
+    monkeypatch.setattr(
+        backfill_module, "_count_pending",
+        lambda upgrade=False: sum(_pending(p, upgrade) for p in state["papers"]),
+    )
+    monkeypatch.setattr(backfill_module, "request_embeddings_async", request)
+    for name, value in {
+        "embedding_backfill_page_size": 4,
+        "embedding_backfill_batch_size": 2,
+        "embedding_backfill_rate": 1000.0,
+        "embedding_backfill_burst": 100,
+        "embedding_backfill_backoff_base": 0.0,
+        "embedding_backfill_max_retries": 2,
+    }.items():
+        monkeypatch.setattr(backfill_module.settings, name, value)
+    return state
+
+
+@pytest.fixture
+def job(fake_redis):
+    return EmbeddingBackfill(redis=fake_redis)
+
+
+# ============================================================
+# Rate-Limit / Retries
+# ============================================================
+
+class TestRateLimiting:
+
+    def test_token_bucket_waits_for_refill(self, monkeypatch):
+        now = [0.0]
+        slept = []
+
+        async def fake_sleep(seconds):
+            slept.append(seconds)
+            now[0] += seconds
+
+        monkeypatch.setattr(backfill_module.asyncio, "sleep", fake_sleep)
+        bucket = TokenBucket(rate=2.0, capacity=2, clock=lambda: now[0])
+
+        async def take(n):
+            for _ in range(n):
+                await bucket.acquire()
+
+        asyncio.run(take(4))
+        assert slept == [0.5, 0.5]
+
+    def test_retryable_errors(self):
+        assert is_retryable(_http_error(429))
+        assert is_retryable(_http_error(503))
+        assert is_retryable(httpx.ConnectTimeout("timeout"))
+        assert not is_retryable(_http_error(400))
+        assert not is_retryable(ValueError("kaputt"))
+
+    def test_transient_errors_are_retried(self, env, job, monkeypatch):
+        errors = [_http_error(429), _http_error(502)]
+
+        async def flaky(inputs, input_type):
+            if errors:
+                raise errors.pop(0)
+            return [[1.0] for _ in inputs]
+
+        monkeypatch.setattr(backfill_module, "request_embeddings_async", flaky)
+
+        status = asyncio.run(job.run())
+
+        assert status["failed"] == 0
+        assert status["embedded"] == 10
+
+
+# ============================================================
+# Lauf / Checkpoint
+# ============================================================
+
+class TestBackfillRun:
+
+    def test_run_embeds_all_and_skips_empty_texts(self, env, job):
+        status = asyncio.run(job.run())
+
+        assert status["status"] == "done"
+        assert status["embedded"] == 10
+        assert status["skipped"] == 1
+        assert status["processed"] == 11
+        assert status["cursor"] == "p99"
+        assert LOCK_KEY not in job._redis.store
+        assert env["calls"] == 5  # 10 Texte, 2 je Request
+
+    def test_failed_batch_is_recorded_and_run_continues(self, env, job):
+        env["fail"] = {"Vorlage 3"}
+
+        status = asyncio.run(job.run())
+
+        assert status["status"] == "done"
+        assert status["embedded"] == 8
+        assert sorted(job._redis.store[FAILED_KEY]) == ["p02", "p03"]
+        assert status["failed"] == 2
+
+    def test_interrupted_run_resumes_after_checkpoint(self, env, job):
+        job._redis.store[STATE_KEY] = {
+            "status": "running", "cursor": "p03", "processed": "4", "embedded": "4", "skipped": "0",
+        }
+        for paper in env["papers"][:4]:
+            paper.has_embedding, paper.embedding_model, paper.synced = True, EMBEDDING_MODEL, 2
+
+        status = asyncio.run(job.run())
+
+        assert env["loads"][0] == "p03"
+        assert "p00" not in env["stored"]
+        assert status["processed"] == 11
+        assert status["embedded"] == 10
+
+    def test_retry_failed_only_processes_failed_papers(self, env, job):
+        job._redis.store[FAILED_KEY] = {"p05": "HTTPStatusError: 400"}
+
+        status = asyncio.run(job.run(retry_failed=True))
+
+        assert list(env["stored"]) == ["p05"]
+        assert status["failed"] == 0
+        assert status["total"] == 1
+
+    def test_second_run_is_rejected_while_locked(self, env, job):
+        job._redis.store[LOCK_KEY] = "other-worker"
+
+        asyncio.run(job.run())
+
+        assert env["stored"] == {}
+
+
+# ============================================================
+# Hash-Abgleich / Modellwechsel
+# ============================================================
+
+class TestContentHashGate:
+
+    def test_touched_paper_with_same_text_is_not_reembedded(self, env, job):
+        env["papers"] = [_embedded("p01", "Haushalt"), _paper("p02", "Radweg")]
+
+        status = asyncio.run(job.run())
+
+        assert env["touched"] == ["p01"]
+        assert list(env["stored"]) == ["p02"]
+        assert status["unchanged"] == 1
+        assert env["calls"] == 1
+
+    def test_changed_text_is_reembedded(self, env, job):
+        env["papers"] = [_embedded("p01", "Haushalt 2026", text="Haushalt 2025")]
+
+        asyncio.run(job.run())
+
+        assert env["stored"]["p01"]["hash"] == content_hash("Haushalt 2026")
+        assert env["stored"]["p01"]["synced_at"] == 2
+
+    def test_up_to_date_paper_is_not_selected(self, env, job):
+        env["papers"] = [_embedded("p01", "Haushalt", synced=2)]
+
+        status = asyncio.run(job.run())
+
+        assert status["processed"] == 0
+        assert env["touched"] == []
+
+    def test_other_model_only_with_upgrade(self, env, job):
+        env["papers"] = [_embedded("p01", "Haushalt", model="voyage-2", synced=2)]
+
+        asyncio.run(job.run())
+        assert env["stored"] == {}
+
+        status = asyncio.run(job.run(upgrade_model=True))
+        assert env["stored"]["p01"]["model"] == EMBEDDING_MODEL
+        assert status["mode"] == "upgrade"
+
+    def test_interrupted_upgrade_resumes_as_upgrade(self, env, job):
+        env["papers"] = [
+            _embedded("p01", "A", model="voyage-2", synced=2),
+            _embedded("p02", "B", model="voyage-2", synced=2),
+        ]
+        job._redis.store[STATE_KEY] = {"status": "stopped", "mode": "upgrade", "cursor": "p01"}
+
+        asyncio.run(job.run())
+
+        assert list(env["stored"]) == ["p02"]
+
+
+# ============================================================
+# Endpunkte
+# ============================================================
+
+class TestAdminEndpoints:
+
+    @pytest.mark.parametrize("path", ["/api/v1/search/semantic/backfill", "/api/v1/search/semantic/embed/p1"])
+    def test_anonymous_requests_are_rejected(self, path, monkeypatch):
+        started = []
+        monkeypatch.setattr(backfill_module.embedding_backfill, "start", lambda **kw: started.append(kw))
+        app = FastAPI()
+        app.include_router(semantic_search_router)
+
+        response = TestClient(app).post(path)
+
+        assert response.status_code == 401
+        assert started == []
@@ -0,0 +1,178 @@
+"""
+Tests for batched Voyage embeddings.
+
+Covers:
+- Packing inputs within the provider's input and token limits
+- Results aligned to inputs (response order, empty texts, failed batches)
+- Single-text helpers delegate to the batch API
+- Async variants on the shared AsyncClient
+- Deterministic local (offline) provider
+"""
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.services import embeddings
+from app.services.embeddings import (
+    EMBEDDING_DIM,
+    LocalHashingProvider,
+    generate_embeddings,
+    iter_batches,
+)
+
+
+def _response(inputs, reverse=False):
+    data = [
+        {"index": i, "embedding": [float(len(text))] * EMBEDDING_DIM}
+        for i, text in enumerate(inputs)
+    ]
+    resp = MagicMock()
+    resp.json.return_value = {"data": list(reversed(data)) if reverse else data}
+    return resp
+
+
+@pytest.fixture
+def client(monkeypatch):
+    client = MagicMock()
+    client.post.side_effect = lambda url, headers, json: _response(json["input"], reverse=True)
+    monkeypatch.setattr(embeddings, "_get_client", lambda: client)
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "test-key")
+    return client
+
+
+# ============================================================
+# Batch-Bildung
+# ============================================================
+
+class TestIterBatches:
+
+    def test_respects_input_limit(self):
+        batches = list(iter_batches(["a"] * 5, max_inputs=2))
+        assert batches == [[0, 1], [2, 3], [4]]
+
+    def test_respects_token_limit(self):
+        texts = ["x" * 30, "x" * 30, "x" * 30]  # je 11 geschaetzte Tokens
+        assert list(iter_batches(texts, max_tokens=25)) == [[0, 1], [2]]
+
+    def test_empty_texts_are_left_out(self):
+        assert list(iter_batches(["a", "", "b"])) == [[0, 2]]
+
+
+# ============================================================
+# Batch-API
+# ============================================================
+
+class TestGenerateEmbeddings:
+
+    def test_results_are_aligned_to_inputs(self, client, monkeypatch):
+        monkeypatch.setattr(embeddings, "iter_batches",
+                            lambda texts: iter_batches(texts, max_inputs=2))
+
+        vectors = generate_embeddings(["a", "", "bbb", "cc", "dddd"])
+
+        assert client.post.call_count == 2
+        assert [v[0] for v in vectors] == [1.0, 0.0, 3.0, 2.0, 4.0]
+        assert all(len(v) == EMBEDDING_DIM for v in vectors)
+
+    def test_failed_batch_yields_zero_vectors(self, client, monkeypatch):
+        monkeypatch.setattr(embeddings, "iter_batches",
+                            lambda texts: iter_batches(texts, max_inputs=1))
+        ok = client.post.side_effect
+        client.post.side_effect = [RuntimeError("503"), ok(None, None, {"input": ["bb"]})]
+
+        vectors = generate_embeddings(["a", "bb"])
+
+        assert vectors[0] == [0.0] * EMBEDDING_DIM
+        assert vectors[1][0] == 2.0
+
+    def test_without_api_key_nothing_is_sent(self, client, monkeypatch):
+        monkeypatch.delenv("ANTHROPIC_API_KEY")
+
+        assert generate_embeddings(["a"]) == [[0.0] * EMBEDDING_DIM]
+        client.post.assert_not_called()
+
+    def test_query_helper_uses_query_input_type(self, client):
+        vector = embeddings.generate_query_embedding("Radweg")
+
+        assert vector[0] == 6.0
+        assert client.post.call_args.kwargs["json"]["input_type"] == "query"
+
+
+# ============================================================
+# Async-Varianten
+# ============================================================
+
+class TestAsyncEmbeddings:
+
+    @pytest.fixture
+    def async_client(self, monkeypatch):
+        client = MagicMock()
+        client.post = AsyncMock(
+            side_effect=lambda url, headers, json: _response(json["input"], reverse=True)
+        )
+        monkeypatch.setattr(embeddings, "_get_async_client", lambda: client)
+        monkeypatch.setenv("ANTHROPIC_API_KEY", "test-key")
+        return client
+
+    def test_batches_run_on_async_client(self, async_client, monkeypatch):
+        monkeypatch.setattr(embeddings, "iter_batches",
+                            lambda texts: iter_batches(texts, max_inputs=2))
+
+        vectors = asyncio.run(embeddings.generate_embeddings_async(["a", "", "bbb", "cc", "dddd"]))
+
+        assert async_client.post.await_count == 2
+        assert [v[0] for v in vectors] == [1.0, 0.0, 3.0, 2.0, 4.0]
+
+    def test_query_embedding_async(self, async_client, client):
+        vector = asyncio.run(embeddings.generate_query_embedding_async("Radweg"))
+
+        assert vector[0] == 6.0
+        assert async_client.post.call_args.kwargs["json"]["input_type"] == "query"
+        client.post.assert_not_called()
+
+    def test_strict_request_raises(self, async_client):
+        async_client.post.side_effect = RuntimeError("503")
+
+        with pytest.raises(RuntimeError):
+            asyncio.run(embeddings.request_embeddings_async(["a"]))
+
+
+# ============================================================
+# Lokaler Provider
+# ============================================================
+
+def _cosine(a, b):
+    return sum(x * y for x, y in zip(a, b))
+
+
+class TestLocalProvider:
+
+    @pytest.fixture
+    def local(self, monkeypatch):
+        provider = LocalHashingProvider()
+        monkeypatch.setattr(embeddings, "_provider", provider)
+        monkeypatch.delenv("ANTHROPIC_API_KEY", raising=False)
+        return provider
+
+    def test_vectors_are_deterministic_and_normalized(self, local):
+        first = local.embed_one("Sanierung der Grundschule Nord")
+        second = LocalHashingProvider().embed_one("Sanierung der Grundschule Nord")
+
+        assert first == second
+        assert len(first) == EMBEDDING_DIM
+        assert _cosine(first, first) == pytest.approx(1.0)
+
+    def test_shared_words_and_word_parts_are_similar(self, local):
+        query = local.embed_one("Schule")
+        related = local.embed_one("Neubau Grundschule")
+        unrelated = local.embed_one("Haushaltssatzung 2026")
+
+        assert _cosine(query, related) > _cosine(query, unrelated)
+
+    def test_pipeline_works_without_api_key(self, local):
+        vectors = generate_embeddings(["Radweg Nord", ""])
+
+        assert not embeddings.is_zero_vector(vectors[0])
+        assert embeddings.is_zero_vector(vectors[1])
+        assert asyncio.run(embeddings.generate_query_embedding_async("Radweg Nord")) == vectors[0]
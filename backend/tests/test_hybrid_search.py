@@ -0,0 +1,156 @@
+"""
+Tests for hybrid keyword + vector search.
+
+Covers:
+- Reciprocal rank fusion ordering and field merging
+- Concurrent retrieval with per-source timeouts
+- Keyword backend errors (swallowed by the backend) degrade to semantic
+- Semantic leg is skipped for filters it cannot apply and without a tenant
+- Body/committee/year filters are passed to the semantic leg
+"""
+import asyncio
+import time
+from datetime import date
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.services import hybrid_search as hybrid
+from app.services.hybrid_search import hybrid_search, reciprocal_rank_fusion
+from app.services.search_postgres import PostgresSearchService
+from app.services.search_service import SearchResult
+
+
+def _keyword_backend(ids, delay=0.0):
+    async def search(**kwargs):
+        await asyncio.sleep(delay)
+        data = [{"id": i, "type": "paper", "name": f"Vorlage {i}", "score": 5.0} for i in ids]
+        return SearchResult(data=data, total=len(data), page=1, per_page=kwargs["size"],
+                            facets={"by_type": []})
+
+    backend = AsyncMock()
+    backend.search.side_effect = search
+    return backend
+
+
+@pytest.fixture
+def semantic(monkeypatch):
+    state = {"ids": [], "delay": 0.0}
+
+    def fake(embedding, tenant_id, limit, filters=None):
+        state["filters"] = filters
+        time.sleep(state["delay"])
+        return [{"id": i, "type": "paper", "name": None, "similarity": 0.9} for i in state["ids"]]
+
+    monkeypatch.setattr(hybrid, "_semantic_candidates", fake)
+    monkeypatch.setattr(hybrid.query_embedding_cache, "get", AsyncMock(return_value=[1.0]))
+    monkeypatch.setattr(hybrid.settings, "hybrid_keyword_timeout", 0.2)
+    monkeypatch.setattr(hybrid.settings, "hybrid_semantic_timeout", 0.2)
+    return state
+
+
+# ============================================================
+# Reciprocal Rank Fusion
+# ============================================================
+
+class TestReciprocalRankFusion:
+
+    def test_documents_in_both_lists_win(self):
+        fused = reciprocal_rank_fusion({
+            "keyword": [{"id": "a"}, {"id": "b"}],
+            "semantic": [{"id": "c"}, {"id": "b"}],
+        }, k=60)
+        assert [d["id"] for d in fused] == ["b", "a", "c"]
+        assert fused[0]["sources"] == ["keyword", "semantic"]
+        assert fused[0]["score"] == pytest.approx(2 / 62)
+
+    def test_missing_fields_are_filled_from_later_sources(self):
+        fused = reciprocal_rank_fusion({
+            "keyword": [{"id": "a", "name": "Haushalt", "similarity": None}],
+            "semantic": [{"id": "a", "name": "anders", "similarity": 0.8}],
+        })
+        assert fused[0]["name"] == "Haushalt"
+        assert fused[0]["similarity"] == 0.8
+
+
+# ============================================================
+# Hybride Suche
+# ============================================================
+
+class TestHybridSearch:
+
+    def test_sources_are_fused_and_paged(self, semantic):
+        semantic["ids"] = ["s1", "k2"]
+        backend = _keyword_backend(["k1", "k2", "k3"])
+
+        result, degraded = asyncio.run(hybrid_search(backend, "Haushalt", tenant_id="t1", page=1, size=2))
+
+        assert degraded == []
+        assert [d["id"] for d in result.data] == ["k2", "k1"]
+        assert result.total == 4
+        assert result.facets == {"by_type": []}
+
+    def test_slow_semantic_source_degrades_to_keyword(self, semantic):
+        semantic["ids"], semantic["delay"] = ["s1"], 0.5
+        backend = _keyword_backend(["k1"])
+
+        async def timed():
+            started = time.monotonic()
+            outcome = await hybrid_search(backend, "Haushalt", tenant_id="t1")
+            return outcome, time.monotonic() - started
+
+        (result, degraded), elapsed = asyncio.run(timed())
+
+        assert elapsed < 0.45
+        assert degraded == ["semantic"]
+        assert [d["id"] for d in result.data] == ["k1"]
+
+    def test_slow_keyword_source_degrades_to_semantic(self, semantic):
+        semantic["ids"] = ["s1"]
+        backend = _keyword_backend(["k1"], delay=0.5)
+
+        result, degraded = asyncio.run(hybrid_search(backend, "Haushalt", tenant_id="t1"))
+
+        assert degraded == ["keyword"]
+        assert [d["id"] for d in result.data] == ["s1"]
+        assert result.facets == {}
+
+    def test_failing_keyword_backend_degrades_to_semantic(self, semantic):
+        semantic["ids"] = ["s1"]
+        db = MagicMock()
+        db.execute.side_effect = RuntimeError("connection lost")
+
+        result, degraded = asyncio.run(hybrid_search(PostgresSearchService(db), "Haushalt", tenant_id="t1"))
+
+        assert degraded == ["keyword"]
+        assert [d["id"] for d in result.data] == ["s1"]
+
+    def test_semantic_is_skipped_with_unsupported_filters(self, semantic):
+        semantic["ids"] = ["s1"]
+        backend = _keyword_backend(["k1"])
+
+        result, _ = asyncio.run(hybrid_search(backend, "Haushalt", tenant_id="t1", status="scheduled"))
+
+        assert [d["id"] for d in result.data] == ["k1"]
+
+    def test_semantic_is_skipped_without_tenant(self, semantic):
+        semantic["ids"] = ["s1"]
+        backend = _keyword_backend(["k1"])
+
+        result, degraded = asyncio.run(hybrid_search(backend, "Haushalt"))
+
+        assert degraded == []
+        assert [d["id"] for d in result.data] == ["k1"]
+
+    def test_filters_are_passed_to_semantic_source(self, semantic):
+        semantic["ids"] = ["s1"]
+        backend = _keyword_backend(["k1"])
+
+        result, _ = asyncio.run(
+            hybrid_search(backend, "Haushalt", tenant_id="t1", gremium="Bauausschuss", year=2025)
+        )
+
+        assert {d["id"] for d in result.data} == {"k1", "s1"}
+        filters = semantic["filters"]
+        assert filters.organization == "Bauausschuss"
+        assert (filters.date_from, filters.date_to) == (date(2025, 1, 1), date(2025, 12, 31))
@@ -0,0 +1,177 @@
+"""
+Tests for keyword-subscription matching.
+
+Covers:
+- German text normalization
+- Aho-Corasick automaton (overlapping patterns, fail links)
+- Word-start vs. compound matching
+- Matching papers against all subscriptions in one pass
+- Periodic notifier: watermark (modified, id), paging, lock across workers
+"""
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import keyword_matcher as matcher_module
+from app.services.keyword_matcher import (
+    LOCK_KEY,
+    WATERMARK_KEY,
+    AhoCorasick,
+    KeywordNotifier,
+    KeywordSubscriptionMatcher,
+    normalize_german,
+)
+
+
+def _sub(id, target_id, label=None):
+    return SimpleNamespace(id=id, target_id=target_id, target_label=label or target_id)
+
+
+def _paper(id, name, keyword=None, summary=None):
+    return SimpleNamespace(
+        id=id, name=name, reference=None, paper_type="Antrag",
+        keyword=keyword, ai_summary=summary,
+    )
+
+
+@pytest.fixture
+def matcher():
+    m = KeywordSubscriptionMatcher()
+    m.build([
+        _sub("s-rad", "radweg", "Radweg"),
+        _sub("s-schule", "schule", "Schule"),
+        _sub("s-muell", "muellabfuhr", "Müllabfuhr"),
+        _sub("s-rat", "rat", "Rat"),
+        _sub("s-kita", "kita-ausbau", "Kita-Ausbau"),
+        _sub("s-rad2", "radweg", "Radweg"),
+    ])
+    return m
+
+
+# ============================================================
+# Normalisierung / Automat
+# ============================================================
+
+class TestAutomaton:
+
+    def test_normalization_spells_out_umlauts(self):
+        assert normalize_german("Müllabfuhr – Straße!") == " muellabfuhr strasse "
+
+    def test_overlapping_patterns_are_all_found(self):
+        ac = AhoCorasick(["he", "she", "his", "hers"])
+        found = sorted((end, ac.patterns[i]) for end, i in ac.search("ushers"))
+        assert found == [(3, "he"), (3, "she"), (5, "hers")]
+
+
+# ============================================================
+# Abgleich
+# ============================================================
+
+class TestMatching:
+
+    def test_keyword_matches_at_word_start_and_in_compounds(self, matcher):
+        found = matcher.match_text("Radwegekonzept fuer die Grundschule")
+        assert set(found) == {"s-rad", "s-rad2", "s-schule"}
+
+    def test_short_keyword_needs_word_start(self, matcher):
+        assert "s-rat" not in matcher.match_text("Beratung im Ausschuss")
+        assert "s-rat" in matcher.match_text("Sitzung Rat der Stadt")
+
+    def test_umlaut_and_hyphen_variants_match(self, matcher):
+        assert "s-muell" in matcher.match_text("Neuordnung der MUELLABFUHR")
+        assert "s-kita" in matcher.match_text("Kita Ausbau 2026")
+
+    def test_papers_are_matched_in_one_pass(self, matcher):
+        papers = [
+            _paper("p1", "Sanierung Grundschule Nord"),
+            _paper("p2", "Haushalt 2026", keyword=["Radweg"]),
+            _paper("p3", "Bebauungsplan", summary="Kein Bezug"),
+        ]
+        matcher.ensure_loaded = lambda db: None
+
+        assert matcher.match_papers(None, papers) == {
+            "p1": {"s-schule"},
+            "p2": {"s-rad", "s-rad2"},
+        }
+
+    def test_invalidate_forces_reload(self, matcher):
+        matcher.invalidate()
+        assert matcher.size == 0
+        assert matcher.match_text("Radweg") == {}
+
+
+# ============================================================
+# Periodischer Abgleich
+# ============================================================
+
+T0 = datetime(2026, 3, 1, 12, 0)
+
+
+@pytest.fixture
+def pages(monkeypatch):
+    """Geaenderte Vorlagen als (modified, id); _notify_page liefert sie seitenweise."""
+    state = {
+        "papers": [
+            (T0 + timedelta(minutes=1), "p2"),
+            (T0 + timedelta(minutes=1), "p3"),
+            (T0 + timedelta(minutes=5), "p1"),
+        ],
+        "calls": [],
+    }
+
+    def notify_page(since, last_id, limit, reload):
+        state["calls"].append((since, last_id, reload))
+        rows = [p for p in sorted(state["papers"]) if p > (since, last_id)][:limit]
+        if not rows:
+            return 0, 0, None
+        return len(rows), len(rows), rows[-1]
+
+    monkeypatch.setattr(matcher_module, "_notify_page", notify_page)
+    monkeypatch.setattr(matcher_module.settings, "keyword_notify_batch_size", 2)
+    return state
+
+
+class TestNotifier:
+
+    def test_first_run_only_sets_watermark(self, pages, fake_redis):
+        sent = asyncio.run(KeywordNotifier(redis=fake_redis).run_once())
+
+        assert sent == 0
+        assert pages["calls"] == []
+        assert fake_redis.store[WATERMARK_KEY]["id"] == ""
+
+    def test_changed_papers_are_paged_after_watermark(self, pages, fake_redis):
+        fake_redis.store[WATERMARK_KEY] = {"modified": T0.isoformat(), "id": ""}
+
+        sent = asyncio.run(KeywordNotifier(redis=fake_redis).run_once())
+
+        assert sent == 3
+        assert [c[1] for c in pages["calls"]] == ["", "p3"]
+        # Automat nur auf der ersten Seite neu laden
+        assert [c[2] for c in pages["calls"]] == [True, False]
+        assert fake_redis.store[WATERMARK_KEY] == {"modified": (T0 + timedelta(minutes=5)).isoformat(), "id": "p1"}
+        assert LOCK_KEY not in fake_redis.store
+
+    def test_same_modified_is_split_by_id(self, pages, fake_redis):
+        fake_redis.store[WATERMARK_KEY] = {"modified": (T0 + timedelta(minutes=1)).isoformat(), "id": "p2"}
+
+        sent = asyncio.run(KeywordNotifier(redis=fake_redis).run_once())
+
+        assert sent == 2
+
+    def test_unchanged_papers_are_not_notified_twice(self, pages, fake_redis):
+        fake_redis.store[WATERMARK_KEY] = {"modified": T0.isoformat(), "id": ""}
+        notifier = KeywordNotifier(redis=fake_redis)
+
+        asyncio.run(notifier.run_once())
+
+        assert asyncio.run(notifier.run_once()) == 0
+
+    def test_skipped_while_another_worker_holds_the_lock(self, pages, fake_redis):
+        fake_redis.store[WATERMARK_KEY] = {"modified": T0.isoformat(), "id": ""}
+        fake_redis.store[LOCK_KEY] = "other-worker"
+
+        assert asyncio.run(KeywordNotifier(redis=fake_redis).run_once()) == 0
+        assert pages["calls"] == []
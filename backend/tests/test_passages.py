@@ -0,0 +1,260 @@
+"""
+Tests for the passage index over paper and file texts.
+
+Covers:
+- Splitting texts into overlapping passages at sentence boundaries
+- Passage rows from the paper itself and its files
+- Sync: unchanged passages keep their embedding, failures stay pending
+- Grouping passage hits back to papers
+- Papers without passages are merged in via paper embeddings
+- Paper filters and the deleted flag applied in the passage scan
+- Passage scan uses the tenant's quantization with exact rerank
+- Passages of deleted papers are purged
+"""
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.services import passages
+from app.services.embeddings import EMBEDDING_DIM, QUANTIZATIONS, VectorFilter, content_hash
+from app.services.passages import (
+    _EXISTING_SQL,
+    _MARK_SYNCED_SQL,
+    _search_sql,
+    build_passages,
+    group_passages,
+    purge_deleted_passages,
+    search_passages,
+    semantic_paper_search,
+    split_passages,
+    sync_passages,
+)
+
+
+def _paper(id="p1", name="Radverkehrskonzept", ai_summary=None):
+    return SimpleNamespace(
+        id=id, name=name, description=None, paper_type="Beschlussvorlage",
+        keyword=None, reference="2026/001", tenant_id="t1", ai_summary=ai_summary,
+    )
+
+
+def _hit(paper_id, similarity, content="Abschnitt", file_id="f1", chunk_index=0):
+    return SimpleNamespace(
+        paper_id=paper_id, file_id=file_id, chunk_index=chunk_index, content=content,
+        similarity=similarity, name=f"Vorlage {paper_id}", paper_type=None, date=None, reference=None,
+    )
+
+
+SENTENCES = " ".join(f"Satz Nummer {i} der Vorlage." for i in range(40))
+
+
+# ============================================================
+# Zerlegung
+# ============================================================
+
+class TestSplitPassages:
+
+    def test_passages_respect_size(self):
+        chunks = split_passages(SENTENCES, size=200, overlap=0)
+
+        assert len(chunks) > 1
+        assert all(len(c) <= 200 for c in chunks)
+        assert " ".join(chunks) == SENTENCES
+
+    def test_passages_overlap_at_sentence_boundaries(self):
+        chunks = split_passages(SENTENCES, size=200, overlap=60)
+
+        for previous, current in zip(chunks, chunks[1:]):
+            first_sentence = current.split(". ", 1)[0] + "."
+            assert previous.endswith(first_sentence) or f"{first_sentence} " in previous
+        assert all(c.endswith(".") for c in chunks)
+
+    def test_overlong_sentence_is_split_at_words(self):
+        text = "wort " * 100
+
+        chunks = split_passages(text, size=50, overlap=0)
+
+        assert all(len(c) <= 50 for c in chunks)
+        assert all(not c.endswith(" ") for c in chunks)
+
+    def test_empty_text(self):
+        assert split_passages("   ") == []
+        assert split_passages(None) == []
+
+
+class TestBuildPassages:
+
+    def test_sources_are_paper_and_files(self, monkeypatch):
+        monkeypatch.setattr(passages.settings, "passage_chars", 1200)
+        paper = _paper(ai_summary="Die Stadt plant neue Radwege.")
+
+        rows = build_passages(paper, [("f1", "Anlage zum Radverkehr."), ("f2", "Kostenschaetzung.")])
+
+        assert [r["file_id"] for r in rows] == [None, "f1", "f2"]
+        assert "Die Stadt plant neue Radwege." in rows[0]["content"]
+        assert rows[1]["content_hash"] == content_hash("Radverkehrskonzept: Anlage zum Radverkehr.")
+        assert all(r["tenant_id"] == "t1" for r in rows)
+
+
+# ============================================================
+# Indexierung
+# ============================================================
+
+class TestSyncPassages:
+
+    @pytest.fixture
+    def env(self, monkeypatch):
+        state = {"embedded": [], "existing": [], "fail": set()}
+        monkeypatch.setattr(passages.settings, "passage_chars", 1200)
+        monkeypatch.setattr(
+            passages, "load_file_texts", lambda db, ids, max_chars: {"p1": [("f1", "Anlage eins.")]}
+        )
+
+        def embed(texts, input_type):
+            state["embedded"].extend(texts)
+            return [[0.0] * EMBEDDING_DIM if t in state["fail"] else [0.5] for t in texts]
+
+        monkeypatch.setattr(passages, "generate_embeddings", embed)
+
+        db = MagicMock()
+        db.execute.side_effect = lambda stmt, params=None: (
+            state["existing"] if stmt is _EXISTING_SQL else MagicMock()
+        )
+        state["db"] = db
+        return state
+
+    def _calls(self, db, statement):
+        return [c.args[1] for c in db.execute.call_args_list if c.args[0] is statement]
+
+    def test_new_passages_are_embedded_and_paper_marked(self, env):
+        counters = sync_passages(env["db"], [_paper()])
+
+        assert counters["passages"] == 2
+        assert counters["embedded"] == 2
+        assert self._calls(env["db"], _MARK_SYNCED_SQL)[0]["paper_ids"] == ["p1"]
+        env["db"].commit.assert_called_once()
+
+    def test_unchanged_passage_reuses_embedding(self, env):
+        env["existing"] = [SimpleNamespace(
+            paper_id="p1", content_hash=content_hash("Radverkehrskonzept: Anlage eins."), embedding="[0.1]",
+        )]
+
+        counters = sync_passages(env["db"], [_paper()])
+
+        assert counters["reused"] == 1
+        assert env["embedded"] == [t for t in env["embedded"] if "Anlage eins." not in t]
+
+    def test_failed_embedding_keeps_paper_pending(self, env):
+        env["fail"] = {"Radverkehrskonzept: Anlage eins."}
+
+        counters = sync_passages(env["db"], [_paper()])
+
+        assert counters["failed"] == 1
+        assert self._calls(env["db"], _MARK_SYNCED_SQL) == []
+
+
+# ============================================================
+# Suche
+# ============================================================
+
+class TestGroupPassages:
+
+    def test_hits_are_grouped_by_paper(self):
+        rows = [_hit("a", 0.9, "A1"), _hit("b", 0.8, "B1"), _hit("a", 0.7, "A2"), _hit("c", 0.6)]
+
+        matches = group_passages(rows, limit=2, per_paper=3)
+
+        assert [m.id for m in matches] == ["a", "b"]
+        assert matches[0].similarity == 0.9
+        assert [p.content for p in matches[0].passages] == ["A1", "A2"]
+        assert "A1" in matches[0].content and "A2" in matches[0].content
+
+    def test_passages_per_paper_and_min_similarity(self):
+        rows = [_hit("a", 0.9), _hit("a", 0.85), _hit("a", 0.8), _hit("b", 0.2)]
+
+        matches = group_passages(rows, limit=10, per_paper=2, min_similarity=0.5)
+
+        assert len(matches) == 1
+        assert len(matches[0].passages) == 2
+
+    def test_papers_without_passages_are_merged_in(self, monkeypatch):
+        monkeypatch.setattr(passages, "search_passages", lambda *a, **kw: [
+            passages.PaperMatch(id="p1", name=None, paper_type=None, date=None, reference=None, similarity=0.9),
+            passages.PaperMatch(id="p2", name=None, paper_type=None, date=None, reference=None, similarity=0.6),
+        ])
+        row = SimpleNamespace(
+            id="p9", name="Haushalt", paper_type=None, date=None, reference=None,
+            similarity=0.8, content="Zusammenfassung", modified=None,
+        )
+        calls = []
+        monkeypatch.setattr(passages, "nearest_papers", lambda *a, **kw: calls.append(kw) or [row])
+        db = MagicMock()
+        db.execute.return_value.scalar.return_value = True
+
+        matches = semantic_paper_search(
+            db, [0.1], tenant_id="t1", limit=2, min_similarity=0.5, filters=VectorFilter(body_id="b1"),
+        )
+
+        assert [m.id for m in matches] == ["p1", "p9"]
+        assert matches[1].content == "Zusammenfassung"
+        assert matches[1].passages == []
+        assert calls[0]["filters"] == VectorFilter(body_id="b1", without_passages=True)
+
+    def test_no_paper_scan_once_all_papers_have_passages(self, monkeypatch):
+        monkeypatch.setattr(passages, "search_passages", lambda *a, **kw: [])
+        nearest = MagicMock()
+        monkeypatch.setattr(passages, "nearest_papers", nearest)
+        db = MagicMock()
+        db.execute.return_value.scalar.return_value = False
+
+        assert semantic_paper_search(db, [0.1], tenant_id="t1") == []
+        nearest.assert_not_called()
+
+    def test_paper_filters_are_applied_in_passage_scan(self):
+        hits = _search_sql(VectorFilter(body_id="b1")).split("LIMIT :candidates")[0]
+
+        assert (
+            "EXISTS (SELECT 1 FROM papers fp WHERE fp.id = pp.paper_id "
+            "AND fp.deleted = false AND fp.body_id = :filter_body_id)"
+        ) in hits
+
+    def test_deleted_papers_are_excluded_in_passage_scan(self):
+        hits = _search_sql().split("LIMIT :candidates")[0]
+
+        assert "fp.deleted = false" in hits
+
+    def test_quantized_passage_scan_reranks_exactly(self):
+        ann, rerank = _search_sql(quantization="binary").split("LIMIT :candidates")
+        q = QUANTIZATIONS["binary"]
+
+        assert f"ORDER BY {q.column} {q.operator} {q.query}" in ann
+        assert "ORDER BY pp.embedding <=> CAST(:embedding AS vector)" in rerank
+        assert "LIMIT :limit" in rerank
+
+    def test_search_uses_tenant_quantization(self, monkeypatch):
+        config = passages.settings
+        monkeypatch.setattr(config, "vector_quantization", "none")
+        monkeypatch.setattr(config, "vector_quantization_tenants", "t1=halfvec")
+        monkeypatch.setattr(config, "vector_rerank_factor", 4)
+        monkeypatch.setattr(config, "passage_candidate_factor", 5)
+        db = MagicMock()
+        db.execute.return_value.fetchall.return_value = []
+
+        search_passages(db, [0.1], tenant_id="t1", limit=2)
+
+        query = db.execute.call_args
+        assert "halfvec" in str(query.args[0])
+        assert (query.args[1]["limit"], query.args[1]["candidates"]) == (10, 40)
+
+    def test_without_passages_filter(self):
+        assert VectorFilter(without_passages=True).sql("p") == "p.passages_synced_at IS NULL"
+        assert not VectorFilter(without_passages=None)
+
+    def test_passages_of_deleted_papers_are_purged(self):
+        db = MagicMock()
+        db.execute.return_value.rowcount = 3
+
+        assert purge_deleted_passages(db) == 3
+        assert "p.deleted = true" in str(db.execute.call_args.args[0])
+        db.commit.assert_called_once()
@@ -0,0 +1,104 @@
+"""
+Tests for the query-embedding cache.
+
+Covers:
+- Cache keys from model and normalized query
+- Compact little-endian float32 storage
+- The embedded text is the normalized query behind the cache key
+- LRU hit, Redis hit and miss paths with hit counters
+- Failed embeddings (zero vector) are not cached
+- Redis outage falls back to the in-process LRU
+"""
+import asyncio
+
+import pytest
+
+from app.services import query_embedding_cache as cache_module
+from app.services.query_embedding_cache import (
+    QueryEmbeddingCache,
+    make_cache_key,
+    pack_vector,
+    unpack_vector,
+)
+
+
+@pytest.fixture
+def embed(monkeypatch):
+    calls = []
+
+    async def fake(query):
+        calls.append(query)
+        return [0.0, 0.0] if query == "kaputt" else [0.5, 0.25]
+
+    monkeypatch.setattr(cache_module, "generate_query_embedding_async", fake)
+    return calls
+
+
+# ============================================================
+# Schluessel / Format
+# ============================================================
+
+class TestKeysAndPacking:
+
+    def test_key_ignores_case_and_whitespace(self):
+        assert make_cache_key("  Radweg   Nord ") == make_cache_key("radweg nord")
+        assert make_cache_key("Radweg", model="a") != make_cache_key("Radweg", model="b")
+
+    def test_vectors_are_stored_as_float32_bytes(self):
+        data = pack_vector([0.5, -1.25, 3.0])
+        assert len(data) == 12
+        assert unpack_vector(data) == [0.5, -1.25, 3.0]
+        assert data[:4] == b"\x00\x00\x00\x3f"
+
+
+# ============================================================
+# Cache-Stufen
+# ============================================================
+
+class TestQueryEmbeddingCache:
+
+    def test_miss_then_memory_hit(self, embed, fake_redis):
+        cache = QueryEmbeddingCache(redis=fake_redis, maxsize=8)
+
+        first = asyncio.run(cache.get("Radweg  Nord"))
+        second = asyncio.run(cache.get("radweg nord"))
+
+        assert first == second == [0.5, 0.25]
+        assert embed == ["radweg nord"]
+        stats = cache.stats()
+        assert (stats["misses"], stats["memory_hits"], stats["hit_rate"]) == (1, 1, 0.5)
+
+    def test_redis_hit_is_shared_across_processes(self, embed, fake_redis):
+        asyncio.run(QueryEmbeddingCache(redis=fake_redis).get("Haushalt"))
+
+        other = QueryEmbeddingCache(redis=fake_redis)
+        assert asyncio.run(other.get("Haushalt")) == [0.5, 0.25]
+        assert other.stats()["redis_hits"] == 1
+        assert embed == ["haushalt"]
+
+    def test_lru_evicts_least_recently_used(self, embed, fake_redis):
+        fake_redis.fail = True
+        cache = QueryEmbeddingCache(redis=fake_redis, maxsize=2)
+        for query in ("a", "b", "a", "c"):
+            asyncio.run(cache.get(query))
+
+        asyncio.run(cache.get("b"))
+
+        assert embed == ["a", "b", "c", "b"]
+
+    def test_zero_vector_is_not_cached(self, embed, fake_redis):
+        cache = QueryEmbeddingCache(redis=fake_redis)
+
+        asyncio.run(cache.get("kaputt"))
+        asyncio.run(cache.get("kaputt"))
+
+        assert embed == ["kaputt", "kaputt"]
+        assert fake_redis.store == {}
+
+    def test_redis_outage_falls_back_to_lru(self, embed, fake_redis):
+        fake_redis.fail = True
+        cache = QueryEmbeddingCache(redis=fake_redis)
+
+        asyncio.run(cache.get("Kita"))
+        assert asyncio.run(cache.get("Kita")) == [0.5, 0.25]
+        assert embed == ["kita"]
@@ -0,0 +1,204 @@
+"""
+Tests for the streaming RAG chat endpoint.
+
+Covers:
+- SSE order: sources, text chunks, [DONE]
+- Generation stops and the upstream stream is closed on client disconnect
+- Upstream errors are reported in the stream without upstream details
+- Concurrency limit per worker (503 when all slots are taken)
+- Answer cache: replay on hit, only completed answers are stored
+"""
+import asyncio
+import json
+from datetime import datetime
+from unittest.mock import AsyncMock
+
+import pytest
+from fastapi import HTTPException
+
+from app.routers import rag
+from app.routers.rag import RAGQuery, rag_chat, stream_answer
+from app.services.passages import PaperMatch
+from app.services.rag_answer_cache import CachedAnswer
+
+
+class FakeStream:
+    def __init__(self, chunks, error=None):
+        self.chunks, self.error = chunks, error
+        self.closed = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.closed = True
+
+    @property
+    async def text_stream(self):
+        for chunk in self.chunks:
+            yield chunk
+        if self.error:
+            raise self.error
+
+
+class FakeClient:
+    def __init__(self, stream):
+        self.stream_obj = stream
+        self.messages = self
+        self.kwargs = None
+
+    def stream(self, **kwargs):
+        self.kwargs = kwargs
+        return self.stream_obj
+
+
+class FakeRequest:
+    def __init__(self, disconnect_after=None):
+        self.checks = 0
+        self.disconnect_after = disconnect_after
+
+    async def is_disconnected(self):
+        self.checks += 1
+        return self.disconnect_after is not None and self.checks > self.disconnect_after
+
+
+def _match(id, similarity, content="Passage"):
+    return PaperMatch(
+        id=id, name=f"Vorlage {id}", paper_type="Antrag", date=None,
+        reference=f"2026/{id}", similarity=similarity, content=content,
+    )
+
+
+async def _collect(iterator):
+    return [event async for event in iterator]
+
+
+def _payloads(events):
+    return [json.loads(e[len("data: "):]) if e != "data: [DONE]\n\n" else "DONE" for e in events]
+
+
+# ============================================================
+# Streaming
+# ============================================================
+
+class TestStreamAnswer:
+
+    def test_sources_then_chunks_then_done(self):
+        client = FakeClient(FakeStream(["Der ", "Rat"]))
+
+        events = asyncio.run(_collect(stream_answer(FakeRequest(), client, "Frage", [{"id": "p1"}])))
+
+        assert _payloads(events) == [{"sources": [{"id": "p1"}]}, {"text": "Der "}, {"text": "Rat"}, "DONE"]
+        assert client.kwargs["model"] == rag.settings.rag_model
+
+    def test_disconnect_closes_upstream_stream(self):
+        stream = FakeStream(["a", "b", "c"])
+
+        events = asyncio.run(_collect(stream_answer(FakeRequest(disconnect_after=1), FakeClient(stream), "F", [])))
+
+        assert _payloads(events) == [{"sources": []}, {"text": "a"}]
+        assert stream.closed
+
+    def test_upstream_error_is_reported(self):
+        stream = FakeStream(["a"], error=RuntimeError("overloaded"))
+
+        events = asyncio.run(_collect(stream_answer(FakeRequest(), FakeClient(stream), "F", [])))
+
+        payloads = _payloads(events)
+        assert payloads[2] == {"text": rag.GENERATION_ERROR}
+        assert "overloaded" not in payloads[2]["text"]
+        assert payloads[-1] == "DONE"
+
+    def test_completed_answer_is_stored(self):
+        stored = []
+        client = FakeClient(FakeStream(["Der ", "Rat"]))
+
+        asyncio.run(_collect(stream_answer(FakeRequest(), client, "F", [], stored.append)))
+
+        assert stored == ["Der Rat"]
+
+    def test_failed_or_aborted_answer_is_not_stored(self):
+        stored = []
+        failing = FakeClient(FakeStream(["a"], error=RuntimeError("overloaded")))
+        aborted = FakeClient(FakeStream(["a", "b"]))
+
+        asyncio.run(_collect(stream_answer(FakeRequest(), failing, "F", [], stored.append)))
+        asyncio.run(_collect(stream_answer(FakeRequest(disconnect_after=1), aborted, "F", [], stored.append)))
+
+        assert stored == []
+
+    def test_slot_is_released_after_stream(self, monkeypatch):
+        async def scenario():
+            slots = asyncio.Semaphore(1)
+            monkeypatch.setattr(rag, "_stream_slots", slots)
+            await _collect(stream_answer(FakeRequest(), FakeClient(FakeStream(["a"])), "F", []))
+            return slots.locked()
+
+        assert asyncio.run(scenario()) is False
+
+
+# ============================================================
+# Endpoint
+# ============================================================
+
+class TestRagChat:
+
+    @pytest.fixture
+    def env(self, monkeypatch):
+        monkeypatch.setattr(rag.query_embedding_cache, "get", AsyncMock(return_value=[0.5]))
+        monkeypatch.setattr(rag, "_retrieve", lambda body, embedding: [_match("p1", 0.9)])
+        monkeypatch.setattr(rag, "_cached_answer", lambda body, embedding: None)
+        client = FakeClient(FakeStream(["Antwort"]))
+        monkeypatch.setattr(rag, "_get_client", lambda: client)
+        return client
+
+    def test_chat_streams_answer(self, env):
+        async def scenario():
+            response = await rag_chat(RAGQuery(query="Radwege"), FakeRequest())
+            return response, await _collect(response.body_iterator)
+
+        response, events = asyncio.run(scenario())
+        payloads = _payloads(events)
+
+        assert payloads[0]["sources"][0]["id"] == "p1"
+        assert payloads[1] == {"text": "Antwort"}
+        assert "Frage: Radwege" in env.kwargs["messages"][0]["content"]
+        assert int(response.headers["X-RAG-Prompt-Tokens"]) > 0
+
+    def test_cached_answer_is_replayed_without_generation(self, env, monkeypatch):
+        cached = CachedAnswer(id=1, answer="Im Herbst.", sources=[{"id": "p1"}], similarity=0.97)
+        monkeypatch.setattr(rag, "_cached_answer", lambda body, embedding: cached)
+        monkeypatch.setattr(rag, "_retrieve", lambda body, embedding: pytest.fail("keine Vektorsuche"))
+
+        async def scenario():
+            response = await rag_chat(RAGQuery(query="Wann wird die Schule saniert?"), FakeRequest())
+            return await _collect(response.body_iterator)
+
+        payloads = _payloads(asyncio.run(scenario()))
+
+        assert payloads == [{"sources": [{"id": "p1"}], "cached": True}, {"text": "Im Herbst."}, "DONE"]
+        assert env.kwargs is None
+
+    def test_answer_store_records_stamps_of_used_sources(self, monkeypatch):
+        calls = []
+        monkeypatch.setattr(rag, "_in_session", lambda func, *args: calls.append(args))
+        used, unused = _match("p1", 0.9), _match("p2", 0.1)
+        used.modified = datetime(2026, 10, 1, 12, 0)
+
+        store = rag._answer_store(RAGQuery(query="Radwege"), [0.5], [{"id": "p1"}], [used, unused])
+        store("Antwort")
+
+        scope, question, embedding, answer, sources, stamps = calls[0]
+        assert (question, answer) == ("Radwege", "Antwort")
+        assert stamps == {"p1": "2026-10-01T12:00:00"}
+
+    def test_busy_worker_rejects_new_chats(self, env, monkeypatch):
+        async def scenario():
+            slots = asyncio.Semaphore(1)
+            await slots.acquire()
+            monkeypatch.setattr(rag, "_stream_slots", slots)
+            await rag_chat(RAGQuery(query="Radwege"), FakeRequest())
+
+        with pytest.raises(HTTPException) as exc:
+            asyncio.run(scenario())
+        assert exc.value.status_code == 503
@@ -0,0 +1,140 @@
+"""
+Tests for the RAG answer cache.
+
+Covers:
+- Scope: tenant, filters and result count separate the cache entries
+- Lookup: similarity threshold, unchanged sources are a hit
+- Automatic invalidation when a source paper changed or was deleted
+- Storing answers with sources and source stamps
+"""
+import json
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import rag_answer_cache as cache_module
+from app.services.embeddings import VectorFilter
+from app.services.rag_answer_cache import answer_scope, lookup_answer, source_stamps, store_answer
+
+MODIFIED = datetime(2026, 10, 1, 12, 0)
+
+
+class FakeDB:
+    """Dispatches on the SQL text; papers maps id -> modified (missing = deleted)."""
+
+    def __init__(self, entries=(), papers=None):
+        self.entries = list(entries)
+        self.papers = papers or {}
+        self.executed = []
+        self.commits = 0
+
+    def execute(self, statement, params=None):
+        sql = str(statement)
+        self.executed.append((sql, params))
+        result = SimpleNamespace(fetchall=lambda: [])
+        if "FROM rag_answer_cache" in sql and "SELECT" in sql:
+            result.fetchall = lambda: self.entries
+        elif "FROM papers" in sql:
+            rows = [SimpleNamespace(id=i, modified=self.papers[i]) for i in params["ids"] if i in self.papers]
+            result.fetchall = lambda: rows
+        return result
+
+    def commit(self):
+        self.commits += 1
+
+    def statements(self, prefix):
+        return [params for sql, params in self.executed if sql.strip().startswith(prefix)]
+
+
+def _entry(id, similarity, stamps=None):
+    return SimpleNamespace(
+        id=id, answer=f"Antwort {id}", sources=[{"id": "p1"}], similarity=similarity,
+        source_stamps=stamps if stamps is not None else {"p1": MODIFIED.isoformat()},
+    )
+
+
+@pytest.fixture(autouse=True)
+def threshold(monkeypatch):
+    monkeypatch.setattr(cache_module.settings, "rag_answer_cache_threshold", 0.95)
+
+
+# ============================================================
+# Geltungsbereich
+# ============================================================
+
+class TestScope:
+
+    def test_scope_separates_tenants_filters_and_limits(self):
+        base = answer_scope("t1", 8)
+
+        assert answer_scope("t1", 8) == base
+        assert answer_scope("t2", 8) != base
+        assert answer_scope("t1", 5) != base
+        assert answer_scope("t1", 8, VectorFilter(body_id="b1")) != base
+
+    def test_empty_filter_equals_no_filter(self):
+        assert answer_scope("t1", 8, VectorFilter()) == answer_scope("t1", 8)
+
+    def test_source_stamps(self):
+        sources = [SimpleNamespace(id="p1", modified=MODIFIED), SimpleNamespace(id="p2", modified=None)]
+
+        assert source_stamps(sources) == {"p1": "2026-10-01T12:00:00", "p2": ""}
+
+
+# ============================================================
+# Abfrage / Invalidierung
+# ============================================================
+
+class TestLookup:
+
+    def test_similar_question_with_unchanged_sources_is_a_hit(self):
+        db = FakeDB([_entry(1, 0.97)], papers={"p1": MODIFIED})
+
+        hit = lookup_answer(db, "scope", [0.1, 0.2])
+
+        assert hit.answer == "Antwort 1"
+        assert hit.sources == [{"id": "p1"}]
+        assert db.statements("UPDATE rag_answer_cache") == [{"id": 1}]
+
+    def test_below_threshold_is_a_miss(self):
+        db = FakeDB([_entry(1, 0.9)], papers={"p1": MODIFIED})
+
+        assert lookup_answer(db, "scope", [0.1]) is None
+        assert db.commits == 0
+
+    def test_changed_source_invalidates_entry(self):
+        db = FakeDB([_entry(1, 0.99), _entry(2, 0.96)], papers={"p1": datetime(2026, 10, 2)})
+        db.entries[1].source_stamps = {"p1": datetime(2026, 10, 2).isoformat()}
+
+        hit = lookup_answer(db, "scope", [0.1])
+
+        assert hit.id == 2
+        assert db.statements("DELETE FROM rag_answer_cache WHERE id") == [{"ids": [1]}]
+
+    def test_deleted_source_invalidates_entry(self):
+        db = FakeDB([_entry(1, 0.99)], papers={})
+
+        assert lookup_answer(db, "scope", [0.1]) is None
+        assert db.statements("DELETE FROM rag_answer_cache WHERE id") == [{"ids": [1]}]
+        assert db.commits == 1
+
+
+# ============================================================
+# Speichern
+# ============================================================
+
+class TestStore:
+
+    def test_store_purges_expired_and_inserts(self, monkeypatch):
+        monkeypatch.setattr(cache_module.settings, "rag_answer_cache_ttl", 3600)
+        db = FakeDB()
+
+        store_answer(db, "scope", "Frage", [0.5], "Antwort", [{"id": "p1"}], {"p1": "x"})
+
+        assert "expires_at <= now()" in db.executed[0][0]
+        params = db.statements("INSERT INTO rag_answer_cache")[0]
+        assert params["embedding"] == "[0.5]"
+        assert json.loads(params["stamps"]) == {"p1": "x"}
+        assert params["ttl"] == 3600
+        assert db.commits == 1
@@ -0,0 +1,136 @@
+"""
+Tests for the token-budgeted RAG context builder.
+
+Covers:
+- Relevance threshold with fallback to the best three papers
+- Passages are packed into the token budget; the first one is truncated
+- MMR prefers diverse passages over near-duplicates
+- Near-duplicate passages are dropped entirely
+"""
+import pytest
+
+from app.services import rag_context as context_module
+from app.services.passages import PaperMatch, Passage
+from app.services.rag_context import build_context, estimate_tokens, jaccard, shingles
+
+
+def _match(id, similarity, passages=(), content=""):
+    return PaperMatch(
+        id=id, name=f"Vorlage {id}", paper_type="Antrag", date=None, reference=f"2026/{id}",
+        similarity=similarity, content=content,
+        passages=[Passage("f1", i, text, sim) for i, (text, sim) in enumerate(passages)],
+    )
+
+
+def _text(*words, repeat=1):
+    return " ".join(list(words) * repeat)
+
+
+@pytest.fixture(autouse=True)
+def defaults(monkeypatch):
+    for name, value in {
+        "rag_context_max_tokens": 3000,
+        "rag_context_min_similarity": 0.3,
+        "rag_context_mmr_lambda": 0.7,
+        "rag_context_duplicate_threshold": 0.8,
+    }.items():
+        monkeypatch.setattr(context_module.settings, name, value)
+
+
+# ============================================================
+# Auswahl
+# ============================================================
+
+class TestSelection:
+
+    def test_low_similarity_falls_back_to_best_three(self):
+        rows = [_match(str(i), 0.1, content=f"Zusammenfassung {i}") for i in range(5)]
+
+        context = build_context(rows)
+
+        assert [s["id"] for s in context.sources] == ["0", "1", "2"]
+        assert context.text.count("---") == 2
+
+    def test_only_relevant_matches_are_used(self):
+        context = build_context([_match("a", 0.8, content="Radweg"), _match("b", 0.2, content="Haushalt")])
+
+        assert [s["id"] for s in context.sources] == ["a"]
+        assert "Radweg" in context.text
+
+    def test_passages_of_a_paper_are_joined(self):
+        row = _match("a", 0.9, passages=[("Erster Abschnitt ueber Radwege", 0.9), ("Kosten und Foerderung", 0.8)])
+
+        context = build_context([row])
+
+        assert context.passages == 2
+        assert "Erster Abschnitt ueber Radwege\n[...]\nKosten und Foerderung" in context.text
+
+
+# ============================================================
+# Token-Budget
+# ============================================================
+
+class TestBudget:
+
+    def test_passages_beyond_budget_are_dropped(self):
+        rows = [
+            _match(str(i), 0.9 - i / 100, passages=[(_text(f"thema{i}", "wort", str(i), repeat=40), 0.9 - i / 100)])
+            for i in range(6)
+        ]
+        per_unit = estimate_tokens(rows[0].passages[0].content)
+
+        context = build_context(rows, max_tokens=per_unit * 3)
+
+        assert context.passages < 6
+        assert context.dropped == 6 - context.passages
+        assert context.tokens <= per_unit * 3 + 10
+
+    def test_oversized_first_passage_is_truncated(self):
+        row = _match("a", 0.9, passages=[("x" * 3000, 0.9)])
+
+        context = build_context([row], max_tokens=100)
+
+        assert context.passages == 1
+        assert context.tokens <= 110
+
+
+# ============================================================
+# MMR / Dubletten
+# ============================================================
+
+class TestDiversity:
+
+    def test_shingle_similarity(self):
+        a = shingles("Sanierung der Grundschule am Markt")
+
+        assert jaccard(a, shingles("sanierung der grundschule am markt")) == 1.0
+        assert jaccard(a, shingles("Radweg an der Hauptstrasse")) == 0.0
+
+    def test_near_duplicate_is_dropped(self):
+        text = _text("Sanierung", "der", "Grundschule", "am", "Markt", repeat=5)
+        rows = [
+            _match("a", 0.9, passages=[(text, 0.9)]),
+            _match("b", 0.89, passages=[(text + " Ergaenzung", 0.89)]),
+            _match("c", 0.5, passages=[("Radweg an der Hauptstrasse", 0.5)]),
+        ]
+
+        context = build_context(rows)
+
+        assert [s["id"] for s in context.sources] == ["a", "c"]
+        assert context.dropped == 1
+
+    def test_mmr_prefers_diverse_passage(self):
+        base = _text("Schule", "Sanierung", "Kosten", "Zeitplan", "Bauabschnitt", "eins", "zwei", "drei")
+        similar = base.replace("drei", "vier").replace("eins", "fuenf")
+        rows = [
+            _match("a", 0.9, passages=[(base, 0.9)]),
+            _match("b", 0.85, passages=[(similar, 0.85)]),
+            _match("c", 0.8, passages=[("Radweg entlang der Hauptstrasse geplant", 0.8)]),
+        ]
+        budget = sum(estimate_tokens(r.passages[0].content) + 15 for r in rows[:2])
+
+        diverse = build_context(rows, max_tokens=budget, mmr_lambda=0.3)
+        relevance_only = build_context(rows, max_tokens=budget, mmr_lambda=1.0)
+
+        assert [s["id"] for s in diverse.sources] == ["a", "c"]
+        assert [s["id"] for s in relevance_only.sources] == ["a", "b"]
@@ -0,0 +1,140 @@
+"""
+Tests for the pluggable search backends.
+
+Covers:
+- Backend selection per tenant via settings
+- Unknown tenant backends are rejected by Settings; the router answers 503
+- The facets endpoint uses the tenant's backend
+- PostgreSQL backend: prefix tsquery, cursor / facet validation
+- PostgreSQL backend: result mapping incl. ts_headline highlight
+"""
+import asyncio
+from datetime import date
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+from fastapi import HTTPException
+from pydantic import ValidationError
+
+from app.core.config import Settings
+from app.routers import search as search_router
+from app.routers.search import _search_backend
+from app.services import search_backend
+from app.services.search_backend import get_search_backend
+from app.services.search_postgres import PostgresSearchService, _prefix_tsquery
+from app.services.search_service import SEARCH_AGGREGATIONS, SearchResult, SearchService
+
+
+@pytest.fixture
+def overrides(monkeypatch):
+    monkeypatch.setattr(search_backend.settings, "search_backend", "elasticsearch")
+    monkeypatch.setattr(
+        search_backend.settings, "search_backend_tenants", "gemeinde-a=postgres"
+    )
+
+
+# ============================================================
+# Backend-Auswahl
+# ============================================================
+
+class TestBackendSelection:
+
+    def test_default_backend_is_elasticsearch(self, overrides):
+        svc = get_search_backend("stadt-b")
+        assert isinstance(svc, SearchService)
+        asyncio.run(svc.close())
+
+    def test_tenant_override_selects_postgres(self, overrides):
+        db = MagicMock()
+        svc = get_search_backend("gemeinde-a", db)
+        assert isinstance(svc, PostgresSearchService)
+        assert svc.db is db
+
+    def test_postgres_requires_session(self, overrides):
+        with pytest.raises(ValueError):
+            get_search_backend("gemeinde-a")
+
+    def test_unknown_tenant_backend_is_rejected_by_settings(self):
+        with pytest.raises(ValidationError, match="gemeinde-a=solr"):
+            Settings(search_backend_tenants="gemeinde-a=solr,stadt-b=postgres")
+
+    def test_router_maps_backend_errors_to_503(self, monkeypatch):
+        monkeypatch.setattr(search_backend.settings, "search_backend_tenants", "gemeinde-a=solr")
+
+        with pytest.raises(HTTPException) as exc:
+            _search_backend("gemeinde-a", MagicMock())
+
+        assert exc.value.status_code == 503
+
+    def test_facets_endpoint_uses_tenant_backend(self, overrides, monkeypatch):
+        calls = []
+
+        class Backend:
+            async def search(self, **kwargs):
+                calls.append(kwargs)
+                return SearchResult(data=[], total=0, page=1, per_page=25, facets={"by_type": []})
+
+            async def close(self):
+                pass
+
+        monkeypatch.setattr(search_router, "get_search_backend", lambda tenant_id, db: Backend())
+
+        response = asyncio.run(search_router.search_facets(
+            q="Haushalt", tenant_id="gemeinde-a", body_id=None, db=MagicMock(),
+        ))
+
+        assert response["facets"] == {"by_type": []}
+        assert calls[0]["facets"] == list(SEARCH_AGGREGATIONS)
+
+
+# ============================================================
+# PostgreSQL-Backend
+# ============================================================
+
+class TestPostgresSearch:
+
+    def test_prefix_tsquery(self):
+        assert _prefix_tsquery("Haushalt Plan") == "haushalt & plan:*"
+        assert _prefix_tsquery("  '&|! ") is None
+
+    def test_cursor_is_rejected(self):
+        svc = PostgresSearchService(MagicMock())
+        with pytest.raises(ValueError):
+            asyncio.run(svc.search("Haushalt", cursor="*"))
+
+    def test_unknown_facet_is_rejected(self):
+        svc = PostgresSearchService(MagicMock())
+        with pytest.raises(ValueError):
+            asyncio.run(svc.search("Haushalt", facets=["by_color"]))
+
+    def test_rows_are_mapped_to_search_result(self):
+        row = SimpleNamespace(
+            id="p1", type="paper", name="Haushaltsplan 2026", reference="V/2026/001",
+            date=date(2026, 3, 1), paper_type="Beschlussvorlage", meeting_state=None,
+            organization_name=None, score=0.42, total_count=1,
+            hl_name="<mark>Haushaltsplan</mark> 2026",
+        )
+        db = MagicMock()
+        db.execute.return_value.fetchall.return_value = [row]
+
+        result = asyncio.run(PostgresSearchService(db).search("Haushaltsplan"))
+
+        assert result.total == 1
+        item = result.data[0]
+        assert item["date"] == "2026-03-01"
+        assert item["highlight"] == {"name": ["<mark>Haushaltsplan</mark> 2026"]}
+        sql = str(db.execute.call_args.args[0])
+        assert "websearch_to_tsquery('german', :q)" in sql
+        assert "ts_headline" in sql
+
+    def test_db_error_returns_empty_result(self):
+        db = MagicMock()
+        db.execute.side_effect = RuntimeError("connection lost")
+
+        result = asyncio.run(PostgresSearchService(db).search("Haushalt"))
+
+        assert result.total == 0
+        assert result.error == "RuntimeError"
+        assert "error" not in result.to_dict()
+        db.rollback.assert_called_once()
@@ -0,0 +1,127 @@
+"""
+Tests for the search benchmark harness.
+
+Covers:
+- Deterministic synthetic corpus
+- Judged queries and their relevance sets
+- Latency percentiles and recall@k
+- Replaying a query log against a backend; failed queries are counted
+"""
+import asyncio
+
+import pytest
+
+from app.scripts.search_benchmark import (
+    BENCH_TENANT,
+    TOPICS,
+    build_judged_queries,
+    build_query_log,
+    generate_corpus,
+    percentile,
+    recall_at_k,
+    replay,
+)
+from app.services.search_service import SearchResult
+
+
+@pytest.fixture(scope="module")
+def corpus():
+    return generate_corpus(300, seed=7)
+
+
+class FakeBackend:
+    """Returns the relevant documents of a known query, otherwise nothing."""
+
+    def __init__(self, answers, fail=()):
+        self.answers = answers
+        self.fail = fail
+
+    async def search(self, query, types=None, tenant_id=None, size=20, **kwargs):
+        assert tenant_id == BENCH_TENANT
+        if query in self.fail:
+            return SearchResult(data=[], total=0, page=1, per_page=size, facets={}, error="OperationalError")
+        ids = self.answers.get(query, [])[:size]
+        return SearchResult(data=[{"id": i} for i in ids], total=len(ids),
+                            page=1, per_page=size, facets={})
+
+
+# ============================================================
+# Korpus / Anfragen
+# ============================================================
+
+class TestCorpus:
+
+    def test_corpus_is_deterministic(self, corpus):
+        again = generate_corpus(300, seed=7)
+        assert [p.id for p in again] == [p.id for p in corpus]
+        assert [p.name for p in again] == [p.name for p in corpus]
+
+    def test_references_are_unique(self, corpus):
+        assert len({p.reference for p in corpus}) == len(corpus)
+
+    def test_documents_match_index_format(self, corpus):
+        doc = corpus[0].to_document()
+        assert doc["tenant_id"] == BENCH_TENANT
+        assert doc["content"] and doc["reference"] == corpus[0].reference
+
+    def test_judged_queries_have_correct_relevance(self, corpus):
+        queries = build_judged_queries(corpus, seed=7)
+        by_id = {p.id: p for p in corpus}
+        for q in queries:
+            if q.kind == "reference":
+                assert by_id[next(iter(q.relevant))].reference == q.query
+            if q.kind == "topic_place":
+                for doc_id in q.relevant:
+                    paper = by_id[doc_id]
+                    assert q.query == f"{TOPICS[paper.topic]['term']} {paper.ortsteil}"
+
+    def test_query_log_is_skewed(self, corpus):
+        queries = build_judged_queries(corpus, seed=7)
+        log = build_query_log(queries, 2000, seed=7)
+        counts = sorted((sum(1 for entry in log if entry is q) for q in queries), reverse=True)
+        assert len(log) == 2000
+        assert counts[0] > 10 * counts[len(counts) // 2]
+
+
+# ============================================================
+# Kennzahlen / Replay
+# ============================================================
+
+class TestMetrics:
+
+    def test_percentile_nearest_rank(self):
+        values = [float(v) for v in range(1, 101)]
+        assert percentile(values, 50) == 50.0
+        assert percentile(values, 99) == 99.0
+        assert percentile([], 95) == 0.0
+
+    def test_recall_at_k_caps_by_k(self):
+        assert recall_at_k(["a", "b", "x"], {"a", "b", "c", "d"}, k=2) == 1.0
+        assert recall_at_k(["x", "a"], {"a", "b"}, k=2) == 0.5
+
+    def test_replay_reports_latency_and_recall(self, corpus):
+        queries = build_judged_queries(corpus, seed=7)
+        answers = {q.query: sorted(q.relevant) for q in queries if q.kind == "reference"}
+        log = [q for q in queries if q.kind in ("reference", "topic_year")]
+
+        report = asyncio.run(replay([FakeBackend(answers)] * 4, log, k=10))
+
+        assert report["queries"] == len(log)
+        assert report["errors"] == 0
+        assert report["recall@10_by_kind"]["reference"] == 1.0
+        assert report["recall@10_by_kind"]["topic_year"] == 0.0
+        assert report["latency_ms"]["p50"] <= report["latency_ms"]["p99"]
+        assert report["throughput_qps"] > 0
+
+    def test_failed_queries_are_counted_not_measured(self, corpus):
+        queries = build_judged_queries(corpus, seed=7)
+        answers = {q.query: sorted(q.relevant) for q in queries}
+        log = [q for q in queries if q.kind == "reference"]
+        backend = FakeBackend(answers, fail={log[0].query})
+
+        report = asyncio.run(replay([backend, backend], log, k=10))
+
+        assert report["errors"] == 1
+        assert report["errors_by_type"] == {"OperationalError": 1}
+        assert report["queries"] == len(log) - 1
+        assert report["recall@10"] == 1.0
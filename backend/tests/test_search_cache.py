@@ -0,0 +1,126 @@
+"""
+Tests for the search result cache.
+
+Covers:
+- Query normalization and stable cache keys
+- Cache hit / miss with index generation
+- Invalidation via generation bump
+- Single-flight de-duplication of concurrent identical misses
+- Errors are not cached
+"""
+import asyncio
+
+import pytest
+
+from app.services.search_cache import (
+    GENERATION_KEY,
+    SearchCache,
+    make_cache_key,
+    normalize_query,
+)
+
+
+@pytest.fixture
+def cache(fake_redis):
+    return SearchCache(redis=fake_redis)
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+# ============================================================
+# Normalisierung / Keys
+# ============================================================
+
+class TestCacheKey:
+
+    def test_whitespace_is_collapsed(self):
+        assert normalize_query("  Haushalt   2026 ") == "Haushalt 2026"
+
+    def test_case_is_preserved_for_references(self):
+        assert normalize_query("V/2026/001") == "V/2026/001"
+
+    def test_key_independent_of_param_order(self):
+        a = make_cache_key({"q": "Haushalt", "page": 1, "types": None})
+        b = make_cache_key({"types": None, "page": 1, "q": "Haushalt"})
+        assert a == b
+
+    def test_key_differs_per_page(self):
+        a = make_cache_key({"q": "Haushalt", "page": 1})
+        b = make_cache_key({"q": "Haushalt", "page": 2})
+        assert a != b
+
+
+# ============================================================
+# Hit / Miss / Invalidierung
+# ============================================================
+
+class TestGetOrCompute:
+
+    def test_second_call_is_served_from_cache(self, cache):
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            return {"total": 1}
+
+        async def scenario():
+            first = await cache.get_or_compute({"q": "Haushalt"}, compute)
+            second = await cache.get_or_compute({"q": "Haushalt"}, compute)
+            return first, second
+
+        first, second = _run(scenario())
+        assert first == second == {"total": 1}
+        assert len(calls) == 1
+
+    def test_generation_bump_invalidates(self, cache):
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            return {"total": len(calls)}
+
+        async def scenario():
+            await cache.get_or_compute({"q": "Haushalt"}, compute)
+            await cache.bump_generation()
+            return await cache.get_or_compute({"q": "Haushalt"}, compute)
+
+        result = _run(scenario())
+        assert result == {"total": 2}
+        assert cache._redis.store[GENERATION_KEY] == "1"
+
+    def test_concurrent_misses_compute_once(self, cache):
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return {"total": 7}
+
+        async def scenario():
+            return await asyncio.gather(*[
+                cache.get_or_compute({"q": "Bebauungsplan"}, compute)
+                for _ in range(10)
+            ])
+
+        results = _run(scenario())
+        assert all(r == {"total": 7} for r in results)
+        assert len(calls) == 1
+
+    def test_errors_are_not_cached(self, cache):
+        calls = []
+
+        async def failing():
+            calls.append(1)
+            raise RuntimeError("ES down")
+
+        async def ok():
+            return {"total": 3}
+
+        async def scenario():
+            with pytest.raises(RuntimeError):
+                await cache.get_or_compute({"q": "Schule"}, failing)
+            return await cache.get_or_compute({"q": "Schule"}, ok)
+
+        assert _run(scenario()) == {"total": 3}
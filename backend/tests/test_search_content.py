@@ -0,0 +1,107 @@
+"""
+Tests for attachment text indexing (search_content).
+
+Covers:
+- Per-paper character budget across main file and attachments
+- Empty / missing file texts are skipped
+- Streamed file-text rows feed both the index content and the passage loader
+- Paper -> ES document mapping incl. content
+"""
+from datetime import date, datetime
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+from app.services.search_content import (
+    collect_contents,
+    load_file_texts,
+    load_paper_contents,
+    paper_to_document,
+)
+
+
+class TestCollectContents:
+
+    def test_texts_are_grouped_per_paper(self):
+        rows = [("p1", "Hauptdokument"), ("p1", "Anlage 1"), ("p2", "Antrag")]
+        assert collect_contents(rows, max_chars=1000) == {
+            "p1": ["Hauptdokument", "Anlage 1"],
+            "p2": ["Antrag"],
+        }
+
+    def test_budget_truncates_and_drops_further_attachments(self):
+        rows = [("p1", "a" * 6), ("p1", "b" * 6), ("p1", "c" * 6)]
+        contents = collect_contents(rows, max_chars=10)
+        assert contents == {"p1": ["a" * 6, "b" * 4]}
+
+    def test_budget_is_per_paper(self):
+        rows = [("p1", "x" * 10), ("p2", "y" * 10)]
+        contents = collect_contents(rows, max_chars=10)
+        assert contents == {"p1": ["x" * 10], "p2": ["y" * 10]}
+
+    def test_empty_texts_are_skipped(self):
+        rows = [("p1", None), ("p1", "   "), ("p1", "Text")]
+        assert collect_contents(rows, max_chars=100) == {"p1": ["Text"]}
+
+    def test_accepts_generators(self):
+        rows = ((f"p{i}", "Text") for i in range(3))
+        assert len(collect_contents(rows, max_chars=100)) == 3
+
+
+class TestLoadFileTexts:
+
+    def _db(self):
+        result = MagicMock()
+        result.__iter__.return_value = iter([
+            SimpleNamespace(paper_id="p1", file_id="f1", text="Hauptdatei"),
+            SimpleNamespace(paper_id="p1", file_id="f2", text="  "),
+            SimpleNamespace(paper_id="p2", file_id="f3", text="Anlage"),
+        ])
+        db = MagicMock()
+        db.execute.return_value = result
+        return db, result
+
+    def test_file_texts_per_paper(self):
+        db, result = self._db()
+
+        assert load_file_texts(db, ["p1", "p2"]) == {"p1": [("f1", "Hauptdatei")], "p2": [("f3", "Anlage")]}
+        result.close.assert_called_once()
+
+    def test_paper_contents_use_the_same_rows(self):
+        db, result = self._db()
+
+        assert load_paper_contents(db, ["p1", "p2"], max_chars=100) == {"p1": ["Hauptdatei"], "p2": ["Anlage"]}
+        result.close.assert_called_once()
+
+    def test_no_query_without_papers(self):
+        db = MagicMock()
+
+        assert load_file_texts(db, []) == {}
+        db.execute.assert_not_called()
+
+
+class TestPaperToDocument:
+
+    def test_document_contains_content(self):
+        paper = MagicMock()
+        paper.id = "paper-001"
+        paper.body_id = "body-001"
+        paper.tenant_id = "tenant-001"
+        paper.name = "Haushaltssatzung 2026"
+        paper.reference = "V/2026/001"
+        paper.paper_type = "Beschlussvorlage"
+        paper.keyword = ["haushalt"]
+        paper.date = date(2026, 1, 15)
+        paper.created = datetime(2026, 1, 10, 9, 0)
+        paper.modified = datetime(2026, 1, 12, 9, 0)
+
+        doc = paper_to_document(paper, ["Der Rat beschliesst ..."])
+
+        assert doc["oparl_id"] == "paper-001"
+        assert doc["tenant_id"] == "tenant-001"
+        assert doc["content"] == ["Der Rat beschliesst ..."]
+        assert doc["keywords"] == ["haushalt"]
+        assert doc["date"] == "2026-01-15"
+
+    def test_missing_content_is_empty_list(self):
+        paper = MagicMock(keyword=None, date=None, created=None, modified=None)
+        assert paper_to_document(paper)["content"] == []
@@ -0,0 +1,190 @@
+"""
+Tests for SearchService (Elasticsearch full-text search).
+
+Covers:
+- Opaque cursor encoding / decoding
+- search_after pagination within a point-in-time
+- PIT is closed once the last page is reached
+- Opt-in facet aggregations in a separate query
+- Per-tenant shard routing
+"""
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.services.search_service import (
+    CURSOR_SORT,
+    SearchService,
+    decode_cursor,
+    encode_cursor,
+)
+
+
+def _hit(doc_id, sort):
+    return {
+        "_source": {"oparl_id": doc_id, "oparl_type": "paper", "name": f"Vorlage {doc_id}"},
+        "_score": 1.0,
+        "sort": sort,
+    }
+
+
+def _es_response(hits, total=3, pit_id="pit-1"):
+    return {
+        "pit_id": pit_id,
+        "hits": {"total": {"value": total}, "hits": hits},
+    }
+
+
+@pytest.fixture
+def service():
+    svc = SearchService()
+    svc.client = AsyncMock()
+    return svc
+
+
+# ============================================================
+# Cursor-Token
+# ============================================================
+
+class TestCursorToken:
+
+    def test_roundtrip(self):
+        state = {"pit": "abc", "after": [1.5, 1700000000000, 42], "page": 3}
+        assert decode_cursor(encode_cursor(state)) == state
+
+    def test_invalid_token_raises_value_error(self):
+        with pytest.raises(ValueError):
+            decode_cursor("kein-gueltiger-cursor")
+
+    def test_token_without_pit_is_rejected(self):
+        with pytest.raises(ValueError):
+            decode_cursor(encode_cursor({"after": [1]}))
+
+
+# ============================================================
+# Cursor-Suche
+# ============================================================
+
+class TestCursorSearch:
+
+    def test_first_page_opens_pit_and_returns_cursor(self, service):
+        service.client.open_point_in_time.return_value = {"id": "pit-1"}
+        service.client.search.return_value = _es_response(
+            [_hit("p1", [2.0, 10, 0]), _hit("p2", [1.0, 9, 1])]
+        )
+
+        result = asyncio.run(service.search("Haushalt", size=2, cursor="*"))
+
+        kwargs = service.client.search.call_args.kwargs
+        assert kwargs["pit"]["id"] == "pit-1"
+        assert kwargs["sort"] == CURSOR_SORT
+        assert "from_" not in kwargs
+        assert "search_after" not in kwargs
+        assert [d["id"] for d in result.data] == ["p1", "p2"]
+        state = decode_cursor(result.next_cursor)
+        assert state == {"pit": "pit-1", "after": [1.0, 9, 1], "page": 2}
+
+    def test_next_page_uses_search_after(self, service):
+        service.client.search.return_value = _es_response([_hit("p3", [0.5, 8, 2])])
+        cursor = encode_cursor({"pit": "pit-1", "after": [1.0, 9, 1], "page": 2})
+
+        result = asyncio.run(service.search("Haushalt", size=2, cursor=cursor))
+
+        kwargs = service.client.search.call_args.kwargs
+        assert kwargs["search_after"] == [1.0, 9, 1]
+        assert "aggregations" not in kwargs
+        assert result.page == 2
+        assert result.next_cursor is None
+        service.client.close_point_in_time.assert_awaited_once_with(id="pit-1")
+        service.client.open_point_in_time.assert_not_called()
+
+    def test_invalid_cursor_raises(self, service):
+        with pytest.raises(ValueError):
+            asyncio.run(service.search("Haushalt", cursor="%%%"))
+
+
+# ============================================================
+# Facetten
+# ============================================================
+
+class TestFacets:
+
+    def test_no_aggregations_without_facets(self, service):
+        service.client.search.return_value = _es_response([_hit("p1", None)], total=1)
+
+        result = asyncio.run(service.search("Haushalt", use_cache=False))
+
+        assert service.client.search.await_count == 1
+        assert "aggregations" not in service.client.search.call_args.kwargs
+        assert result.facets == {}
+
+    def test_requested_facets_run_as_separate_size_zero_query(self, service):
+        hits_response = _es_response([_hit("p1", None)], total=1)
+        facet_response = {
+            "hits": {"total": {"value": 1}, "hits": []},
+            "aggregations": {"by_type": {"buckets": [{"key": "paper", "doc_count": 1}]}},
+        }
+
+        async def fake_search(**kwargs):
+            return facet_response if kwargs.get("size") == 0 else hits_response
+
+        service.client.search.side_effect = fake_search
+
+        result = asyncio.run(service.search("Haushalt", facets=["by_type"], use_cache=False))
+
+        facet_calls = [
+            c.kwargs for c in service.client.search.call_args_list if c.kwargs.get("size") == 0
+        ]
+        assert len(facet_calls) == 1
+        assert list(facet_calls[0]["aggregations"]) == ["by_type"]
+        assert result.facets == {"by_type": [{"key": "paper", "count": 1}]}
+        assert [d["id"] for d in result.data] == ["p1"]
+
+    def test_unknown_facet_raises(self, service):
+        with pytest.raises(ValueError):
+            asyncio.run(service.search("Haushalt", facets=["by_color"]))
+
+
+# ============================================================
+# Tenant-Routing
+# ============================================================
+
+class TestTenantRouting:
+
+    def test_search_with_tenant_is_routed(self, service):
+        service.client.search.return_value = _es_response([_hit("p1", None)], total=1)
+
+        asyncio.run(service.search("Haushalt", tenant_id="gemeinde-a", use_cache=False))
+
+        assert service.client.search.call_args.kwargs["routing"] == "gemeinde-a"
+
+    def test_search_without_tenant_queries_all_shards(self, service):
+        service.client.search.return_value = _es_response([_hit("p1", None)], total=1)
+
+        asyncio.run(service.search("Haushalt", use_cache=False))
+
+        assert "routing" not in service.client.search.call_args.kwargs
+
+    def test_cursor_pit_is_opened_with_routing(self, service):
+        service.client.open_point_in_time.return_value = {"id": "pit-1"}
+        service.client.search.return_value = _es_response([_hit("p1", [1.0, 1, 0])], total=1)
+
+        asyncio.run(service.search("Haushalt", tenant_id="gemeinde-a", cursor="*"))
+
+        kwargs = service.client.open_point_in_time.call_args.kwargs
+        assert kwargs["routing"] == "gemeinde-a"
+        assert "routing" not in service.client.search.call_args.kwargs
+
+    def test_bulk_actions_carry_tenant_routing(self):
+        assert SearchService._routing_for("gemeinde-a") == {"_routing": "gemeinde-a"}
+        assert SearchService._routing_for(None) == {"_routing": "public"}
+
+    def test_delete_without_tenant_falls_back_to_ids_query(self, service, monkeypatch):
+        monkeypatch.setattr("app.services.search_service.search_cache.bump_generation", AsyncMock())
+
+        asyncio.run(service.delete_document("p1"))
+        asyncio.run(service.delete_document("p2", tenant="gemeinde-a"))
+
+        service.client.delete_by_query.assert_awaited_once()
+        assert service.client.delete.call_args.kwargs["routing"] == "gemeinde-a"
@@ -0,0 +1,317 @@
+"""
+Tests for the pgvector index tooling.
+
+Covers:
+- Index DDL for HNSW and IVFFlat from settings
+- Automatic IVFFlat list count
+- Per-query ef_search (at least LIMIT, capped by pgvector)
+- Concurrent rebuild order and the invalid-index guard
+- Recall report against exact search
+- Quantized ANN stage (halfvec / binary) with exact rerank, per tenant
+- Index sync for papers and paper_passages
+- Filters inside the ANN scan and iterative index scans
+"""
+from datetime import date
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.scripts import vector_index
+from app.scripts.vector_index import (
+    INDEX_NAME,
+    TMP_INDEX_NAME,
+    index_ddl,
+    ivfflat_lists,
+    rebuild_index,
+    summarize_recall,
+)
+from app.services import embeddings
+from app.services.embeddings import (
+    MAX_EF_SEARCH,
+    QUANTIZATIONS,
+    VectorFilter,
+    effective_ef_search,
+    nearest_papers,
+    quantization_for_tenant,
+    set_vector_search_params,
+    vector_search_sql,
+)
+
+
+class FakeConnection:
+    """Records executed SQL; answers count(*), the indisvalid and the index existence check."""
+
+    def __init__(self, rows=5000, valid=True, existing=()):
+        self.rows, self.valid = rows, valid
+        self.existing = set(existing)
+        self.statements = []
+
+    def execute(self, statement, params=None):
+        sql = str(statement)
+        self.statements.append(sql)
+        if "count(*)" in sql:
+            return SimpleNamespace(scalar=lambda: self.rows)
+        if "to_regclass" in sql:
+            return SimpleNamespace(scalar=lambda: params["name"] in self.existing)
+        if "indisvalid" in sql:
+            return SimpleNamespace(scalar=lambda: self.valid)
+        return SimpleNamespace(scalar=lambda: None)
+
+
+# ============================================================
+# DDL / Parameter
+# ============================================================
+
+class TestIndexDefinition:
+
+    def test_hnsw_ddl_uses_settings(self, monkeypatch):
+        monkeypatch.setattr(vector_index.settings, "vector_hnsw_m", 24)
+        monkeypatch.setattr(vector_index.settings, "vector_hnsw_ef_construction", 128)
+
+        ddl = index_ddl("ix", "hnsw")
+
+        assert "CONCURRENTLY" in ddl
+        assert "USING hnsw (embedding vector_cosine_ops)" in ddl
+        assert "m = 24, ef_construction = 128" in ddl
+
+    def test_ivfflat_lists(self, monkeypatch):
+        assert ivfflat_lists(500) == 10
+        assert ivfflat_lists(250_000) == 250
+        assert ivfflat_lists(250_000, configured=64) == 64
+
+        monkeypatch.setattr(vector_index.settings, "vector_ivfflat_lists", 0)
+        assert "lists = 42" in index_ddl("ix", "ivfflat", rows=42_000)
+
+    def test_unknown_type_is_rejected(self):
+        with pytest.raises(ValueError):
+            index_ddl("ix", "diskann")
+
+    def test_ef_search_is_at_least_limit(self, monkeypatch):
+        monkeypatch.setattr(embeddings.get_settings(), "vector_hnsw_ef_search", 40)
+
+        assert effective_ef_search(10) == 40
+        assert effective_ef_search(100) == 100
+        assert effective_ef_search(10, ef_search=200) == 200
+        assert effective_ef_search(10, ef_search=5000) == MAX_EF_SEARCH
+
+    def test_search_params_are_transaction_local(self):
+        db = MagicMock()
+
+        set_vector_search_params(db, limit=10, ef_search=64)
+
+        statement, params = db.execute.call_args.args
+        assert "set_config('hnsw.ef_search', :ef, true)" in str(statement)
+        assert params["ef"] == "64"
+
+
+# ============================================================
+# Rebuild
+# ============================================================
+
+class TestRebuild:
+
+    def test_rebuild_builds_new_index_before_dropping_old(self, monkeypatch):
+        monkeypatch.setattr(vector_index.settings, "vector_index_type", "hnsw")
+        conn = FakeConnection()
+
+        result = rebuild_index(conn)
+
+        create = next(i for i, s in enumerate(conn.statements) if s.startswith("CREATE INDEX"))
+        drop_old = conn.statements.index(f"DROP INDEX CONCURRENTLY IF EXISTS {INDEX_NAME}")
+        assert TMP_INDEX_NAME in conn.statements[create]
+        assert create < drop_old
+        assert conn.statements[-1] == f"ALTER INDEX {TMP_INDEX_NAME} RENAME TO {INDEX_NAME}"
+        assert result["type"] == "hnsw"
+        assert result["rows"] == 5000
+
+    def test_invalid_index_keeps_old_one(self):
+        conn = FakeConnection(valid=False)
+
+        with pytest.raises(RuntimeError):
+            rebuild_index(conn, "ivfflat")
+
+        assert f"DROP INDEX CONCURRENTLY IF EXISTS {INDEX_NAME}" not in conn.statements
+
+
+# ============================================================
+# Recall
+# ============================================================
+
+class TestRecallReport:
+
+    def test_recall_against_exact_search(self):
+        results = [
+            (["a", "b", "c"], ["a", "b", "c"]),
+            (["a", "b", "x"], ["a", "b", "c"]),
+        ]
+
+        report = summarize_recall(results, [1.0, 3.0], [10.0, 30.0], k=3)
+
+        assert report["recall@3"] == pytest.approx(0.8333, abs=1e-4)
+        assert report["min_recall@3"] == pytest.approx(0.6667, abs=1e-4)
+        assert report["ann_latency_ms"]["p99"] == 3.0
+        assert report["exact_latency_ms"]["p50"] == 10.0
+
+    def test_empty_sample(self):
+        report = summarize_recall([], [], [], k=10)
+
+        assert report["sample"] == 0
+        assert report["recall@10"] == 0.0
+
+
+# ============================================================
+# Quantisierung / Rerank
+# ============================================================
+
+@pytest.fixture
+def quantization_settings(monkeypatch):
+    config = embeddings.get_settings()
+    monkeypatch.setattr(config, "vector_quantization", "none")
+    monkeypatch.setattr(config, "vector_quantization_tenants", "gemeinde-a=binary, stadt-b=halfvec, x=unsinn")
+    monkeypatch.setattr(config, "vector_rerank_factor", 4)
+    return config
+
+
+class TestQuantization:
+
+    def test_quantization_per_tenant(self, quantization_settings):
+        assert quantization_for_tenant("gemeinde-a") == "binary"
+        assert quantization_for_tenant("stadt-b") == "halfvec"
+        assert quantization_for_tenant("x") == "none"
+        assert quantization_for_tenant(None) == "none"
+
+    def test_unquantized_query_orders_by_float_distance(self):
+        ann, _ = vector_search_sql("id").split("JOIN candidates")
+
+        assert "ORDER BY embedding <=> CAST(:embedding AS vector)" in ann
+
+    @pytest.mark.parametrize("quantization", ["halfvec", "binary"])
+    def test_quantized_query_reranks_candidates(self, quantization):
+        sql = vector_search_sql("id, name", quantization)
+        q = QUANTIZATIONS[quantization]
+
+        ann, rerank = sql.split("JOIN candidates")
+        assert f"ORDER BY {q.column} {q.operator} {q.query}" in ann
+        assert "LIMIT :candidates" in ann
+        assert "ORDER BY embedding <=> CAST(:embedding AS vector)" in rerank
+        assert "LIMIT :limit" in rerank
+
+    def test_index_ddl_matches_query_expression(self):
+        ddl = index_ddl("ix", "hnsw", quantization="binary")
+
+        assert f"(({QUANTIZATIONS['binary'].column}) bit_hamming_ops)" in ddl
+
+    def test_nearest_papers_widens_candidates_for_rerank(self, quantization_settings):
+        db = MagicMock()
+
+        nearest_papers(db, [0.1, 0.2], tenant_id="gemeinde-a", limit=10)
+
+        set_params, query = db.execute.call_args_list
+        assert set_params.args[1]["ef"] == str(max(40, quantization_settings.vector_hnsw_ef_search))
+        assert "binary_quantize" in str(query.args[0])
+        assert query.args[1]["candidates"] == 40
+        assert query.args[1]["limit"] == 10
+
+    def test_configured_quantizations(self, quantization_settings):
+        assert vector_index.configured_quantizations() == {"none", "binary", "halfvec"}
+
+        quantization_settings.vector_quantization = "halfvec"
+        quantization_settings.vector_quantization_tenants = ""
+        assert vector_index.configured_quantizations() == {"halfvec"}
+
+    def test_sync_builds_missing_before_dropping_unused(self, quantization_settings):
+        quantization_settings.vector_quantization = "halfvec"
+        quantization_settings.vector_quantization_tenants = ""
+        conn = FakeConnection(existing={INDEX_NAME})
+
+        result = vector_index.sync_indexes(conn)
+
+        assert result == {
+            "created": ["ix_papers_embedding_halfvec", "ix_paper_passages_embedding_halfvec"],
+            "dropped": [INDEX_NAME],
+        }
+        create = next(i for i, sql in enumerate(conn.statements) if sql.startswith("CREATE INDEX"))
+        drop = conn.statements.index(f"DROP INDEX CONCURRENTLY IF EXISTS {INDEX_NAME}")
+        assert create < drop
+
+    def test_passage_index_ddl(self):
+        ddl = index_ddl("ix", "hnsw", quantization="halfvec", table="paper_passages")
+
+        assert f"ON paper_passages USING hnsw (({QUANTIZATIONS['halfvec'].column}) halfvec_cosine_ops)" in ddl
+
+    def test_sync_drops_unused_passage_index(self, quantization_settings):
+        quantization_settings.vector_quantization = "binary"
+        quantization_settings.vector_quantization_tenants = ""
+        existing = {"ix_papers_embedding_binary", "ix_paper_passages_embedding_binary",
+                    "ix_paper_passages_embedding_cosine"}
+
+        result = vector_index.sync_indexes(FakeConnection(existing=existing))
+
+        assert result == {"created": [], "dropped": ["ix_paper_passages_embedding_cosine"]}
+
+    def test_drop_index(self):
+        conn = FakeConnection()
+
+        name = vector_index.drop_index(conn, "none")
+
+        assert name == INDEX_NAME
+        assert conn.statements == [f"DROP INDEX CONCURRENTLY IF EXISTS {INDEX_NAME}"]
+
+
+# ============================================================
+# Filter im ANN-Scan
+# ============================================================
+
+class TestVectorFilter:
+
+    def test_empty_filter(self):
+        assert not VectorFilter()
+        assert VectorFilter().sql() == ""
+        assert vector_search_sql("id", filters=VectorFilter()) == vector_search_sql("id")
+
+    def test_filters_are_inside_the_ann_scan(self):
+        filters = VectorFilter(
+            paper_type="Antrag", date_from=date(2025, 1, 1), date_to=date(2025, 12, 31),
+            organization="Bauausschuss",
+        )
+
+        ann, _ = vector_search_sql("id", filters=filters).split("JOIN candidates")
+
+        assert "papers.paper_type = :filter_paper_type" in ann
+        assert "papers.date >= :filter_date_from" in ann
+        assert "papers.date <= :filter_date_to" in ann
+        assert "o.name = :filter_organization" in ann
+        assert "body_id" not in ann
+        assert ann.index(":filter_paper_type") < ann.index("LIMIT :candidates")
+
+    def test_filter_params_are_bound(self, quantization_settings):
+        db = MagicMock()
+        filters = VectorFilter(body_id="b1", paper_type="Antrag")
+
+        nearest_papers(db, [0.1], tenant_id="t1", limit=5, filters=filters)
+
+        params = db.execute.call_args_list[-1].args[1]
+        assert params["filter_body_id"] == "b1"
+        assert params["filter_paper_type"] == "Antrag"
+
+    def test_iterative_scan_is_enabled(self, monkeypatch):
+        config = embeddings.get_settings()
+        monkeypatch.setattr(config, "vector_iterative_scan", "relaxed_order")
+        monkeypatch.setattr(config, "vector_max_scan_tuples", 5000)
+        db = MagicMock()
+
+        set_vector_search_params(db, limit=10)
+
+        statement, params = db.execute.call_args.args
+        assert "set_config('hnsw.iterative_scan', :iterative, true)" in str(statement)
+        assert params["iterative"] == "relaxed_order"
+        assert params["max_tuples"] == "5000"
+
+    def test_iterative_scan_can_be_disabled(self, monkeypatch):
+        monkeypatch.setattr(embeddings.get_settings(), "vector_iterative_scan", "off")
+        db = MagicMock()
+
+        set_vector_search_params(db, limit=10)
+
+        assert "iterative_scan" not in str(db.execute.call_args.args[0])
@@ -268,7 +268,12 @@ function SuchePageInner() {
 
     setLoading(true);
     try {
-      const params = new URLSearchParams({ q: q.trim(), page: String(pg), per_page: '10' });
+      const params = new URLSearchParams({
+        q: q.trim(),
+        page: String(pg),
+        per_page: '10',
+        facets: 'by_type,by_organization,by_meeting_state,by_year',
+      });
       if (type)    params.set('type', type);
       if (gremium) params.set('gremium', gremium);
       if (year)    params.set('year', year);
@@ -8,6 +8,9 @@ interface SimpleLanguageToggleProps {
   originalText: string;
 }
 
+const POLL_INTERVAL_MS = 2000;
+const MAX_POLLS = 30;
+
 declare global {
   interface Window {
     plausible?: (event: string, opts?: { props?: Record<string, string> }) => void;
@@ -35,12 +38,19 @@ export default function SimpleLanguageToggle({
     setLoading(true);
     try {
       const apiBase = process.env.NEXT_PUBLIC_API_URL || '';
-      const res = await fetch(
-        `${apiBase}/api/export/paper/${paperId}/simple-language`,
-        { method: 'POST', headers: { 'Content-Type': 'application/json' } },
-      );
-      const data = await res.json();
-      setSimpleText(data.simple_language_text || null);
+      const url = `${apiBase}/api/export/paper/${paperId}/simple-language`;
+      // Generierung laeuft als Hintergrundjob: einstellen, dann Status abfragen
+      let res = await fetch(url, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+      });
+      let data = await res.json();
+      for (let i = 0; i < MAX_POLLS && ['queued', 'running'].includes(data.status); i++) {
+        await new Promise((resolve) => setTimeout(resolve, POLL_INTERVAL_MS));
+        res = await fetch(url);
+        data = await res.json();
+      }
+      setSimpleText(data.status === 'done' ? data.text || null : null);
       setSimpleMode(true);
       if (typeof window !== 'undefined' && window.plausible) {
         window.plausible('simple_language_generated', {